@@ -0,0 +1,69 @@
+"""Shared route dependencies for authentication, admission control and idempotency"""
+
+import hashlib
+import hmac
+from typing import Optional
+from fastapi import Header, HTTPException, Request
+from app.core.config import settings
+from app.core.metrics import get_metrics
+from app.core.rate_limit import AdmissionRejected, get_admission_controller
+from app.core.tasks import get_task_runtime
+
+def api_key_matches(presented: str) -> bool:
+    """Constant-time comparison against the shared secret and any per-client keys"""
+    presented_bytes = presented.encode()
+    return any(hmac.compare_digest(presented_bytes, key.encode()) for key in [settings.API_SECRET, *settings.API_KEYS])
+
+def admin_key_matches(presented: str) -> bool:
+    """Constant-time comparison against the shared secret only; client keys are not admins"""
+    return hmac.compare_digest(presented.encode(), settings.API_SECRET.encode())
+
+def _caller_key(request: Request) -> str:
+    """Identify the caller by API key digest, falling back to client address"""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return hashlib.blake2b(authorization.encode(), digest_size=8).hexdigest()
+    return request.client.host if request.client else "anonymous"
+
+async def rate_limit_caller(request: Request):
+    """Per-API-key token bucket"""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    try:
+        await get_admission_controller().check_key(_caller_key(request))
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers) from e
+
+async def rate_limit_session(session_id: str):
+    """Per-session token bucket; called once the session ID is known"""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    try:
+        await get_admission_controller().check_session(session_id)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers) from e
+
+async def llm_admission():
+    """Hold an LLM concurrency slot for the duration of the request"""
+    if not settings.RATE_LIMIT_ENABLED:
+        yield
+        return
+    try:
+        async with get_admission_controller().llm_limiter.slot():
+            yield
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers) from e
+
+async def backlog_admission():
+    """Shed new requests while post-response work is backlogged"""
+    retry_after = get_task_runtime().retry_after()
+    if retry_after is not None:
+        get_metrics().incr("admission.backlog_shed")
+        rejected = AdmissionRejected(503, "Server busy, please retry", retry_after)
+        raise HTTPException(status_code=rejected.status_code, detail=rejected.detail, headers=rejected.headers)
+
+async def idempotency_key(key: Optional[str] = Header(default=None, alias="Idempotency-Key")) -> Optional[str]:
+    """Client-chosen key that makes a mutating request safe to retry"""
+    if key is not None and not 1 <= len(key) <= 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key must be 1-255 characters")
+    return key
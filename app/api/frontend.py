@@ -0,0 +1,245 @@
+"""Serve the built single-page frontend from a precompressed in-memory asset cache"""
+
+import gzip
+import hashlib
+import mimetypes
+import mmap
+import os
+import re
+import time
+import zipfile
+from typing import Dict, List, Optional, Union
+import structlog
+from starlette.datastructures import Headers
+from starlette.types import Receive, Scope, Send
+from app.core.config import settings
+from app.core.metrics import get_metrics
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+# Vite writes built assets to `assets/name-<content hash>.ext`; they never change
+# under the same URL. Files copied from `public/` (icons, manifests) keep their
+# names, however hyphenated, so only the assets directory counts as hashed.
+HASHED_NAME = re.compile(r"^assets/[^/]+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+CHUNK_SIZE = 256 * 1024
+
+# Paths that belong to the API: unknown ones are a 404, never the app shell
+API_PREFIXES = ("/api/", "/health", "/docs", "/redoc", "/openapi.json")
+
+# Types that are already compressed, so no variants are stored
+_PRECOMPRESSED_TYPES = (
+    "image/png", "image/jpeg", "image/gif", "image/webp", "image/avif",
+    "font/woff", "video/", "audio/", "application/zip", "application/gzip"
+)
+
+class StaticAsset:
+    """One file with its precomputed encodings and validators"""
+
+    __slots__ = ("path", "content_type", "cache_control", "body", "etag", "variants")
+
+    def __init__(self, path: str, body: Union[bytes, mmap.mmap], cache_control: str, precompress: bool):
+        self.path = path
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if content_type.startswith("text/") or content_type in ("application/javascript", "image/svg+xml"):
+            content_type += "; charset=utf-8"
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.body = body
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.etag = f'"{digest}"'
+        # encoding -> (body, etag); each representation has its own strong validator
+        self.variants: Dict[str, tuple] = {}
+        if precompress and not content_type.startswith(_PRECOMPRESSED_TYPES):
+            self._add_variant("gzip", "gz", gzip.compress(body, compresslevel=9, mtime=0))
+            if brotli is not None:
+                self._add_variant("br", "br", brotli.compress(bytes(body), quality=11))
+
+    def _add_variant(self, encoding: str, suffix: str, compressed: bytes):
+        # Not worth a Content-Encoding unless it saves a tenth
+        if len(compressed) < len(self.body) * 0.9:
+            self.variants[encoding] = (compressed, f'"{self.etag[1:-1]}-{suffix}"')
+
+    def representation(self, accepted: str) -> tuple:
+        """(body, etag, encoding) for the client's Accept-Encoding"""
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and encoding in accepted:
+                body, etag = self.variants[encoding]
+                return body, etag, encoding
+        return self.body, self.etag, None
+
+    def matches(self, if_none_match: str) -> bool:
+        """Whether an If-None-Match header names any representation of this asset"""
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or any(etag in tags for _, etag in self.variants.values())
+
+class FrontendAssets:
+    """Every file of a built frontend (a directory or a zip of one), loaded once"""
+
+    def __init__(self, source: str, precompress_max_bytes: int, mmap_min_bytes: int):
+        self.source = source
+        self.precompress_max_bytes = precompress_max_bytes
+        self.mmap_min_bytes = mmap_min_bytes
+        self.assets: Dict[str, StaticAsset] = {}
+        self.loaded = False
+        self.load_seconds: Optional[float] = None
+        self._mapped: List[mmap.mmap] = []
+
+    def load(self):
+        """Read, hash and compress every file; a missing source leaves the cache empty"""
+        if self.loaded:
+            return
+        started = time.perf_counter()
+        try:
+            if os.path.isdir(self.source):
+                self._load_directory()
+            else:
+                self._load_zip()
+        except Exception as e:
+            logger.error("Error loading frontend assets", source=self.source, error=str(e))
+        self.loaded = True
+        self.load_seconds = time.perf_counter() - started
+        logger.info("Frontend assets loaded", source=self.source, assets=len(self.assets), seconds=round(self.load_seconds, 3))
+
+    def _add(self, path: str, body: Union[bytes, mmap.mmap]):
+        cache_control = IMMUTABLE if HASHED_NAME.search(path) else REVALIDATE
+        self.assets["/" + path] = StaticAsset(path, body, cache_control, len(body) <= self.precompress_max_bytes)
+
+    def _load_zip(self):
+        with zipfile.ZipFile(self.source) as archive:
+            names = [info.filename for info in archive.infolist() if not info.is_dir()]
+            # `zip -r frontend-dist.zip dist` nests everything under one directory
+            tops = {name.split("/", 1)[0] for name in names}
+            strip = len(tops.pop()) + 1 if len(tops) == 1 and all("/" in name for name in names) else 0
+            for name in names:
+                self._add(name[strip:], archive.read(name))
+
+    def _load_directory(self):
+        for root, _, files in os.walk(self.source):
+            for filename in files:
+                full_path = os.path.join(root, filename)
+                path = os.path.relpath(full_path, self.source).replace(os.sep, "/")
+                size = os.path.getsize(full_path)
+                with open(full_path, "rb") as f:
+                    if size >= self.mmap_min_bytes:
+                        # Large files stay in the page cache instead of the heap
+                        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                        self._mapped.append(mapped)
+                        self._add(path, mapped)
+                    else:
+                        self._add(path, f.read())
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        return self.assets.get(path)
+
+    def index(self) -> Optional[StaticAsset]:
+        return self.assets.get("/index.html")
+
+    def close(self):
+        self.assets.clear()
+        for mapped in self._mapped:
+            mapped.close()
+        self._mapped = []
+        self.loaded = False
+
+    def status(self) -> Dict:
+        return {
+            "source": self.source,
+            "loaded": self.loaded,
+            "assets": len(self.assets),
+            "bytes": sum(len(asset.body) for asset in self.assets.values()),
+            "compressed_bytes": sum(
+                len(body) for asset in self.assets.values() for body, _ in asset.variants.values()
+            ),
+            "load_seconds": self.load_seconds,
+        }
+
+class FrontendApp:
+    """ASGI app serving the SPA: assets by path, the app shell for client-side routes"""
+
+    def __init__(self, assets: FrontendAssets):
+        self.assets = assets
+
+    def _resolve(self, path: str) -> Optional[StaticAsset]:
+        if path == "/":
+            return self.assets.index()
+        asset = self.assets.get(path)
+        if asset is not None or path.startswith(API_PREFIXES):
+            return asset
+        # A path without a file extension is a client-side route
+        if "." in path.rsplit("/", 1)[-1]:
+            return None
+        return self.assets.index()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return
+        self.assets.load()
+        if scope["method"] not in ("GET", "HEAD"):
+            await _send_plain(send, 405, b"Method Not Allowed", [(b"allow", b"GET, HEAD")])
+            return
+        asset = self._resolve(scope["path"])
+        if asset is None:
+            await _send_plain(send, 404, b"Not Found")
+            return
+
+        request_headers = Headers(scope=scope)
+        body, etag, encoding = asset.representation(request_headers.get("accept-encoding", ""))
+        headers = [
+            (b"content-type", asset.content_type.encode()),
+            (b"cache-control", asset.cache_control.encode()),
+            (b"etag", etag.encode()),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and asset.matches(if_none_match):
+            metrics.incr("frontend.not_modified")
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        metrics.incr("frontend.responses")
+        if encoding:
+            headers.append((b"content-encoding", encoding.encode()))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b""})
+        elif isinstance(body, bytes):
+            await send({"type": "http.response.body", "body": body})
+        else:
+            # Memory-mapped: stream slices rather than copy the whole file at once
+            for offset in range(0, len(body), CHUNK_SIZE):
+                chunk = body[offset:offset + CHUNK_SIZE]
+                await send({"type": "http.response.body", "body": chunk, "more_body": offset + CHUNK_SIZE < len(body)})
+
+async def _send_plain(send: Send, status: int, body: bytes, extra_headers: Optional[List[tuple]] = None):
+    headers = [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", str(len(body)).encode())]
+    await send({"type": "http.response.start", "status": status, "headers": headers + (extra_headers or [])})
+    await send({"type": "http.response.body", "body": body})
+
+# Frontend asset cache instance
+_frontend_assets: Optional[FrontendAssets] = None
+
+def get_frontend_assets() -> FrontendAssets:
+    """Get frontend asset cache"""
+    global _frontend_assets
+    if _frontend_assets is None:
+        _frontend_assets = FrontendAssets(
+            settings.FRONTEND_DIST,
+            settings.FRONTEND_PRECOMPRESS_MAX_BYTES,
+            settings.FRONTEND_MMAP_MIN_BYTES
+        )
+    return _frontend_assets
+
+def frontend_status() -> Dict:
+    return get_frontend_assets().status()
+
+metrics.register_collector("frontend", frontend_status)
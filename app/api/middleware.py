@@ -0,0 +1,124 @@
+"""Pure ASGI middleware for request timing and response compression"""
+
+import gzip
+import time
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.metrics import get_metrics
+from app.core.profiling import get_profiler
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+metrics = get_metrics()
+
+class TimingMiddleware:
+    """Record per-route latency and report it in a Server-Timing header.
+
+    With profiling on, the request is traced too: its phase spans are added
+    to the header and kept in full when the request is slow.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        profiler = get_profiler()
+        trace = profiler.begin()
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - started
+                route = getattr(scope.get("route"), "path", "unmatched")
+                metrics.observe(f"http.{scope['method']} {route}", elapsed)
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", f"app;dur={elapsed * 1000:.2f}")
+                if trace is not None and not trace.done:
+                    profiler.finish(trace, scope["method"], route, scope["path"], message["status"])
+                    phases: dict = {}
+                    for name, _, duration in trace.spans:
+                        phases[name] = phases.get(name, 0.0) + duration
+                    for name, duration in phases.items():
+                        headers.append("Server-Timing", f"{name};dur={duration * 1000:.2f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if trace is not None:
+                profiler.end(trace)
+
+class CompressionMiddleware:
+    """Compress complete response bodies above a size threshold.
+
+    Brotli is preferred when installed and accepted by the client, gzip
+    otherwise. Streaming responses and bodies below `minimum_size` pass
+    through untouched so small chat replies do not pay for compression.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _choose_encoding(self, scope: Scope) -> Optional[str]:
+        accepted = Headers(scope=scope).get("accept-encoding", "")
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        encoding = self._choose_encoding(scope) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+
+        async def send_compressed(message: Message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(scope=start)
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                # The app already chose an encoding for this client (precompressed assets)
+                or "accept-encoding" in headers.get("vary", "").lower()
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = self._compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
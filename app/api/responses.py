@@ -0,0 +1,123 @@
+"""Response classes for the fast serialization path"""
+
+from contextvars import ContextVar
+from typing import Any, Callable
+import orjson
+from fastapi import HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+_JSON_RANGES = (JSON, "application/*", "*/*")
+
+# Format negotiated for the current request; JSON outside negotiated routes
+_response_format: ContextVar[str] = ContextVar("response_format", default=JSON)
+
+def preferred_format(accept: str) -> str:
+    """MessagePack if the Accept header ranks it above JSON, else JSON"""
+    if msgpack is None or "msgpack" not in accept:
+        return JSON
+    msgpack_rank, json_rank = (0.0, 0), (0.0, 0)
+    for position, media_range in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        # Higher quality wins; on a tie, the type listed first
+        rank = (quality, -position)
+        if media_type in MSGPACK_TYPES:
+            msgpack_rank = max(msgpack_rank, rank)
+        elif media_type in _JSON_RANGES:
+            json_rank = max(json_rank, rank)
+    return MSGPACK if msgpack_rank[0] > 0 and msgpack_rank > json_rank else JSON
+
+def response_format() -> str:
+    """Media type negotiated for the current request"""
+    return _response_format.get()
+
+def to_msgpack(content: Any) -> bytes:
+    """MessagePack with the same values as the JSON rendering (ISO datetimes, enum values).
+
+    Models go through pydantic-core's JSON serializer and orjson: faster than
+    building a JSON-mode dict in pydantic, and identical to the JSON response.
+    """
+    if isinstance(content, BaseModel):
+        return msgpack.packb(orjson.loads(content.__pydantic_serializer__.to_json(content)))
+    return msgpack.packb(orjson.loads(orjson.dumps(content)))
+
+def transcode(body: bytes, wanted: str) -> bytes:
+    """Re-encode a JSON body as MessagePack, or the reverse"""
+    if wanted == MSGPACK:
+        return msgpack.packb(orjson.loads(body))
+    return orjson.dumps(msgpack.unpackb(body))
+
+class ModelResponse(ORJSONResponse):
+    """JSON response rendered straight from an already-validated pydantic model.
+
+    Returning a Response from a route bypasses FastAPI's response_model
+    re-validation, and pydantic-core serializes the model to JSON bytes
+    without an intermediate dict. The route keeps `response_model` for the
+    OpenAPI schema. Plain dicts fall back to orjson. On negotiated routes a
+    client that prefers MessagePack gets it instead.
+    """
+
+    def __init__(self, content: Any, *args, **kwargs):
+        if _response_format.get() == MSGPACK:
+            self.media_type = MSGPACK
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type == MSGPACK:
+            return to_msgpack(content)
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return super().render(content)
+
+class MsgPackRequest(Request):
+    """Request whose body is MessagePack, decoded where FastAPI expects JSON"""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = msgpack.unpackb(await self.body())
+        return self._json
+
+class NegotiatedRoute(APIRoute):
+    """Route that accepts MessagePack bodies and answers in the format the client prefers.
+
+    JSON stays the default. Routers using it should default to ModelResponse
+    so plain dict returns are negotiated too.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def negotiated_handler(request: Request) -> Response:
+            content_type = request.headers.get("content-type", "").split(";", 1)[0].strip()
+            if content_type in MSGPACK_TYPES:
+                if msgpack is None:
+                    raise HTTPException(status_code=415, detail="MessagePack is not supported")
+                # FastAPI only parses bodies it recognizes as JSON
+                headers = [(name, value) for name, value in request.scope["headers"] if name != b"content-type"]
+                scope = {**request.scope, "headers": headers + [(b"content-type", JSON.encode())]}
+                request = MsgPackRequest(scope, request.receive)
+            token = _response_format.set(preferred_format(request.headers.get("accept", "")))
+            try:
+                response = await handler(request)
+            finally:
+                _response_format.reset(token)
+            response.headers.add_vary_header("Accept")
+            return response
+
+        return negotiated_handler
@@ -0,0 +1,50 @@
+"""Admin routes: runtime profiling"""
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import get_metrics
+from app.core.profiling import Profiler, get_profiler
+from app.models.schemas import ProfilingUpdate
+
+router = APIRouter()
+
+@router.get("/profiling")
+async def profiling_status(profiler: Profiler = Depends(get_profiler)):
+    """Profiling switches and per-phase latency of traced requests"""
+    latencies = get_metrics().snapshot()["latencies"]
+    return {
+        **profiler.status(),
+        "phases": {name[len("span."):]: summary for name, summary in latencies.items() if name.startswith("span.")}
+    }
+
+@router.put("/profiling")
+async def update_profiling(update: ProfilingUpdate, profiler: Profiler = Depends(get_profiler)):
+    """Switch span tracing or the sampling profiler on or off without a restart"""
+    if update.spans_enabled is not None:
+        profiler.spans_enabled = update.spans_enabled
+    if update.slow_request_ms is not None:
+        profiler.slow_request_seconds = update.slow_request_ms / 1000
+    if update.sampler_running is True:
+        profiler.sampler.start()
+    elif update.sampler_running is False:
+        profiler.sampler.stop()
+    return profiler.status()
+
+@router.get("/profiling/slow")
+async def slow_requests(
+    limit: int = Query(default=20, ge=1, le=1000),
+    profiler: Profiler = Depends(get_profiler)
+):
+    """Phase breakdowns of the slowest captured requests"""
+    return {
+        "threshold_ms": profiler.slow_request_seconds * 1000,
+        "requests": profiler.slowest(limit)
+    }
+
+@router.get("/profiling/flamegraph", response_class=PlainTextResponse)
+async def flamegraph(reset: bool = False, profiler: Profiler = Depends(get_profiler)):
+    """Sampled stacks in collapsed format, for flamegraph.pl or speedscope"""
+    stacks = profiler.sampler.collapsed()
+    if reset:
+        profiler.sampler.reset()
+    return PlainTextResponse(stacks)
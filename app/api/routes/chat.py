@@ -1,61 +1,195 @@
 """Chat API routes"""
 
 import uuid
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import JSONResponse
 import structlog
 from app.models.schemas import (
     ChatRequest, ChatResponse, FieldSelectionRequest, 
-    AnswerRequest, AnswerResponse, FieldType, ChatMessage
+    AnswerRequest, AnswerResponse, FieldType, Question, SessionEventType, UserSession
 )
-from app.services.session_service import SessionService
-from app.services.question_service import QuestionService
+from app.api.dependencies import idempotency_key, rate_limit_session
+from app.api.responses import ModelResponse, NegotiatedRoute
+from app.services.session_service import SessionService, session_lock
+from app.core.config import settings
+from app.core.profiling import span
+from app.core.tasks import get_task_runtime
+from app.services.question_service import QuestionService, get_question_service
+from app.services.speculation import SpeculativeGenerator, get_speculative_generator
+from app.services.dedup import QuestionDeduplicator, get_deduplicator, new_user_filter
+from app.services.explanations import ExplanationService, get_explanation_service, local_explanation
+from app.services.idempotency import IdempotencyCache, get_idempotency_cache
+from app.services.leaderboard import LeaderboardStore, get_leaderboard_store, record_session
+from app.services.push_hub import PushHub, get_push_hub, session_update
+from app.services.timers import QuestionTimers, get_question_timers
+from app.services.question_store import content_id
 
 logger = structlog.get_logger()
-router = APIRouter()
+# JSON by default; MessagePack for clients that send or accept it
+router = APIRouter(route_class=NegotiatedRoute, default_response_class=ModelResponse)
+
+async def _fresh_question(
+    session: UserSession,
+    question: Question,
+    session_service: SessionService,
+    question_service: QuestionService,
+    deduplicator: QuestionDeduplicator
+) -> Question:
+    """Swap out a question the session or user has already seen, then mark it seen"""
+    profile = await session_service.get_user_profile(session.user_id) if session.user_id else None
+    user_filter = new_user_filter(profile.seen_filter, profile.seen_filter_previous) if profile else None
+    
+    question = await deduplicator.fresh_question(
+        session,
+        question,
+        lambda: question_service.generate_question(question.field, question.difficulty, session.recent_questions),
+        user_filter
+    )
+    
+    # Re-read under the profile lock rather than saving the copy loaded above,
+    # which may be stale after the regenerations
+    if profile:
+        await session_service.record_seen(profile.user_id, question.question)
+    return question
+
+async def _serve(
+    session_service: SessionService,
+    session: UserSession,
+    question: Question,
+    explanations: ExplanationService,
+    timers: QuestionTimers
+):
+    """Make `question` the session's current question and start its clock"""
+    # Content-addressed, so every session served this question shares one stored copy
+    question.id = content_id(question)
+    session_service.record(
+        session,
+        SessionEventType.QUESTION_SERVED,
+        question=question.model_dump(mode="json", exclude_none=True),
+        message_id=str(uuid.uuid4())
+    )
+    explanations.prefetch(question)
+    deadline = session_service.question_deadline(session)
+    if deadline:
+        await timers.schedule(session.id, deadline.timestamp())
+
+def _time_out(session_service: SessionService, session: UserSession) -> str:
+    """Count the current question as wrong because its time ran out; returns the feedback"""
+    question = session.current_question
+    explanation = f"Time's up! The correct answer was {question.correct_answer}."
+    projected = session.model_copy(update={"total_questions": session.total_questions + 1})
+    session_service.record(
+        session,
+        SessionEventType.QUESTION_TIMED_OUT,
+        response_seconds=float(question.time_limit),
+        difficulty=session_service.calculate_adaptive_difficulty(projected),
+        message={"id": str(uuid.uuid4()), "content": explanation}
+    )
+    return explanation
+
+async def _advance(
+    session: UserSession,
+    session_service: SessionService,
+    question_service: QuestionService,
+    speculator: SpeculativeGenerator,
+    deduplicator: QuestionDeduplicator,
+    leaderboards: LeaderboardStore,
+    explanations: ExplanationService,
+    timers: QuestionTimers
+) -> Optional[Question]:
+    """Complete the session or serve its next question; returns the question served"""
+    if session.total_questions >= settings.QUESTIONS_PER_SESSION:
+        session_service.record(
+            session,
+            SessionEventType.SESSION_COMPLETED,
+            message={
+                "id": str(uuid.uuid4()),
+                "content": f"Session complete! You scored {session.score} points with {session.correct_answers}/{session.total_questions} correct answers."
+            }
+        )
+        # The response does not depend on the profile or leaderboards
+        tasks = get_task_runtime()
+        await tasks.defer("post_response", session_service.record_completion, session)
+        await tasks.defer("post_response", record_session, leaderboards, session)
+        return None
+    
+    # Generate next question (served from a speculative branch when available)
+    next_question = await speculator.next_question(
+        session,
+        int(session.difficulty),
+        session.recent_questions
+    )
+    next_question = await _fresh_question(session, next_question, session_service, question_service, deduplicator)
+    await _serve(session_service, session, next_question, explanations, timers)
+    return next_question
+
+async def expire_question(session_id: str):
+    """Timer callback: time out the session's question if it is still unanswered past its deadline"""
+    session_service = SessionService()
+    # Serialized with answers to the same question, which would otherwise time it out twice
+    async with session_lock(session_id):
+        try:
+            session = await session_service.get_session(session_id)
+            deadline = session_service.question_deadline(session) if session else None
+            if deadline is None or datetime.now() < deadline:
+                # Answered in time, or a newer question with a later deadline
+                return
+        
+            _time_out(session_service, session)
+            next_question = await _advance(
+                session, session_service, get_question_service(), get_speculative_generator(), get_deduplicator(),
+                get_leaderboard_store(), get_explanation_service(), get_question_timers()
+            )
+            await session_service.update_session(session)
+            await get_push_hub().publish(session_update(session, "complete" if session.is_complete else "timeout", False))
+            if next_question:
+                get_speculative_generator().speculate(session, session_service, session.recent_questions)
+        except Exception as e:
+            logger.error("Error expiring question", error=str(e), session_id=session_id)
 
 @router.post("/message", response_model=ChatResponse)
 async def send_message(
     request: ChatRequest,
     session_service: SessionService = Depends(lambda: SessionService()),
-    question_service: QuestionService = Depends(lambda: QuestionService())
+    question_service: QuestionService = Depends(get_question_service),
+    speculator: SpeculativeGenerator = Depends(get_speculative_generator),
+    deduplicator: QuestionDeduplicator = Depends(get_deduplicator),
+    explanations: ExplanationService = Depends(get_explanation_service),
+    timers: QuestionTimers = Depends(get_question_timers)
 ):
     """Send a message to the chatbot"""
+    await rate_limit_session(request.session_id)
     try:
         session = await session_service.get_session(request.session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         
         # Add user message to session
-        user_message = ChatMessage(
-            id=str(uuid.uuid4()),
-            type="user",
-            content=request.message
+        session_service.record(
+            session,
+            SessionEventType.MESSAGE_RECEIVED,
+            message={"id": str(uuid.uuid4()), "content": request.message}
         )
-        session.messages.append(user_message)
         
         # Process message based on current state
         if not session.selected_field and request.field:
             # Field selection
-            session.selected_field = request.field
+            session_service.record(
+                session,
+                SessionEventType.FIELD_SELECTED,
+                field=request.field.value,
+                difficulty=await session_service.starting_difficulty(session.user_id, request.field)
+            )
             response_text = f"Great choice! Let's test your {request.field} skills. Here's your first question:"
             
             # Generate first question
-            question = await question_service.generate_question(
-                session.selected_field, 
-                int(session.difficulty)
-            )
-            session.current_question = question
+            question = await speculator.first_question(session.selected_field, int(session.difficulty))
+            question = await _fresh_question(session, question, session_service, question_service, deduplicator)
             
             # Add bot response
-            bot_message = ChatMessage(
-                id=str(uuid.uuid4()),
-                type="question",
-                content=question.question,
-                question=question
-            )
-            session.messages.append(bot_message)
+            await _serve(session_service, session, question, explanations, timers)
+            speculator.speculate(session, session_service, session.recent_questions)
             
         else:
             response_text = "I didn't understand that. Please select a field to get started or answer the current question."
@@ -63,7 +197,7 @@ async def send_message(
         
         await session_service.update_session(session)
         
-        return ChatResponse(
+        return ModelResponse(ChatResponse(
             session_id=session.id,
             response=response_text,
             question=session.current_question,
@@ -75,7 +209,7 @@ async def send_message(
                 "correct_answers": session.correct_answers,
                 "accuracy": session.correct_answers / max(session.total_questions, 1)
             }
-        )
+        ))
     
     except Exception as e:
         logger.error("Error processing message", error=str(e), request=request.model_dump())
@@ -85,45 +219,58 @@ async def send_message(
 async def select_field(
     request: FieldSelectionRequest,
     session_service: SessionService = Depends(lambda: SessionService()),
-    question_service: QuestionService = Depends(lambda: QuestionService())
+    question_service: QuestionService = Depends(get_question_service),
+    speculator: SpeculativeGenerator = Depends(get_speculative_generator),
+    deduplicator: QuestionDeduplicator = Depends(get_deduplicator),
+    explanations: ExplanationService = Depends(get_explanation_service),
+    timers: QuestionTimers = Depends(get_question_timers),
+    key: Optional[str] = Depends(idempotency_key),
+    idempotency: IdempotencyCache = Depends(get_idempotency_cache)
 ):
     """Select a field for testing"""
+    await rate_limit_session(request.session_id)
+    return await idempotency.run(
+        "select-field", request.session_id, key, request,
+        lambda: _select_field(request, session_service, question_service, speculator, deduplicator, explanations, timers)
+    )
+
+async def _select_field(
+    request: FieldSelectionRequest,
+    session_service: SessionService,
+    question_service: QuestionService,
+    speculator: SpeculativeGenerator,
+    deduplicator: QuestionDeduplicator,
+    explanations: ExplanationService,
+    timers: QuestionTimers
+):
     try:
         session = await session_service.get_session(request.session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         
-        session.selected_field = request.field
-        
-        # Initialize field score
-        session_service.update_field_scores(session, request.field, is_correct=True)
-        session.field_scores[request.field.value].correct = 0  # Reset initial increment
-        session.field_scores[request.field.value].total = 0
-        
-        # Generate first question
-        question = await question_service.generate_question(
-            request.field, 
-            int(session.difficulty)
-        )
-        session.current_question = question
-        
-        # Add messages
-        field_message = ChatMessage(
-            id=str(uuid.uuid4()),
-            type="bot",
-            content=f"Excellent! You've selected {request.field.value}. Let's begin with your first question."
+        # Select the field, reset its score and open at the user's known ability
+        difficulty = session.difficulty
+        if session.total_questions == 0:
+            difficulty = await session_service.starting_difficulty(session.user_id, request.field)
+        session_service.record(
+            session,
+            SessionEventType.FIELD_SELECTED,
+            field=request.field.value,
+            difficulty=difficulty,
+            reset_score=True,
+            message={
+                "id": str(uuid.uuid4()),
+                "content": f"Excellent! You've selected {request.field.value}. Let's begin with your first question."
+            }
         )
-        session.messages.append(field_message)
         
-        question_message = ChatMessage(
-            id=str(uuid.uuid4()),
-            type="question",
-            content=question.question,
-            question=question
-        )
-        session.messages.append(question_message)
+        # Generate first question
+        question = await speculator.first_question(request.field, int(session.difficulty))
+        question = await _fresh_question(session, question, session_service, question_service, deduplicator)
+        await _serve(session_service, session, question, explanations, timers)
         
         await session_service.update_session(session)
+        speculator.speculate(session, session_service, session.recent_questions)
         
         return {"message": "Field selected successfully", "question": question}
     
@@ -135,100 +282,125 @@ async def select_field(
 async def submit_answer(
     request: AnswerRequest,
     session_service: SessionService = Depends(lambda: SessionService()),
-    question_service: QuestionService = Depends(lambda: QuestionService())
+    question_service: QuestionService = Depends(get_question_service),
+    speculator: SpeculativeGenerator = Depends(get_speculative_generator),
+    deduplicator: QuestionDeduplicator = Depends(get_deduplicator),
+    leaderboards: LeaderboardStore = Depends(get_leaderboard_store),
+    explanations: ExplanationService = Depends(get_explanation_service),
+    timers: QuestionTimers = Depends(get_question_timers),
+    push: PushHub = Depends(get_push_hub),
+    key: Optional[str] = Depends(idempotency_key),
+    idempotency: IdempotencyCache = Depends(get_idempotency_cache)
 ):
     """Submit an answer to the current question"""
+    await rate_limit_session(request.session_id)
+    return await idempotency.run(
+        "answer", request.session_id, key, request,
+        lambda: _submit_answer(request, session_service, question_service, speculator, deduplicator, leaderboards, explanations, timers, push)
+    )
+
+async def _submit_answer(
+    request: AnswerRequest,
+    session_service: SessionService,
+    question_service: QuestionService,
+    speculator: SpeculativeGenerator,
+    deduplicator: QuestionDeduplicator,
+    leaderboards: LeaderboardStore,
+    explanations: ExplanationService,
+    timers: QuestionTimers,
+    push: PushHub
+):
+    """Answer under the session's lock, so an expiry firing at the deadline sees the answer or is seen by it"""
+    async with session_lock(request.session_id):
+        return await _answer_locked(
+            request, session_service, question_service, speculator, deduplicator, leaderboards, explanations, timers, push
+        )
+
+async def _answer_locked(
+    request: AnswerRequest,
+    session_service: SessionService,
+    question_service: QuestionService,
+    speculator: SpeculativeGenerator,
+    deduplicator: QuestionDeduplicator,
+    leaderboards: LeaderboardStore,
+    explanations: ExplanationService,
+    timers: QuestionTimers,
+    push: PushHub
+):
     try:
-        session = await session_service.get_session(request.session_id)
+        with span("load"):
+            session = await session_service.get_session(request.session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
         
         if not session.current_question:
             raise HTTPException(status_code=400, detail="No active question")
+        if request.question_id and request.question_id != session.current_question.id:
+            raise HTTPException(status_code=409, detail="Question is no longer current (it may have timed out)")
         
-        # Evaluate answer
-        is_correct, explanation = question_service.evaluate_answer(
-            session.current_question, 
-            request.answer
-        )
-        
-        # Update session stats
-        session.total_questions += 1
-        if is_correct:
-            session.correct_answers += 1
-            session.score += session.current_question.points
-        
-        # Update field scores
-        session_service.update_field_scores(
-            session, 
-            session.current_question.field, 
-            is_correct
-        )
-        
-        # Add user answer message
-        user_message = ChatMessage(
-            id=str(uuid.uuid4()),
-            type="user",
-            content=request.answer
-        )
-        session.messages.append(user_message)
-        
-        # Add feedback message
-        feedback_message = ChatMessage(
-            id=str(uuid.uuid4()),
-            type="bot",
-            content=f"{'Correct!' if is_correct else 'Incorrect.'} {explanation}",
-            is_correct=is_correct
-        )
-        session.messages.append(feedback_message)
-        
-        # Calculate new difficulty
-        session.difficulty = session_service.calculate_adaptive_difficulty(session)
-        
-        # Check if session is complete
-        next_question = None
-        if session.total_questions >= 10:  # Configurable
-            session.is_complete = True
-            session.end_time = datetime.now()
-            
-            # Add completion message
-            completion_message = ChatMessage(
-                id=str(uuid.uuid4()),
-                type="bot",
-                content=f"Session complete! You scored {session.score} points with {session.correct_answers}/{session.total_questions} correct answers."
-            )
-            session.messages.append(completion_message)
+        now = datetime.now()
+        deadline = session_service.question_deadline(session)
+        await timers.cancel(session.id)
+        timed_out = deadline is not None and now > deadline
+        if timed_out:
+            # Answered after the deadline but before the expiry timer got to it
+            is_correct = False
+            explanation = _time_out(session_service, session)
+            response_seconds = float(session.current_question.time_limit)
         else:
-            # Generate next question
-            question_history = [msg.question.question for msg in session.messages if msg.question]
-            next_question = await question_service.generate_question(
-                session.selected_field,
-                int(session.difficulty),
-                question_history[-5:]  # Last 5 questions for context
-            )
-            session.current_question = next_question
+            with span("evaluate"):
+                is_correct, explanation = question_service.evaluate_answer(
+                    session.current_question, 
+                    request.answer
+                )
+                # Explanations are generated lazily; use one if it is ready, else a short local
+                # one (the full text is at GET /questions/{id}/explanation)
+                explanation = explanation or explanations.peek(session.current_question) or local_explanation(session.current_question)
+                response_seconds = round((now - session.question_served_at).total_seconds(), 3) if session.question_served_at else None
             
-            # Add next question message
-            question_message = ChatMessage(
-                id=str(uuid.uuid4()),
-                type="question",
-                content=next_question.question,
-                question=next_question
-            )
-            session.messages.append(question_message)
+                # Difficulty after this answer, from the projected stats
+                projected = session.model_copy(update={
+                    "total_questions": session.total_questions + 1,
+                    "correct_answers": session.correct_answers + int(is_correct)
+                })
+                session_service.record(
+                    session,
+                    SessionEventType.ANSWER_EVALUATED,
+                    answer=request.answer,
+                    is_correct=is_correct,
+                    explanation=explanation,
+                    difficulty=session_service.calculate_adaptive_difficulty(projected),
+                    response_seconds=response_seconds,
+                    answer_message_id=str(uuid.uuid4()),
+                    feedback_message_id=str(uuid.uuid4())
+                )
         
-        await session_service.update_session(session)
+        with span("generate"):
+            next_question = await _advance(
+                session, session_service, question_service, speculator, deduplicator, leaderboards, explanations, timers
+            )
+        with span("save"):
+            await session_service.update_session(session)
+        await push.publish(session_update(
+            session, "complete" if session.is_complete else "timeout" if timed_out else "answer", is_correct
+        ))
+        if next_question:
+            speculator.speculate(session, session_service, session.recent_questions)
         
-        return AnswerResponse(
+        return ModelResponse(AnswerResponse(
             session_id=session.id,
             is_correct=is_correct,
             explanation=explanation,
             score=session.score,
             next_question=next_question,
             is_complete=session.is_complete,
-            difficulty=session.difficulty
-        )
+            difficulty=session.difficulty,
+            timed_out=timed_out,
+            response_seconds=response_seconds
+        ))
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Error submitting answer", error=str(e))
         raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
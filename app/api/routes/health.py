@@ -1,7 +1,12 @@
 """Health check routes"""
 
 from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
 from datetime import datetime
+from app.core.circuit_breaker import OPEN
+from app.core.metrics import get_metrics
+from app.services.question_service import ai_path_status
+from app.services.warmup import get_warmup
 
 router = APIRouter()
 
@@ -17,13 +22,33 @@ async def health_check():
 @router.get("/ready")
 async def readiness_check():
     """Readiness check for deployment"""
+    warmup = get_warmup()
+    if warmup.warming:
+        # Kept out of rotation until connections are open and caches are filled
+        return ORJSONResponse(
+            status_code=503,
+            content={"status": "warming", "timestamp": datetime.now().isoformat(), "warmup": warmup.status()}
+        )
+    
     # Add checks for external dependencies here
-    # (database connectivity, OpenAI API, etc.)
+    # (database connectivity, etc.)
+    ai_path = ai_path_status()
+    breaker_state = ai_path.get("breaker", {}).get("state")
     return {
         "status": "ready",
         "timestamp": datetime.now().isoformat(),
         "checks": {
             "database": "connected",
-            "openai": "available"
+            # Template fallback keeps the service ready while the LLM is degraded
+            "openai": "degraded" if breaker_state == OPEN else "available",
+            "ai_path": ai_path
         }
-    }
\ No newline at end of file
+    }
+
+@router.get("/metrics")
+async def metrics():
+    """In-process service metrics"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "metrics": get_metrics().snapshot()
+    }
@@ -0,0 +1,67 @@
+"""Leaderboard API routes"""
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+import structlog
+from app.models.schemas import FieldType, LeaderboardEntry, LeaderboardRank, LeaderboardResponse
+from app.api.responses import ModelResponse
+from app.services.leaderboard import GLOBAL_BOARD, LeaderboardStore, get_leaderboard_store
+from app.services.session_service import SessionService
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+_BOARDS = {GLOBAL_BOARD, *(field.value for field in FieldType)}
+
+def _check_board(board: str):
+    if board not in _BOARDS:
+        raise HTTPException(status_code=404, detail="Unknown leaderboard")
+
+@router.get("/{board}", response_model=LeaderboardResponse)
+async def get_leaderboard(
+    board: str,
+    limit: int = Query(default=10, ge=1, le=100),
+    store: LeaderboardStore = Depends(get_leaderboard_store)
+):
+    """Top sessions on the global board or a field's board"""
+    _check_board(board)
+    try:
+        top = await store.top(board, limit)
+        return ModelResponse(LeaderboardResponse(
+            board=board,
+            total=await store.size(board),
+            entries=[
+                LeaderboardEntry(rank=i + 1, session_id=session_id, score=score)
+                for i, (session_id, score) in enumerate(top)
+            ]
+        ))
+    except Exception as e:
+        logger.error("Error reading leaderboard", error=str(e), board=board)
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
+@router.get("/{board}/sessions/{session_id}", response_model=LeaderboardRank)
+async def get_session_rank(
+    board: str,
+    session_id: str,
+    store: LeaderboardStore = Depends(get_leaderboard_store),
+    session_service: SessionService = Depends(lambda: SessionService())
+):
+    """A session's rank and percentile on a board"""
+    _check_board(board)
+    try:
+        session = await session_service.get_session(session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        rank = await store.rank(board, session_id)
+        return ModelResponse(LeaderboardRank(
+            board=board,
+            session_id=session_id,
+            score=session.score,
+            rank=rank + 1 if rank is not None else None,
+            percentile=await store.percentile(board, session.score),
+            total=await store.size(board)
+        ))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error reading session rank", error=str(e), board=board, session_id=session_id)
+        raise HTTPException(status_code=500, detail="Internal server error") from e
@@ -0,0 +1,80 @@
+"""Live session update routes (WebSocket)"""
+
+import asyncio
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect
+import structlog
+from app.api.dependencies import api_key_matches
+from app.core.config import settings
+from app.services.push_hub import PushHub, Subscriber, get_push_hub, group_topic, session_topic
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+def _authorized(websocket: WebSocket, token: Optional[str]) -> bool:
+    if not settings.REQUIRE_AUTH:
+        return True
+    authorization = websocket.headers.get("authorization", "")
+    presented = token or (authorization[len("Bearer "):] if authorization.startswith("Bearer ") else "")
+    return bool(presented) and api_key_matches(presented)
+
+def _topics(session_ids: List[str], groups: List[str]) -> List[str]:
+    return [session_topic(session_id) for session_id in session_ids] + [group_topic(group) for group in groups]
+
+async def _send(websocket: WebSocket, subscriber: Subscriber):
+    while True:
+        message = await subscriber.next()
+        if message is None:
+            await websocket.close(code=1013, reason="Subscriber too slow; reconnect")
+            return
+        await websocket.send_text(message)
+
+async def _receive(websocket: WebSocket, hub: PushHub, subscriber: Subscriber):
+    """Apply {"action": "subscribe" | "unsubscribe", "session_ids": [...], "groups": [...]} commands"""
+    while True:
+        try:
+            command = await websocket.receive_json()
+            topics = _topics(command.get("session_ids", []), command.get("groups", []))
+            if command.get("action") == "subscribe":
+                hub.subscribe(topics, subscriber)
+            elif command.get("action") == "unsubscribe":
+                hub.unsubscribe(subscriber, topics)
+            else:
+                raise ValueError("action must be subscribe or unsubscribe")
+        except WebSocketDisconnect:
+            return
+        except (ValueError, TypeError, AttributeError) as e:
+            await websocket.send_json({"error": str(e)})
+
+@router.websocket("/sessions")
+async def session_updates(
+    websocket: WebSocket,
+    session_id: List[str] = Query(default=[]),
+    group: List[str] = Query(default=[]),
+    token: Optional[str] = None,
+    hub: PushHub = Depends(get_push_hub)
+):
+    """Stream score, difficulty and progress updates for the given sessions and groups"""
+    if not _authorized(websocket, token):
+        await websocket.close(code=1008, reason="Invalid API key")
+        return
+    await websocket.accept()
+    try:
+        subscriber = hub.subscribe(_topics(session_id, group))
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    tasks = [
+        asyncio.create_task(_send(websocket, subscriber)),
+        asyncio.create_task(_receive(websocket, hub, subscriber))
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() and not isinstance(task.exception(), WebSocketDisconnect):
+                logger.warning("Push connection error", error=str(task.exception()))
+    finally:
+        for task in tasks:
+            task.cancel()
+        hub.unsubscribe(subscriber)
@@ -0,0 +1,54 @@
+"""Question API routes"""
+
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+import structlog
+from app.models.schemas import ExplanationResponse, Question, UserSession
+from app.api.dependencies import rate_limit_session
+from app.api.responses import ModelResponse
+from app.services.explanations import ExplanationService, get_explanation_service
+from app.services.session_service import SessionService
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+def _served_question(session: UserSession, question_id: str) -> Optional[Question]:
+    """A question the session has been served, most recent first"""
+    if session.current_question and session.current_question.id == question_id:
+        return session.current_question
+    for message in reversed(session.messages):
+        if message.question and message.question.id == question_id:
+            return message.question
+    return None
+
+@router.get("/{question_id}/explanation", response_model=ExplanationResponse)
+async def get_explanation(
+    question_id: str,
+    session_id: str = Query(...),
+    session_service: SessionService = Depends(lambda: SessionService()),
+    explanations: ExplanationService = Depends(get_explanation_service)
+):
+    """Explanation of a question the session has already answered"""
+    await rate_limit_session(session_id)
+    try:
+        session = await session_service.get_session(session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        
+        question = _served_question(session, question_id)
+        if question is None:
+            raise HTTPException(status_code=404, detail="Question not found in session")
+        # The explanation gives the answer away
+        if question is session.current_question and not session.is_complete:
+            raise HTTPException(status_code=409, detail="Question has not been answered yet")
+        
+        return ModelResponse(ExplanationResponse(
+            question_id=question_id,
+            explanation=await explanations.explain(question)
+        ))
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error getting explanation", error=str(e), question_id=question_id)
+        raise HTTPException(status_code=500, detail="Internal server error") from e
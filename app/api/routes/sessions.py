@@ -7,10 +7,14 @@ from app.models.schemas import (
     SessionCreateRequest, SessionResponse, UserSession, 
     PerformanceAnalytics
 )
+from app.api.dependencies import rate_limit_session
+from app.api.responses import ModelResponse, NegotiatedRoute
+from app.services.leaderboard import LeaderboardStore, get_leaderboard_store
 from app.services.session_service import SessionService
 
 logger = structlog.get_logger()
-router = APIRouter()
+# JSON by default; MessagePack for clients that send or accept it
+router = APIRouter(route_class=NegotiatedRoute, default_response_class=ModelResponse)
 
 @router.post("/create", response_model=SessionResponse)
 async def create_session(
@@ -19,16 +23,16 @@ async def create_session(
 ):
     """Create a new testing session"""
     try:
-        session = await session_service.create_session(request.user_id)
-        return SessionResponse(
+        session = await session_service.create_session(request.user_id, request.group)
+        return ModelResponse(SessionResponse(
             session=session,
             message="Session created successfully. Please select a field to begin testing."
-        )
+        ))
     except Exception as e:
         logger.error("Error creating session", error=str(e))
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@router.get("/{session_id}", response_model=UserSession)
+@router.get("/{session_id}", response_model=UserSession, dependencies=[Depends(rate_limit_session)])
 async def get_session(
     session_id: str,
     session_service: SessionService = Depends(lambda: SessionService())
@@ -38,17 +42,18 @@ async def get_session(
         session = await session_service.get_session(session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
-        return session
+        return ModelResponse(session)
     except HTTPException:
         raise
     except Exception as e:
         logger.error("Error retrieving session", error=str(e), session_id=session_id)
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@router.get("/{session_id}/analytics", response_model=PerformanceAnalytics)
+@router.get("/{session_id}/analytics", response_model=PerformanceAnalytics, dependencies=[Depends(rate_limit_session)])
 async def get_session_analytics(
     session_id: str,
-    session_service: SessionService = Depends(lambda: SessionService())
+    session_service: SessionService = Depends(lambda: SessionService()),
+    leaderboards: LeaderboardStore = Depends(get_leaderboard_store)
 ):
     """Get detailed performance analytics for a session"""
     try:
@@ -71,17 +76,25 @@ async def get_session_analytics(
                 elif accuracy < 0.5:
                     current_diff = max(1.0, current_diff - 0.3)
         
-        return PerformanceAnalytics(
+        # Where this score falls among completed sessions in each field
+        field_performance = {}
+        for field, score in session.field_scores.items():
+            percentile = await leaderboards.percentile(field, session.score)
+            field_performance[field] = score.model_copy(update={"percentile": percentile})
+        
+        return ModelResponse(PerformanceAnalytics(
             session_id=session.id,
             total_score=summary["total_score"],
             accuracy=summary["accuracy"] / 100,  # Convert to decimal
             difficulty_progression=difficulty_progression,
-            field_performance=session.field_scores,
+            field_performance=field_performance,
             time_spent=int(summary["time_spent_minutes"] * 60),
+            average_response_seconds=summary["average_response_seconds"],
+            timed_out_questions=session.timed_out_questions,
             strengths=summary["strengths"],
             weaknesses=summary["weaknesses"],
             recommendations=summary["recommendations"]
-        )
+        ))
         
     except HTTPException:
         raise
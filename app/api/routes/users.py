@@ -0,0 +1,29 @@
+"""User API routes"""
+
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+import structlog
+from app.models.schemas import UserSessionsPage
+from app.api.responses import ModelResponse
+from app.core.config import settings
+from app.services.session_service import SessionService
+
+logger = structlog.get_logger()
+router = APIRouter()
+
+@router.get("/{user_id}/sessions", response_model=UserSessionsPage)
+async def list_user_sessions(
+    user_id: str,
+    limit: int = Query(default=settings.USER_SESSIONS_PAGE_SIZE, ge=1, le=100),
+    cursor: Optional[str] = None,
+    session_service: SessionService = Depends(lambda: SessionService())
+):
+    """List a user's sessions, newest first; pass `next_cursor` back to get the next page"""
+    try:
+        page = await session_service.list_user_sessions(user_id, limit, cursor)
+        return ModelResponse(page)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+    except Exception as e:
+        logger.error("Error listing user sessions", error=str(e), user_id=user_id)
+        raise HTTPException(status_code=500, detail="Internal server error") from e
@@ -0,0 +1,121 @@
+"""Circuit breaker for slow or failing upstream dependencies"""
+
+import time
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker.
+
+    Outcomes from the last `window_seconds` are kept; once at least
+    `minimum_calls` have been seen, the breaker opens when the failure rate
+    or the slow-call rate crosses its threshold. Calls slower than
+    `slow_call_seconds` count as slow even when they succeed, so a degraded
+    dependency trips the breaker as well as one that errors. After
+    `cooldown_seconds` a single half-open probe decides whether to close.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 60.0,
+        minimum_calls: int = 5,
+        failure_rate_threshold: float = 0.5,
+        slow_call_rate_threshold: float = 0.8,
+        slow_call_seconds: float = 10.0,
+        cooldown_seconds: float = 30.0
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.minimum_calls = minimum_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected_calls = 0
+        self._probe_in_flight = False
+        # (timestamp, failed, slow)
+        self._outcomes: Deque[Tuple[float, bool, bool]] = deque()
+
+    def _trim(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+
+    def allow_request(self) -> bool:
+        """Whether a call may go through right now"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            # Let a single probe through to test recovery
+            self._probe_in_flight = True
+            return True
+        self.rejected_calls += 1
+        return False
+
+    def record_success(self, latency: float):
+        """Record a completed call"""
+        self._record(failed=False, slow=latency > self.slow_call_seconds)
+
+    def record_failure(self):
+        """Record a failed or timed-out call"""
+        self._record(failed=True, slow=False)
+
+    def _record(self, failed: bool, slow: bool):
+        now = time.monotonic()
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+            if failed or slow:
+                self._open(now)
+            else:
+                self.state = CLOSED
+                self._outcomes.clear()
+            return
+
+        self._outcomes.append((now, failed, slow))
+        self._trim(now)
+        if self.state == CLOSED and len(self._outcomes) >= self.minimum_calls:
+            failure_rate, slow_rate = self._rates()
+            if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                self._open(now)
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.opened_at = now
+        self.times_opened += 1
+
+    def _rates(self) -> Tuple[float, float]:
+        total = len(self._outcomes)
+        if not total:
+            return 0.0, 0.0
+        failures = sum(1 for _, failed, _ in self._outcomes if failed)
+        slow = sum(1 for _, _, is_slow in self._outcomes if is_slow)
+        return failures / total, slow / total
+
+    def failure_rate(self) -> float:
+        """Failure rate over the rolling window"""
+        self._trim(time.monotonic())
+        return self._rates()[0]
+
+    def status(self) -> Dict:
+        """Current breaker state for metrics and health checks"""
+        self._trim(time.monotonic())
+        failure_rate, slow_rate = self._rates()
+        return {
+            "state": self.state,
+            "window_calls": len(self._outcomes),
+            "failure_rate": round(failure_rate, 3),
+            "slow_call_rate": round(slow_rate, 3),
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected_calls,
+        }
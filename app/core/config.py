@@ -1,7 +1,7 @@
 """Configuration settings for IQFieldBot"""
 
 import os
-from typing import List
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -10,20 +10,123 @@ class Settings(BaseSettings):
     DEBUG: bool = Field(default=False, env="DEBUG")
     API_SECRET: str = Field(env="API_SECRET")
     REQUIRE_AUTH: bool = Field(default=True, env="REQUIRE_AUTH")
+    API_KEYS: List[str] = Field(default=[], env="API_KEYS")  # additional per-client keys
     
     # OpenAI Configuration
     OPENAI_API_KEY: str = Field(env="OPENAI_API_KEY")
-    OPENAI_MODEL: str = Field(default="gpt-4", env="OPENAI_MODEL")
+    OPENAI_MODEL: str = Field(default="gpt-4o", env="OPENAI_MODEL")
     OPENAI_MAX_TOKENS: int = Field(default=500, env="OPENAI_MAX_TOKENS")
+    OPENAI_FAST_MODEL: str = Field(default="gpt-4o-mini", env="OPENAI_FAST_MODEL")
+    FAST_MODEL_MAX_DIFFICULTY: int = Field(default=2, env="FAST_MODEL_MAX_DIFFICULTY")
+    AI_GENERATION_RETRIES: int = Field(default=1, env="AI_GENERATION_RETRIES")
+    MODEL_COST_PER_1K_TOKENS: Dict[str, float] = Field(
+        default={"gpt-4": 0.045, "gpt-4o": 0.00625, "gpt-4o-mini": 0.0004},
+        env="MODEL_COST_PER_1K_TOKENS"
+    )
+    
+    # LLM Provider Configuration
+    LLM_PROVIDER: str = Field(default="openai", env="LLM_PROVIDER")  # openai | stub
+    LLM_BASE_URL: Optional[str] = Field(default=None, env="LLM_BASE_URL")
+    LLM_STRUCTURED_OUTPUT: bool = Field(default=True, env="LLM_STRUCTURED_OUTPUT")
+    # Model-name prefixes the OpenAI API accepts a strict json_schema for; other models get JSON mode.
+    # Servers at LLM_BASE_URL are trusted with json_schema for any model.
+    LLM_JSON_SCHEMA_MODELS: List[str] = Field(
+        default=["gpt-4o", "gpt-4.1", "gpt-5", "o3", "o4"],
+        env="LLM_JSON_SCHEMA_MODELS"
+    )
+    LLM_HEDGE_BASE_URL: Optional[str] = Field(default=None, env="LLM_HEDGE_BASE_URL")
+    LLM_HEDGE_API_KEY: Optional[str] = Field(default=None, env="LLM_HEDGE_API_KEY")
+    LLM_HEDGE_MODEL: Optional[str] = Field(default=None, env="LLM_HEDGE_MODEL")
+    LLM_HEDGE_DELAY_MS: int = Field(default=2000, env="LLM_HEDGE_DELAY_MS")
+    LLM_BREAKER_WINDOW_SECONDS: float = Field(default=60.0, env="LLM_BREAKER_WINDOW_SECONDS")
+    LLM_BREAKER_MIN_CALLS: int = Field(default=5, env="LLM_BREAKER_MIN_CALLS")
+    LLM_BREAKER_FAILURE_RATE: float = Field(default=0.5, env="LLM_BREAKER_FAILURE_RATE")
+    LLM_BREAKER_SLOW_CALL_RATE: float = Field(default=0.8, env="LLM_BREAKER_SLOW_CALL_RATE")
+    LLM_BREAKER_COOLDOWN_SECONDS: float = Field(default=30.0, env="LLM_BREAKER_COOLDOWN_SECONDS")
+    LLM_SLOW_CALL_SECONDS: float = Field(default=3.0, env="LLM_SLOW_CALL_SECONDS")
+    
+    # AI generation budget: time allowed for the AI path before falling back to templates
+    AI_LATENCY_BUDGET_SECONDS: float = Field(default=4.0, env="AI_LATENCY_BUDGET_SECONDS")
+    AI_GENERATION_RATIO: float = Field(default=0.7, env="AI_GENERATION_RATIO")
+    AI_MIN_GENERATION_RATIO: float = Field(default=0.05, env="AI_MIN_GENERATION_RATIO")
+    STUB_LLM_LATENCY_MS: int = Field(default=0, env="STUB_LLM_LATENCY_MS")
     
     # Database Configuration
+    DATABASE_BACKEND: str = Field(default="", env="DATABASE_BACKEND")  # memory | dynamodb | redis | sqlite | sharded; empty follows USE_DYNAMODB
     USE_DYNAMODB: bool = Field(default=False, env="USE_DYNAMODB")
     DYNAMODB_TABLE_NAME: str = Field(default="iqfieldbot-sessions", env="DYNAMODB_TABLE_NAME")
     DYNAMODB_REGION: str = Field(default="us-east-1", env="DYNAMODB_REGION")
+    DYNAMODB_USERS_TABLE_NAME: str = Field(default="iqfieldbot-users", env="DYNAMODB_USERS_TABLE_NAME")
+    DYNAMODB_EVENTS_TABLE_NAME: str = Field(default="iqfieldbot-session-events", env="DYNAMODB_EVENTS_TABLE_NAME")
+    DYNAMODB_QUESTIONS_TABLE_NAME: str = Field(default="iqfieldbot-questions", env="DYNAMODB_QUESTIONS_TABLE_NAME")
+    DYNAMODB_USER_INDEX_NAME: str = Field(default="user_id-start_time-index", env="DYNAMODB_USER_INDEX_NAME")
+    DYNAMODB_COMPLETED_INDEX_NAME: str = Field(default="completed_at-index", env="DYNAMODB_COMPLETED_INDEX_NAME")
+    SQLITE_PATH: str = Field(default="iqfieldbot.db", env="SQLITE_PATH")
+    SESSION_STORE_MODE: str = Field(default="snapshot", env="SESSION_STORE_MODE")  # snapshot | events
+    SESSION_SNAPSHOT_INTERVAL: int = Field(default=20, env="SESSION_SNAPSHOT_INTERVAL")  # events between snapshots
+    NORMALIZE_QUESTIONS: bool = Field(default=True, env="NORMALIZE_QUESTIONS")  # store questions once, reference by ID
+    QUESTION_STORE_CACHE_SIZE: int = Field(default=20000, env="QUESTION_STORE_CACHE_SIZE")
+    
+    # Archival of completed sessions to Parquet (requires pyarrow)
+    ARCHIVE_ENABLED: bool = Field(default=False, env="ARCHIVE_ENABLED")
+    ARCHIVE_PATH: str = Field(default="archive", env="ARCHIVE_PATH")
+    ARCHIVE_BATCH_SIZE: int = Field(default=500, env="ARCHIVE_BATCH_SIZE")
+    ARCHIVE_MIN_AGE_SECONDS: float = Field(default=3600.0, env="ARCHIVE_MIN_AGE_SECONDS")  # kept hot after completion
+    ARCHIVE_INTERVAL_SECONDS: float = Field(default=300.0, env="ARCHIVE_INTERVAL_SECONDS")
+    
+    # Leaderboards
+    LEADERBOARD_BACKEND: str = Field(default="memory", env="LEADERBOARD_BACKEND")  # memory | redis
+    LEADERBOARD_SIZE: int = Field(default=10000, env="LEADERBOARD_SIZE")  # exact ranks kept per board in memory
+    LEADERBOARD_TDIGEST_COMPRESSION: float = Field(default=100.0, env="LEADERBOARD_TDIGEST_COMPRESSION")
+    
+    # User Profiles
+    ABILITY_SMOOTHING: float = Field(default=0.3, env="ABILITY_SMOOTHING")  # weight of the latest session
+    USER_SESSIONS_PAGE_SIZE: int = Field(default=20, env="USER_SESSIONS_PAGE_SIZE")
     
     # Redis Configuration (for session caching)
     REDIS_URL: str = Field(default="redis://localhost:6379", env="REDIS_URL")
     REDIS_TTL: int = Field(default=3600, env="REDIS_TTL")  # 1 hour
+    REDIS_QUESTION_TTL: int = Field(default=7200, env="REDIS_QUESTION_TTL")  # never below REDIS_TTL; session saves extend it
+    
+    # Sharded store (DATABASE_BACKEND=sharded): redis://, sqlite:///path or memory://name per node
+    SHARD_URLS: List[str] = Field(default=[], env="SHARD_URLS")
+    SHARD_PREVIOUS_URLS: List[str] = Field(default=[], env="SHARD_PREVIOUS_URLS")  # the ring being rebalanced away from
+    SHARD_VIRTUAL_NODES: int = Field(default=160, env="SHARD_VIRTUAL_NODES")
+    SHARD_POOL_SIZE: int = Field(default=50, env="SHARD_POOL_SIZE")  # connections per Redis node
+    SHARD_REBALANCE_ENABLED: bool = Field(default=False, env="SHARD_REBALANCE_ENABLED")  # on one worker only
+    SHARD_REBALANCE_BATCH: int = Field(default=500, env="SHARD_REBALANCE_BATCH")
+    SHARD_REBALANCE_INTERVAL_SECONDS: float = Field(default=30.0, env="SHARD_REBALANCE_INTERVAL_SECONDS")
+    SHARD_IDLE_SECONDS: float = Field(default=300.0, env="SHARD_IDLE_SECONDS")  # active sessions move on their next write
+    
+    # Admission Control
+    RATE_LIMIT_ENABLED: bool = Field(default=True, env="RATE_LIMIT_ENABLED")
+    RATE_LIMIT_BACKEND: str = Field(default="memory", env="RATE_LIMIT_BACKEND")  # memory | redis
+    RATE_LIMIT_KEY_RATE: float = Field(default=10.0, env="RATE_LIMIT_KEY_RATE")  # requests/second
+    RATE_LIMIT_KEY_BURST: int = Field(default=20, env="RATE_LIMIT_KEY_BURST")
+    RATE_LIMIT_SESSION_RATE: float = Field(default=2.0, env="RATE_LIMIT_SESSION_RATE")
+    RATE_LIMIT_SESSION_BURST: int = Field(default=5, env="RATE_LIMIT_SESSION_BURST")
+    LLM_MAX_CONCURRENCY: int = Field(default=32, env="LLM_MAX_CONCURRENCY")
+    LLM_MAX_QUEUE: int = Field(default=64, env="LLM_MAX_QUEUE")
+    LLM_QUEUE_TIMEOUT_SECONDS: float = Field(default=2.0, env="LLM_QUEUE_TIMEOUT_SECONDS")
+    
+    # Idempotency-Key support on mutating chat routes
+    IDEMPOTENCY_BACKEND: str = Field(default="memory", env="IDEMPOTENCY_BACKEND")  # memory | redis (adds a shared tier)
+    IDEMPOTENCY_MAX_ENTRIES: int = Field(default=10000, env="IDEMPOTENCY_MAX_ENTRIES")
+    IDEMPOTENCY_TTL_SECONDS: float = Field(default=86400.0, env="IDEMPOTENCY_TTL_SECONDS")
+    
+    # Live session updates over WebSocket
+    PUSH_BACKEND: str = Field(default="memory", env="PUSH_BACKEND")  # memory | redis (fan out across workers)
+    PUSH_QUEUE_SIZE: int = Field(default=64, env="PUSH_QUEUE_SIZE")  # per subscriber; full queues are dropped
+    PUSH_MAX_TOPICS: int = Field(default=1000, env="PUSH_MAX_TOPICS")  # subscriptions per connection
+    
+    # HTTP Configuration
+    COMPRESSION_MIN_SIZE: int = Field(default=1024, env="COMPRESSION_MIN_SIZE")  # bytes
+    
+    # Built frontend served from the API origin (no cross-origin calls or preflights)
+    FRONTEND_ENABLED: bool = Field(default=False, env="FRONTEND_ENABLED")
+    FRONTEND_DIST: str = Field(default="frontend-dist.zip", env="FRONTEND_DIST")  # zip or directory of the Vite build
+    FRONTEND_PRECOMPRESS_MAX_BYTES: int = Field(default=8388608, env="FRONTEND_PRECOMPRESS_MAX_BYTES")  # larger files are served as-is
+    FRONTEND_MMAP_MIN_BYTES: int = Field(default=1048576, env="FRONTEND_MMAP_MIN_BYTES")  # directory builds only
     
     # CORS Configuration
     ALLOWED_ORIGINS: List[str] = Field(
@@ -35,6 +138,68 @@ class Settings(BaseSettings):
     DEFAULT_DIFFICULTY: int = Field(default=1, env="DEFAULT_DIFFICULTY")
     MAX_DIFFICULTY: int = Field(default=5, env="MAX_DIFFICULTY")
     QUESTIONS_PER_SESSION: int = Field(default=10, env="QUESTIONS_PER_SESSION")
+    QUESTION_BANK_PATH: str = Field(default="", env="QUESTION_BANK_PATH")  # built with app.tools.build_bank
+    
+    # Explanations: generated after the question is served, cached by question content
+    LAZY_EXPLANATIONS: bool = Field(default=True, env="LAZY_EXPLANATIONS")  # false asks for them with the question
+    EXPLANATION_PREFETCH: bool = Field(default=False, env="EXPLANATION_PREFETCH")  # generate in the background once served
+    EXPLANATION_MAX_TOKENS: int = Field(default=200, env="EXPLANATION_MAX_TOKENS")
+    EXPLANATION_CACHE_SIZE: int = Field(default=50000, env="EXPLANATION_CACHE_SIZE")
+    EXPLANATION_CACHE_BACKEND: str = Field(default="memory", env="EXPLANATION_CACHE_BACKEND")  # memory | redis (adds a shared tier)
+    EXPLANATION_TTL_SECONDS: int = Field(default=604800, env="EXPLANATION_TTL_SECONDS")  # shared tier only
+    
+    # Time limits: enforced on answer and by background expiry timers
+    TIME_LIMITS_ENABLED: bool = Field(default=True, env="TIME_LIMITS_ENABLED")
+    TIME_LIMIT_GRACE_SECONDS: float = Field(default=2.0, env="TIME_LIMIT_GRACE_SECONDS")  # allowance for network latency
+    TIMER_BACKEND: str = Field(default="memory", env="TIMER_BACKEND")  # memory (timer wheel) | redis (shared sorted set)
+    TIMER_TICK_SECONDS: float = Field(default=0.1, env="TIMER_TICK_SECONDS")
+    TIMER_POLL_SECONDS: float = Field(default=0.5, env="TIMER_POLL_SECONDS")  # redis backend
+    
+    # Repeat suppression
+    RECENT_QUESTION_HISTORY: int = Field(default=5, env="RECENT_QUESTION_HISTORY")
+    DEDUP_MAX_ATTEMPTS: int = Field(default=3, env="DEDUP_MAX_ATTEMPTS")
+    USER_SEEN_FILTER_BITS: int = Field(default=16384, env="USER_SEEN_FILTER_BITS")
+    USER_SEEN_FILTER_HASHES: int = Field(default=7, env="USER_SEEN_FILTER_HASHES")
+    USER_SEEN_FILTER_MAX_FP: float = Field(default=0.01, env="USER_SEEN_FILTER_MAX_FP")  # a generation retires at half this
+    SIMHASH_MAX_DISTANCE: int = Field(default=6, env="SIMHASH_MAX_DISTANCE")
+    SIMHASH_INDEX_SIZE: int = Field(default=200000, env="SIMHASH_INDEX_SIZE")
+    
+    # Topic diversity: pick bank and pool questions unlike the session's recent ones
+    DIVERSITY_ENABLED: bool = Field(default=False, env="DIVERSITY_ENABLED")  # also drops history from the AI prompt
+    DIVERSITY_INDEX_PATH: str = Field(default="", env="DIVERSITY_INDEX_PATH")  # default: <QUESTION_BANK_PATH>.vec.npy
+    DIVERSITY_DIM: int = Field(default=128, env="DIVERSITY_DIM")
+    DIVERSITY_CANDIDATES: int = Field(default=512, env="DIVERSITY_CANDIDATES")  # bank rows scored per selection
+    DIVERSITY_MAX_SIMILARITY: float = Field(default=0.9, env="DIVERSITY_MAX_SIMILARITY")  # closer AI questions yield to the bank
+    
+    # Speculative next-question generation (one background generation per reachable difficulty)
+    SPECULATION_ENABLED: bool = Field(default=False, env="SPECULATION_ENABLED")
+    SPECULATION_TTL_SECONDS: float = Field(default=300.0, env="SPECULATION_TTL_SECONDS")
+    SPECULATION_MAX_PER_SESSION: int = Field(default=20, env="SPECULATION_MAX_PER_SESSION")
+    SPECULATION_POOL_SIZE: int = Field(default=50, env="SPECULATION_POOL_SIZE")
+    
+    # Startup warm-up (connections, question bank pages, question pool) before readiness reports ready
+    WARMUP_ENABLED: bool = Field(default=True, env="WARMUP_ENABLED")
+    WARMUP_BLOCKING: bool = Field(default=False, env="WARMUP_BLOCKING")  # finish before accepting requests
+    WARMUP_TIMEOUT_SECONDS: float = Field(default=15.0, env="WARMUP_TIMEOUT_SECONDS")
+    WARMUP_POOL_PER_FIELD: int = Field(default=2, env="WARMUP_POOL_PER_FIELD")  # first questions pre-generated per field
+    
+    # Background task runtime for work done after the response
+    TASKS_ENABLED: bool = Field(default=True, env="TASKS_ENABLED")  # false runs deferred work inline
+    TASK_WORKERS: int = Field(default=4, env="TASK_WORKERS")
+    TASK_QUEUE_SIZE: int = Field(default=1000, env="TASK_QUEUE_SIZE")  # per queue; a full queue runs jobs inline
+    TASK_HIGH_WATER: float = Field(default=0.8, env="TASK_HIGH_WATER")  # backlog share at which chat requests are shed
+    TASK_MAX_RETRIES: int = Field(default=3, env="TASK_MAX_RETRIES")
+    TASK_RETRY_BASE_SECONDS: float = Field(default=0.5, env="TASK_RETRY_BASE_SECONDS")
+    TASK_CPU_WORKERS: int = Field(default=2, env="TASK_CPU_WORKERS")
+    TASK_CPU_EXECUTOR: str = Field(default="thread", env="TASK_CPU_EXECUTOR")  # thread | process
+    TASK_DRAIN_TIMEOUT_SECONDS: float = Field(default=10.0, env="TASK_DRAIN_TIMEOUT_SECONDS")
+    
+    # Profiling: request phase spans, slow-request capture and a sampling profiler (all togglable at runtime)
+    PROFILING_ENABLED: bool = Field(default=False, env="PROFILING_ENABLED")  # trace phase spans per request
+    PROFILING_SLOW_REQUEST_MS: float = Field(default=500.0, env="PROFILING_SLOW_REQUEST_MS")
+    PROFILING_SLOW_REQUEST_LIMIT: int = Field(default=200, env="PROFILING_SLOW_REQUEST_LIMIT")  # newest kept
+    PROFILING_SAMPLER_ENABLED: bool = Field(default=False, env="PROFILING_SAMPLER_ENABLED")  # start sampling at startup
+    PROFILING_SAMPLE_INTERVAL_MS: float = Field(default=10.0, env="PROFILING_SAMPLE_INTERVAL_MS")
     
     # Adaptive Algorithm Settings
     DIFFICULTY_THRESHOLD: float = Field(default=0.7, env="DIFFICULTY_THRESHOLD")
@@ -1,13 +1,45 @@
 """Database abstraction layer"""
 
+import asyncio
+import base64
+import bisect
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from abc import ABC, abstractmethod
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import structlog
 from app.core.config import settings
 
 logger = structlog.get_logger()
 
+# A page of session records plus the cursor for the next page (None when exhausted)
+SessionPage = Tuple[List[Dict], Optional[str]]
+
+# Record kinds enumerated by scan_keys: sessions (with their events), user profiles, questions
+KEY_KINDS = ("session", "user", "question")
+
+def _json_default(value):
+    """Serialize datetimes left in model dumps (e.g. message timestamps)"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _dumps(data: Dict) -> str:
+    return json.dumps(data, default=_json_default)
+
+def _start_time(session_data: Dict) -> str:
+    start_time = session_data.get('start_time')
+    return start_time.isoformat() if isinstance(start_time, datetime) else str(start_time)
+
+def _end_time(session_data: Dict) -> Optional[str]:
+    """End time of a completed session, the key of the completed-session index"""
+    end_time = session_data.get('end_time')
+    if not session_data.get('is_complete') or not end_time:
+        return None
+    return end_time.isoformat() if isinstance(end_time, datetime) else str(end_time)
+
 class DatabaseInterface(ABC):
     """Abstract database interface"""
     
@@ -21,26 +53,187 @@ class DatabaseInterface(ABC):
     
     @abstractmethod
     async def delete_session(self, session_id: str) -> bool:
+        """Remove a session with its event log"""
+        pass
+    
+    @abstractmethod
+    async def get_user_profile(self, user_id: str) -> Optional[Dict]:
+        pass
+    
+    @abstractmethod
+    async def save_user_profile(self, user_id: str, profile_data: Dict) -> bool:
+        pass
+    
+    @abstractmethod
+    async def delete_user_profile(self, user_id: str) -> bool:
+        pass
+    
+    @abstractmethod
+    async def list_user_sessions(self, user_id: str, limit: int, cursor: Optional[str] = None) -> SessionPage:
+        """A user's sessions, newest first, read from the user_id index"""
         pass
+    
+    @abstractmethod
+    async def list_completed_sessions(self, ended_before: str, limit: int) -> List[Dict]:
+        """Up to `limit` completed sessions that ended before `ended_before` (ISO time), oldest first"""
+        pass
+    
+    @abstractmethod
+    async def append_session_events(self, session_id: str, events: List[Dict]) -> bool:
+        """Append events (each with a `seq` continuing the session's sequence).
+
+        False when the log does not end right before the first new seq, so a
+        concurrent writer can never add a duplicate sequence number.
+        """
+        pass
+    
+    @abstractmethod
+    async def get_session_events(self, session_id: str, after_seq: int = 0) -> List[Dict]:
+        """A session's events with seq greater than `after_seq`, in order"""
+        pass
+    
+    @abstractmethod
+    async def put_questions(self, questions: Dict[str, Dict]) -> bool:
+        """Store questions by content-addressed ID; existing IDs hold the same content"""
+        pass
+    
+    async def touch_questions(self, question_ids: List[str]) -> bool:
+        """Extend the expiry of stored questions; only backends that expire them need to"""
+        return True
+    
+    @abstractmethod
+    async def get_questions(self, question_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch many questions in one batch; unknown IDs are left out"""
+        pass
+    
+    @abstractmethod
+    async def delete_questions(self, question_ids: List[str]) -> bool:
+        pass
+    
+    @abstractmethod
+    async def scan_keys(self, kind: str, cursor: Optional[str], limit: int) -> Tuple[List[str], Optional[str]]:
+        """About `limit` IDs of one record kind (see KEY_KINDS) and the cursor to continue from.
+
+        A page may be short or empty before the scan ends; it ends when the
+        cursor comes back None.
+        """
+        pass
+    
+    @abstractmethod
+    async def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """Take or renew a named lease for `ttl_seconds`; False while another owner holds it"""
+        pass
+    
+    async def warm_up(self) -> bool:
+        """Open connections ahead of the first request"""
+        return True
 
 class InMemoryDatabase(DatabaseInterface):
     """In-memory database for development/testing"""
     
     def __init__(self):
         self.sessions: Dict[str, Dict] = {}
+        self.user_profiles: Dict[str, Dict] = {}
+        # user_id -> (start_time, session_id) kept sorted ascending
+        self.user_sessions: Dict[str, List[Tuple[str, str]]] = {}
+        self.session_owners: Dict[str, Tuple[str, str, str]] = {}
+        self.session_events: Dict[str, List[Dict]] = {}
+        self.questions: Dict[str, Dict] = {}
+        # (end_time, session_id) of completed sessions kept sorted ascending
+        self.completed: List[Tuple[str, str]] = []
+        self.completed_at: Dict[str, str] = {}
+        # lease name -> (owner, expiry as a Unix time)
+        self.leases: Dict[str, Tuple[str, float]] = {}
     
     async def get_session(self, session_id: str) -> Optional[Dict]:
         return self.sessions.get(session_id)
     
     async def save_session(self, session_id: str, session_data: Dict) -> bool:
         self.sessions[session_id] = session_data
+        user_id = session_data.get('user_id')
+        if user_id and session_id not in self.session_owners:
+            entry = (_start_time(session_data), session_id)
+            self.session_owners[session_id] = (user_id, *entry)
+            bisect.insort(self.user_sessions.setdefault(user_id, []), entry)
+        end_time = _end_time(session_data)
+        if end_time and session_id not in self.completed_at:
+            self.completed_at[session_id] = end_time
+            bisect.insort(self.completed, (end_time, session_id))
         return True
     
     async def delete_session(self, session_id: str) -> bool:
         if session_id in self.sessions:
             del self.sessions[session_id]
+            owner = self.session_owners.pop(session_id, None)
+            if owner:
+                user_id, *entry = owner
+                entries = self.user_sessions[user_id]
+                del entries[bisect.bisect_left(entries, tuple(entry))]
+            end_time = self.completed_at.pop(session_id, None)
+            if end_time:
+                del self.completed[bisect.bisect_left(self.completed, (end_time, session_id))]
+            self.session_events.pop(session_id, None)
             return True
         return False
+    
+    async def list_user_sessions(self, user_id: str, limit: int, cursor: Optional[str] = None) -> SessionPage:
+        entries = self.user_sessions.get(user_id, [])
+        end = len(entries) - int(cursor or 0)
+        start = max(0, end - limit)
+        page = [self.sessions[session_id] for _, session_id in reversed(entries[start:end])]
+        return page, str(len(entries) - start) if start > 0 else None
+    
+    async def list_completed_sessions(self, ended_before: str, limit: int) -> List[Dict]:
+        end = bisect.bisect_left(self.completed, (ended_before, ""))
+        return [self.sessions[session_id] for _, session_id in self.completed[:min(end, limit)]]
+    
+    async def append_session_events(self, session_id: str, events: List[Dict]) -> bool:
+        log = self.session_events.setdefault(session_id, [])
+        if len(log) != events[0]["seq"] - 1:
+            return False
+        log.extend(events)
+        return True
+    
+    async def get_session_events(self, session_id: str, after_seq: int = 0) -> List[Dict]:
+        # Sequence numbers start at 1 and are dense, so seq N sits at index N - 1
+        return self.session_events.get(session_id, [])[after_seq:]
+    
+    async def put_questions(self, questions: Dict[str, Dict]) -> bool:
+        self.questions.update(questions)
+        return True
+    
+    async def get_questions(self, question_ids: List[str]) -> Dict[str, Dict]:
+        return {qid: self.questions[qid] for qid in question_ids if qid in self.questions}
+    
+    async def delete_questions(self, question_ids: List[str]) -> bool:
+        for question_id in question_ids:
+            self.questions.pop(question_id, None)
+        return True
+    
+    async def scan_keys(self, kind: str, cursor: Optional[str], limit: int) -> Tuple[List[str], Optional[str]]:
+        table = {"session": self.sessions, "user": self.user_profiles, "question": self.questions}[kind]
+        keys = sorted(table)
+        start = bisect.bisect_right(keys, cursor) if cursor else 0
+        page = keys[start:start + limit]
+        return page, page[-1] if start + limit < len(keys) else None
+    
+    async def get_user_profile(self, user_id: str) -> Optional[Dict]:
+        return self.user_profiles.get(user_id)
+    
+    async def save_user_profile(self, user_id: str, profile_data: Dict) -> bool:
+        self.user_profiles[user_id] = profile_data
+        return True
+    
+    async def delete_user_profile(self, user_id: str) -> bool:
+        return self.user_profiles.pop(user_id, None) is not None
+    
+    async def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        holder, expires_at = self.leases.get(name, (owner, now))
+        if holder != owner and expires_at > now:
+            return False
+        self.leases[name] = (owner, now + ttl_seconds)
+        return True
 
 class DynamoDBDatabase(DatabaseInterface):
     """DynamoDB database implementation"""
@@ -49,6 +242,18 @@ class DynamoDBDatabase(DatabaseInterface):
         import boto3
         self.dynamodb = boto3.resource('dynamodb', region_name=settings.DYNAMODB_REGION)
         self.table = self.dynamodb.Table(settings.DYNAMODB_TABLE_NAME)
+        self.users_table = self.dynamodb.Table(settings.DYNAMODB_USERS_TABLE_NAME)
+        self.events_table = self.dynamodb.Table(settings.DYNAMODB_EVENTS_TABLE_NAME)
+        self.questions_table = self.dynamodb.Table(settings.DYNAMODB_QUESTIONS_TABLE_NAME)
+    
+    async def warm_up(self) -> bool:
+        try:
+            # A read of a key that never exists opens the HTTPS connection and resolves credentials
+            self.table.get_item(Key={'session_id': '__warm_up__'})
+            return True
+        except Exception as e:
+            logger.error("DynamoDB warm-up error", error=str(e))
+            return False
     
     async def get_session(self, session_id: str) -> Optional[Dict]:
         try:
@@ -62,32 +267,247 @@ class DynamoDBDatabase(DatabaseInterface):
     
     async def save_session(self, session_id: str, session_data: Dict) -> bool:
         try:
-            self.table.put_item(
-                Item={
-                    'session_id': session_id,
-                    'session_data': session_data,
-                    'ttl': int((datetime.now() + timedelta(hours=24)).timestamp())
-                }
-            )
+            item = {
+                'session_id': session_id,
+                'session_data': session_data,
+                'ttl': int((datetime.now() + timedelta(hours=24)).timestamp())
+            }
+            if session_data.get('user_id'):
+                # Top-level keys of the sparse user_id/start_time GSI
+                item['user_id'] = session_data['user_id']
+                item['start_time'] = _start_time(session_data)
+            if _end_time(session_data):
+                # Key of the sparse completed-session GSI scanned by the archiver
+                item['completed_at'] = _end_time(session_data)
+            self.table.put_item(Item=item)
             return True
         except Exception as e:
             logger.error("DynamoDB save error", error=str(e), session_id=session_id)
             return False
     
     async def delete_session(self, session_id: str) -> bool:
+        from boto3.dynamodb.conditions import Key
         try:
             self.table.delete_item(Key={'session_id': session_id})
+            query = {
+                'KeyConditionExpression': Key('session_id').eq(session_id),
+                'ProjectionExpression': 'session_id, seq'
+            }
+            with self.events_table.batch_writer() as batch:
+                while True:
+                    response = self.events_table.query(**query)
+                    for item in response.get('Items', []):
+                        batch.delete_item(Key={'session_id': item['session_id'], 'seq': item['seq']})
+                    if 'LastEvaluatedKey' not in response:
+                        break
+                    query['ExclusiveStartKey'] = response['LastEvaluatedKey']
             return True
         except Exception as e:
             logger.error("DynamoDB delete error", error=str(e), session_id=session_id)
             return False
+    
+    async def get_user_profile(self, user_id: str) -> Optional[Dict]:
+        try:
+            response = self.users_table.get_item(Key={'user_id': user_id})
+            if 'Item' in response:
+                return response['Item']['profile_data']
+            return None
+        except Exception as e:
+            logger.error("DynamoDB user get error", error=str(e), user_id=user_id)
+            return None
+    
+    async def save_user_profile(self, user_id: str, profile_data: Dict) -> bool:
+        try:
+            self.users_table.put_item(Item={'user_id': user_id, 'profile_data': profile_data})
+            return True
+        except Exception as e:
+            logger.error("DynamoDB user save error", error=str(e), user_id=user_id)
+            return False
+    
+    async def delete_user_profile(self, user_id: str) -> bool:
+        try:
+            self.users_table.delete_item(Key={'user_id': user_id})
+            return True
+        except Exception as e:
+            logger.error("DynamoDB user delete error", error=str(e), user_id=user_id)
+            return False
+    
+    async def list_user_sessions(self, user_id: str, limit: int, cursor: Optional[str] = None) -> SessionPage:
+        from boto3.dynamodb.conditions import Key
+        query = {
+            'IndexName': settings.DYNAMODB_USER_INDEX_NAME,
+            'KeyConditionExpression': Key('user_id').eq(user_id),
+            'ScanIndexForward': False,
+            'Limit': limit,
+        }
+        if cursor:
+            query['ExclusiveStartKey'] = json.loads(base64.urlsafe_b64decode(cursor))
+        try:
+            response = self.table.query(**query)
+            last_key = response.get('LastEvaluatedKey')
+            next_cursor = base64.urlsafe_b64encode(json.dumps(last_key).encode()).decode() if last_key else None
+            return [item['session_data'] for item in response.get('Items', [])], next_cursor
+        except Exception as e:
+            logger.error("DynamoDB user sessions query error", error=str(e), user_id=user_id)
+            return [], None
+    
+    async def list_completed_sessions(self, ended_before: str, limit: int) -> List[Dict]:
+        from boto3.dynamodb.conditions import Attr
+        # The sparse index holds only completed sessions, so scanning it never touches live ones
+        scan = {
+            'IndexName': settings.DYNAMODB_COMPLETED_INDEX_NAME,
+            'FilterExpression': Attr('completed_at').lt(ended_before),
+            'Limit': limit,
+        }
+        sessions: List[Dict] = []
+        try:
+            while len(sessions) < limit:
+                response = self.table.scan(**scan)
+                sessions.extend(item['session_data'] for item in response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    break
+                scan['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            return sessions[:limit]
+        except Exception as e:
+            logger.error("DynamoDB completed sessions scan error", error=str(e))
+            return sessions[:limit]
+    
+    async def append_session_events(self, session_id: str, events: List[Dict]) -> bool:
+        try:
+            # Conditional puts keep the log append-only: an existing seq is never overwritten
+            for event in events:
+                self.events_table.put_item(
+                    Item={'session_id': session_id, 'seq': event['seq'], 'event': _dumps(event)},
+                    ConditionExpression='attribute_not_exists(seq)'
+                )
+            return True
+        except Exception as e:
+            logger.error("DynamoDB event append error", error=str(e), session_id=session_id)
+            return False
+    
+    async def get_session_events(self, session_id: str, after_seq: int = 0) -> List[Dict]:
+        from boto3.dynamodb.conditions import Key
+        try:
+            query = {'KeyConditionExpression': Key('session_id').eq(session_id) & Key('seq').gt(after_seq)}
+            items = []
+            while True:
+                response = self.events_table.query(**query)
+                items.extend(response.get('Items', []))
+                if 'LastEvaluatedKey' not in response:
+                    break
+                query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            return [json.loads(item['event']) for item in items]
+        except Exception as e:
+            logger.error("DynamoDB event query error", error=str(e), session_id=session_id)
+            return []
+    
+    async def put_questions(self, questions: Dict[str, Dict]) -> bool:
+        try:
+            # BatchWriteItem in groups of 25; a repeated ID rewrites identical content
+            with self.questions_table.batch_writer() as batch:
+                for question_id, question in questions.items():
+                    batch.put_item(Item={'question_id': question_id, 'question': _dumps(question)})
+            return True
+        except Exception as e:
+            logger.error("DynamoDB question put error", error=str(e), count=len(questions))
+            return False
+    
+    async def get_questions(self, question_ids: List[str]) -> Dict[str, Dict]:
+        table_name = settings.DYNAMODB_QUESTIONS_TABLE_NAME
+        found: Dict[str, Dict] = {}
+        try:
+            # BatchGetItem takes up to 100 keys; retry whatever comes back unprocessed
+            for start in range(0, len(question_ids), 100):
+                request = {table_name: {'Keys': [{'question_id': qid} for qid in question_ids[start:start + 100]]}}
+                while request:
+                    response = self.dynamodb.batch_get_item(RequestItems=request)
+                    for item in response.get('Responses', {}).get(table_name, []):
+                        found[item['question_id']] = json.loads(item['question'])
+                    request = response.get('UnprocessedKeys')
+            return found
+        except Exception as e:
+            logger.error("DynamoDB question get error", error=str(e), count=len(question_ids))
+            return found
+    
+    async def delete_questions(self, question_ids: List[str]) -> bool:
+        try:
+            with self.questions_table.batch_writer() as batch:
+                for question_id in question_ids:
+                    batch.delete_item(Key={'question_id': question_id})
+            return True
+        except Exception as e:
+            logger.error("DynamoDB question delete error", error=str(e), count=len(question_ids))
+            return False
+    
+    async def scan_keys(self, kind: str, cursor: Optional[str], limit: int) -> Tuple[List[str], Optional[str]]:
+        table, key = {
+            "session": (self.table, 'session_id'),
+            "user": (self.users_table, 'user_id'),
+            "question": (self.questions_table, 'question_id'),
+        }[kind]
+        scan = {'ProjectionExpression': key, 'Limit': limit}
+        if cursor:
+            scan['ExclusiveStartKey'] = json.loads(base64.urlsafe_b64decode(cursor))
+        try:
+            response = table.scan(**scan)
+            last_key = response.get('LastEvaluatedKey')
+            next_cursor = base64.urlsafe_b64encode(json.dumps(last_key).encode()).decode() if last_key else None
+            return [item[key] for item in response.get('Items', [])], next_cursor
+        except Exception as e:
+            logger.error("DynamoDB key scan error", error=str(e), kind=kind)
+            return [], None
+    
+    async def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        now = int(time.time())
+        try:
+            # Kept in the events table at seq 0, which no session's log uses
+            self.events_table.put_item(
+                Item={'session_id': f'lease:{name}', 'seq': 0, 'lease_owner': owner, 'expires_at': now + int(ttl_seconds)},
+                ConditionExpression='attribute_not_exists(session_id) OR lease_owner = :owner OR expires_at < :now',
+                ExpressionAttributeValues={':owner': owner, ':now': now}
+            )
+            return True
+        except Exception as e:
+            if getattr(e, 'response', {}).get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                logger.error("DynamoDB lease error", error=str(e), lease=name)
+            return False
+
+# Append to an event log only if it ends right before the first new seq
+_REDIS_APPEND_EVENTS = """
+if redis.call('LLEN', KEYS[1]) ~= tonumber(ARGV[1]) - 1 then
+    return 0
+end
+redis.call('RPUSH', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+# Take or renew a lease: set the key with an expiry unless another owner holds it
+_REDIS_ACQUIRE_LEASE = """
+local holder = redis.call('GET', KEYS[1])
+if holder and holder ~= ARGV[1] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return 1
+"""
 
 class RedisDatabase(DatabaseInterface):
     """Redis database implementation for session caching"""
     
-    def __init__(self):
+    def __init__(self, redis_url: Optional[str] = None, max_connections: Optional[int] = None):
         import redis.asyncio as redis
-        self.redis = redis.from_url(settings.REDIS_URL)
+        self.redis = redis.from_url(redis_url or settings.REDIS_URL, max_connections=max_connections)
+        self._append_events = self.redis.register_script(_REDIS_APPEND_EVENTS)
+        self._acquire_lease = self.redis.register_script(_REDIS_ACQUIRE_LEASE)
+    
+    async def warm_up(self) -> bool:
+        try:
+            await self.redis.ping()
+            return True
+        except Exception as e:
+            logger.error("Redis warm-up error", error=str(e))
+            return False
     
     async def get_session(self, session_id: str) -> Optional[Dict]:
         try:
@@ -101,11 +521,15 @@ class RedisDatabase(DatabaseInterface):
     
     async def save_session(self, session_id: str, session_data: Dict) -> bool:
         try:
-            await self.redis.setex(
-                f"session:{session_id}",
-                settings.REDIS_TTL,
-                json.dumps(session_data)
-            )
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.setex(f"session:{session_id}", settings.REDIS_TTL, _dumps(session_data))
+                if session_data.get('user_id'):
+                    score = datetime.fromisoformat(_start_time(session_data)).timestamp()
+                    pipe.zadd(f"user_sessions:{session_data['user_id']}", {session_id: score}, nx=True)
+                if _end_time(session_data):
+                    ended = datetime.fromisoformat(_end_time(session_data)).timestamp()
+                    pipe.zadd("completed_sessions", {session_id: ended}, nx=True)
+                await pipe.execute()
             return True
         except Exception as e:
             logger.error("Redis save error", error=str(e), session_id=session_id)
@@ -113,11 +537,394 @@ class RedisDatabase(DatabaseInterface):
     
     async def delete_session(self, session_id: str) -> bool:
         try:
-            await self.redis.delete(f"session:{session_id}")
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.delete(f"session:{session_id}", f"session_events:{session_id}")
+                pipe.zrem("completed_sessions", session_id)
+                await pipe.execute()
             return True
         except Exception as e:
             logger.error("Redis delete error", error=str(e), session_id=session_id)
             return False
+    
+    async def get_user_profile(self, user_id: str) -> Optional[Dict]:
+        try:
+            data = await self.redis.get(f"user:{user_id}")
+            if data:
+                return json.loads(data)
+            return None
+        except Exception as e:
+            logger.error("Redis user get error", error=str(e), user_id=user_id)
+            return None
+    
+    async def save_user_profile(self, user_id: str, profile_data: Dict) -> bool:
+        try:
+            # Profiles outlive individual sessions, so no TTL
+            await self.redis.set(f"user:{user_id}", _dumps(profile_data))
+            return True
+        except Exception as e:
+            logger.error("Redis user save error", error=str(e), user_id=user_id)
+            return False
+    
+    async def delete_user_profile(self, user_id: str) -> bool:
+        try:
+            await self.redis.delete(f"user:{user_id}")
+            return True
+        except Exception as e:
+            logger.error("Redis user delete error", error=str(e), user_id=user_id)
+            return False
+    
+    async def list_user_sessions(self, user_id: str, limit: int, cursor: Optional[str] = None) -> SessionPage:
+        offset = int(cursor or 0)
+        index_key = f"user_sessions:{user_id}"
+        try:
+            session_ids = await self.redis.zrevrange(index_key, offset, offset + limit - 1)
+            if not session_ids:
+                return [], None
+            values = await self.redis.mget([f"session:{sid.decode()}" for sid in session_ids])
+            # Sessions expire with REDIS_TTL; drop their index entries as they are found
+            expired = [sid for sid, value in zip(session_ids, values, strict=True) if value is None]
+            if expired:
+                await self.redis.zrem(index_key, *expired)
+            sessions = [json.loads(value) for value in values if value is not None]
+            next_cursor = str(offset + len(sessions)) if len(session_ids) == limit else None
+            return sessions, next_cursor
+        except Exception as e:
+            logger.error("Redis user sessions error", error=str(e), user_id=user_id)
+            return [], None
+    
+    async def list_completed_sessions(self, ended_before: str, limit: int) -> List[Dict]:
+        cutoff = datetime.fromisoformat(ended_before).timestamp()
+        try:
+            session_ids = await self.redis.zrangebyscore("completed_sessions", "-inf", f"({cutoff}", start=0, num=limit)
+            if not session_ids:
+                return []
+            values = await self.redis.mget([f"session:{sid.decode()}" for sid in session_ids])
+            # Sessions that expired with REDIS_TTL before being archived are gone
+            expired = [sid for sid, value in zip(session_ids, values, strict=True) if value is None]
+            if expired:
+                await self.redis.zrem("completed_sessions", *expired)
+            return [json.loads(value) for value in values if value is not None]
+        except Exception as e:
+            logger.error("Redis completed sessions error", error=str(e))
+            return []
+    
+    async def append_session_events(self, session_id: str, events: List[Dict]) -> bool:
+        try:
+            appended = await self._append_events(
+                keys=[f"session_events:{session_id}"],
+                args=[events[0]["seq"], settings.REDIS_TTL, *(_dumps(event) for event in events)]
+            )
+            if not appended:
+                logger.warning("Redis event append conflict", session_id=session_id, seq=events[0]["seq"])
+            return bool(appended)
+        except Exception as e:
+            logger.error("Redis event append error", error=str(e), session_id=session_id)
+            return False
+    
+    async def get_session_events(self, session_id: str, after_seq: int = 0) -> List[Dict]:
+        try:
+            # Dense sequence numbers: seq N is list index N - 1
+            values = await self.redis.lrange(f"session_events:{session_id}", after_seq, -1)
+            return [json.loads(value) for value in values]
+        except Exception as e:
+            logger.error("Redis event read error", error=str(e), session_id=session_id)
+            return []
+    
+    async def put_questions(self, questions: Dict[str, Dict]) -> bool:
+        try:
+            # Shared by sessions, so they outlive REDIS_TTL; an existing copy gets its expiry extended
+            ttl = max(settings.REDIS_QUESTION_TTL, settings.REDIS_TTL)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for question_id, question in questions.items():
+                    pipe.set(f"question:{question_id}", _dumps(question), nx=True, ex=ttl)
+                    pipe.expire(f"question:{question_id}", ttl)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error("Redis question put error", error=str(e), count=len(questions))
+            return False
+    
+    async def touch_questions(self, question_ids: List[str]) -> bool:
+        try:
+            ttl = max(settings.REDIS_QUESTION_TTL, settings.REDIS_TTL)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for question_id in question_ids:
+                    pipe.expire(f"question:{question_id}", ttl)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error("Redis question touch error", error=str(e), count=len(question_ids))
+            return False
+    
+    async def get_questions(self, question_ids: List[str]) -> Dict[str, Dict]:
+        try:
+            values = await self.redis.mget([f"question:{qid}" for qid in question_ids])
+            return {qid: json.loads(value) for qid, value in zip(question_ids, values, strict=True) if value is not None}
+        except Exception as e:
+            logger.error("Redis question get error", error=str(e), count=len(question_ids))
+            return {}
+    
+    async def delete_questions(self, question_ids: List[str]) -> bool:
+        try:
+            if question_ids:
+                await self.redis.delete(*(f"question:{qid}" for qid in question_ids))
+            return True
+        except Exception as e:
+            logger.error("Redis question delete error", error=str(e), count=len(question_ids))
+            return False
+    
+    async def scan_keys(self, kind: str, cursor: Optional[str], limit: int) -> Tuple[List[str], Optional[str]]:
+        # "session:*" does not match the session_events:/user_sessions: keys
+        prefix = f"{kind}:"
+        try:
+            next_cursor, keys = await self.redis.scan(int(cursor or 0), match=f"{prefix}*", count=limit)
+            return [key.decode()[len(prefix):] for key in keys], str(next_cursor) if next_cursor else None
+        except Exception as e:
+            logger.error("Redis key scan error", error=str(e), kind=kind)
+            return [], None
+    
+    async def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        try:
+            acquired = await self._acquire_lease(keys=[f"lease:{name}"], args=[owner, int(ttl_seconds * 1000)])
+            return bool(acquired)
+        except Exception as e:
+            logger.error("Redis lease error", error=str(e), lease=name)
+            return False
+
+class SQLiteDatabase(DatabaseInterface):
+    """SQLite database for single-node deployments.
+
+    sqlite3 calls block, so they run on one dedicated thread: the event loop
+    stays free, and the connection is never used by two threads at once.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        import sqlite3
+        self.conn = sqlite3.connect(path or settings.SQLITE_PATH, check_same_thread=False)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self.conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                user_id TEXT,
+                start_time TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sessions_by_user ON sessions (user_id, start_time, session_id);
+            CREATE INDEX IF NOT EXISTS sessions_completed ON sessions (json_extract(data, '$.end_time'))
+                WHERE json_extract(data, '$.is_complete') = 1;
+            CREATE TABLE IF NOT EXISTS user_profiles (
+                user_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS session_events (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            );
+            CREATE TABLE IF NOT EXISTS questions (
+                question_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+        """)
+    
+    async def _run(self, fn: Callable[[], Any]) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn)
+    
+    def _fetchone(self, query: str, params) -> Optional[tuple]:
+        return self.conn.execute(query, params).fetchone()
+    
+    def _fetchall(self, query: str, params) -> List[tuple]:
+        return self.conn.execute(query, params).fetchall()
+    
+    def _write(self, query: str, params) -> None:
+        with self.conn:
+            self.conn.execute(query, params)
+    
+    def _write_many(self, query: str, rows: List[tuple]) -> None:
+        with self.conn:
+            self.conn.executemany(query, rows)
+    
+    async def get_session(self, session_id: str) -> Optional[Dict]:
+        try:
+            row = await self._run(lambda: self._fetchone("SELECT data FROM sessions WHERE session_id = ?", (session_id,)))
+            return json.loads(row[0]) if row else None
+        except Exception as e:
+            logger.error("SQLite get error", error=str(e), session_id=session_id)
+            return None
+    
+    async def save_session(self, session_id: str, session_data: Dict) -> bool:
+        try:
+            params = (session_id, session_data.get('user_id'), _start_time(session_data), _dumps(session_data))
+            await self._run(lambda: self._write(
+                "INSERT OR REPLACE INTO sessions (session_id, user_id, start_time, data) VALUES (?, ?, ?, ?)", params
+            ))
+            return True
+        except Exception as e:
+            logger.error("SQLite save error", error=str(e), session_id=session_id)
+            return False
+    
+    async def delete_session(self, session_id: str) -> bool:
+        def delete():
+            with self.conn:
+                self.conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self.conn.execute("DELETE FROM session_events WHERE session_id = ?", (session_id,))
+        try:
+            await self._run(delete)
+            return True
+        except Exception as e:
+            logger.error("SQLite delete error", error=str(e), session_id=session_id)
+            return False
+    
+    async def get_user_profile(self, user_id: str) -> Optional[Dict]:
+        try:
+            row = await self._run(lambda: self._fetchone("SELECT data FROM user_profiles WHERE user_id = ?", (user_id,)))
+            return json.loads(row[0]) if row else None
+        except Exception as e:
+            logger.error("SQLite user get error", error=str(e), user_id=user_id)
+            return None
+    
+    async def save_user_profile(self, user_id: str, profile_data: Dict) -> bool:
+        try:
+            params = (user_id, _dumps(profile_data))
+            await self._run(lambda: self._write("INSERT OR REPLACE INTO user_profiles (user_id, data) VALUES (?, ?)", params))
+            return True
+        except Exception as e:
+            logger.error("SQLite user save error", error=str(e), user_id=user_id)
+            return False
+    
+    async def delete_user_profile(self, user_id: str) -> bool:
+        try:
+            await self._run(lambda: self._write("DELETE FROM user_profiles WHERE user_id = ?", (user_id,)))
+            return True
+        except Exception as e:
+            logger.error("SQLite user delete error", error=str(e), user_id=user_id)
+            return False
+    
+    async def list_user_sessions(self, user_id: str, limit: int, cursor: Optional[str] = None) -> SessionPage:
+        # Keyset pagination over the (user_id, start_time, session_id) index
+        query = "SELECT data, start_time, session_id FROM sessions WHERE user_id = ?"
+        params: list = [user_id]
+        if cursor:
+            start_time, session_id = cursor.split("|", 1)
+            query += " AND (start_time, session_id) < (?, ?)"
+            params += [start_time, session_id]
+        query += " ORDER BY start_time DESC, session_id DESC LIMIT ?"
+        params.append(limit)
+        try:
+            rows = await self._run(lambda: self._fetchall(query, params))
+            next_cursor = f"{rows[-1][1]}|{rows[-1][2]}" if len(rows) == limit else None
+            return [json.loads(row[0]) for row in rows], next_cursor
+        except Exception as e:
+            logger.error("SQLite user sessions error", error=str(e), user_id=user_id)
+            return [], None
+    
+    async def list_completed_sessions(self, ended_before: str, limit: int) -> List[Dict]:
+        try:
+            # Same expressions as the partial sessions_completed index
+            rows = await self._run(lambda: self._fetchall(
+                "SELECT data FROM sessions WHERE json_extract(data, '$.is_complete') = 1 "
+                "AND json_extract(data, '$.end_time') < ? ORDER BY json_extract(data, '$.end_time') LIMIT ?",
+                (ended_before, limit)
+            ))
+            return [json.loads(row[0]) for row in rows]
+        except Exception as e:
+            logger.error("SQLite completed sessions error", error=str(e))
+            return []
+    
+    async def append_session_events(self, session_id: str, events: List[Dict]) -> bool:
+        try:
+            rows = [(session_id, event['seq'], _dumps(event)) for event in events]
+            await self._run(lambda: self._write_many("INSERT INTO session_events (session_id, seq, data) VALUES (?, ?, ?)", rows))
+            return True
+        except Exception as e:
+            logger.error("SQLite event append error", error=str(e), session_id=session_id)
+            return False
+    
+    async def get_session_events(self, session_id: str, after_seq: int = 0) -> List[Dict]:
+        try:
+            rows = await self._run(lambda: self._fetchall(
+                "SELECT data FROM session_events WHERE session_id = ? AND seq > ? ORDER BY seq",
+                (session_id, after_seq)
+            ))
+            return [json.loads(row[0]) for row in rows]
+        except Exception as e:
+            logger.error("SQLite event read error", error=str(e), session_id=session_id)
+            return []
+    
+    async def put_questions(self, questions: Dict[str, Dict]) -> bool:
+        try:
+            rows = [(question_id, _dumps(question)) for question_id, question in questions.items()]
+            await self._run(lambda: self._write_many("INSERT OR IGNORE INTO questions (question_id, data) VALUES (?, ?)", rows))
+            return True
+        except Exception as e:
+            logger.error("SQLite question put error", error=str(e), count=len(questions))
+            return False
+    
+    async def get_questions(self, question_ids: List[str]) -> Dict[str, Dict]:
+        def read() -> List[tuple]:
+            rows: List[tuple] = []
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(question_ids), 500):
+                chunk = question_ids[start:start + 500]
+                rows += self._fetchall(
+                    f"SELECT question_id, data FROM questions WHERE question_id IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                )
+            return rows
+        try:
+            return {row[0]: json.loads(row[1]) for row in await self._run(read)}
+        except Exception as e:
+            logger.error("SQLite question get error", error=str(e), count=len(question_ids))
+            return {}
+    
+    async def delete_questions(self, question_ids: List[str]) -> bool:
+        try:
+            rows = [(qid,) for qid in question_ids]
+            await self._run(lambda: self._write_many("DELETE FROM questions WHERE question_id = ?", rows))
+            return True
+        except Exception as e:
+            logger.error("SQLite question delete error", error=str(e), count=len(question_ids))
+            return False
+    
+    async def scan_keys(self, kind: str, cursor: Optional[str], limit: int) -> Tuple[List[str], Optional[str]]:
+        table, key = {
+            "session": ("sessions", "session_id"),
+            "user": ("user_profiles", "user_id"),
+            "question": ("questions", "question_id"),
+        }[kind]
+        try:
+            rows = await self._run(lambda: self._fetchall(
+                f"SELECT {key} FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT ?", (cursor or "", limit)
+            ))
+            return [row[0] for row in rows], rows[-1][0] if len(rows) == limit else None
+        except Exception as e:
+            logger.error("SQLite key scan error", error=str(e), kind=kind)
+            return [], None
+    
+    async def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        def acquire() -> Optional[tuple]:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                    "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+                    (name, owner, now + ttl_seconds, now)
+                )
+                return self.conn.execute("SELECT owner FROM leases WHERE name = ?", (name,)).fetchone()
+        try:
+            row = await self._run(acquire)
+            return row is not None and row[0] == owner
+        except Exception as e:
+            logger.error("SQLite lease error", error=str(e), lease=name)
+            return False
 
 # Database instance
 _database: Optional[DatabaseInterface] = None
@@ -133,11 +940,21 @@ async def init_database():
     """Initialize database connection"""
     global _database
     
-    if settings.USE_DYNAMODB:
+    backend = settings.DATABASE_BACKEND or ("dynamodb" if settings.USE_DYNAMODB else "memory")
+    
+    if backend == "dynamodb":
         _database = DynamoDBDatabase()
         logger.info("Initialized DynamoDB connection")
+    elif backend == "redis":
+        _database = RedisDatabase()
+        logger.info("Initialized Redis connection")
+    elif backend == "sqlite":
+        _database = SQLiteDatabase()
+        logger.info("Initialized SQLite database", path=settings.SQLITE_PATH)
+    elif backend == "sharded":
+        from app.core.sharding import build_sharded_database
+        _database = build_sharded_database(settings.SHARD_URLS, settings.SHARD_PREVIOUS_URLS)
+        logger.info("Initialized sharded database", nodes=len(settings.SHARD_URLS), rebalancing=bool(settings.SHARD_PREVIOUS_URLS))
     else:
         _database = InMemoryDatabase()
-        logger.info("Initialized in-memory database")
-    
-    # TODO: Add Redis caching layer if needed
\ No newline at end of file
+        logger.info("Initialized in-memory database")
\ No newline at end of file
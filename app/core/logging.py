@@ -0,0 +1,66 @@
+"""Structured logging configuration with queue-based, non-blocking output"""
+
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional
+import orjson
+import structlog
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def _orjson_dumps(event_dict, **kwargs) -> str:
+    return orjson.dumps(event_dict, default=str).decode()
+
+def configure_logging(level: int = logging.INFO):
+    """Configure structlog on top of stdlib logging.
+
+    Log records are rendered on the calling thread but handed to a
+    QueueHandler; a background QueueListener thread performs the actual
+    stream I/O, so a slow stdout/stderr never blocks the event loop.
+    """
+    global _listener
+
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.UnicodeDecoder(),
+            structlog.processors.JSONRenderer(serializer=_orjson_dumps)
+        ],
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        cache_logger_on_first_use=True,
+    )
+
+    if _listener is not None:
+        return
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+def shutdown_logging():
+    """Flush queued log records and stop the listener thread.
+
+    The root logger falls back to writing through the listener's handlers
+    directly, so records emitted after shutdown are not lost in the queue.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger().handlers = list(_listener.handlers)
+        _listener = None
@@ -0,0 +1,101 @@
+"""In-process metrics registry"""
+
+import threading
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, List, Optional
+
+# Number of samples kept per observed series for percentile estimates
+DEFAULT_WINDOW_SIZE = 1024
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted sample list"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+class MetricsRegistry:
+    """Counters, gauges and rolling latency windows shared by the whole process"""
+
+    def __init__(self, window_size: int = DEFAULT_WINDOW_SIZE):
+        self.window_size = window_size
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._windows: Dict[str, Deque[float]] = {}
+        self._collectors: Dict[str, Callable[[], Dict]] = {}
+
+    def incr(self, name: str, value: float = 1.0):
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        """Set a gauge to its current value"""
+        self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        """Record a sample (typically a latency in seconds) in a rolling window"""
+        with self._lock:
+            window = self._windows.get(name)
+            if window is None:
+                window = self._windows[name] = deque(maxlen=self.window_size)
+            window.append(value)
+
+    def counter(self, name: str) -> float:
+        """Current value of a counter"""
+        return self._counters.get(name, 0.0)
+
+    def gauge(self, name: str) -> Optional[float]:
+        """Current value of a gauge"""
+        return self._gauges.get(name)
+
+    def window_percentile(self, name: str, pct: float) -> float:
+        """Percentile over the rolling window of an observed series"""
+        with self._lock:
+            samples = list(self._windows.get(name, ()))
+        return percentile(samples, pct)
+
+    def register_collector(self, name: str, collector: Callable[[], Dict]):
+        """Register a callable whose output is embedded in snapshots under `name`"""
+        self._collectors[name] = collector
+
+    def snapshot(self) -> Dict:
+        """Point-in-time view of every metric"""
+        with self._lock:
+            counters = dict(self._counters)
+            windows = {name: list(samples) for name, samples in self._windows.items()}
+
+        summaries = {
+            name: {
+                "count": len(samples),
+                "p50": percentile(samples, 50),
+                "p95": percentile(samples, 95),
+                "p99": percentile(samples, 99),
+            }
+            for name, samples in windows.items()
+        }
+
+        snapshot = {
+            "counters": counters,
+            "gauges": dict(self._gauges),
+            "latencies": summaries,
+        }
+        for name, collector in self._collectors.items():
+            snapshot[name] = collector()
+        return snapshot
+
+    def reset(self):
+        """Clear all recorded values (collectors are kept)"""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._windows.clear()
+
+# Metrics instance
+_metrics = MetricsRegistry()
+
+def get_metrics() -> MetricsRegistry:
+    """Get metrics registry"""
+    return _metrics
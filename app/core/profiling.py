@@ -0,0 +1,240 @@
+"""Request phase spans, slow-request capture and a sampling profiler"""
+
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+import structlog
+from app.core.config import settings
+from app.core.metrics import get_metrics
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+class RequestTrace:
+    """Phase spans recorded during one request"""
+
+    __slots__ = ("started", "spans", "done", "token")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[tuple] = []  # (name, start offset, duration) in seconds
+        self.done = False
+        self.token = None
+
+    def breakdown(self) -> List[Dict]:
+        return [
+            {"name": name, "start_ms": round(offset * 1000, 3), "duration_ms": round(duration * 1000, 3)}
+            for name, offset, duration in self.spans
+        ]
+
+class _Span:
+    __slots__ = ("trace", "name", "started")
+
+    def __init__(self, trace: RequestTrace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.started
+        self.trace.spans.append((self.name, self.started - self.trace.started, duration))
+        metrics.observe(f"span.{self.name}", duration)
+        return False
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+def span(name: str):
+    """Time a phase of the current request: `with span("load"): ...`.
+
+    Outside a traced request (profiling off, or background work outliving
+    its request) this is a shared no-op costing one context lookup.
+    """
+    trace = _current_trace.get()
+    if trace is None or trace.done:
+        return _NO_SPAN
+    return _Span(trace, name)
+
+_STDLIB = sysconfig.get_paths()["stdlib"]
+
+class SamplingProfiler:
+    """Wall-clock sampler of every thread's stack, folded into collapsed stacks.
+
+    The output is the `frame;frame;frame count` format read by flamegraph.pl
+    and speedscope. Sampling runs in a daemon thread, so the event loop only
+    pays for the GIL hand-off while a stack is copied.
+    """
+
+    def __init__(self, interval_seconds: float = 0.01, max_depth: int = 64):
+        self.interval_seconds = interval_seconds
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._labels: Dict = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """Start sampling; False if already running"""
+        if self.running:
+            return False
+        self._stop.clear()
+        self.started_at = datetime.now()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info("Sampling profiler started", interval_seconds=self.interval_seconds)
+        return True
+
+    def stop(self) -> bool:
+        """Stop sampling, keeping what was collected; False if not running"""
+        if not self.running:
+            return False
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        logger.info("Sampling profiler stopped", samples=self.samples)
+        return True
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+
+    def collapsed(self) -> str:
+        """Collected samples as collapsed stacks, hottest first"""
+        with self._lock:
+            stacks = self.stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(os.getcwd()):
+                filename = os.path.relpath(filename)
+            elif "site-packages" in filename:
+                filename = filename.split("site-packages" + os.sep, 1)[1]
+            elif filename.startswith(_STDLIB):
+                filename = os.path.relpath(filename, _STDLIB)
+            label = self._labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+        return label
+
+    def sample(self):
+        """Record the current stack of every other thread once"""
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        folded = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, "thread"))
+            folded.append(";".join(reversed(stack)))
+        with self._lock:
+            self.stacks.update(folded)
+            self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.sample()
+
+class Profiler:
+    """Runtime-togglable request tracing, slow-request log and sampler"""
+
+    def __init__(self):
+        self.spans_enabled = settings.PROFILING_ENABLED
+        self.slow_request_seconds = settings.PROFILING_SLOW_REQUEST_MS / 1000
+        self.slow_requests: Deque[Dict] = deque(maxlen=settings.PROFILING_SLOW_REQUEST_LIMIT)
+        self.sampler = SamplingProfiler(settings.PROFILING_SAMPLE_INTERVAL_MS / 1000)
+        self.traced = 0
+
+    def begin(self) -> Optional[RequestTrace]:
+        """Start tracing the current request, if spans are enabled"""
+        if not self.spans_enabled:
+            return None
+        trace = RequestTrace()
+        trace.token = _current_trace.set(trace)
+        return trace
+
+    def end(self, trace: RequestTrace):
+        """Detach a trace from the request context once the request is over"""
+        trace.done = True
+        _current_trace.reset(trace.token)
+
+    def finish(self, trace: RequestTrace, method: str, route: str, path: str, status: int) -> float:
+        """Close a trace, keeping its breakdown if the request was slow; returns the elapsed seconds"""
+        elapsed = time.perf_counter() - trace.started
+        trace.done = True
+        self.traced += 1
+        if elapsed >= self.slow_request_seconds:
+            metrics.incr("profiling.slow_requests")
+            self.slow_requests.append({
+                "at": datetime.now().isoformat(),
+                "method": method,
+                "route": route,
+                "path": path,
+                "status": status,
+                "duration_ms": round(elapsed * 1000, 3),
+                "spans": trace.breakdown()
+            })
+        return elapsed
+
+    def slowest(self, limit: int) -> List[Dict]:
+        """Captured slow requests, slowest first"""
+        return sorted(self.slow_requests, key=lambda record: record["duration_ms"], reverse=True)[:limit]
+
+    def status(self) -> Dict:
+        return {
+            "spans_enabled": self.spans_enabled,
+            "slow_request_ms": self.slow_request_seconds * 1000,
+            "traced_requests": self.traced,
+            "slow_requests": len(self.slow_requests),
+            "sampler": {
+                "running": self.sampler.running,
+                "interval_ms": self.sampler.interval_seconds * 1000,
+                "samples": self.sampler.samples,
+                "started_at": self.sampler.started_at.isoformat() if self.sampler.started_at else None
+            }
+        }
+
+# Profiler instance
+_profiler: Optional[Profiler] = None
+
+def get_profiler() -> Profiler:
+    """Get profiler"""
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
+
+def profiling_status() -> Dict:
+    return get_profiler().status()
+
+metrics.register_collector("profiling", profiling_status)
@@ -0,0 +1,234 @@
+"""Admission control: token-bucket rate limits and LLM concurrency shedding"""
+
+import asyncio
+import math
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+import structlog
+from app.core.config import settings
+from app.core.metrics import get_metrics
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused; carries the HTTP status and Retry-After"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+class TokenBucket:
+    """Classic token bucket refilled lazily on each take"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated_at")
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = now
+
+    def take(self, now: float) -> float:
+        """Take one token; returns 0 when allowed, else seconds until one is available"""
+        tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if tokens >= 1.0:
+            self.tokens = tokens - 1.0
+            return 0.0
+        self.tokens = tokens
+        return (1.0 - tokens) / self.rate
+
+class RateLimiter(ABC):
+    """Abstract per-key rate limiter"""
+
+    @abstractmethod
+    async def acquire(self, key: str) -> float:
+        """Returns 0 when the call is allowed, else the suggested retry delay"""
+        pass
+
+class InMemoryRateLimiter(RateLimiter):
+    """Per-process token buckets keyed by caller"""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def try_acquire(self, key: str) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._evict_full_buckets(now)
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+        return bucket.take(now)
+
+    async def acquire(self, key: str) -> float:
+        return self.try_acquire(key)
+
+    def _evict_full_buckets(self, now: float):
+        """Drop buckets that have refilled completely; they hold no state worth keeping"""
+        refill_time = self.burst / self.rate
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if now - bucket.updated_at < refill_time
+        }
+
+# Token bucket evaluated atomically in Redis so every worker shares the budget
+_REDIS_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local retry = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(retry)
+"""
+
+class RedisRateLimiter(RateLimiter):
+    """Distributed token buckets shared by all workers through Redis"""
+
+    def __init__(self, rate: float, burst: int, prefix: str, redis_url: Optional[str] = None):
+        import redis.asyncio as redis
+        self.redis = redis.from_url(redis_url or settings.REDIS_URL)
+        self.script = self.redis.register_script(_REDIS_TOKEN_BUCKET)
+        self.rate = rate
+        self.burst = burst
+        self.prefix = prefix
+
+    async def acquire(self, key: str) -> float:
+        try:
+            retry = await self.script(keys=[f"ratelimit:{self.prefix}:{key}"], args=[self.rate, self.burst, time.time()])
+            return float(retry)
+        except Exception as e:
+            # Fail open: losing the limiter must not take the API down with it
+            logger.error("Redis rate limit error", error=str(e))
+            return 0.0
+
+class ConcurrencyLimiter:
+    """Caps in-flight LLM-backed requests and sheds load once the queue is full.
+
+    Requests beyond `max_concurrent` wait in a bounded queue; when the queue is
+    full, or a waiter exceeds `queue_timeout`, the request is rejected at once
+    with an estimate of when capacity frees up.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.queued = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._avg_service_time = 1.0
+
+    def _retry_after(self) -> float:
+        return (self.queued + 1) * self._avg_service_time / self.max_concurrent
+
+    @asynccontextmanager
+    async def slot(self, wait: bool = True):
+        """Hold a slot; with `wait=False` (optional background work) reject instead of queueing"""
+        if self.active >= self.max_concurrent:
+            if not wait:
+                raise AdmissionRejected(503, "Server busy, please retry", self._retry_after())
+            if self.queued >= self.max_queue:
+                metrics.incr("admission.llm_shed")
+                raise AdmissionRejected(503, "Server busy, please retry", self._retry_after())
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError as e:
+                metrics.incr("admission.llm_shed")
+                raise AdmissionRejected(503, "Server busy, please retry", self._retry_after()) from e
+            finally:
+                self.queued -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.active += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            # Exponentially weighted service time for Retry-After estimates
+            self._avg_service_time = 0.9 * self._avg_service_time + 0.1 * (time.monotonic() - started)
+
+    def status(self) -> Dict:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
+
+class AdmissionController:
+    """Per-key and per-session rate limits plus the LLM concurrency cap"""
+
+    def __init__(self, key_limiter: RateLimiter, session_limiter: RateLimiter, llm_limiter: ConcurrencyLimiter):
+        self.key_limiter = key_limiter
+        self.session_limiter = session_limiter
+        self.llm_limiter = llm_limiter
+
+    async def check_key(self, key: str):
+        retry_after = await self.key_limiter.acquire(key)
+        if retry_after:
+            metrics.incr("admission.key_rejected")
+            raise AdmissionRejected(429, "Rate limit exceeded", retry_after)
+
+    async def check_session(self, session_id: str):
+        retry_after = await self.session_limiter.acquire(session_id)
+        if retry_after:
+            metrics.incr("admission.session_rejected")
+            raise AdmissionRejected(429, "Too many requests for this session", retry_after)
+
+def build_admission_controller() -> AdmissionController:
+    """Build the admission controller described by settings"""
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        key_limiter: RateLimiter = RedisRateLimiter(settings.RATE_LIMIT_KEY_RATE, settings.RATE_LIMIT_KEY_BURST, "key")
+        session_limiter: RateLimiter = RedisRateLimiter(settings.RATE_LIMIT_SESSION_RATE, settings.RATE_LIMIT_SESSION_BURST, "session")
+    else:
+        key_limiter = InMemoryRateLimiter(settings.RATE_LIMIT_KEY_RATE, settings.RATE_LIMIT_KEY_BURST)
+        session_limiter = InMemoryRateLimiter(settings.RATE_LIMIT_SESSION_RATE, settings.RATE_LIMIT_SESSION_BURST)
+
+    return AdmissionController(
+        key_limiter,
+        session_limiter,
+        ConcurrencyLimiter(settings.LLM_MAX_CONCURRENCY, settings.LLM_MAX_QUEUE, settings.LLM_QUEUE_TIMEOUT_SECONDS)
+    )
+
+# Admission controller instance
+_admission: Optional[AdmissionController] = None
+
+def get_admission_controller() -> AdmissionController:
+    """Get admission controller instance"""
+    global _admission
+    if _admission is None:
+        _admission = build_admission_controller()
+    return _admission
+
+def admission_status() -> Dict:
+    """LLM concurrency state for the metrics endpoint"""
+    return _admission.llm_limiter.status() if _admission else {}
+
+metrics.register_collector("admission", admission_status)
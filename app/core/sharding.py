@@ -0,0 +1,488 @@
+"""Consistent-hash sharding of the store across several nodes"""
+
+import asyncio
+import base64
+import bisect
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import structlog
+from app.core.config import settings
+from app.core.database import (
+    KEY_KINDS, DatabaseInterface, InMemoryDatabase, RedisDatabase, SQLiteDatabase, SessionPage,
+    _end_time, _start_time, get_database
+)
+from app.core.metrics import get_metrics
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Consistent-hash ring with virtual nodes.
+
+    Each node owns `vnodes` points on a 64-bit ring and a key belongs to the
+    first point at or after its hash, so adding a node takes over roughly
+    1/N of the keys (all of them from existing nodes) and moves nothing else.
+    """
+
+    def __init__(self, nodes: Iterable[str], vnodes: int = 160):
+        self.vnodes = vnodes
+        self.nodes: List[str] = []
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for replica in range(self.vnodes):
+            point = _hash(f"{node}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def node_for(self, key: str) -> str:
+        if not self._points:
+            raise ValueError("Hash ring has no nodes")
+        return self._owners[bisect.bisect(self._points, _hash(key)) % len(self._points)]
+
+def backend_for_url(url: str) -> DatabaseInterface:
+    """Store node for a shard URL: redis://, rediss://, sqlite:///path or memory://name"""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        # Every node gets its own client and connection pool
+        return RedisDatabase(url, max_connections=settings.SHARD_POOL_SIZE)
+    if url.startswith("sqlite:///"):
+        return SQLiteDatabase(url[len("sqlite:///"):])
+    if url.startswith("memory://"):
+        return InMemoryDatabase()
+    raise ValueError(f"Unsupported shard URL: {url}")
+
+def _activity(session_data: Dict, events: List[Dict]) -> float:
+    """Timestamp of a session's last recorded activity (latest event, message or start)"""
+    latest = 0.0
+    messages = session_data.get("messages") or []
+    for value in (
+        events[-1].get("at") if events else None,
+        messages[-1].get("timestamp") if messages else None,
+        session_data.get("start_time"),
+    ):
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if isinstance(value, datetime):
+            latest = max(latest, value.timestamp())
+    return latest
+
+class ShardedDatabase(DatabaseInterface):
+    """Spreads sessions, profiles and questions over store nodes by consistent hashing.
+
+    Keys are routed by ID: a session and its event log live on the same
+    node. Multi-key operations are grouped by node and sent concurrently,
+    one batch per node. Listings fan out to every node and merge.
+
+    When the ring changes, the previous ring is kept until rebalancing
+    finishes. Reads go to the new owner and fall back to the previous one
+    ("dual reads"). A session is moved to its new owner before it is next
+    written, so its log is never split across nodes. The rebalancer moves
+    the remaining keys: sessions idle for SHARD_IDLE_SECONDS, profiles and
+    questions. Moves copy before they delete and are safe to repeat. The
+    rebalancer should run on one worker.
+    """
+
+    def __init__(
+        self,
+        shards: Dict[str, DatabaseInterface],
+        ring_nodes: Optional[List[str]] = None,
+        previous_nodes: Optional[List[str]] = None,
+        vnodes: int = 160,
+        idle_seconds: float = 300.0
+    ):
+        self.shards = shards
+        self.vnodes = vnodes
+        self.idle_seconds = idle_seconds
+        self.ring = HashRing(ring_nodes if ring_nodes is not None else list(shards), vnodes)
+        self.previous: Optional[HashRing] = HashRing(previous_nodes, vnodes) if previous_nodes else None
+        self._settled: set = set()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._rebalancer: Optional[asyncio.Task] = None
+        self.last_pass: Dict = {}
+
+    @property
+    def rebalancing(self) -> bool:
+        return self.previous is not None
+
+    def _owner(self, key: str) -> DatabaseInterface:
+        return self.shards[self.ring.node_for(key)]
+
+    def _previous_owner(self, key: str) -> Optional[DatabaseInterface]:
+        """The key's owner on the previous ring, while that is a different node"""
+        if self.previous is None:
+            return None
+        node = self.previous.node_for(key)
+        return self.shards[node] if node != self.ring.node_for(key) else None
+
+    def _group(self, keys: Iterable[str], ring: HashRing) -> Dict[str, List[str]]:
+        groups: Dict[str, List[str]] = {}
+        for key in keys:
+            groups.setdefault(ring.node_for(key), []).append(key)
+        return groups
+
+    # Ring changes
+
+    def start_rebalance(self, nodes: List[str]):
+        """Switch to a ring over `nodes`; the current ring stays readable until keys have moved"""
+        if self.previous is not None:
+            raise RuntimeError("A rebalance is already in progress")
+        missing = [node for node in nodes if node not in self.shards]
+        if missing:
+            raise ValueError(f"Unknown shard nodes: {missing}")
+        self.previous = self.ring
+        self.ring = HashRing(nodes, self.vnodes)
+        logger.info("Rebalance started", nodes=nodes, previous=self.previous.nodes)
+
+    def add_node(self, node: str, backend: DatabaseInterface):
+        self.shards[node] = backend
+        self.start_rebalance(self.ring.nodes + [node])
+
+    def remove_node(self, node: str):
+        self.start_rebalance([existing for existing in self.ring.nodes if existing != node])
+
+    def _finish_rebalance(self):
+        retired = [node for node in self.previous.nodes if node not in self.ring.nodes]
+        self.previous = None
+        self._settled.clear()
+        for node in retired:
+            self.shards.pop(node, None)
+        logger.info("Rebalance complete", nodes=self.ring.nodes, retired=retired)
+
+    # Moving keys
+
+    async def _move_session(self, session_id: str, source: DatabaseInterface, target: DatabaseInterface) -> bool:
+        """Copy a session and its events to `target`, then drop them from `source`.
+
+        Another worker may be moving or writing the same session, so nothing
+        on the target is ever deleted: an interrupted copy is resumed, appends
+        are conditional on the log length, and a target whose log has moved
+        past the source's means the source is stale.
+        """
+        if await target.get_session(session_id) is not None:
+            # Moved already (the snapshot is copied last); anything left on the source is stale
+            await source.delete_session(session_id)
+            return False
+        session_data = await source.get_session(session_id)
+        if session_data is None:
+            return False
+        events = await source.get_session_events(session_id)
+        copied = await target.get_session_events(session_id)
+        if copied != events[:len(copied)]:
+            await source.delete_session(session_id)
+            return False
+        remaining = events[len(copied):]
+        if remaining and not await target.append_session_events(session_id, remaining):
+            return False
+        # Checked again right before the unconditional snapshot write
+        if await target.get_session(session_id) is not None:
+            await source.delete_session(session_id)
+            return False
+        if not await target.save_session(session_id, session_data):
+            return False
+        await source.delete_session(session_id)
+        metrics.incr("sharding.moved.session")
+        return True
+
+    async def _move_profile(self, user_id: str, source: DatabaseInterface, target: DatabaseInterface) -> bool:
+        moved = False
+        if await target.get_user_profile(user_id) is None:
+            profile = await source.get_user_profile(user_id)
+            if profile is None or not await target.save_user_profile(user_id, profile):
+                return False
+            moved = True
+            metrics.incr("sharding.moved.user")
+        await source.delete_user_profile(user_id)
+        return moved
+
+    async def _move_questions(self, question_ids: List[str], source: DatabaseInterface, target: DatabaseInterface) -> int:
+        # Content-addressed and immutable, so copies never conflict
+        questions = await source.get_questions(question_ids)
+        if questions and not await target.put_questions(questions):
+            return 0
+        await source.delete_questions(question_ids)
+        metrics.incr("sharding.moved.question", len(questions))
+        return len(questions)
+
+    async def _settle(self, session_id: str):
+        """Before a write during rebalancing, bring the session over from its previous owner"""
+        previous = self._previous_owner(session_id)
+        if previous is None or session_id in self._settled:
+            return
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        try:
+            async with lock:
+                if session_id not in self._settled:
+                    await self._move_session(session_id, previous, self._owner(session_id))
+                    self._settled.add(session_id)
+        finally:
+            if not lock.locked():
+                self._locks.pop(session_id, None)
+
+    async def rebalance_once(self, batch_size: int = 500) -> Dict:
+        """One pass over every node, moving keys to their owners on the new ring.
+
+        Finishes the rebalance when a pass finds nothing left to move.
+        """
+        if self.previous is None:
+            return {}
+        counts = {kind: 0 for kind in KEY_KINDS}
+        counts["active"] = 0
+        now = time.time()
+        for node, source in list(self.shards.items()):
+            for kind in KEY_KINDS:
+                cursor = None
+                while True:
+                    keys, cursor = await source.scan_keys(kind, cursor, batch_size)
+                    misplaced = self._group((key for key in keys if self.ring.node_for(key) != node), self.ring)
+                    for owner, owned in misplaced.items():
+                        target = self.shards[owner]
+                        if kind == "question":
+                            counts[kind] += await self._move_questions(owned, source, target)
+                            continue
+                        for key in owned:
+                            if kind == "user":
+                                counts[kind] += await self._move_profile(key, source, target)
+                                continue
+                            session_data = await source.get_session(key)
+                            events = await source.get_session_events(key) if session_data else []
+                            if session_data and now - _activity(session_data, events) < self.idle_seconds:
+                                # Still in use: it moves on its next write, or on a later pass
+                                counts["active"] += 1
+                                continue
+                            async with self._locks.setdefault(key, asyncio.Lock()):
+                                counts[kind] += await self._move_session(key, source, target)
+                            self._locks.pop(key, None)
+                    if cursor is None:
+                        break
+        self.last_pass = {**counts, "finished_at": datetime.now().isoformat()}
+        logger.info("Rebalance pass", **counts)
+        if not any(counts.values()):
+            self._finish_rebalance()
+        return counts
+
+    async def _run_rebalance(self, interval_seconds: float, batch_size: int):
+        while self.previous is not None:
+            try:
+                await self.rebalance_once(batch_size)
+            except Exception as e:
+                logger.error("Rebalance error", error=str(e))
+            if self.previous is not None:
+                await asyncio.sleep(interval_seconds)
+
+    def start_rebalancer(self, interval_seconds: float = 30.0, batch_size: int = 500):
+        if self.previous is not None and self._rebalancer is None:
+            self._rebalancer = asyncio.create_task(self._run_rebalance(interval_seconds, batch_size))
+
+    async def stop_rebalancer(self):
+        if self._rebalancer is not None:
+            self._rebalancer.cancel()
+            self._rebalancer = None
+
+    # DatabaseInterface
+
+    async def warm_up(self) -> bool:
+        return all(await asyncio.gather(*(shard.warm_up() for shard in self.shards.values())))
+
+    async def get_session(self, session_id: str) -> Optional[Dict]:
+        session_data = await self._owner(session_id).get_session(session_id)
+        previous = self._previous_owner(session_id) if session_data is None else None
+        if previous is not None:
+            session_data = await previous.get_session(session_id)
+            if session_data is not None:
+                metrics.incr("sharding.dual_reads")
+        return session_data
+
+    async def save_session(self, session_id: str, session_data: Dict) -> bool:
+        await self._settle(session_id)
+        return await self._owner(session_id).save_session(session_id, session_data)
+
+    async def delete_session(self, session_id: str) -> bool:
+        previous = self._previous_owner(session_id)
+        if previous is not None:
+            await previous.delete_session(session_id)
+        return await self._owner(session_id).delete_session(session_id)
+
+    async def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        return await self._owner(f"lease:{name}").acquire_lease(name, owner, ttl_seconds)
+
+    async def append_session_events(self, session_id: str, events: List[Dict]) -> bool:
+        await self._settle(session_id)
+        return await self._owner(session_id).append_session_events(session_id, events)
+
+    async def get_session_events(self, session_id: str, after_seq: int = 0) -> List[Dict]:
+        events = await self._owner(session_id).get_session_events(session_id, after_seq)
+        previous = self._previous_owner(session_id) if not events else None
+        if previous is not None:
+            events = await previous.get_session_events(session_id, after_seq)
+        return events
+
+    async def get_user_profile(self, user_id: str) -> Optional[Dict]:
+        profile = await self._owner(user_id).get_user_profile(user_id)
+        previous = self._previous_owner(user_id) if profile is None else None
+        if previous is not None:
+            profile = await previous.get_user_profile(user_id)
+            if profile is not None:
+                metrics.incr("sharding.dual_reads")
+        return profile
+
+    async def save_user_profile(self, user_id: str, profile_data: Dict) -> bool:
+        saved = await self._owner(user_id).save_user_profile(user_id, profile_data)
+        previous = self._previous_owner(user_id)
+        if saved and previous is not None:
+            # The whole profile was just written, so the previous owner's copy is stale
+            await previous.delete_user_profile(user_id)
+        return saved
+
+    async def delete_user_profile(self, user_id: str) -> bool:
+        previous = self._previous_owner(user_id)
+        if previous is not None:
+            await previous.delete_user_profile(user_id)
+        return await self._owner(user_id).delete_user_profile(user_id)
+
+    async def put_questions(self, questions: Dict[str, Dict]) -> bool:
+        groups = self._group(questions, self.ring)
+        results = await asyncio.gather(*(
+            self.shards[node].put_questions({qid: questions[qid] for qid in ids}) for node, ids in groups.items()
+        ))
+        return all(results)
+
+    async def touch_questions(self, question_ids: List[str]) -> bool:
+        groups = self._group(question_ids, self.ring)
+        results = await asyncio.gather(*(self.shards[node].touch_questions(ids) for node, ids in groups.items()))
+        return all(results)
+
+    async def get_questions(self, question_ids: List[str]) -> Dict[str, Dict]:
+        groups = self._group(question_ids, self.ring)
+        found: Dict[str, Dict] = {}
+        for part in await asyncio.gather(*(self.shards[node].get_questions(ids) for node, ids in groups.items())):
+            found.update(part)
+        missing = [qid for qid in question_ids if qid not in found and self._previous_owner(qid) is not None]
+        if missing:
+            groups = self._group(missing, self.previous)
+            recovered: Dict[str, Dict] = {}
+            for part in await asyncio.gather(*(self.shards[node].get_questions(ids) for node, ids in groups.items())):
+                recovered.update(part)
+            if recovered:
+                metrics.incr("sharding.dual_reads", len(recovered))
+                # Immutable, so copying them to their new owners on read is safe
+                await self.put_questions(recovered)
+                found.update(recovered)
+        return found
+
+    async def delete_questions(self, question_ids: List[str]) -> bool:
+        rings = [self.ring] + ([self.previous] if self.previous is not None else [])
+        results = await asyncio.gather(*(
+            self.shards[node].delete_questions(ids)
+            for ring in rings for node, ids in self._group(question_ids, ring).items()
+        ))
+        return all(results)
+
+    async def list_user_sessions(self, user_id: str, limit: int, cursor: Optional[str] = None) -> SessionPage:
+        # The cursor holds each node's own cursor; nodes that ran out are left out
+        positions: Dict[str, Optional[str]] = (
+            json.loads(base64.urlsafe_b64decode(cursor)) if cursor else {node: None for node in self.shards}
+        )
+        nodes = [node for node in positions if node in self.shards]
+        pages = await asyncio.gather(*(
+            self.shards[node].list_user_sessions(user_id, limit, positions[node]) for node in nodes
+        ))
+        candidates = sorted(
+            ((_start_time(record), record['id'], node, record) for node, (records, _) in zip(nodes, pages, strict=True) for record in records),
+            reverse=True
+        )
+        page: List[Dict] = []
+        seen = set()
+        consumed = {node: 0 for node in nodes}
+        for _, session_id, node, record in candidates:
+            if len(page) == limit and session_id not in seen:
+                break
+            consumed[node] += 1
+            # A session caught mid-move can be listed by two nodes
+            if session_id not in seen:
+                seen.add(session_id)
+                page.append(record)
+
+        next_positions: Dict[str, Optional[str]] = {}
+        for node, (records, next_cursor) in zip(nodes, pages, strict=True):
+            taken = consumed[node]
+            if taken == len(records):
+                if next_cursor:
+                    next_positions[node] = next_cursor
+            elif taken == 0:
+                next_positions[node] = positions[node]
+            else:
+                # Node cursors are opaque: ask for exactly the records taken to get the cursor after them
+                _, partial_cursor = await self.shards[node].list_user_sessions(user_id, taken, positions[node])
+                if partial_cursor:
+                    next_positions[node] = partial_cursor
+        next_cursor = base64.urlsafe_b64encode(json.dumps(next_positions).encode()).decode() if next_positions else None
+        return page, next_cursor
+
+    async def list_completed_sessions(self, ended_before: str, limit: int) -> List[Dict]:
+        parts = await asyncio.gather(*(
+            shard.list_completed_sessions(ended_before, limit) for shard in self.shards.values()
+        ))
+        sessions: Dict[str, Dict] = {}
+        for record in sorted((record for part in parts for record in part), key=lambda record: _end_time(record) or ""):
+            sessions.setdefault(record['id'], record)
+        return list(sessions.values())[:limit]
+
+    async def scan_keys(self, kind: str, cursor: Optional[str], limit: int) -> Tuple[List[str], Optional[str]]:
+        # Nodes are scanned one after another; the cursor is "<node index>|<node cursor>"
+        nodes = list(self.shards)
+        index, _, node_cursor = (cursor or "0|").partition("|")
+        position = int(index)
+        if position >= len(nodes):
+            return [], None
+        keys, node_cursor = await self.shards[nodes[position]].scan_keys(kind, node_cursor or None, limit)
+        if node_cursor is None:
+            position += 1
+        if position >= len(nodes):
+            return keys, None
+        return keys, f"{position}|{node_cursor or ''}"
+
+    def status(self) -> Dict:
+        return {
+            "nodes": self.ring.nodes,
+            "rebalancing": self.rebalancing,
+            "previous_nodes": self.previous.nodes if self.previous else [],
+            "dual_reads": metrics.counter("sharding.dual_reads"),
+            "moved": {kind: metrics.counter(f"sharding.moved.{kind}") for kind in KEY_KINDS},
+            "last_pass": self.last_pass,
+        }
+
+def build_sharded_database(urls: List[str], previous_urls: Optional[List[str]] = None) -> ShardedDatabase:
+    """Sharded store over `urls`, rebalancing away from `previous_urls` when given"""
+    if not urls:
+        raise ValueError("SHARD_URLS must list at least one node")
+    shards = {url: backend_for_url(url) for url in dict.fromkeys(urls + (previous_urls or []))}
+    return ShardedDatabase(
+        shards,
+        ring_nodes=urls,
+        previous_nodes=previous_urls or None,
+        vnodes=settings.SHARD_VIRTUAL_NODES,
+        idle_seconds=settings.SHARD_IDLE_SECONDS
+    )
+
+def sharding_status() -> Dict:
+    """Ring and rebalance progress of the sharded store, for the metrics endpoint"""
+    try:
+        db = get_database()
+    except RuntimeError:
+        return {}
+    return db.status() if isinstance(db, ShardedDatabase) else {}
+
+metrics.register_collector("sharding", sharding_status)
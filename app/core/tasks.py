@@ -0,0 +1,263 @@
+"""In-process background task runtime: bounded priority queues with worker pools"""
+
+import asyncio
+import itertools
+import random
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import structlog
+from app.core.config import settings
+from app.core.metrics import get_metrics
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+# Priority levels: lower runs first
+HIGH = 0
+NORMAL = 1
+LOW = 2
+
+class Job:
+    """One unit of queued work"""
+
+    __slots__ = ("fn", "args", "kwargs", "name", "enqueued_at")
+
+    def __init__(self, fn: Callable, args: tuple, kwargs: Dict):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.name = getattr(fn, "__qualname__", repr(fn))
+        self.enqueued_at = time.monotonic()
+
+class TaskQueue:
+    """A named bounded priority queue drained by a pool of worker tasks.
+
+    Coroutine functions run on the event loop. Plain functions run in the
+    queue's executor ("thread" or "process") so CPU-bound or blocking work
+    stays off the loop; process-pool jobs must be picklable. A failed job is
+    retried by the same worker with exponential backoff and jitter.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        workers: int = 4,
+        max_size: int = 1000,
+        executor: Optional[str] = None,
+        max_retries: int = 3,
+        retry_base_seconds: float = 0.5,
+        high_water: Optional[float] = None
+    ):
+        self.name = name
+        self.workers = workers
+        self.max_size = max_size
+        self.executor_kind = executor
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        # Share of capacity above which admission control sheds new requests; None never sheds
+        self.high_water = high_water
+        self.busy = 0
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._executor: Optional[Executor] = None
+        self._avg_run_seconds = 0.01
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.PriorityQueue(self.max_size)
+        if self.executor_kind == "process":
+            self._executor = ProcessPoolExecutor(self.workers)
+        elif self.executor_kind == "thread":
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix=f"tasks-{self.name}")
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def submit(self, fn: Callable, *args, priority: int = NORMAL, **kwargs) -> bool:
+        """Queue a job; False when the queue is not running or is full"""
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait((priority, next(self._sequence), Job(fn, args, kwargs)))
+        except asyncio.QueueFull:
+            metrics.incr(f"tasks.{self.name}.rejected")
+            return False
+        metrics.incr(f"tasks.{self.name}.submitted")
+        return True
+
+    async def run_now(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a job in the caller, the way a worker would"""
+        if asyncio.iscoroutinefunction(fn):
+            return await fn(*args, **kwargs)
+        if self._executor is not None:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, _call, fn, args, kwargs)
+        return fn(*args, **kwargs)
+
+    def retry_after(self) -> Optional[float]:
+        """Seconds until the backlog is likely worked off, when it is above the high-water mark"""
+        if self.high_water is None or self.depth < self.high_water * self.max_size:
+            return None
+        return self.depth * self._avg_run_seconds / self.workers
+
+    async def _work(self):
+        while True:
+            _, _, job = await self._queue.get()
+            self.busy += 1
+            started = time.monotonic()
+            metrics.observe(f"tasks.{self.name}.wait", started - job.enqueued_at)
+            try:
+                await self._run(job)
+            finally:
+                elapsed = time.monotonic() - started
+                metrics.observe(f"tasks.{self.name}.run", elapsed)
+                self._avg_run_seconds = 0.9 * self._avg_run_seconds + 0.1 * elapsed
+                self.busy -= 1
+                self._queue.task_done()
+
+    async def _run(self, job: Job):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.run_now(job.fn, *job.args, **job.kwargs)
+                metrics.incr(f"tasks.{self.name}.completed")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    metrics.incr(f"tasks.{self.name}.failed")
+                    logger.error("Background job failed", queue=self.name, job=job.name, attempts=attempt + 1, error=str(e))
+                    return
+                metrics.incr(f"tasks.{self.name}.retried")
+                await asyncio.sleep(self.retry_base_seconds * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    async def drain(self, timeout: float) -> int:
+        """Let the workers finish queued jobs, then stop them; returns the jobs left undone"""
+        if not self.running:
+            return 0
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        left = self.depth + self.busy
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=left == 0, cancel_futures=True)
+            self._executor = None
+        if left:
+            metrics.incr(f"tasks.{self.name}.dropped", left)
+            logger.warning("Background jobs dropped at shutdown", queue=self.name, jobs=left)
+        return left
+
+    def status(self) -> Dict:
+        return {
+            "running": self.running,
+            "depth": self.depth,
+            "max_size": self.max_size,
+            "workers": self.workers,
+            "busy": self.busy,
+            "executor": self.executor_kind or "async",
+            "shedding": self.retry_after() is not None,
+        }
+
+def _call(fn: Callable, args: tuple, kwargs: Dict) -> Any:
+    return fn(*args, **kwargs)
+
+class TaskRuntime:
+    """Named task queues started with the app and drained on shutdown"""
+
+    def __init__(self, drain_timeout: float = 10.0):
+        self.drain_timeout = drain_timeout
+        self.queues: Dict[str, TaskQueue] = {}
+        self.accepting = False
+
+    def define(self, queue: TaskQueue) -> TaskQueue:
+        self.queues[queue.name] = queue
+        return queue
+
+    def start(self):
+        for queue in self.queues.values():
+            queue.start()
+        self.accepting = True
+        logger.info("Task runtime started", queues=list(self.queues))
+
+    def submit(self, queue: str, fn: Callable, *args, priority: int = NORMAL, **kwargs) -> bool:
+        """Queue a job without waiting; False when it was not accepted (the caller decides what to do)"""
+        return self.accepting and self.queues[queue].submit(fn, *args, priority=priority, **kwargs)
+
+    async def defer(self, queue: str, fn: Callable, *args, priority: int = NORMAL, **kwargs) -> bool:
+        """Run a job after the response, or now if it cannot be queued.
+
+        Work is never lost: when the runtime is stopped or draining, or the
+        queue is full, the job runs in the caller, once; a failure is logged
+        rather than raised, as the response does not depend on it. Returns
+        whether it was queued.
+        """
+        if self.submit(queue, fn, *args, priority=priority, **kwargs):
+            return True
+        metrics.incr(f"tasks.{queue}.inline")
+        try:
+            await self.queues[queue].run_now(fn, *args, **kwargs)
+        except Exception as e:
+            metrics.incr(f"tasks.{queue}.failed")
+            logger.error("Background job failed", queue=queue, job=getattr(fn, "__qualname__", repr(fn)), attempts=1, error=str(e))
+        return False
+
+    def retry_after(self) -> Optional[float]:
+        """Backpressure for admission control: a Retry-After while any shedding queue is backlogged"""
+        delays = [delay for delay in (queue.retry_after() for queue in self.queues.values()) if delay is not None]
+        return max(delays) if delays else None
+
+    async def drain(self):
+        """Stop accepting jobs and finish the queued ones within the drain timeout"""
+        self.accepting = False
+        left = await asyncio.gather(*(queue.drain(self.drain_timeout) for queue in self.queues.values()))
+        logger.info("Task runtime drained", dropped=sum(left))
+
+    def status(self) -> Dict:
+        return {"accepting": self.accepting, "queues": {name: queue.status() for name, queue in self.queues.items()}}
+
+# Task runtime instance
+_runtime: Optional[TaskRuntime] = None
+
+def get_task_runtime() -> TaskRuntime:
+    """Get the task runtime with the queues described by settings"""
+    global _runtime
+    if _runtime is None:
+        _runtime = TaskRuntime(settings.TASK_DRAIN_TIMEOUT_SECONDS)
+        # Work done for a request after its response: profile updates, leaderboards
+        _runtime.define(TaskQueue(
+            "post_response",
+            workers=settings.TASK_WORKERS,
+            max_size=settings.TASK_QUEUE_SIZE,
+            max_retries=settings.TASK_MAX_RETRIES,
+            retry_base_seconds=settings.TASK_RETRY_BASE_SECONDS,
+            high_water=settings.TASK_HIGH_WATER
+        ))
+        # CPU-bound or blocking functions, off the event loop
+        _runtime.define(TaskQueue(
+            "cpu",
+            workers=settings.TASK_CPU_WORKERS,
+            max_size=settings.TASK_QUEUE_SIZE,
+            executor=settings.TASK_CPU_EXECUTOR,
+            max_retries=settings.TASK_MAX_RETRIES,
+            retry_base_seconds=settings.TASK_RETRY_BASE_SECONDS
+        ))
+    return _runtime
+
+def tasks_status() -> Dict:
+    return get_task_runtime().status()
+
+metrics.register_collector("tasks", tasks_status)
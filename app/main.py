@@ -3,34 +3,33 @@ IQFieldBot - Personalized IQ Testing Chatbot
 Main FastAPI application entry point
 """
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends, Security
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import structlog
 from app.core.config import settings
-from app.api.routes import chat, sessions, health
-from app.core.database import init_database
-from app.services.question_service import QuestionService
+from app.core.logging import configure_logging, shutdown_logging
+from app.api.frontend import FrontendApp, get_frontend_assets
+from app.api.middleware import CompressionMiddleware, TimingMiddleware
+from app.api.routes import chat, sessions, questions, users, leaderboards, push, health, admin
+from app.api.dependencies import admin_key_matches, api_key_matches, backlog_admission, llm_admission, rate_limit_caller
+from app.core.database import get_database, init_database
+from app.core.profiling import get_profiler
+from app.core.tasks import get_task_runtime
+from app.core.sharding import ShardedDatabase
+from app.services.question_service import get_question_service
+from app.services.speculation import get_speculative_generator
+from app.services.push_hub import get_push_hub
+from app.services.timers import get_question_timers
+from app.services.warmup import get_warmup
+from app.services.archive import get_archiver
 
 # Configure structured logging
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    cache_logger_on_first_use=True,
-)
+configure_logging(logging.DEBUG if settings.DEBUG else logging.INFO)
 
 logger = structlog.get_logger()
 
@@ -44,11 +43,21 @@ async def verify_api_key(credentials: HTTPAuthorizationCredentials = Security(se
             raise HTTPException(status_code=401, detail="API key required")
         return None
     
-    if credentials.credentials != settings.API_SECRET:
+    if not api_key_matches(credentials.credentials):
         raise HTTPException(status_code=401, detail="Invalid API key")
     
     return credentials.credentials
 
+async def verify_admin_key(credentials: HTTPAuthorizationCredentials = Security(security)):
+    """Require the shared API secret, whatever REQUIRE_AUTH says"""
+    if not credentials:
+        raise HTTPException(status_code=401, detail="API key required")
+    if not admin_key_matches(credentials.credentials):
+        if api_key_matches(credentials.credentials):
+            raise HTTPException(status_code=403, detail="Admin routes require the API secret")
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    return credentials.credentials
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
@@ -57,14 +66,58 @@ async def lifespan(app: FastAPI):
     # Initialize database connections
     await init_database()
     
+    # Work that can wait until after the response
+    if settings.TASKS_ENABLED:
+        get_task_runtime().start()
+    
     # Initialize question service
-    question_service = QuestionService()
-    app.state.question_service = question_service
+    app.state.question_service = get_question_service()
+    
+    # Time out unanswered questions in the background
+    get_question_timers().start(chat.expire_question)
+    
+    # Relay live session updates published by other workers
+    get_push_hub().start()
+    
+    # Move completed sessions out of the hot store
+    if settings.ARCHIVE_ENABLED:
+        get_archiver().start()
+    
+    # Move keys to their new shards after the shard list changed
+    database = get_database()
+    if settings.SHARD_REBALANCE_ENABLED and isinstance(database, ShardedDatabase):
+        database.start_rebalancer(settings.SHARD_REBALANCE_INTERVAL_SECONDS, settings.SHARD_REBALANCE_BATCH)
+    
+    # Hash and precompress the frontend once, off the event loop
+    if settings.FRONTEND_ENABLED:
+        await asyncio.get_running_loop().run_in_executor(None, get_frontend_assets().load)
+    
+    # Collect flame graph stacks from the start
+    if settings.PROFILING_SAMPLER_ENABLED:
+        get_profiler().sampler.start()
+    
+    # Open connections and fill caches before readiness reports ready
+    if settings.WARMUP_ENABLED:
+        warmup = get_warmup().start()
+        if settings.WARMUP_BLOCKING:
+            await warmup
     
     logger.info("IQFieldBot API started successfully")
     yield
     
     logger.info("Shutting down IQFieldBot API")
+    await get_warmup().stop()
+    await get_task_runtime().drain()
+    if settings.ARCHIVE_ENABLED:
+        await get_archiver().stop()
+    if isinstance(database, ShardedDatabase):
+        await database.stop_rebalancer()
+    get_profiler().sampler.stop()
+    get_frontend_assets().close()
+    get_speculative_generator().shutdown()
+    await get_question_timers().stop()
+    await get_push_hub().stop()
+    shutdown_logging()
 
 # Create FastAPI application
 app = FastAPI(
@@ -73,7 +126,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS configuration
@@ -85,29 +139,65 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compression for large payloads (full sessions, analytics) and request timing
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+app.add_middleware(TimingMiddleware)
+
 # Include routers
+auth_dependencies = [Depends(verify_api_key)] if settings.REQUIRE_AUTH else []
+
 app.include_router(health.router, prefix="/health", tags=["Health"])
 app.include_router(
     chat.router, 
     prefix="/api/v1/chat", 
     tags=["Chat"],
-    dependencies=[Depends(verify_api_key)] if settings.REQUIRE_AUTH else []
+    dependencies=[*auth_dependencies, Depends(rate_limit_caller), Depends(backlog_admission), Depends(llm_admission)]
 )
 app.include_router(
     sessions.router, 
     prefix="/api/v1/sessions", 
     tags=["Sessions"],
-    dependencies=[Depends(verify_api_key)] if settings.REQUIRE_AUTH else []
+    dependencies=[*auth_dependencies, Depends(rate_limit_caller)]
+)
+app.include_router(
+    questions.router,
+    prefix="/api/v1/questions",
+    tags=["Questions"],
+    dependencies=[*auth_dependencies, Depends(rate_limit_caller), Depends(llm_admission)]
+)
+app.include_router(
+    users.router,
+    prefix="/api/v1/users",
+    tags=["Users"],
+    dependencies=[*auth_dependencies, Depends(rate_limit_caller)]
+)
+app.include_router(
+    leaderboards.router,
+    prefix="/api/v1/leaderboards",
+    tags=["Leaderboards"],
+    dependencies=[*auth_dependencies, Depends(rate_limit_caller)]
+)
+app.include_router(
+    admin.router,
+    prefix="/api/v1/admin",
+    tags=["Admin"],
+    dependencies=[Depends(verify_admin_key)]
 )
+# WebSockets authenticate themselves (browsers cannot send an Authorization header)
+app.include_router(push.router, prefix="/api/v1/push", tags=["Push"])
 
-@app.get("/")
-async def root():
-    """Root endpoint"""
-    return {
-        "message": "IQFieldBot API",
-        "version": "1.0.0",
-        "status": "running"
-    }
+if settings.FRONTEND_ENABLED:
+    # Last, so API routes match first; everything else is the SPA
+    app.mount("/", FrontendApp(get_frontend_assets()), name="frontend")
+else:
+    @app.get("/")
+    async def root():
+        """Root endpoint"""
+        return {
+            "message": "IQFieldBot API",
+            "version": "1.0.0",
+            "status": "running"
+        }
 
 if __name__ == "__main__":
     import uvicorn
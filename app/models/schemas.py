@@ -2,7 +2,7 @@
 
 from datetime import datetime
 from typing import Dict, List, Optional, Union
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from enum import Enum
 
 class FieldType(str, Enum):
@@ -33,20 +33,26 @@ class FieldScore(BaseModel):
     correct: int = 0
     total: int = 0
     accuracy: float = 0.0
+    percentile: Optional[float] = None  # share of completed sessions in the field scoring lower
+    timed_out: int = 0
+    average_response_seconds: Optional[float] = None
 
 class ChatMessage(BaseModel):
     id: str
     type: str  # 'bot', 'user', 'question'
     content: str
     question: Optional[Question] = None
+    question_id: Optional[str] = None  # kept in storage; the question is resolved from the question store
     is_correct: Optional[bool] = None
     timestamp: datetime = Field(default_factory=datetime.now)
 
 class UserSession(BaseModel):
     id: str
     user_id: Optional[str] = None
+    group: Optional[str] = None  # e.g. an exam room watched by a proctor
     selected_field: Optional[FieldType] = None
     current_question: Optional[Question] = None
+    current_question_id: Optional[str] = None
     score: int = 0
     total_questions: int = 0
     correct_answers: int = 0
@@ -56,6 +62,56 @@ class UserSession(BaseModel):
     end_time: Optional[datetime] = None
     is_complete: bool = False
     messages: List[ChatMessage] = Field(default_factory=list)
+    recent_questions: List[str] = Field(default_factory=list)
+    question_served_at: Optional[datetime] = None  # set while the current question is unanswered
+    response_times: List[float] = Field(default_factory=list)  # seconds per answered or timed-out question
+    timed_out_questions: int = 0
+    seen_fingerprints: List[int] = Field(default_factory=list)  # fixed-size open-addressing set
+    version: int = 0  # sequence number of the last event applied
+    _pending_events: List["SessionEvent"] = PrivateAttr(default_factory=list)
+
+class SessionEventType(str, Enum):
+    SESSION_CREATED = "session_created"
+    MESSAGE_RECEIVED = "message_received"
+    FIELD_SELECTED = "field_selected"
+    QUESTION_SERVED = "question_served"
+    ANSWER_EVALUATED = "answer_evaluated"
+    QUESTION_TIMED_OUT = "question_timed_out"
+    SESSION_COMPLETED = "session_completed"
+
+class SessionEvent(BaseModel):
+    seq: int
+    type: SessionEventType
+    at: datetime = Field(default_factory=datetime.now)
+    data: Dict = Field(default_factory=dict)
+
+class FieldAbility(BaseModel):
+    estimate: float = 1.0  # difficulty level the user settles at
+    sessions: int = 0
+    questions: int = 0
+
+class UserProfile(BaseModel):
+    user_id: str
+    seen_filter: Optional[str] = None  # base64 Bloom filter of served question fingerprints
+    seen_filter_previous: Optional[str] = None  # the retired generation, still checked
+    abilities: Dict[str, FieldAbility] = Field(default_factory=dict)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+class UserSessionSummary(BaseModel):
+    session_id: str
+    selected_field: Optional[FieldType] = None
+    score: int
+    total_questions: int
+    correct_answers: int
+    difficulty: float
+    start_time: datetime
+    end_time: Optional[datetime] = None
+    is_complete: bool
+
+class UserSessionsPage(BaseModel):
+    user_id: str
+    sessions: List[UserSessionSummary]
+    next_cursor: Optional[str] = None
 
 # Request/Response Models
 class ChatRequest(BaseModel):
@@ -79,6 +135,7 @@ class FieldSelectionRequest(BaseModel):
 class AnswerRequest(BaseModel):
     session_id: str
     answer: str
+    question_id: Optional[str] = None  # rejects the answer if the question has since timed out
 
 class AnswerResponse(BaseModel):
     session_id: str
@@ -88,14 +145,60 @@ class AnswerResponse(BaseModel):
     next_question: Optional[Question] = None
     is_complete: bool
     difficulty: float
+    timed_out: bool = False
+    response_seconds: Optional[float] = None
+
+class ExplanationResponse(BaseModel):
+    question_id: str
+    explanation: str
 
 class SessionCreateRequest(BaseModel):
     user_id: Optional[str] = None
+    group: Optional[str] = Field(default=None, max_length=128)
+
+class SessionUpdate(BaseModel):
+    """Progress delta pushed to live subscribers"""
+    event: str  # answer | timeout | complete
+    session_id: str
+    user_id: Optional[str] = None
+    group: Optional[str] = None
+    score: int
+    difficulty: float
+    answered: int
+    correct: int
+    total: int
+    is_correct: Optional[bool] = None
+    is_complete: bool
+    at: datetime = Field(default_factory=datetime.now)
 
 class SessionResponse(BaseModel):
     session: UserSession
     message: str
 
+class LeaderboardEntry(BaseModel):
+    rank: int  # 1-based
+    session_id: str
+    score: float
+
+class LeaderboardResponse(BaseModel):
+    board: str
+    total: int
+    entries: List[LeaderboardEntry]
+
+class LeaderboardRank(BaseModel):
+    board: str
+    session_id: str
+    score: int
+    rank: Optional[int] = None  # 1-based; None when outside the ranked range
+    percentile: Optional[float] = None
+    total: int
+
+class ProfilingUpdate(BaseModel):
+    """Runtime profiling switches; omitted fields are left as they are"""
+    spans_enabled: Optional[bool] = None
+    slow_request_ms: Optional[float] = Field(default=None, ge=0)
+    sampler_running: Optional[bool] = None
+
 class PerformanceAnalytics(BaseModel):
     session_id: str
     total_score: int
@@ -103,6 +206,8 @@ class PerformanceAnalytics(BaseModel):
     difficulty_progression: List[float]
     field_performance: Dict[str, FieldScore]
     time_spent: int  # seconds
+    average_response_seconds: Optional[float] = None
+    timed_out_questions: int = 0
     strengths: List[str]
     weaknesses: List[str]
     recommendations: List[str]
\ No newline at end of file
@@ -0,0 +1,285 @@
+"""Archival of completed sessions to partitioned Parquet files for offline analytics"""
+
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import structlog
+from app.core.config import settings
+from app.core.database import DatabaseInterface, get_database
+from app.core.metrics import get_metrics
+from app.models.schemas import UserSession
+from app.services.session_service import SessionService
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+# Column name -> Arrow type name; `date` becomes the hive partition directory
+ANSWER_COLUMNS = {
+    "session_id": "string",
+    "user_id": "string",
+    "field": "string",
+    "date": "string",
+    "question_id": "string",
+    "difficulty": "int8",
+    "correct": "bool",
+    "points": "int16",
+    "response_seconds": "float32",
+    "timed_out": "bool",
+    "answered_at": "timestamp[ms]",
+}
+PARTITION_COLUMNS = ["date"]
+
+def answer_rows(session: UserSession) -> List[Dict]:
+    """One row per answered or timed-out question, in order.
+
+    A question message is followed by either the user's answer and the
+    marked feedback, or (when its time ran out) only the marked feedback.
+    """
+    rows: List[Dict] = []
+    question_message = None
+    answered = False
+    for message in session.messages:
+        if message.type == "question":
+            question_message, answered = message, False
+        elif message.type == "user" and question_message is not None:
+            answered = True
+        elif message.type == "bot" and message.is_correct is not None and question_message is not None:
+            question = question_message.question
+            if question is not None:
+                rows.append({
+                    "session_id": session.id,
+                    "user_id": session.user_id,
+                    "field": question.field.value,
+                    "date": (session.end_time or message.timestamp).date().isoformat(),
+                    "question_id": question.id,
+                    "difficulty": question.difficulty,
+                    "correct": message.is_correct,
+                    "points": question.points if message.is_correct else 0,
+                    "response_seconds": (message.timestamp - question_message.timestamp).total_seconds(),
+                    "timed_out": not answered,
+                    "answered_at": message.timestamp,
+                })
+            question_message = None
+    return rows
+
+def write_answer_rows(path: str, rows: List[Dict]) -> int:
+    """Append rows as new Parquet files under `path`/date=…; returns rows written"""
+    if not rows:
+        return 0
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([(name, pa.type_for_alias(type_name)) for name, type_name in ANSWER_COLUMNS.items()])
+    table = pa.Table.from_pylist(rows, schema=schema)
+    # Parquet files are immutable: every batch adds files rather than rewriting old ones
+    pq.write_to_dataset(
+        table,
+        path,
+        partition_cols=PARTITION_COLUMNS,
+        basename_template=f"part-{int(time.time())}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore"
+    )
+    return table.num_rows
+
+def compact_partitions(path: str, before: str) -> int:
+    """Merge the files of each date partition older than `before` into one; returns partitions merged.
+
+    Every archiver batch adds a file, so a day ends up split into hundreds
+    of small files; once the day is over they are rewritten as one. The
+    merged file is written under a dot-prefixed name, which readers skip,
+    and renamed into place before the originals are removed.
+    """
+    if not os.path.isdir(path):
+        return 0
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    merged = 0
+    for name in sorted(os.listdir(path)):
+        if not name.startswith("date=") or name[len("date="):] >= before:
+            continue
+        directory = os.path.join(path, name)
+        files = sorted(os.path.join(directory, file) for file in os.listdir(directory) if file.startswith("part-"))
+        if len(files) < 2:
+            continue
+        table = pa.concat_tables([pq.read_table(file) for file in files])
+        staging = os.path.join(directory, f".compacting-{uuid.uuid4().hex[:8]}.parquet")
+        pq.write_table(table, staging)
+        os.replace(staging, os.path.join(directory, f"part-compacted-{uuid.uuid4().hex[:8]}.parquet"))
+        for file in files:
+            os.remove(file)
+        merged += 1
+    return merged
+
+def field_accuracy(path: str, since: Optional[str] = None) -> Dict[str, Dict]:
+    """Per-field answer counts, accuracy and mean response time across the archive.
+
+    Reads only the needed columns and aggregates them in Arrow, so millions
+    of answers never become Python objects. `since` (YYYY-MM-DD) prunes
+    whole date partitions before any file is opened.
+    """
+    if not os.path.isdir(path):
+        return {}
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    # Partition values stay strings so `since` compares as an ISO date
+    partitioning = ds.partitioning(pa.schema([(name, pa.string()) for name in PARTITION_COLUMNS]), flavor="hive")
+    dataset = ds.dataset(path, format="parquet", partitioning=partitioning)
+    if not dataset.files:
+        return {}
+    table = dataset.to_table(
+        columns=["field", "correct", "response_seconds"],
+        filter=(ds.field("date") >= since) if since else None
+    )
+    if table.num_rows == 0:
+        return {}
+    table = table.set_column(
+        table.schema.get_field_index("correct"), "correct", pc.cast(table["correct"], "int64")
+    )
+    grouped = table.group_by("field").aggregate([
+        ("correct", "count"), ("correct", "sum"), ("response_seconds", "mean")
+    ]).to_pydict()
+    return {
+        str(field): {
+            "answers": count,
+            "correct": correct,
+            "accuracy": round(correct / count, 4) if count else 0.0,
+            "average_response_seconds": round(mean, 2) if mean is not None else None,
+        }
+        for field, count, correct, mean in zip(
+            grouped["field"], grouped["correct_count"], grouped["correct_sum"], grouped["response_seconds_mean"], strict=True
+        )
+    }
+
+class SessionArchiver:
+    """Moves completed sessions from the hot store to Parquet in batches.
+
+    Each batch is written before its sessions are evicted, so a crash in
+    between archives those sessions again on the next run rather than
+    losing them; IDs archived recently are remembered and skipped, which
+    also covers completed-session indexes that lag behind deletes.
+
+    Every worker may run an archiver, but only the holder of the shared
+    "archiver" lease in the database moves sessions and compacts partitions. It renews the lease each
+    batch and keeps it across intervals; another worker takes over once it
+    lapses.
+    """
+
+    def __init__(
+        self,
+        db: DatabaseInterface,
+        path: str,
+        batch_size: int = 500,
+        min_age_seconds: float = 3600.0,
+        interval_seconds: float = 300.0
+    ):
+        self.db = db
+        self.path = path
+        self.batch_size = batch_size
+        self.min_age_seconds = min_age_seconds
+        self.interval_seconds = interval_seconds
+        self.owner = str(uuid.uuid4())
+        self.lease_seconds = interval_seconds * 2 + 60
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        self._runner: Optional[asyncio.Task] = None
+        self.last_run: Optional[str] = None
+
+    async def _hold_lease(self) -> bool:
+        """Take or renew the "archiver" lease"""
+        if await self.db.acquire_lease("archiver", self.owner, self.lease_seconds):
+            return True
+        metrics.incr("archive.lease_busy")
+        return False
+
+    async def archive_batch(self) -> int:
+        """Archive and evict one batch; returns the number of sessions moved"""
+        if not await self._hold_lease():
+            return 0
+        ended_before = (datetime.now() - timedelta(seconds=self.min_age_seconds)).isoformat()
+        records = await self.db.list_completed_sessions(ended_before, self.batch_size)
+        records = [record for record in records if record["id"] not in self._recent]
+        if not records:
+            return 0
+        sessions = await SessionService().load_sessions(records)
+        rows = [row for session in sessions for row in answer_rows(session)]
+        written = await asyncio.to_thread(write_answer_rows, self.path, rows)
+
+        for session in sessions:
+            self._recent[session.id] = None
+            await self.db.delete_session(session.id)
+        while len(self._recent) > self.batch_size * 10:
+            self._recent.popitem(last=False)
+        metrics.incr("archive.sessions", len(sessions))
+        metrics.incr("archive.rows", written)
+        logger.info("Archived completed sessions", sessions=len(sessions), rows=written)
+        return len(sessions)
+
+    async def run_once(self) -> int:
+        """Archive batches until the backlog of eligible sessions is drained, then compact closed days.
+
+        Both only happen while holding the lease, so two workers never
+        compact the same partition.
+        """
+        if not await self._hold_lease():
+            return 0
+        archived = 0
+        while True:
+            moved = await self.archive_batch()
+            archived += moved
+            if moved < self.batch_size:
+                break
+        compacted = await asyncio.to_thread(compact_partitions, self.path, datetime.now().date().isoformat())
+        if compacted:
+            logger.info("Compacted archive partitions", partitions=compacted)
+        self.last_run = datetime.now().isoformat()
+        return archived
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("Session archival error", error=str(e))
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            self._runner = None
+
+    def status(self) -> Dict:
+        return {
+            "sessions": metrics.counter("archive.sessions"),
+            "rows": metrics.counter("archive.rows"),
+            "last_run": self.last_run,
+            "lease_busy": metrics.counter("archive.lease_busy"),
+        }
+
+# Archiver instance
+_archiver: Optional[SessionArchiver] = None
+
+def get_archiver() -> SessionArchiver:
+    """Get the session archiver of the current database"""
+    global _archiver
+    if _archiver is None or _archiver.db is not get_database():
+        _archiver = SessionArchiver(
+            get_database(),
+            settings.ARCHIVE_PATH,
+            settings.ARCHIVE_BATCH_SIZE,
+            settings.ARCHIVE_MIN_AGE_SECONDS,
+            settings.ARCHIVE_INTERVAL_SECONDS
+        )
+    return _archiver
+
+def archive_status() -> Dict:
+    """Archived session and row counts for the metrics endpoint"""
+    return _archiver.status() if _archiver else {}
+
+metrics.register_collector("archive", archive_status)
@@ -0,0 +1,332 @@
+"""Seen-question tracking and near-duplicate suppression"""
+
+import base64
+import hashlib
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple, Union
+import structlog
+from app.core.config import settings
+from app.core.metrics import get_metrics
+from app.models.schemas import Question, UserSession
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+_TOKEN = re.compile(r"[a-z]+|\d+(?:\.\d+)?|[^\sa-z\d]")
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+def question_fingerprint(text: str) -> int:
+    """64-bit fingerprint of normalized question text (case, spacing and punctuation spacing ignored)"""
+    normalized = " ".join(_tokens(text))
+    return int.from_bytes(hashlib.blake2b(normalized.encode(), digest_size=8).digest(), "big")
+
+class SeenSet:
+    """Fixed-size open-addressing set of 32-bit fingerprints stored in a plain list.
+
+    The list lives on the session (`UserSession.seen_fingerprints`), so lookups
+    and inserts are O(1) without rebuilding anything from the message history.
+    Zero marks an empty slot.
+    """
+
+    def __init__(self, slots: List[int]):
+        self.slots = slots
+        self.mask = len(slots) - 1
+
+    @staticmethod
+    def capacity() -> int:
+        """Power of two giving at most 50% load for a full session"""
+        capacity = 16
+        while capacity < 2 * settings.QUESTIONS_PER_SESSION:
+            capacity *= 2
+        return capacity
+
+    @classmethod
+    def for_session(cls, session: UserSession) -> "SeenSet":
+        if not session.seen_fingerprints:
+            session.seen_fingerprints = [0] * cls.capacity()
+        return cls(session.seen_fingerprints)
+
+    @staticmethod
+    def _key(fingerprint: int) -> int:
+        return (fingerprint & 0xFFFFFFFF) or 1
+
+    def __contains__(self, fingerprint: int) -> bool:
+        key = self._key(fingerprint)
+        index = key & self.mask
+        for _ in range(len(self.slots)):
+            slot = self.slots[index]
+            if slot == key:
+                return True
+            if slot == 0:
+                return False
+            index = (index + 1) & self.mask
+        return False
+
+    def add(self, fingerprint: int) -> bool:
+        key = self._key(fingerprint)
+        index = key & self.mask
+        for _ in range(len(self.slots)):
+            slot = self.slots[index]
+            if slot == key:
+                return True
+            if slot == 0:
+                self.slots[index] = key
+                return True
+            index = (index + 1) & self.mask
+        return False  # full
+
+class BloomFilter:
+    """Bloom filter over 64-bit fingerprints, serialized as base64 for storage"""
+
+    def __init__(self, num_bits: int, num_hashes: int, data: Optional[bytes] = None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray(data) if data else bytearray((num_bits + 7) // 8)
+
+    @classmethod
+    def from_string(cls, encoded: Optional[str], num_bits: int, num_hashes: int) -> "BloomFilter":
+        if encoded:
+            data = base64.b64decode(encoded)
+            if len(data) * 8 >= num_bits:
+                return cls(len(data) * 8, num_hashes, data)
+        return cls(num_bits, num_hashes)
+
+    def to_string(self) -> str:
+        return base64.b64encode(bytes(self.bits)).decode()
+
+    def _positions(self, fingerprint: int):
+        # Kirsch-Mitzenmacher double hashing from the two halves of the fingerprint
+        h1 = fingerprint & 0xFFFFFFFF
+        h2 = (fingerprint >> 32) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, fingerprint: int):
+        for position in self._positions(fingerprint):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, fingerprint: int) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(fingerprint))
+
+    def false_positive_rate(self) -> float:
+        """Estimated from the fraction of bits set"""
+        return (int.from_bytes(self.bits, "big").bit_count() / self.num_bits) ** self.num_hashes
+
+class SeenFilter:
+    """Two-generation Bloom filter of what a user has been served.
+
+    New fingerprints go into the current generation; once its false-positive
+    estimate reaches half of `max_false_positive` it becomes the previous
+    generation and the old previous one is dropped. Lookups check both, so
+    the filter never saturates and questions seen two generations ago may
+    come back.
+    """
+
+    def __init__(self, current: BloomFilter, previous: Optional[BloomFilter], max_false_positive: float):
+        self.current = current
+        self.previous = previous
+        self.max_false_positive = max_false_positive
+
+    def add(self, fingerprint: int):
+        if self.current.false_positive_rate() >= self.max_false_positive / 2:
+            self.previous = self.current
+            self.current = BloomFilter(self.current.num_bits, self.current.num_hashes)
+            metrics.incr("dedup.user_filter_rotations")
+        self.current.add(fingerprint)
+
+    def __contains__(self, fingerprint: int) -> bool:
+        return fingerprint in self.current or (self.previous is not None and fingerprint in self.previous)
+
+    def false_positive_rate(self) -> float:
+        previous = self.previous.false_positive_rate() if self.previous is not None else 0.0
+        return 1 - (1 - self.current.false_positive_rate()) * (1 - previous)
+
+@lru_cache(maxsize=65536)
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+
+_WORD = re.compile(r"[a-z]+|\d+(?:\.\d+)?")
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word and number tokens (punctuation ignored)"""
+    weights = [0] * 64
+    for token in _WORD.findall(text.lower()):
+        value = _token_hash(token)
+        for bit in range(64):
+            if value >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+    result = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            result |= 1 << bit
+    return result
+
+class SimHashIndex:
+    """Banded SimHash index for near-duplicate lookups scoped to an owner.
+
+    The hash is split into `max_distance + 1` bands; two hashes within
+    `max_distance` bits of each other must agree exactly on at least one band
+    (pigeonhole), so a lookup only inspects entries sharing a band value.
+    Buckets are keyed by owner (user or session) as well, because questions
+    are only compared with what that owner has already been served; this
+    keeps candidate sets tiny regardless of index size. The oldest entries
+    are evicted first.
+    """
+
+    def __init__(self, max_distance: int = 6, max_entries: int = 200_000):
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self.band_mask = (1 << self.band_bits) - 1
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._buckets: Dict[Tuple[int, str, int], Set[int]] = {}
+        self._entries: Deque[Tuple[int, str]] = deque()
+
+    def _band_keys(self, value: int):
+        for band in range(self.bands):
+            yield band, (value >> (band * self.band_bits)) & self.band_mask
+
+    def add(self, value: int, owner: str):
+        for band, key in self._band_keys(value):
+            self._buckets.setdefault((band, owner, key), set()).add(value)
+        self._entries.append((value, owner))
+        if len(self._entries) > self.max_entries:
+            self._remove(*self._entries.popleft())
+
+    def _remove(self, value: int, owner: str):
+        for band, key in self._band_keys(value):
+            bucket = self._buckets.get((band, owner, key))
+            if bucket is not None:
+                bucket.discard(value)
+                if not bucket:
+                    del self._buckets[(band, owner, key)]
+
+    def has_near_duplicate(self, value: int, owners: Set[str]) -> bool:
+        for owner in owners:
+            for band, key in self._band_keys(value):
+                for candidate in self._buckets.get((band, owner, key), ()):
+                    if (candidate ^ value).bit_count() <= self.max_distance:
+                        return True
+        return False
+
+UserFilter = Union[BloomFilter, SeenFilter]
+
+class QuestionDeduplicator:
+    """Reject questions the session or user has already seen, exactly or nearly"""
+
+    def __init__(self, index: SimHashIndex, max_attempts: int = 3, max_false_positive: float = 0.01):
+        self.index = index
+        self.max_attempts = max_attempts
+        self.max_false_positive = max_false_positive
+
+    def _owners(self, session: UserSession) -> Set[str]:
+        owners = {f"session:{session.id}"}
+        if session.user_id:
+            owners.add(f"user:{session.user_id}")
+        return owners
+
+    def _repeat(
+        self,
+        session: UserSession,
+        question: Question,
+        user_filter: Optional[UserFilter],
+        across_sessions: bool = True
+    ) -> Optional[str]:
+        """Why the question counts as a repeat, or None if it is fresh"""
+        fingerprint = question_fingerprint(question.question)
+        if fingerprint in SeenSet.for_session(session):
+            return "session_repeats"
+        value = simhash(question.question)
+        if self.index.has_near_duplicate(value, {f"session:{session.id}"}):
+            return "near_duplicates"
+        if not across_sessions:
+            return None
+        if user_filter is not None and fingerprint in user_filter:
+            return "user_repeats"
+        if session.user_id and self.index.has_near_duplicate(value, {f"user:{session.user_id}"}):
+            return "user_near_duplicates"
+        return None
+
+    def is_fresh(self, session: UserSession, question: Question, user_filter: Optional[UserFilter] = None) -> bool:
+        repeat = self._repeat(session, question, user_filter)
+        if repeat:
+            metrics.incr(f"dedup.{repeat}")
+        return repeat is None
+
+    def record(self, session: UserSession, question: Question, user_filter: Optional[UserFilter] = None):
+        """Index a served question for the user and near-duplicate lookups.
+
+        Session state is updated by `mark_seen` when the question_served event
+        is applied, so replaying a session rebuilds it.
+        """
+        if user_filter is not None:
+            user_filter.add(question_fingerprint(question.question))
+        value = simhash(question.question)
+        for owner in self._owners(session):
+            self.index.add(value, owner)
+
+    async def fresh_question(
+        self,
+        session: UserSession,
+        question: Question,
+        regenerate: Callable[[], Awaitable[Question]],
+        user_filter: Optional[UserFilter] = None
+    ) -> Question:
+        """Return `question`, or a regenerated one if it repeats; indexes the result for the user.
+
+        Regenerations can be LLM calls, so the user filter is skipped when its
+        false-positive estimate is too high, and a repeat from an earlier
+        session earns one regeneration only: a cell whose pool the user has
+        used up should not cost `max_attempts` generations per question.
+        """
+        check_filter = user_filter
+        if user_filter is not None and user_filter.false_positive_rate() > self.max_false_positive:
+            metrics.incr("dedup.user_filter_skipped")
+            check_filter = None
+        across_sessions = True
+        for _ in range(self.max_attempts):
+            repeat = self._repeat(session, question, check_filter, across_sessions)
+            if repeat is None:
+                break
+            metrics.incr(f"dedup.{repeat}")
+            if repeat.startswith("user_"):
+                across_sessions = False
+            question = await regenerate()
+        else:
+            metrics.incr("dedup.gave_up")
+        self.record(session, question, user_filter)
+        return question
+
+def mark_seen(session: UserSession, question: Question):
+    """Add a served question to the session's seen-set and recent history"""
+    SeenSet.for_session(session).add(question_fingerprint(question.question))
+    session.recent_questions = (session.recent_questions + [question.question])[-settings.RECENT_QUESTION_HISTORY:]
+
+def new_user_filter(current: Optional[str] = None, previous: Optional[str] = None) -> SeenFilter:
+    """Per-user seen filter sized from settings"""
+    bits, hashes = settings.USER_SEEN_FILTER_BITS, settings.USER_SEEN_FILTER_HASHES
+    return SeenFilter(
+        BloomFilter.from_string(current, bits, hashes),
+        BloomFilter.from_string(previous, bits, hashes) if previous else None,
+        settings.USER_SEEN_FILTER_MAX_FP
+    )
+
+# Shared deduplicator instance
+_deduplicator: Optional[QuestionDeduplicator] = None
+
+def get_deduplicator() -> QuestionDeduplicator:
+    """Get the process-wide question deduplicator"""
+    global _deduplicator
+    if _deduplicator is None:
+        _deduplicator = QuestionDeduplicator(
+            SimHashIndex(max_distance=settings.SIMHASH_MAX_DISTANCE, max_entries=settings.SIMHASH_INDEX_SIZE),
+            max_attempts=settings.DEDUP_MAX_ATTEMPTS,
+            max_false_positive=settings.USER_SEEN_FILTER_MAX_FP
+        )
+    return _deduplicator
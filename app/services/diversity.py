@@ -0,0 +1,150 @@
+"""Topic diversity: local question embeddings and farthest-from-history selection"""
+
+import hashlib
+import os
+import re
+from functools import lru_cache
+from itertools import pairwise
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import orjson
+import structlog
+from app.core.config import settings
+from app.core.metrics import get_metrics
+from app.core.profiling import span
+from app.models.schemas import FieldType
+from app.services.question_bank import QuestionBank
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+# Words, number placeholders and operator symbols. Numbers are folded into one
+# token so "What is 3 + 4?" and "What is 8 + 1?" share a topic.
+_FEATURE = re.compile(r"[a-z]+|\d+(?:\.\d+)?|[^\sa-z\d.,?!:;'\"()]")
+_NUMBER = re.compile(r"\d")
+
+def _features(text: str) -> List[str]:
+    tokens = ["#" if _NUMBER.match(token) else token for token in _FEATURE.findall(text.lower())]
+    return tokens + [f"{a} {b}" for a, b in pairwise(tokens)]
+
+@lru_cache(maxsize=65536)
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+
+def embed(text: str, dim: int) -> np.ndarray:
+    """Unit-length signed hashing-vectorizer embedding of unigrams and bigrams"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature in _features(text):
+        value = _feature_hash(feature)
+        vector[value % dim] += 1.0 if value >> 63 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+@lru_cache(maxsize=4096)
+def _cached_embedding(text: str, dim: int) -> np.ndarray:
+    vector = embed(text, dim)
+    vector.flags.writeable = False
+    return vector
+
+def index_path(bank_path: str) -> str:
+    return f"{bank_path}.vec.npy"
+
+# Index rows are unit vectors quantized to int8: a quarter of float32's size,
+# and they widen to float32 far faster than float16 does
+_QUANT_SCALE = 127.0
+
+def build_vector_index(bank: QuestionBank, path: str, dim: int, chunk: int = 65536) -> int:
+    """Embed every bank question into an int8 .npy file with rows in bank order; replaced atomically"""
+    tmp_path = f"{path}.tmp.npy"
+    vectors = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.int8, shape=(bank.size, dim))
+    for start in range(0, bank.size, chunk):
+        stop = min(start + chunk, bank.size)
+        embedded = np.stack([embed(orjson.loads(bank.record(i))["question"], dim) for i in range(start, stop)])
+        vectors[start:stop] = np.rint(embedded * _QUANT_SCALE)
+    vectors.flush()
+    del vectors
+    os.replace(tmp_path, path)
+    return bank.size
+
+class DiversitySelector:
+    """Choose the question least similar to what the session was just asked.
+
+    Bank questions are scored from a memory-mapped embedding index: a random
+    sample of `candidates` rows from the (field, difficulty) cell is gathered
+    and compared with the history in one matrix product, so selection cost
+    does not grow with the bank. Small pools are scored in full.
+    """
+
+    def __init__(self, vectors: Optional[np.ndarray], dim: int, candidates: int = 512, seed: Optional[int] = None):
+        self.vectors = vectors
+        self.dim = vectors.shape[1] if vectors is not None else dim
+        self.candidates = candidates
+        self._rng = np.random.default_rng(seed)
+
+    def history_matrix(self, history: Optional[Sequence[str]]) -> Optional[np.ndarray]:
+        if not history:
+            return None
+        return np.stack([_cached_embedding(text, self.dim) for text in history])
+
+    def _farthest(self, vectors: np.ndarray, history: np.ndarray) -> int:
+        """Row whose closest history question is least similar (scores are only compared, so scale does not matter)"""
+        return int(np.argmin((vectors.astype(np.float32, copy=False) @ history.T).max(axis=1)))
+
+    def pick_bank(
+        self,
+        bank: QuestionBank,
+        field: FieldType,
+        difficulty: int,
+        history: Optional[Sequence[str]]
+    ) -> Optional[int]:
+        """Bank record index for the cell, or None when there is no index, history or question"""
+        first, count = bank.cell_range(field, difficulty)
+        matrix = self.history_matrix(history)
+        if self.vectors is None or matrix is None or not count:
+            return None
+        with span("diversity"):
+            if count <= self.candidates:
+                rows = np.arange(first, first + count)
+            else:
+                rows = np.sort(self._rng.integers(first, first + count, self.candidates))
+            choice = int(rows[self._farthest(self.vectors[rows], matrix)])
+        metrics.incr("diversity.bank_selections")
+        return choice
+
+    def pick(self, texts: Sequence[str], history: Optional[Sequence[str]]) -> int:
+        """Position of the text least similar to the history (0 without history)"""
+        matrix = self.history_matrix(history)
+        if matrix is None or len(texts) < 2:
+            return 0
+        metrics.incr("diversity.pool_selections")
+        return self._farthest(np.stack([_cached_embedding(text, self.dim) for text in texts]), matrix)
+
+    def similarity(self, text: str, history: Optional[Sequence[str]]) -> float:
+        """Cosine similarity to the closest history question (0 without history)"""
+        matrix = self.history_matrix(history)
+        if matrix is None:
+            return 0.0
+        return float((matrix @ _cached_embedding(text, self.dim)).max())
+
+    def status(self) -> Dict:
+        return {
+            "indexed_questions": int(self.vectors.shape[0]) if self.vectors is not None else 0,
+            "dim": self.dim,
+            "candidates": self.candidates,
+        }
+
+def load_diversity_selector(bank: Optional[QuestionBank]) -> DiversitySelector:
+    """Selector over the bank's embedding index; pool-only when the index is missing or stale"""
+    vectors = None
+    if bank is not None:
+        path = settings.DIVERSITY_INDEX_PATH or index_path(bank.path)
+        try:
+            vectors = np.load(path, mmap_mode="r")
+            if vectors.ndim != 2 or vectors.shape[0] != bank.size or vectors.dtype != np.int8:
+                logger.error("Diversity index does not match the question bank", path=path, rows=vectors.shape[0], questions=bank.size)
+                vectors = None
+            else:
+                logger.info("Loaded diversity index", path=path, questions=vectors.shape[0], dim=vectors.shape[1])
+        except (OSError, ValueError) as e:
+            logger.error("Could not load diversity index", path=path, error=str(e))
+    return DiversitySelector(vectors, settings.DIVERSITY_DIM, settings.DIVERSITY_CANDIDATES)
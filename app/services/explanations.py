@@ -0,0 +1,153 @@
+"""Lazily generated answer explanations, shared by every session that gets the same question"""
+
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+import structlog
+from app.core.config import settings
+from app.core.metrics import get_metrics
+from app.models.schemas import Question
+from app.services.dedup import question_fingerprint
+from app.services.question_service import QuestionService, get_question_service
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+def explanation_key(question: Question) -> str:
+    """Content hash of a question and its answer; IDs differ between copies of the same question"""
+    return f"{question_fingerprint(f'{question.question} {question.correct_answer}'):016x}"
+
+def local_explanation(question: Question) -> str:
+    """Explanation available without a model call"""
+    return f"The correct answer is {question.correct_answer}."
+
+class RedisExplanationTier:
+    """Shared second tier so every worker reuses an explanation generated once"""
+
+    def __init__(self, ttl_seconds: int, redis_url: Optional[str] = None):
+        import redis.asyncio as redis
+        self.redis = redis.from_url(redis_url or settings.REDIS_URL)
+        self.ttl_seconds = ttl_seconds
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            data = await self.redis.get(f"explanation:{key}")
+            return data.decode() if data is not None else None
+        except Exception as e:
+            logger.error("Redis explanation get error", error=str(e))
+            return None
+
+    async def put(self, key: str, explanation: str):
+        try:
+            await self.redis.set(f"explanation:{key}", explanation, ex=self.ttl_seconds)
+        except Exception as e:
+            logger.error("Redis explanation put error", error=str(e))
+
+class ExplanationService:
+    """Explanations generated on first request (or prefetched) and cached by content hash.
+
+    Questions are generated without an explanation; the first session to ask
+    for one pays a short fast-model call, concurrent requests for the same
+    question share that call, and later sessions are served from the LRU.
+    Local fallbacks are returned but not cached, so a later request can
+    still get a model-written explanation.
+    """
+
+    def __init__(
+        self,
+        question_service: QuestionService,
+        max_entries: int = 50_000,
+        tier: Optional[RedisExplanationTier] = None
+    ):
+        self.question_service = question_service
+        self.max_entries = max_entries
+        self.tier = tier
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._prefetches: Set[asyncio.Task] = set()
+
+    def peek(self, question: Question) -> Optional[str]:
+        """Explanation if one is already available, without generating it"""
+        if question.explanation:
+            return question.explanation
+        key = explanation_key(question)
+        explanation = self._cache.get(key)
+        if explanation is not None:
+            self._cache.move_to_end(key)
+        return explanation
+
+    def _remember(self, key: str, explanation: str):
+        self._cache[key] = explanation
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def _generate(self, key: str, question: Question) -> Optional[str]:
+        try:
+            explanation = await self.tier.get(key) if self.tier is not None else None
+            if explanation is None:
+                explanation = await self.question_service.generate_explanation(question)
+                if explanation is None:
+                    return None
+                metrics.incr("explanations.generated")
+                if self.tier is not None:
+                    await self.tier.put(key, explanation)
+            self._remember(key, explanation)
+            return explanation
+        finally:
+            del self._inflight[key]
+
+    def _start(self, key: str, question: Question) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._generate(key, question))
+        return task
+
+    async def explain(self, question: Question) -> str:
+        """Explanation for a question, generating and caching it on first use"""
+        explanation = self.peek(question)
+        if explanation is not None:
+            metrics.incr("explanations.cache_hits")
+            return explanation
+        metrics.incr("explanations.cache_misses")
+        # Shielded so a client disconnect does not cancel a generation others are waiting on
+        explanation = await asyncio.shield(self._start(explanation_key(question), question))
+        if explanation is None:
+            metrics.incr("explanations.fallbacks")
+            return local_explanation(question)
+        return explanation
+
+    def prefetch(self, question: Question):
+        """Start generating an explanation in the background once a question is served"""
+        if not settings.EXPLANATION_PREFETCH or self.peek(question) is not None:
+            return
+        task = self._start(explanation_key(question), question)
+        self._prefetches.add(task)
+        task.add_done_callback(self._prefetches.discard)
+        metrics.incr("explanations.prefetched")
+
+    def status(self) -> Dict:
+        hits = metrics.counter("explanations.cache_hits")
+        lookups = hits + metrics.counter("explanations.cache_misses")
+        return {
+            "entries": len(self._cache),
+            "inflight": len(self._inflight),
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+# Explanation service instance
+_explanations: Optional[ExplanationService] = None
+
+def get_explanation_service() -> ExplanationService:
+    """Get the process-wide explanation service"""
+    global _explanations
+    if _explanations is None:
+        tier = RedisExplanationTier(settings.EXPLANATION_TTL_SECONDS) if settings.EXPLANATION_CACHE_BACKEND == "redis" else None
+        _explanations = ExplanationService(get_question_service(), settings.EXPLANATION_CACHE_SIZE, tier)
+    return _explanations
+
+def explanation_status() -> Dict:
+    """Cache occupancy and hit rate for the metrics endpoint"""
+    return _explanations.status() if _explanations else {}
+
+metrics.register_collector("explanations", explanation_status)
@@ -0,0 +1,182 @@
+"""Idempotency-Key handling for mutating routes"""
+
+import asyncio
+import base64
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import orjson
+import structlog
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from pydantic import BaseModel
+from app.api.responses import JSON, MSGPACK, ModelResponse, response_format, transcode
+from app.core.config import settings
+from app.core.metrics import get_metrics
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+# (request fingerprint, status code, body, media type)
+StoredResponse = Tuple[str, int, bytes, str]
+
+def request_fingerprint(request: BaseModel) -> str:
+    """Digest of the request body, to refuse a key reused for a different request"""
+    return hashlib.blake2b(request.model_dump_json().encode(), digest_size=16).hexdigest()
+
+class RedisIdempotencyTier:
+    """Shared second tier so a retry landing on another worker is still answered from cache"""
+
+    def __init__(self, ttl_seconds: float, redis_url: Optional[str] = None):
+        import redis.asyncio as redis
+        self.redis = redis.from_url(redis_url or settings.REDIS_URL)
+        self.ttl_ms = int(ttl_seconds * 1000)
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        try:
+            data = await self.redis.get(f"idempotency:{key}")
+            if data is None:
+                return None
+            stored = orjson.loads(data)
+            body = base64.b64decode(stored["body_b64"]) if "body_b64" in stored else stored["body"].encode()
+            return stored["fingerprint"], stored["status"], body, stored["media_type"]
+        except Exception as e:
+            logger.error("Redis idempotency get error", error=str(e))
+            return None
+
+    async def put(self, key: str, stored: StoredResponse):
+        fingerprint, status, body, media_type = stored
+        record = {"fingerprint": fingerprint, "status": status, "media_type": media_type}
+        try:
+            record["body"] = body.decode()
+        except UnicodeDecodeError:
+            # Binary formats (MessagePack)
+            record["body_b64"] = base64.b64encode(body).decode()
+        try:
+            await self.redis.set(f"idempotency:{key}", orjson.dumps(record), px=self.ttl_ms)
+        except Exception as e:
+            logger.error("Redis idempotency put error", error=str(e))
+
+class IdempotencyCache:
+    """Bounded LRU of responses keyed by route, session and Idempotency-Key.
+
+    A retry of a finished request gets the stored response back; a retry
+    that arrives while the original is still running awaits the original's
+    future instead of recomputing it. Server errors are not stored, so a
+    retry after a 5xx runs the request again.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 86_400, tier: Optional[RedisIdempotencyTier] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.tier = tier
+        self._entries: "OrderedDict[str, Tuple[float, StoredResponse]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _get_local(self, key: str) -> Optional[StoredResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, stored = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return stored
+
+    def _put_local(self, key: str, stored: StoredResponse):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, stored)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _replay(stored: StoredResponse, fingerprint: str) -> Response:
+        stored_fingerprint, status, body, media_type = stored
+        if stored_fingerprint != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        metrics.incr("idempotency.replays")
+        # A retry may ask for another format than the original request did
+        wanted = response_format()
+        if media_type in (JSON, MSGPACK) and media_type != wanted:
+            body, media_type = transcode(body, wanted), wanted
+        return Response(content=body, status_code=status, media_type=media_type, headers={"Idempotent-Replayed": "true"})
+
+    async def run(
+        self,
+        scope: str,
+        session_id: str,
+        idempotency_key: Optional[str],
+        request: BaseModel,
+        compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Run `compute` once per key; repeats get the first response"""
+        if not idempotency_key:
+            return await compute()
+        key = f"{scope}:{session_id}:{idempotency_key}"
+        fingerprint = request_fingerprint(request)
+
+        stored = self._get_local(key)
+        if stored is None and self.tier is not None:
+            stored = await self.tier.get(key)
+            if stored is not None:
+                self._put_local(key, stored)
+        if stored is not None:
+            return self._replay(stored, fingerprint)
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            metrics.incr("idempotency.joined_inflight")
+            try:
+                return self._replay(await asyncio.shield(inflight), fingerprint)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # The original was abandoned (client went away); run it here instead
+                return await self.run(scope, session_id, idempotency_key, request, compute)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+            # Rendered in the negotiated format, as the route would without a key
+            response = result if isinstance(result, Response) else ModelResponse(jsonable_encoder(result))
+            stored = (fingerprint, response.status_code, bytes(response.body), response.media_type)
+            if response.status_code < 500:
+                self._put_local(key, stored)
+                if self.tier is not None:
+                    await self.tier.put(key, stored)
+            future.set_result(stored)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            # Waiters see the same failure; nothing is stored so the next retry recomputes
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody is waiting
+            raise
+        finally:
+            del self._inflight[key]
+
+    def status(self) -> Dict:
+        return {"entries": len(self._entries), "inflight": len(self._inflight)}
+
+# Idempotency cache instance
+_idempotency: Optional[IdempotencyCache] = None
+
+def get_idempotency_cache() -> IdempotencyCache:
+    """Get the process-wide idempotency cache"""
+    global _idempotency
+    if _idempotency is None:
+        tier = RedisIdempotencyTier(settings.IDEMPOTENCY_TTL_SECONDS) if settings.IDEMPOTENCY_BACKEND == "redis" else None
+        _idempotency = IdempotencyCache(settings.IDEMPOTENCY_MAX_ENTRIES, settings.IDEMPOTENCY_TTL_SECONDS, tier)
+    return _idempotency
+
+def idempotency_status() -> Dict:
+    """Cache occupancy for the metrics endpoint"""
+    return _idempotency.status() if _idempotency else {}
+
+metrics.register_collector("idempotency", idempotency_status)
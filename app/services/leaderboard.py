@@ -0,0 +1,375 @@
+"""Leaderboards and percentile ranks over completed sessions"""
+
+import math
+import random
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+import structlog
+from app.core.config import settings
+from app.models.schemas import UserSession
+
+logger = structlog.get_logger()
+
+# Board shared by every field
+GLOBAL_BOARD = "global"
+
+class _SkipNode:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.next: List[Optional["_SkipNode"]] = [None] * level
+        self.width: List[int] = [1] * level
+
+class IndexableSkipList:
+    """Sorted keys with O(log n) insert, remove, rank and select.
+
+    Every forward link records how many bottom-level nodes it skips, so the
+    position of a key is the sum of the widths crossed while searching for it.
+    """
+
+    MAX_LEVEL = 24
+
+    def __init__(self, seed: Optional[int] = None):
+        self._rng = random.Random(seed)
+        self.head = _SkipNode(None, self.MAX_LEVEL)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _search(self, key) -> Tuple[List[_SkipNode], List[int]]:
+        """Rightmost node before `key` on every level, with its position"""
+        update = [self.head] * self.MAX_LEVEL
+        positions = [0] * self.MAX_LEVEL
+        node, position = self.head, 0
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            update[level] = node
+            positions[level] = position
+        return update, positions
+
+    def insert(self, key):
+        update, positions = self._search(key)
+        position = positions[0]
+        level = 1
+        while level < self.MAX_LEVEL and self._rng.random() < 0.5:
+            level += 1
+
+        node = _SkipNode(key, level)
+        for i in range(level):
+            previous = update[i]
+            skipped = position - positions[i]
+            node.next[i] = previous.next[i]
+            node.width[i] = previous.width[i] - skipped
+            previous.next[i] = node
+            previous.width[i] = skipped + 1
+        for i in range(level, self.MAX_LEVEL):
+            update[i].width[i] += 1
+        self.size += 1
+
+    def remove(self, key) -> bool:
+        update, _ = self._search(key)
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            return False
+        for i in range(self.MAX_LEVEL):
+            if update[i].next[i] is node:
+                update[i].width[i] += node.width[i] - 1
+                update[i].next[i] = node.next[i]
+            else:
+                update[i].width[i] -= 1
+        self.size -= 1
+        return True
+
+    def rank(self, key) -> Optional[int]:
+        """Zero-based position of `key`, or None if absent"""
+        update, positions = self._search(key)
+        node = update[0].next[0]
+        return positions[0] if node is not None and node.key == key else None
+
+    def at(self, index: int):
+        """Key at zero-based position `index`"""
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        target = index + 1
+        node, position = self.head, 0
+        for level in reversed(range(self.MAX_LEVEL)):
+            while node.next[level] is not None and position + node.width[level] <= target:
+                position += node.width[level]
+                node = node.next[level]
+        return node.key
+
+    def first(self, count: int) -> list:
+        keys = []
+        node = self.head.next[0]
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+    def last(self):
+        return self.at(self.size - 1) if self.size else None
+
+class TDigest:
+    """Merging t-digest: streaming quantile and CDF estimates in bounded memory.
+
+    Centroids are small near the tails and large in the middle (k1 scale
+    function), so ranks near the top and bottom stay accurate.
+    """
+
+    def __init__(self, compression: float = 100.0):
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[Tuple[float, float]] = []
+        self._buffer_limit = int(compression * 5)
+
+    def add(self, value: float, weight: float = 1.0):
+        self._buffer.append((value, weight))
+        self.total += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self._buffer_limit:
+            self._compress()
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * min(1.0, max(0.0, q)) - 1)
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        items = sorted(list(zip(self.means, self.weights, strict=True)) + self._buffer)
+        self._buffer = []
+        means, weights = [], []
+        cumulative = 0.0
+        k_lower = self._k(0.0)
+        mean, weight = items[0]
+        for value, value_weight in items[1:]:
+            if self._k((cumulative + weight + value_weight) / self.total) - k_lower <= 1.0:
+                weight += value_weight
+                mean += (value - mean) * value_weight / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                cumulative += weight
+                k_lower = self._k(cumulative / self.total)
+                mean, weight = value, value_weight
+        means.append(mean)
+        weights.append(weight)
+        self.means, self.weights = means, weights
+
+    def cdf(self, value: float) -> float:
+        """Estimated share of values below `value` (ties count half)"""
+        self._compress()
+        if not self.means:
+            return 0.0
+        if value < self.min:
+            return 0.0
+        if value > self.max:
+            return 1.0
+        if len(self.means) == 1:
+            return 0.5
+
+        cumulative = 0.0
+        previous_mean, previous_center = self.min, 0.0
+        for mean, weight in zip(self.means, self.weights, strict=True):
+            center = cumulative + weight / 2
+            if value < mean:
+                span = mean - previous_mean
+                fraction = (value - previous_mean) / span if span > 0 else 0.5
+                return (previous_center + fraction * (center - previous_center)) / self.total
+            if value == mean:
+                return center / self.total
+            cumulative += weight
+            previous_mean, previous_center = mean, center
+        span = self.max - previous_mean
+        fraction = (value - previous_mean) / span if span > 0 else 0.5
+        return (previous_center + fraction * (self.total - previous_center)) / self.total
+
+    def quantile(self, q: float) -> Optional[float]:
+        self._compress()
+        if not self.means:
+            return None
+        target = q * self.total
+        cumulative = 0.0
+        for mean, weight in zip(self.means, self.weights, strict=True):
+            if cumulative + weight >= target:
+                return mean
+            cumulative += weight
+        return self.max
+
+class LeaderboardStore(ABC):
+    """Per-board rankings of sessions by score"""
+
+    @abstractmethod
+    async def add(self, board: str, member: str, score: float):
+        pass
+
+    @abstractmethod
+    async def top(self, board: str, limit: int) -> List[Tuple[str, float]]:
+        pass
+
+    @abstractmethod
+    async def rank(self, board: str, member: str) -> Optional[int]:
+        """Zero-based rank from the top, or None when unknown"""
+        pass
+
+    @abstractmethod
+    async def percentile(self, board: str, score: float) -> Optional[float]:
+        """Share of the board scoring below `score` (0-100), or None for an empty board"""
+        pass
+
+    @abstractmethod
+    async def size(self, board: str) -> int:
+        pass
+
+class _Board:
+    """Top-K skip list plus a t-digest over the first score of every member ever recorded"""
+
+    def __init__(self, capacity: int, compression: float):
+        self.capacity = capacity
+        self.ranked = IndexableSkipList()
+        self.keys: Dict[str, Tuple[float, str]] = {}
+        self.digest = TDigest(compression)
+        self.count = 0
+
+class InMemoryLeaderboardStore(LeaderboardStore):
+    """In-process leaderboards.
+
+    Ranks are exact for the best `capacity` entries of each board; beyond
+    that only the t-digest is kept, which still answers percentile queries
+    for every session ever recorded.
+    """
+
+    def __init__(self, capacity: int = 10_000, compression: float = 100.0):
+        self.capacity = capacity
+        self.compression = compression
+        self._boards: Dict[str, _Board] = {}
+
+    def _board(self, board: str) -> _Board:
+        if board not in self._boards:
+            self._boards[board] = _Board(self.capacity, self.compression)
+        return self._boards[board]
+
+    async def add(self, board: str, member: str, score: float):
+        entries = self._board(board)
+        # Highest score first; ties broken by member for a stable order
+        key = (-score, member)
+        previous = entries.keys.pop(member, None)
+        if previous is not None:
+            entries.ranked.remove(previous)
+        else:
+            # The digest cannot forget a value, so it holds each member's first score
+            # and stays consistent with `count`; re-adds (such as retries) are not counted twice
+            entries.count += 1
+            entries.digest.add(score)
+
+        if len(entries.ranked) >= entries.capacity:
+            lowest = entries.ranked.last()
+            if key > lowest:
+                return
+            entries.ranked.remove(lowest)
+            del entries.keys[lowest[1]]
+        entries.ranked.insert(key)
+        entries.keys[member] = key
+
+    async def top(self, board: str, limit: int) -> List[Tuple[str, float]]:
+        entries = self._boards.get(board)
+        if entries is None:
+            return []
+        return [(member, -negative) for negative, member in entries.ranked.first(limit)]
+
+    async def rank(self, board: str, member: str) -> Optional[int]:
+        entries = self._boards.get(board)
+        if entries is None or member not in entries.keys:
+            return None
+        return entries.ranked.rank(entries.keys[member])
+
+    async def percentile(self, board: str, score: float) -> Optional[float]:
+        entries = self._boards.get(board)
+        if entries is None or not entries.count:
+            return None
+        return round(entries.digest.cdf(score) * 100, 1)
+
+    async def size(self, board: str) -> int:
+        entries = self._boards.get(board)
+        return entries.count if entries else 0
+
+class RedisLeaderboardStore(LeaderboardStore):
+    """Leaderboards as Redis sorted sets shared by all workers (exact ranks and percentiles)"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        import redis.asyncio as redis
+        self.redis = redis.from_url(redis_url or settings.REDIS_URL)
+
+    @staticmethod
+    def _key(board: str) -> str:
+        return f"leaderboard:{board}"
+
+    async def add(self, board: str, member: str, score: float):
+        try:
+            await self.redis.zadd(self._key(board), {member: score})
+        except Exception as e:
+            logger.error("Redis leaderboard add error", error=str(e), board=board)
+
+    async def top(self, board: str, limit: int) -> List[Tuple[str, float]]:
+        try:
+            entries = await self.redis.zrevrange(self._key(board), 0, limit - 1, withscores=True)
+            return [(member.decode(), score) for member, score in entries]
+        except Exception as e:
+            logger.error("Redis leaderboard top error", error=str(e), board=board)
+            return []
+
+    async def rank(self, board: str, member: str) -> Optional[int]:
+        try:
+            return await self.redis.zrevrank(self._key(board), member)
+        except Exception as e:
+            logger.error("Redis leaderboard rank error", error=str(e), board=board)
+            return None
+
+    async def percentile(self, board: str, score: float) -> Optional[float]:
+        key = self._key(board)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.zcount(key, "-inf", f"({score}")
+                pipe.zcount(key, score, score)
+                pipe.zcard(key)
+                below, ties, total = await pipe.execute()
+            if not total:
+                return None
+            return round((below + ties / 2) / total * 100, 1)
+        except Exception as e:
+            logger.error("Redis leaderboard percentile error", error=str(e), board=board)
+            return None
+
+    async def size(self, board: str) -> int:
+        try:
+            return await self.redis.zcard(self._key(board))
+        except Exception as e:
+            logger.error("Redis leaderboard size error", error=str(e), board=board)
+            return 0
+
+async def record_session(store: LeaderboardStore, session: UserSession):
+    """Add a completed session to the global board and its field's board"""
+    await store.add(GLOBAL_BOARD, session.id, session.score)
+    if session.selected_field:
+        await store.add(session.selected_field.value, session.id, session.score)
+
+# Leaderboard store instance
+_leaderboards: Optional[LeaderboardStore] = None
+
+def get_leaderboard_store() -> LeaderboardStore:
+    """Get the leaderboard store described by settings"""
+    global _leaderboards
+    if _leaderboards is None:
+        if settings.LEADERBOARD_BACKEND == "redis":
+            _leaderboards = RedisLeaderboardStore()
+        else:
+            _leaderboards = InMemoryLeaderboardStore(settings.LEADERBOARD_SIZE, settings.LEADERBOARD_TDIGEST_COMPRESSION)
+    return _leaderboards
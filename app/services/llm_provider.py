@@ -0,0 +1,236 @@
+"""LLM provider abstraction used for question generation"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, List, Optional
+import structlog
+from pydantic import BaseModel
+from app.core.config import settings
+from app.core.metrics import get_metrics, percentile
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+class LLMCompletion(BaseModel):
+    content: str
+    model: str
+    provider: str
+    total_tokens: Optional[int] = None
+
+class LLMProvider(ABC):
+    """Abstract chat-completion provider"""
+
+    name: str = "llm"
+
+    @abstractmethod
+    async def complete(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        response_format: Optional[Dict] = None
+    ) -> LLMCompletion:
+        pass
+
+    async def warm_up(self):
+        """Open connections ahead of the first request; an optional hook, a no-op by default"""
+        return None
+
+class OpenAICompatibleProvider(LLMProvider):
+    """OpenAI chat completions API, or any server exposing the same API (llama.cpp, vLLM)"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        structured_output: bool = True,
+        name: str = "openai"
+    ):
+        import openai
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key or settings.OPENAI_API_KEY,
+            base_url=base_url,
+            max_retries=0
+        )
+        self.model = model
+        self.structured_output = structured_output
+        # The OpenAI API rejects json_schema for older models; other servers are trusted with it
+        self.json_schema_models = None if base_url else tuple(settings.LLM_JSON_SCHEMA_MODELS)
+        self.name = name
+
+    def supports_json_schema(self, model: str) -> bool:
+        if not self.structured_output:
+            return False
+        return self.json_schema_models is None or model.startswith(self.json_schema_models)
+
+    async def warm_up(self):
+        # Any cheap authenticated call opens and pools the HTTPS connection
+        try:
+            await self.client.models.list()
+        except Exception as e:
+            logger.warning("LLM warm-up request failed", provider=self.name, error=str(e))
+
+    async def complete(self, model, messages, max_tokens, temperature, response_format=None) -> LLMCompletion:
+        kwargs = {}
+        if response_format and self.supports_json_schema(self.model or model):
+            kwargs["response_format"] = response_format
+        elif response_format:
+            # Servers without json_schema support still honour plain JSON mode
+            kwargs["response_format"] = {"type": "json_object"}
+
+        response = await self.client.chat.completions.create(
+            model=self.model or model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            **kwargs
+        )
+        total_tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
+        return LLMCompletion(
+            content=response.choices[0].message.content or "",
+            model=self.model or model,
+            provider=self.name,
+            total_tokens=total_tokens if isinstance(total_tokens, int) else None
+        )
+
+class StubProvider(LLMProvider):
+    """Deterministic offline provider for benchmarks, load tests and air-gapped runs.
+
+    `token_latency_seconds` adds decode time per output token, so shorter
+    responses come back faster as they would from a real model.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency_seconds: float = 0.0, token_latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.token_latency_seconds = token_latency_seconds
+
+    async def complete(self, model, messages, max_tokens, temperature, response_format=None) -> LLMCompletion:
+        prompt = "\n".join(message["content"] for message in messages)
+        schema = (response_format or {}).get("json_schema", {})
+        if schema.get("name") == "explanation":
+            match = re.search(r"(\d+) \+ (\d+)", prompt)
+            working = f"{match.group(1)} + {match.group(2)} = {int(match.group(1)) + int(match.group(2))}" if match else "Work through the question step by step"
+            content = json.dumps({"explanation": f"{working}. Add the ones, then the tens, carrying where needed."})
+        else:
+            match = re.search(r"difficulty level (\d)", prompt)
+            difficulty = int(match.group(1)) if match else 1
+            seed = int.from_bytes(hashlib.sha256(prompt.encode()).digest()[:8], "big")
+            a = seed % (10 * difficulty) + 1
+            b = (seed >> 16) % (10 * difficulty) + 1
+            answer = a + b
+            question = {
+                "question": f"What is {a} + {b}?",
+                "type": "multiple-choice",
+                "options": [str(answer - 1), str(answer), str(answer + 1), str(answer + 2)],
+                "correct_answer": str(answer),
+                "explanation": f"{a} + {b} = {answer}. Add the ones, then the tens, carrying where needed.",
+                "points": difficulty * 2
+            }
+            # Only produce the fields the schema asks for, like a structured-output server
+            requested = schema.get("schema", {}).get("properties")
+            content = json.dumps({key: value for key, value in question.items() if requested is None or key in requested})
+
+        total_tokens = len(content) // 4
+        delay = self.latency_seconds + self.token_latency_seconds * total_tokens
+        if delay:
+            await asyncio.sleep(delay)
+        return LLMCompletion(content=content, model=model, provider=self.name, total_tokens=total_tokens)
+
+class HedgedProvider(LLMProvider):
+    """Send to the primary provider and hedge to the next one if it is slow.
+
+    The hedge fires once the primary has been outstanding longer than its
+    observed p95 latency; whichever successful result arrives first wins and
+    the other request is cancelled.
+    """
+
+    name = "hedged"
+
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        hedge_percentile: float = 95.0,
+        initial_delay_seconds: Optional[float] = None,
+        min_delay_seconds: float = 0.05,
+        window_size: int = 256
+    ):
+        if len(providers) < 2:
+            raise ValueError("Hedging needs at least two providers")
+        self.providers = providers
+        self.hedge_percentile = hedge_percentile
+        self.initial_delay_seconds = (
+            settings.LLM_HEDGE_DELAY_MS / 1000 if initial_delay_seconds is None else initial_delay_seconds
+        )
+        self.min_delay_seconds = min_delay_seconds
+        self._latencies: deque = deque(maxlen=window_size)
+
+    def hedge_delay(self) -> float:
+        """Current delay before hedging to the next provider"""
+        if len(self._latencies) < 10:
+            # Not enough samples for a meaningful p95 yet
+            return self.initial_delay_seconds
+        return max(self.min_delay_seconds, percentile(list(self._latencies), self.hedge_percentile))
+
+    async def warm_up(self):
+        await asyncio.gather(*(provider.warm_up() for provider in self.providers))
+
+    async def _timed(self, provider: LLMProvider, *args) -> LLMCompletion:
+        started = time.monotonic()
+        result = await provider.complete(*args)
+        if provider is self.providers[0]:
+            self._latencies.append(time.monotonic() - started)
+        return result
+
+    async def complete(self, model, messages, max_tokens, temperature, response_format=None) -> LLMCompletion:
+        args = (model, messages, max_tokens, temperature, response_format)
+        pending = {asyncio.create_task(self._timed(self.providers[0], *args))}
+        remaining = list(self.providers[1:])
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                timeout = self.hedge_delay() if remaining else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task.result().provider != self.providers[0].name:
+                            metrics.incr("llm.hedge_wins")
+                        return task.result()
+                    last_error = task.exception()
+                if remaining and (not done or not pending):
+                    # Primary is slow (timeout) or every in-flight request failed
+                    metrics.incr("llm.hedged_requests")
+                    pending.add(asyncio.create_task(self._timed(remaining.pop(0), *args)))
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_error or RuntimeError("All LLM providers failed")
+
+def build_llm_provider() -> LLMProvider:
+    """Build the provider stack described by settings"""
+    if settings.LLM_PROVIDER == "stub":
+        return StubProvider(latency_seconds=settings.STUB_LLM_LATENCY_MS / 1000)
+
+    primary = OpenAICompatibleProvider(
+        base_url=settings.LLM_BASE_URL or None,
+        structured_output=settings.LLM_STRUCTURED_OUTPUT
+    )
+    if not settings.LLM_HEDGE_BASE_URL:
+        return primary
+
+    secondary = OpenAICompatibleProvider(
+        base_url=settings.LLM_HEDGE_BASE_URL,
+        api_key=settings.LLM_HEDGE_API_KEY,
+        model=settings.LLM_HEDGE_MODEL,
+        structured_output=settings.LLM_STRUCTURED_OUTPUT,
+        name="hedge"
+    )
+    return HedgedProvider([primary, secondary])
@@ -0,0 +1,192 @@
+"""Live session updates fanned out to WebSocket subscribers"""
+
+import asyncio
+import uuid
+from typing import Dict, Iterable, List, Optional, Set
+import orjson
+import structlog
+from app.core.config import settings
+from app.core.metrics import get_metrics
+from app.models.schemas import SessionUpdate, UserSession
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+def session_topic(session_id: str) -> str:
+    return f"session:{session_id}"
+
+def group_topic(group: str) -> str:
+    return f"group:{group}"
+
+def session_update(session: UserSession, event: str, is_correct: Optional[bool] = None) -> SessionUpdate:
+    """Compact progress delta for a session"""
+    return SessionUpdate(
+        event=event,
+        session_id=session.id,
+        user_id=session.user_id,
+        group=session.group,
+        score=session.score,
+        difficulty=session.difficulty,
+        answered=session.total_questions,
+        correct=session.correct_answers,
+        total=settings.QUESTIONS_PER_SESSION,
+        is_correct=is_correct,
+        is_complete=session.is_complete
+    )
+
+class Subscriber:
+    """One connection's bounded outbox.
+
+    A subscriber whose queue fills up is a slow consumer: it is dropped
+    rather than allowed to hold messages (and memory) for everyone else,
+    and is expected to reconnect and re-read the sessions it watches.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.topics: Set[str] = set()
+        self.dropped = False
+
+    def offer(self, message: str) -> bool:
+        if self.dropped:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.dropped = True
+            # Free the backlog and wake the sender so it closes the connection
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return False
+
+    async def next(self) -> Optional[str]:
+        """Next message, or None once the subscriber has been dropped"""
+        message = await self.queue.get()
+        return None if self.dropped else message
+
+class PushHub:
+    """In-process pub/sub from topics to subscribers.
+
+    Each update is encoded once and the same string is queued for every
+    subscriber of its topics. With the Redis bridge enabled, updates are
+    also published to a channel every worker listens on, so subscribers on
+    other workers receive them too.
+    """
+
+    CHANNEL = "session_updates"
+
+    def __init__(self, queue_size: int = 64, max_topics: int = 1000, redis_url: Optional[str] = None):
+        self.queue_size = queue_size
+        self.max_topics = max_topics
+        self._topics: Dict[str, Set[Subscriber]] = {}
+        self._origin = uuid.uuid4().hex
+        self.redis = None
+        if redis_url:
+            import redis.asyncio as redis
+            self.redis = redis.from_url(redis_url)
+        self._listener: Optional[asyncio.Task] = None
+
+    def subscribe(self, topics: Iterable[str], subscriber: Optional[Subscriber] = None) -> Subscriber:
+        subscriber = subscriber or Subscriber(self.queue_size)
+        for topic in topics:
+            if len(subscriber.topics) >= self.max_topics:
+                raise ValueError(f"At most {self.max_topics} subscriptions per connection")
+            subscriber.topics.add(topic)
+            self._topics.setdefault(topic, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber, topics: Optional[Iterable[str]] = None):
+        for topic in list(subscriber.topics if topics is None else topics):
+            subscriber.topics.discard(topic)
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._topics[topic]
+
+    def deliver(self, topics: List[str], message: str) -> int:
+        """Queue a message for local subscribers of any of `topics`; returns how many got it"""
+        targets: Set[Subscriber] = set()
+        for topic in topics:
+            targets.update(self._topics.get(topic, ()))
+        delivered = 0
+        for subscriber in targets:
+            if subscriber.offer(message):
+                delivered += 1
+            elif subscriber.dropped and subscriber.topics:
+                metrics.incr("push.slow_consumers_dropped")
+                self.unsubscribe(subscriber)
+        metrics.incr("push.deliveries", delivered)
+        return delivered
+
+    async def publish(self, update: SessionUpdate):
+        """Fan an update out to subscribers of its session and group"""
+        topics = [session_topic(update.session_id)]
+        if update.group:
+            topics.append(group_topic(update.group))
+        message = update.model_dump_json(exclude_none=True)
+        metrics.incr("push.published")
+        self.deliver(topics, message)
+        if self.redis is not None:
+            try:
+                await self.redis.publish(
+                    self.CHANNEL, orjson.dumps({"origin": self._origin, "topics": topics, "message": message})
+                )
+            except Exception as e:
+                logger.error("Redis push publish error", error=str(e))
+
+    async def _listen(self):
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.CHANNEL)
+                    async for item in pubsub.listen():
+                        if item["type"] != "message":
+                            continue
+                        data = orjson.loads(item["data"])
+                        # Updates from this worker were delivered locally when published
+                        if data["origin"] != self._origin:
+                            self.deliver(data["topics"], data["message"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Redis push listener error", error=str(e))
+                await asyncio.sleep(1.0)
+
+    def start(self):
+        """Start relaying updates published by other workers"""
+        if self.redis is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+
+    def status(self) -> Dict:
+        return {
+            "topics": len(self._topics),
+            "subscribers": len({subscriber for subscribers in self._topics.values() for subscriber in subscribers}),
+        }
+
+# Push hub instance
+_push_hub: Optional[PushHub] = None
+
+def get_push_hub() -> PushHub:
+    """Get the process-wide push hub"""
+    global _push_hub
+    if _push_hub is None:
+        _push_hub = PushHub(
+            settings.PUSH_QUEUE_SIZE,
+            settings.PUSH_MAX_TOPICS,
+            settings.REDIS_URL if settings.PUSH_BACKEND == "redis" else None
+        )
+    return _push_hub
+
+def push_status() -> Dict:
+    """Subscription counts for the metrics endpoint"""
+    return _push_hub.status() if _push_hub else {}
+
+metrics.register_collector("push", push_status)
@@ -0,0 +1,125 @@
+"""Pre-built question bank: compact indexed file read through mmap"""
+
+import mmap
+import os
+import random
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+import orjson
+import structlog
+from app.core.config import settings
+from app.models.schemas import FieldType, Question
+
+logger = structlog.get_logger()
+
+# File layout (little endian):
+#   header   MAGIC, version, cell count, record count, index offset
+#   records  orjson-encoded questions, grouped by (field, difficulty)
+#   cells    field name, difficulty, first record, record count
+#   offsets  record count + 1 byte offsets, so record i spans offsets[i]:offsets[i + 1]
+MAGIC = b"IQBANK\x00\x01"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIQQ")
+_CELL = struct.Struct("<24sIQQ")
+_OFFSET = struct.Struct("<Q")
+
+Cell = Tuple[FieldType, int]
+
+def write_bank(path: str, cells: Dict[Cell, Iterable[bytes]]) -> int:
+    """Write encoded questions grouped by cell; the file is replaced atomically"""
+    tmp_path = f"{path}.tmp"
+    offsets: List[int] = []
+    table: List[bytes] = []
+    with open(tmp_path, "wb") as f:
+        f.write(b"\x00" * _HEADER.size)
+        for (field, difficulty), records in sorted(cells.items(), key=lambda item: (item[0][0].value, item[0][1])):
+            first = len(offsets)
+            for record in records:
+                offsets.append(f.tell())
+                f.write(record)
+            table.append(_CELL.pack(field.value.encode(), difficulty, first, len(offsets) - first))
+        offsets.append(f.tell())
+
+        index_offset = f.tell()
+        f.write(b"".join(table))
+        f.write(b"".join(_OFFSET.pack(offset) for offset in offsets))
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, len(table), len(offsets) - 1, index_offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(offsets) - 1
+
+class QuestionBank:
+    """Read-only view over a bank file.
+
+    Only the header and cell table are parsed at open; records stay in the
+    page cache behind the mmap and are decoded one at a time when sampled,
+    so a bank of millions of questions costs almost nothing to load.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, cell_count, self.size, index_offset = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Not a question bank: {path}")
+
+        self._cells: Dict[Cell, Tuple[int, int]] = {}
+        for i in range(cell_count):
+            name, difficulty, first, count = _CELL.unpack_from(self._mm, index_offset + i * _CELL.size)
+            self._cells[(FieldType(name.rstrip(b"\x00").decode()), difficulty)] = (first, count)
+        self._offsets_at = index_offset + cell_count * _CELL.size
+
+    def count(self, field: FieldType, difficulty: int) -> int:
+        return self._cells.get((field, difficulty), (0, 0))[1]
+
+    def cell_range(self, field: FieldType, difficulty: int) -> Tuple[int, int]:
+        """First record index and record count of a cell"""
+        return self._cells.get((field, difficulty), (0, 0))
+
+    def cells(self) -> Dict[Cell, int]:
+        return {cell: count for cell, (_, count) in self._cells.items()}
+
+    def record(self, index: int) -> bytes:
+        start, = _OFFSET.unpack_from(self._mm, self._offsets_at + index * _OFFSET.size)
+        end, = _OFFSET.unpack_from(self._mm, self._offsets_at + (index + 1) * _OFFSET.size)
+        return self._mm[start:end]
+
+    def get(self, index: int) -> Question:
+        return Question.model_validate(orjson.loads(self.record(index)))
+
+    def sample(self, field: FieldType, difficulty: int, rng: Optional[random.Random] = None) -> Optional[Question]:
+        """A random question from the cell, or None if the bank has none"""
+        first, count = self._cells.get((field, difficulty), (0, 0))
+        if not count:
+            return None
+        return self.get(first + (rng or random).randrange(count))
+
+    def warm_up(self) -> int:
+        """Ask the OS to read the file ahead and decode one question per cell; returns cells warmed"""
+        if hasattr(mmap, "MADV_WILLNEED"):
+            self._mm.madvise(mmap.MADV_WILLNEED)
+        for first, count in self._cells.values():
+            if count:
+                self.get(first)
+        return len(self._cells)
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+def load_question_bank(path: Optional[str] = None) -> Optional[QuestionBank]:
+    """Open the configured bank file, or None when unset or unreadable"""
+    path = path if path is not None else settings.QUESTION_BANK_PATH
+    if not path:
+        return None
+    try:
+        bank = QuestionBank(path)
+        logger.info("Loaded question bank", path=path, questions=bank.size)
+        return bank
+    except (OSError, ValueError, struct.error) as e:
+        logger.error("Could not load question bank", path=path, error=str(e))
+        return None
@@ -1,21 +1,75 @@
 """Question generation and management service"""
 
-import json
+import asyncio
 import random
-from typing import Dict, List, Optional
-import openai
+import time
+from typing import Dict, List, Optional, Union
 import structlog
+from app.core.circuit_breaker import CircuitBreaker
 from app.core.config import settings
+from app.core.metrics import get_metrics
+from app.core.profiling import span
 from app.models.schemas import Question, FieldType, QuestionType
+from app.services.structured_output import (
+    GENERATED_FIELDS, LAZY_GENERATED_FIELDS, check_math_answer, explanation_response_format,
+    extract_json_object, question_response_format
+)
+from app.services.llm_provider import LLMProvider, build_llm_provider
+from app.services.question_bank import load_question_bank
 
 logger = structlog.get_logger()
+metrics = get_metrics()
+
+def generation_summary() -> Dict:
+    """Derived AI generation health figures for the metrics endpoint"""
+    requests = metrics.counter("question_generation.requests")
+    accepted = metrics.counter("question_generation.accepted")
+    return {
+        "requests": requests,
+        "accepted": accepted,
+        "parse_failure_rate": metrics.counter("question_generation.parse_failures") / requests if requests else 0.0,
+        "cost_per_accepted_question": metrics.counter("question_generation.cost_usd") / accepted if accepted else 0.0,
+        "tokens_per_request": metrics.counter("question_generation.tokens") / requests if requests else 0.0,
+    }
+
+metrics.register_collector("question_generation", generation_summary)
+
+# Templates without placeholders have one right answer
+FIXED_TEMPLATE_ANSWERS = {
+    "All cats are animals. Fluffy is a cat. Therefore, Fluffy is ___?": "an animal",
+    "If A > B and B > C, then A ___ C?": ">",
+    "What comes next in the sequence: 2, 4, 8, 16, ___?": "32",
+    "If some roses are flowers and all flowers are plants, what can we conclude about roses?": "some roses are plants",
+    "In a group of 100 people, 60 like coffee, 40 like tea, and 20 like both. How many like neither?": "20",
+    "What is the missing number: 1, 1, 2, 3, 5, 8, ___?": "13",
+}
 
 class QuestionService:
     """Service for generating and managing questions"""
     
-    def __init__(self):
-        self.client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(self, provider: Optional[LLMProvider] = None):
+        self.llm = provider or build_llm_provider()
+        self.breaker = CircuitBreaker(
+            "llm",
+            window_seconds=settings.LLM_BREAKER_WINDOW_SECONDS,
+            minimum_calls=settings.LLM_BREAKER_MIN_CALLS,
+            failure_rate_threshold=settings.LLM_BREAKER_FAILURE_RATE,
+            slow_call_rate_threshold=settings.LLM_BREAKER_SLOW_CALL_RATE,
+            slow_call_seconds=settings.LLM_SLOW_CALL_SECONDS,
+            cooldown_seconds=settings.LLM_BREAKER_COOLDOWN_SECONDS
+        )
+        self.latency_budget = settings.AI_LATENCY_BUDGET_SECONDS
+        self.base_ai_ratio = settings.AI_GENERATION_RATIO
+        self._ai_ratio = self.base_ai_ratio
+        self._ai_ratio_updated_at = 0.0
         self.question_templates = self._load_question_templates()
+        self.bank = load_question_bank()
+        self.diversity = None
+        if settings.DIVERSITY_ENABLED:
+            # Imported here so numpy only loads when the feature is on
+            from app.services.diversity import load_diversity_selector
+            self.diversity = load_diversity_selector(self.bank)
+        self.lazy_explanations = settings.LAZY_EXPLANATIONS
     
     def _load_question_templates(self) -> Dict:
         """Load predefined question templates"""
@@ -54,24 +108,85 @@ class QuestionService:
     async def generate_question(self, field: FieldType, difficulty: int, user_history: Optional[List[str]] = None) -> Question:
         """Generate a question based on field and difficulty"""
         try:
-            # Try AI-generated question first
-            if random.random() < 0.7:  # 70% chance for AI generation
-                question = await self._generate_ai_question(field, difficulty, user_history)
-                if question:
+            # Try AI-generated question first, within the latency budget and
+            # only while the LLM is healthy enough for the breaker to allow it
+            if random.random() < self.current_ai_ratio() and self.breaker.allow_request():
+                try:
+                    question = await asyncio.wait_for(
+                        self._generate_ai_question(field, difficulty, user_history),
+                        timeout=self.latency_budget
+                    )
+                except asyncio.TimeoutError:
+                    self.breaker.record_failure()
+                    # A cut-off call took at least the budget; without a sample p95 would only see the fast ones
+                    metrics.observe("question_generation.latency", self.latency_budget)
+                    metrics.incr("question_generation.budget_exceeded")
+                    logger.warning("AI question generation exceeded latency budget", budget=self.latency_budget)
+                    question = None
+                if question and self._diverse_enough(question, user_history):
                     return question
             
-            # Fallback to template-based generation
-            return self._generate_template_question(field, difficulty)
+            # Fallback to the pre-built bank, then to template-based generation
+            return self._fallback_question(field, difficulty, user_history)
         
         except Exception as e:
             logger.error("Error generating question", error=str(e), field=field, difficulty=difficulty)
             return self._generate_template_question(field, difficulty)
     
+    def _fallback_question(self, field: FieldType, difficulty: int, user_history: Optional[List[str]] = None) -> Question:
+        """Serve a validated question from the bank when it covers the cell, else a template"""
+        if self.bank is not None:
+            index = self.diversity.pick_bank(self.bank, field, difficulty, user_history) if self.diversity else None
+            question = self.bank.get(index) if index is not None else self.bank.sample(field, difficulty)
+            if question is not None:
+                metrics.incr("question_generation.bank_hits")
+                return question
+        metrics.incr("question_generation.template_fallbacks")
+        return self._generate_template_question(field, difficulty)
+    
+    def _screens_locally(self, field: FieldType, difficulty: int) -> bool:
+        """Whether AI questions for the cell are checked against history by the selector"""
+        return self.diversity is not None and self.diversity.vectors is not None and bool(self.bank.count(field, difficulty))
+    
+    def _diverse_enough(self, question: Question, user_history: Optional[List[str]]) -> bool:
+        """With history left out of the prompt, an AI question too close to it yields to the bank"""
+        if not self._screens_locally(question.field, question.difficulty):
+            return True
+        if self.diversity.similarity(question.question, user_history) < settings.DIVERSITY_MAX_SIMILARITY:
+            return True
+        metrics.incr("diversity.ai_rejected")
+        return False
+    
+    def current_ai_ratio(self) -> float:
+        """Share of questions sent to the AI path, tuned to observed latency and errors.
+
+        The configured ratio is scaled down as p95 latency moves from half the
+        budget to the full budget and as the error rate approaches the breaker
+        threshold; a small floor keeps traffic flowing so recovery is noticed.
+        """
+        now = time.monotonic()
+        if now - self._ai_ratio_updated_at < 1.0:
+            return self._ai_ratio
+        
+        p95 = metrics.window_percentile("question_generation.latency", 95)
+        half_budget = self.latency_budget / 2
+        latency_factor = 1.0 if p95 <= half_budget else max(0.0, (self.latency_budget - p95) / half_budget)
+        error_factor = max(0.0, 1.0 - self.breaker.failure_rate() / self.breaker.failure_rate_threshold)
+        
+        self._ai_ratio = max(
+            min(settings.AI_MIN_GENERATION_RATIO, self.base_ai_ratio),
+            self.base_ai_ratio * min(latency_factor, error_factor)
+        )
+        self._ai_ratio_updated_at = now
+        metrics.set_gauge("question_generation.ai_ratio", self._ai_ratio)
+        return self._ai_ratio
+    
     async def _generate_ai_question(self, field: FieldType, difficulty: int, user_history: Optional[List[str]] = None) -> Optional[Question]:
-        """Generate question using OpenAI API"""
+        """Generate question using OpenAI API with a schema-constrained response"""
         try:
             history_context = ""
-            if user_history:
+            # Where the diversity selector screens repeats locally, no prompt tokens are spent on them
+            if user_history and not self._screens_locally(field, difficulty):
                 history_context = f"Previous questions covered: {', '.join(user_history[-3:])}"
             
             prompt = f"""
@@ -81,52 +196,143 @@ class QuestionService:
             Requirements:
             - Difficulty {difficulty}: {self._get_difficulty_description(difficulty)}
             - Field: {field.value}
-            - Return JSON format with: question, type, options (if multiple choice), correct_answer, explanation, points
+            - For multiple-choice questions, correct_answer must be one of the options
             - Make it engaging and educational
             - Avoid repetition of recent topics
-            
-            Example format:
-            {{
-                "question": "What is 2 + 2?",
-                "type": "multiple-choice",
-                "options": ["3", "4", "5", "6"],
-                "correct_answer": "4",
-                "explanation": "2 + 2 equals 4 through basic addition",
-                "points": 2
-            }}
             """
             
-            response = await self.client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are an expert question generator for IQ tests. Generate challenging, fair, and educational questions."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=settings.OPENAI_MAX_TOKENS,
-                temperature=0.8
-            )
-            
-            content = response.choices[0].message.content.strip()
-            
-            # Parse JSON response
-            question_data = json.loads(content)
-            
-            return Question(
+            model = self._select_model(difficulty)
+            for _ in range(settings.AI_GENERATION_RETRIES + 1):
+                question_data = await self._request_question_data(model, prompt)
+                question = self._build_ai_question(field, difficulty, question_data)
+                if question:
+                    metrics.incr("question_generation.accepted")
+                    return question
+                # Retries go to the cheaper tier: a malformed or wrong answer
+                # rarely needs the large model to fix it
+                model = settings.OPENAI_FAST_MODEL
+            return None
+        
+        except Exception as e:
+            logger.warning("AI question generation failed", error=str(e))
+            return None
+    
+    def _select_model(self, difficulty: int) -> str:
+        """Pick the model tier for a difficulty level"""
+        if difficulty <= settings.FAST_MODEL_MAX_DIFFICULTY:
+            return settings.OPENAI_FAST_MODEL
+        return settings.OPENAI_MODEL
+    
+    async def _request_question_data(self, model: str, prompt: str) -> Optional[Dict]:
+        """Call the model and extract the question object from its output"""
+        metrics.incr("question_generation.requests")
+        started = time.monotonic()
+        try:
+            with span("llm"):
+                completion = await self.llm.complete(
+                    model,
+                    [
+                        {"role": "system", "content": "You are an expert question generator for IQ tests. Generate challenging, fair, and educational questions. Respond with a single JSON object."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    settings.OPENAI_MAX_TOKENS,
+                    0.8,
+                    question_response_format(LAZY_GENERATED_FIELDS if self.lazy_explanations else GENERATED_FIELDS)
+                )
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        latency = time.monotonic() - started
+        self.breaker.record_success(latency)
+        metrics.observe("question_generation.latency", latency)
+        self._record_usage(completion.model, completion.total_tokens)
+        
+        question_data = extract_json_object(completion.content)
+        if question_data is None:
+            metrics.incr("question_generation.parse_failures")
+            logger.warning("Unparseable AI question output", model=model)
+        return question_data
+    
+    def _build_ai_question(self, field: FieldType, difficulty: int, question_data: Optional[Dict]) -> Optional[Question]:
+        """Validate model output and turn it into a Question"""
+        if question_data is None:
+            return None
+        try:
+            question = Question(
                 id=f"{field.value}_{difficulty}_{random.randint(1000, 9999)}",
                 field=field,
                 difficulty=difficulty,
                 question=question_data["question"],
                 type=QuestionType(question_data["type"]),
                 options=question_data.get("options"),
-                correct_answer=question_data["correct_answer"],
+                correct_answer=str(question_data["correct_answer"]),
                 explanation=question_data.get("explanation"),
-                points=question_data.get("points", difficulty * 2),
+                points=question_data.get("points") or difficulty * 2,
                 time_limit=self._calculate_time_limit(difficulty)
             )
+        except (KeyError, ValueError, TypeError) as e:
+            metrics.incr("question_generation.validation_failures")
+            logger.warning("Invalid AI question", error=str(e))
+            return None
+        
+        if question.type == QuestionType.MULTIPLE_CHOICE and (
+            not question.options or question.correct_answer not in question.options
+        ):
+            metrics.incr("question_generation.validation_failures")
+            return None
         
+        if field == FieldType.MATH and check_math_answer(question.question, question.correct_answer) is False:
+            metrics.incr("question_generation.consistency_failures")
+            logger.warning("AI answer failed local check", question=question.question)
+            return None
+        
+        return question
+    
+    async def generate_explanation(self, question: Question) -> Optional[str]:
+        """Ask the fast model to explain an already generated question; None on failure"""
+        if not self.breaker.allow_request():
+            return None
+        metrics.incr("explanation_generation.requests")
+        started = time.monotonic()
+        try:
+            completion = await self.llm.complete(
+                settings.OPENAI_FAST_MODEL,
+                [
+                    {"role": "system", "content": "You explain IQ test answers clearly and briefly. Respond with a single JSON object."},
+                    {"role": "user", "content": (
+                        f"Question ({question.field.value}): {question.question}\n"
+                        + (f"Options: {', '.join(question.options)}\n" if question.options else "")
+                        + f"Correct answer: {question.correct_answer}\n"
+                        "Explain in two or three sentences why this answer is correct."
+                    )}
+                ],
+                settings.EXPLANATION_MAX_TOKENS,
+                0.3,
+                explanation_response_format()
+            )
         except Exception as e:
-            logger.warning("AI question generation failed", error=str(e))
+            self.breaker.record_failure()
+            logger.warning("Explanation generation failed", error=str(e))
             return None
+        latency = time.monotonic() - started
+        self.breaker.record_success(latency)
+        metrics.observe("explanation_generation.latency", latency)
+        self._record_usage(completion.model, completion.total_tokens, "explanation_generation")
+        
+        data = extract_json_object(completion.content)
+        explanation = data.get("explanation") if data else None
+        if not isinstance(explanation, str) or not explanation.strip():
+            metrics.incr("explanation_generation.parse_failures")
+            return None
+        return explanation.strip()
+    
+    def _record_usage(self, model: str, total_tokens: Optional[int], series: str = "question_generation") -> None:
+        """Track token usage and estimated spend"""
+        if total_tokens is None:
+            return
+        metrics.incr(f"{series}.tokens", total_tokens)
+        cost_per_1k = settings.MODEL_COST_PER_1K_TOKENS.get(model, 0.0)
+        metrics.incr(f"{series}.cost_usd", total_tokens / 1000 * cost_per_1k)
     
     def _generate_template_question(self, field: FieldType, difficulty: int) -> Question:
         """Generate question from templates as fallback"""
@@ -176,8 +382,10 @@ class QuestionService:
         base_time = 30  # seconds
         return base_time + (difficulty * 15)
     
-    def _calculate_template_answer(self, question: str, values: Dict) -> int:
+    def _calculate_template_answer(self, question: str, values: Dict) -> Union[int, str]:
         """Calculate answer for template questions (simplified)"""
+        if question in FIXED_TEMPLATE_ANSWERS:
+            return FIXED_TEMPLATE_ANSWERS[question]
         if "+" in question:
             return values['a'] + values['b']
         elif "×" in question or "*" in question:
@@ -212,4 +420,35 @@ class QuestionService:
         
         except Exception as e:
             logger.error("Error evaluating answer", error=str(e))
-            return False, "Error evaluating answer"
\ No newline at end of file
+            return False, "Error evaluating answer"
+
+# Shared question service instance
+_question_service: Optional[QuestionService] = None
+
+def get_question_service() -> QuestionService:
+    """Get the process-wide question service (provider clients and breaker state are shared)"""
+    global _question_service
+    if _question_service is None:
+        _question_service = QuestionService()
+    return _question_service
+
+def ai_path_status() -> Dict:
+    """Circuit breaker, latency budget and AI ratio of the shared question service"""
+    if _question_service is None:
+        return {}
+    return {
+        "breaker": _question_service.breaker.status(),
+        "latency_budget_seconds": _question_service.latency_budget,
+        "latency_p95_seconds": metrics.window_percentile("question_generation.latency", 95),
+        "ai_ratio": round(_question_service.current_ai_ratio(), 3),
+        "base_ai_ratio": _question_service.base_ai_ratio,
+    }
+
+metrics.register_collector("ai_path", ai_path_status)
+
+def diversity_status() -> Dict:
+    if _question_service is None or _question_service.diversity is None:
+        return {}
+    return _question_service.diversity.status()
+
+metrics.register_collector("diversity", diversity_status)
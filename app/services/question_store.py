@@ -0,0 +1,108 @@
+"""Shared, content-addressed question storage referenced by sessions"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+import structlog
+from app.core.config import settings
+from app.core.database import DatabaseInterface, get_database
+from app.core.metrics import get_metrics
+from app.models.schemas import Question
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+def content_id(question: Question) -> str:
+    """ID derived from everything but the ID, so equal questions share one stored copy"""
+    digest = hashlib.blake2b(question.model_dump_json(exclude={"id"}).encode(), digest_size=12)
+    return f"q_{digest.hexdigest()}"
+
+def is_content_addressed(question: Question) -> bool:
+    return question.id == content_id(question)
+
+class QuestionStore:
+    """Immutable questions stored once and resolved by ID in batches.
+
+    Sessions and their events keep only question IDs. Because an ID is a
+    hash of the question's content, a stored question never changes and
+    can be cached indefinitely: the LRU remembers questions already written
+    or read, so a question is written once per process rather than once
+    per session save, and lookups only go to the database for IDs it lacks.
+    """
+
+    def __init__(self, db: DatabaseInterface, max_entries: int = 20_000):
+        self.db = db
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Question]" = OrderedDict()
+
+    def _remember(self, question: Question):
+        self._cache[question.id] = question
+        self._cache.move_to_end(question.id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def put_many(self, questions: Iterable[Question]) -> bool:
+        """Write the questions not already known to be stored and extend the expiry of the rest"""
+        new: Dict[str, Question] = {}
+        known = []
+        for question in questions:
+            if question.id in self._cache:
+                known.append(question.id)
+            else:
+                new[question.id] = question
+        if known and not await self.db.touch_questions(known):
+            return False
+        if not new:
+            return True
+        saved = await self.db.put_questions({
+            question_id: question.model_dump(mode="json", exclude_none=True) for question_id, question in new.items()
+        })
+        if saved:
+            metrics.incr("question_store.written", len(new))
+            for question in new.values():
+                self._remember(question)
+        return saved
+
+    async def get_many(self, question_ids: Iterable[str]) -> Dict[str, Question]:
+        """Resolve IDs from the LRU, fetching the rest in one batched read"""
+        found: Dict[str, Question] = {}
+        missing = []
+        for question_id in dict.fromkeys(question_ids):
+            question = self._cache.get(question_id)
+            if question is None:
+                missing.append(question_id)
+            else:
+                self._cache.move_to_end(question_id)
+                found[question_id] = question
+        metrics.incr("question_store.cache_hits", len(found))
+        if missing:
+            fetched = await self.db.get_questions(missing)
+            for question_id, data in fetched.items():
+                question = found[question_id] = Question.model_validate(data)
+                self._remember(question)
+            metrics.incr("question_store.fetched", len(fetched))
+            if len(fetched) < len(missing):
+                metrics.incr("question_store.missing", len(missing) - len(fetched))
+                logger.warning("Questions missing from store", missing=len(missing) - len(fetched))
+        return found
+
+    def status(self) -> Dict:
+        return {"cached": len(self._cache)}
+
+# Question store instance
+_store: Optional[QuestionStore] = None
+
+def get_question_store() -> QuestionStore:
+    """Get the question store of the current database"""
+    global _store
+    db = get_database()
+    # Rebuilt when the database is, so the LRU never vouches for another database's writes
+    if _store is None or _store.db is not db:
+        _store = QuestionStore(db, settings.QUESTION_STORE_CACHE_SIZE)
+    return _store
+
+def question_store_status() -> Dict:
+    """Cached question count for the metrics endpoint"""
+    return _store.status() if _store else {}
+
+metrics.register_collector("question_store", question_store_status)
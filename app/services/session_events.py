@@ -0,0 +1,108 @@
+"""Session events and the reducer that folds them into session state"""
+
+from typing import Dict, Iterable, Optional
+from app.models.schemas import (
+    ChatMessage, FieldScore, FieldType, Question, SessionEvent, SessionEventType, UserSession
+)
+from app.services.dedup import mark_seen
+
+def score_field(session: UserSession, field: FieldType, is_correct: bool, response_seconds: Optional[float] = None):
+    """Count an answer towards the field's score"""
+    field_score = session.field_scores.setdefault(field.value, FieldScore())
+    field_score.total += 1
+    if is_correct:
+        field_score.correct += 1
+    field_score.accuracy = field_score.correct / field_score.total
+    if response_seconds is not None:
+        session.response_times.append(response_seconds)
+        timed = field_score.average_response_seconds
+        field_score.average_response_seconds = round(
+            response_seconds if timed is None else timed + (response_seconds - timed) / field_score.total, 3
+        )
+
+def _message(session: UserSession, event: SessionEvent, message_type: str, message: Dict, **extra):
+    session.messages.append(ChatMessage(
+        id=message["id"],
+        type=message_type,
+        content=message["content"],
+        timestamp=event.at,
+        **extra
+    ))
+
+def apply_event(session: UserSession, event: SessionEvent) -> UserSession:
+    """Apply one event in place; replaying a session's events rebuilds it exactly"""
+    data = event.data
+
+    if event.type == SessionEventType.SESSION_CREATED:
+        session.user_id = data.get("user_id")
+        session.group = data.get("group")
+        session.difficulty = data["difficulty"]
+        session.start_time = event.at
+        _message(session, event, "bot", data["message"])
+
+    elif event.type == SessionEventType.MESSAGE_RECEIVED:
+        _message(session, event, "user", data["message"])
+
+    elif event.type == SessionEventType.FIELD_SELECTED:
+        field = FieldType(data["field"])
+        session.selected_field = field
+        session.difficulty = data["difficulty"]
+        if data.get("reset_score"):
+            session.field_scores[field.value] = FieldScore()
+        if data.get("message"):
+            _message(session, event, "bot", data["message"])
+
+    elif event.type == SessionEventType.QUESTION_SERVED:
+        question = Question.model_validate(data["question"])
+        session.current_question = question
+        session.current_question_id = question.id
+        session.question_served_at = event.at
+        mark_seen(session, question)
+        session.messages.append(ChatMessage(
+            id=data["message_id"],
+            type="question",
+            content=question.question,
+            question=question,
+            question_id=question.id,
+            timestamp=event.at
+        ))
+
+    elif event.type == SessionEventType.ANSWER_EVALUATED:
+        is_correct = data["is_correct"]
+        session.total_questions += 1
+        if is_correct:
+            session.correct_answers += 1
+            session.score += session.current_question.points
+        score_field(session, session.current_question.field, is_correct, data.get("response_seconds"))
+        session.question_served_at = None
+        _message(session, event, "user", {"id": data["answer_message_id"], "content": data["answer"]})
+        _message(session, event, "bot", {
+            "id": data["feedback_message_id"],
+            "content": f"{'Correct!' if is_correct else 'Incorrect.'} {data['explanation']}"
+        }, is_correct=is_correct)
+        session.difficulty = data["difficulty"]
+
+    elif event.type == SessionEventType.QUESTION_TIMED_OUT:
+        session.total_questions += 1
+        session.timed_out_questions += 1
+        score_field(session, session.current_question.field, False, data["response_seconds"])
+        session.field_scores[session.current_question.field.value].timed_out += 1
+        session.question_served_at = None
+        _message(session, event, "bot", data["message"], is_correct=False)
+        session.difficulty = data["difficulty"]
+
+    elif event.type == SessionEventType.SESSION_COMPLETED:
+        session.is_complete = True
+        session.end_time = event.at
+        _message(session, event, "bot", data["message"])
+
+    session.version = event.seq
+    return session
+
+def replay(session_id: str, snapshot: Optional[UserSession], events: Iterable[SessionEvent]) -> UserSession:
+    """Rebuild a session from its latest snapshot (if any) and the events after it"""
+    session = snapshot or UserSession(id=session_id)
+    for event in events:
+        if event.seq > session.version:
+            apply_event(session, event)
+    return session
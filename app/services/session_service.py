@@ -1,74 +1,284 @@
 """Session management service"""
 
-import json
+import asyncio
 import uuid
+import weakref
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 import structlog
 from app.core.config import settings
-from app.models.schemas import UserSession, FieldType, FieldScore, ChatMessage
+from app.models.schemas import (
+    UserSession, UserProfile, UserSessionSummary, UserSessionsPage,
+    FieldAbility, FieldType, Question, SessionEvent, SessionEventType
+)
 from app.core.database import get_database
+from app.core.profiling import span
+from app.services.dedup import new_user_filter, question_fingerprint
+from app.services.question_store import get_question_store, is_content_addressed
+from app.services.session_events import apply_event, replay, score_field
 
 logger = structlog.get_logger()
 
+# Held while a request or the expiry timer loads, changes and saves a session,
+# so each sees the other's result; a lock goes away once nobody holds it
+_session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+def session_lock(session_id: str) -> asyncio.Lock:
+    """In-process lock serializing changes to one session"""
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = _session_locks[session_id] = asyncio.Lock()
+    return lock
+
+def profile_lock(user_id: str) -> asyncio.Lock:
+    """In-process lock serializing read-modify-writes of one user profile"""
+    return session_lock(f"user:{user_id}")
+
 class SessionService:
     """Service for managing user sessions"""
     
     def __init__(self):
         self.db = get_database()
+        self.questions = get_question_store()
     
-    async def create_session(self, user_id: Optional[str] = None) -> UserSession:
+    async def create_session(self, user_id: Optional[str] = None, group: Optional[str] = None) -> UserSession:
         """Create a new user session"""
-        session = UserSession(
-            id=str(uuid.uuid4()),
+        session = UserSession(id=str(uuid.uuid4()))
+        self.record(
+            session,
+            SessionEventType.SESSION_CREATED,
             user_id=user_id,
-            difficulty=settings.DEFAULT_DIFFICULTY
+            group=group,
+            difficulty=settings.DEFAULT_DIFFICULTY,
+            message={
+                "id": str(uuid.uuid4()),
+                "content": "Hello! I'm IQFieldBot, your personalized intelligence testing assistant. I'll adapt questions to your preferred field and adjust difficulty based on your performance. Which field would you like to be tested on?"
+            }
         )
         
-        # Add welcome message
-        welcome_message = ChatMessage(
-            id=str(uuid.uuid4()),
-            type="bot",
-            content="Hello! I'm IQFieldBot, your personalized intelligence testing assistant. I'll adapt questions to your preferred field and adjust difficulty based on your performance. Which field would you like to be tested on?"
-        )
-        session.messages.append(welcome_message)
-        
-        await self._save_session(session)
+        # Event mode also snapshots at creation so the user_id index sees the session
+        await self.update_session(session)
+        if self.event_sourced:
+            await self._save_session(session)
         return session
     
+    def record(self, session: UserSession, event_type: SessionEventType, **data) -> SessionEvent:
+        """Apply an event to the session and queue it for the next update_session"""
+        event = SessionEvent(seq=session.version + 1, type=event_type, data=data)
+        apply_event(session, event)
+        session._pending_events.append(event)
+        return event
+    
     async def get_session(self, session_id: str) -> Optional[UserSession]:
         """Get session by ID"""
         try:
-            session_data = await self.db.get_session(session_id)
-            if session_data:
-                return UserSession(**session_data)
-            return None
+            with span("db.read"):
+                session_data = await self.db.get_session(session_id)
+            with span("validate"):
+                snapshot = UserSession(**session_data) if session_data else None
+            if not self.event_sourced:
+                await self._resolve_questions([snapshot] if snapshot else [], [])
+                return snapshot
+            
+            # Latest snapshot plus the events appended since it was written
+            with span("db.read"):
+                event_data = await self.db.get_session_events(session_id, snapshot.version if snapshot else 0)
+            if snapshot is None and not event_data:
+                return None
+            event_data = await self._resolve_questions([snapshot] if snapshot else [], event_data)
+            with span("validate"):
+                return replay(session_id, snapshot, (SessionEvent(**event) for event in event_data))
         except Exception as e:
             logger.error("Error retrieving session", session_id=session_id, error=str(e))
             return None
     
     async def update_session(self, session: UserSession) -> bool:
-        """Update session data"""
-        return await self._save_session(session)
+        """Persist the session: a snapshot, or its new events in event-sourced mode"""
+        if not self.event_sourced:
+            session._pending_events.clear()
+            return await self._save_session(session)
+        
+        events = session._pending_events
+        if not events:
+            return True
+        try:
+            with span("serialize"):
+                records = [event.model_dump(mode="json", exclude_none=True) for event in events]
+            # Served questions go to the question store and their events keep only the ID
+            served: Dict[str, Question] = {}
+            for record in records:
+                if record["type"] == SessionEventType.QUESTION_SERVED.value:
+                    data = record["data"]
+                    served.update(self._referenced([Question.model_validate(data["question"])]))
+                    if data["question"]["id"] in served:
+                        record["data"] = {key: value for key, value in data.items() if key != "question"}
+                        record["data"]["question_id"] = data["question"]["id"]
+            # Earlier questions are passed too, so their expiry follows the session's
+            referenced = {**self._referenced([session.current_question] + [msg.question for msg in session.messages]), **served}
+            with span("db.write"):
+                saved = not referenced or await self.questions.put_many(referenced.values())
+                saved = saved and await self.db.append_session_events(session.id, records)
+        except Exception as e:
+            logger.error("Error appending session events", session_id=session.id, error=str(e))
+            return False
+        if not saved:
+            return False
+        
+        # Snapshot whenever the batch crosses a multiple of the interval, and on
+        # completion so the archiver finds the finished session
+        interval = settings.SESSION_SNAPSHOT_INTERVAL
+        previous_version = session.version - len(events)
+        session._pending_events = []
+        if session.version // interval > previous_version // interval or session.is_complete:
+            return await self._save_session(session)
+        return True
+    
+    @property
+    def event_sourced(self) -> bool:
+        return settings.SESSION_STORE_MODE == "events"
+    
+    def _referenced(self, questions: Iterable[Optional[Question]]) -> Dict[str, Question]:
+        """Questions to store by ID rather than embed: the content-addressed ones, when normalizing"""
+        if not settings.NORMALIZE_QUESTIONS:
+            return {}
+        return {question.id: question for question in questions if question and is_content_addressed(question)}
+    
+    async def _resolve_questions(self, snapshots: List[UserSession], events: List[Dict]) -> List[Dict]:
+        """Fill in questions stored by ID, for snapshots and an event tail in one batched read.
+
+        Returns the events with their questions; stored records are left as they are.
+        """
+        messages = [msg for snapshot in snapshots for msg in snapshot.messages if msg.question is None and msg.question_id]
+        current = [snapshot for snapshot in snapshots if snapshot.current_question is None and snapshot.current_question_id]
+        wanted = {msg.question_id for msg in messages} | {snapshot.current_question_id for snapshot in current} | {
+            event["data"]["question_id"] for event in events if "question_id" in event.get("data", {})
+        }
+        if not wanted:
+            return events
+        
+        with span("db.read"):
+            questions = await self.questions.get_many(wanted)
+        for msg in messages:
+            msg.question = questions.get(msg.question_id)
+        for snapshot in current:
+            snapshot.current_question = questions.get(snapshot.current_question_id)
+        # An unresolved event fails to replay and the read is logged as an error
+        return [
+            {**event, "data": {**event["data"], "question": questions[event["data"]["question_id"]]}}
+            if event.get("data", {}).get("question_id") in questions else event
+            for event in events
+        ]
+    
+    async def load_sessions(self, records: List[Dict]) -> List[UserSession]:
+        """Sessions from stored snapshot records, resolving all their questions in one batch"""
+        sessions = [UserSession(**record) for record in records]
+        await self._resolve_questions(sessions, [])
+        return sessions
     
     async def _save_session(self, session: UserSession) -> bool:
         """Save session to storage"""
         try:
-            session_data = session.model_dump()
-            # Convert datetime objects to ISO strings for storage
-            session_data['start_time'] = session.start_time.isoformat()
-            if session.end_time:
-                session_data['end_time'] = session.end_time.isoformat()
+            referenced = self._referenced([session.current_question] + [msg.question for msg in session.messages])
+            # Questions are written before anything refers to them
+            if referenced and not await self.questions.put_many(referenced.values()):
+                return False
             
-            # Convert messages to dict format
-            session_data['messages'] = [msg.model_dump() for msg in session.messages]
+            with span("serialize"):
+                exclude = {"messages", "current_question"} if session.current_question_id in referenced else {"messages"}
+                session_data = session.model_dump(exclude=exclude)
+                # Convert datetime objects to ISO strings for storage
+                session_data['start_time'] = session.start_time.isoformat()
+                if session.end_time:
+                    session_data['end_time'] = session.end_time.isoformat()
+                if session.question_served_at:
+                    session_data['question_served_at'] = session.question_served_at.isoformat()
+                
+                # Convert messages to dict format, keeping only the ID of stored questions
+                session_data['messages'] = [
+                    msg.model_dump(exclude={"question"} if msg.question_id in referenced else None)
+                    for msg in session.messages
+                ]
             
-            await self.db.save_session(session.id, session_data)
+            with span("db.write"):
+                await self.db.save_session(session.id, session_data)
             return True
         except Exception as e:
             logger.error("Error saving session", session_id=session.id, error=str(e))
             return False
     
+    async def get_user_profile(self, user_id: str) -> UserProfile:
+        """Get a user's profile, or a fresh one if none is stored yet"""
+        try:
+            profile_data = await self.db.get_user_profile(user_id)
+            if profile_data:
+                return UserProfile(**profile_data)
+        except Exception as e:
+            logger.error("Error retrieving user profile", user_id=user_id, error=str(e))
+        return UserProfile(user_id=user_id)
+    
+    async def save_user_profile(self, profile: UserProfile) -> bool:
+        """Save a user's profile"""
+        try:
+            profile.updated_at = datetime.now()
+            return await self.db.save_user_profile(profile.user_id, profile.model_dump(mode="json"))
+        except Exception as e:
+            logger.error("Error saving user profile", user_id=profile.user_id, error=str(e))
+            return False
+    
+    async def starting_difficulty(self, user_id: Optional[str], field: FieldType) -> float:
+        """Difficulty to open a session at: the user's ability in the field, if known"""
+        if not user_id:
+            return settings.DEFAULT_DIFFICULTY
+        profile = await self.get_user_profile(user_id)
+        ability = profile.abilities.get(field.value)
+        if not ability or not ability.sessions:
+            return settings.DEFAULT_DIFFICULTY
+        return round(min(settings.MAX_DIFFICULTY, max(1.0, ability.estimate)), 1)
+    
+    async def record_seen(self, user_id: str, question_text: str) -> bool:
+        """Add a served question to the user's seen filter, rotating full generations"""
+        async with profile_lock(user_id):
+            profile = await self.get_user_profile(user_id)
+            user_filter = new_user_filter(profile.seen_filter, profile.seen_filter_previous)
+            user_filter.add(question_fingerprint(question_text))
+            profile.seen_filter = user_filter.current.to_string()
+            profile.seen_filter_previous = user_filter.previous.to_string() if user_filter.previous else None
+            return await self.save_user_profile(profile)
+    
+    async def record_completion(self, session: UserSession) -> bool:
+        """Fold a completed session into the user's rolling per-field ability.
+
+        Raises when the profile cannot be saved, so a background job retries it;
+        nothing was written, so the retry applies the session once.
+        """
+        if not session.user_id or not session.selected_field:
+            return False
+        async with profile_lock(session.user_id):
+            profile = await self.get_user_profile(session.user_id)
+            ability = profile.abilities.setdefault(session.selected_field.value, FieldAbility())
+            
+            # The adaptive difficulty a session ends at is where the user's accuracy
+            # balances; blend it in with an exponentially weighted moving average
+            # (the first sessions count fully until the average has enough history)
+            weight = max(settings.ABILITY_SMOOTHING, 1.0 / (ability.sessions + 1))
+            ability.estimate = round((1 - weight) * ability.estimate + weight * session.difficulty, 3)
+            ability.sessions += 1
+            ability.questions += session.total_questions
+            if not await self.save_user_profile(profile):
+                raise RuntimeError(f"could not save the profile of user {session.user_id}")
+            return True
+    
+    async def list_user_sessions(self, user_id: str, limit: int, cursor: Optional[str] = None) -> UserSessionsPage:
+        """One page of a user's sessions, newest first"""
+        records, next_cursor = await self.db.list_user_sessions(user_id, limit, cursor)
+        summaries = [
+            UserSessionSummary(session_id=record['id'], **{
+                key: record.get(key) for key in UserSessionSummary.model_fields if key != 'session_id'
+            })
+            for record in records
+        ]
+        return UserSessionsPage(user_id=user_id, sessions=summaries, next_cursor=next_cursor)
+    
     def calculate_adaptive_difficulty(self, session: UserSession) -> float:
         """Calculate new difficulty based on performance"""
         if session.total_questions == 0:
@@ -94,21 +304,16 @@ class SessionService:
         
         return new_difficulty
     
+    def question_deadline(self, session: UserSession) -> Optional[datetime]:
+        """When the unanswered current question times out (after the grace period), if it is timed"""
+        question = session.current_question
+        if not settings.TIME_LIMITS_ENABLED or not question or not question.time_limit or not session.question_served_at:
+            return None
+        return session.question_served_at + timedelta(seconds=question.time_limit + settings.TIME_LIMIT_GRACE_SECONDS)
+    
     def update_field_scores(self, session: UserSession, field: FieldType, is_correct: bool):
         """Update field-specific scores"""
-        field_key = field.value
-        
-        if field_key not in session.field_scores:
-            session.field_scores[field_key] = FieldScore()
-        
-        field_score = session.field_scores[field_key]
-        field_score.total += 1
-        
-        if is_correct:
-            field_score.correct += 1
-        
-        # Update accuracy
-        field_score.accuracy = field_score.correct / field_score.total if field_score.total > 0 else 0.0
+        score_field(session, field, is_correct)
     
     def generate_performance_summary(self, session: UserSession) -> Dict:
         """Generate performance summary and recommendations"""
@@ -139,12 +344,19 @@ class SessionService:
         
         if weaknesses:
             recommendations.append(f"Consider practicing more in: {', '.join(weaknesses)}")
+        if session.timed_out_questions * 4 >= session.total_questions:
+            recommendations.append("Watch the clock: several questions ran out of time")
+        
+        average_response = (
+            round(sum(session.response_times) / len(session.response_times), 1) if session.response_times else None
+        )
         
         return {
             "total_score": session.score,
             "accuracy": round(accuracy * 100, 1),
             "questions_answered": session.total_questions,
             "time_spent_minutes": round(time_spent / 60, 1),
+            "average_response_seconds": average_response,
             "difficulty_reached": session.difficulty,
             "strengths": strengths,
             "weaknesses": weaknesses,
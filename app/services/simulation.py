@@ -0,0 +1,293 @@
+"""Synthetic test-taker simulation for tuning the adaptive difficulty algorithm"""
+
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Literal
+import numpy as np
+import structlog
+from pydantic import BaseModel
+from app.core import database
+from app.core.config import settings
+from app.models.schemas import FieldType, Question, SessionEventType, UserSession
+from app.services.llm_provider import StubProvider
+from app.services.question_service import QuestionService
+from app.services.session_service import SessionService
+
+logger = structlog.get_logger()
+
+# Never a substring of a real answer, so evaluate_answer always marks it wrong
+WRONG_ANSWER = "\x00"
+
+class SimulationConfig(BaseModel):
+    """Algorithm settings under test and the synthetic population answering it.
+
+    Latent ability is on the difficulty scale: a test-taker of ability 3
+    answers a difficulty-3 question correctly with probability
+    guessing + (1 - guessing) / 2, and the curve's slope is `discrimination`.
+    """
+    difficulty_threshold: float = settings.DIFFICULTY_THRESHOLD
+    difficulty_adjustment: float = settings.DIFFICULTY_ADJUSTMENT
+    questions_per_session: int = settings.QUESTIONS_PER_SESSION
+    starting_difficulty: int = settings.DEFAULT_DIFFICULTY
+    field: FieldType = FieldType.MATH
+    ability_mean: float = 3.0
+    ability_sd: float = 1.0
+    discrimination: float = 1.7
+    guessing: float = 0.0
+    generation: Literal["template", "stub"] = "template"
+    # Difficulty within this distance of the balance point counts as converged
+    tolerance: float = 0.5
+
+def response_probability(ability, difficulty, discrimination: float, guessing: float):
+    """Three-parameter logistic item response model, vectorized over test-takers"""
+    return guessing + (1.0 - guessing) / (1.0 + np.exp(-discrimination * (ability - difficulty)))
+
+def balance_difficulty(ability, config: SimulationConfig):
+    """Difficulty at which the algorithm should settle for each ability.
+
+    The rule holds difficulty while accuracy is within 0.2 below the
+    threshold, so the target is the difficulty answered correctly at the
+    middle of that band, clipped to the levels that exist.
+    """
+    target = min(max(config.difficulty_threshold - 0.1, config.guessing + 1e-3), 1 - 1e-3)
+    scaled = (target - config.guessing) / (1.0 - config.guessing)
+    offset = np.log(scaled / (1.0 - scaled)) / config.discrimination
+    return np.clip(ability - offset, 1.0, settings.MAX_DIFFICULTY)
+
+@contextmanager
+def _tuned(config: SimulationConfig) -> Iterator[None]:
+    """Apply the configuration's algorithm settings, restoring them afterwards"""
+    overrides = {
+        "DIFFICULTY_THRESHOLD": config.difficulty_threshold,
+        "DIFFICULTY_ADJUSTMENT": config.difficulty_adjustment,
+        "QUESTIONS_PER_SESSION": config.questions_per_session,
+    }
+    previous = {name: getattr(settings, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(settings, name, value)
+
+class ShardSimulator:
+    """Runs one shard of test-takers in lockstep through the real adaptive logic.
+
+    Whether each test-taker answers correctly is sampled for the whole
+    shard at once; everything else is the application's own code. Answers
+    are graded by `QuestionService.evaluate_answer` and difficulty moves by
+    `SessionService.calculate_adaptive_difficulty`. Nothing is persisted.
+
+    In "sessions" mode every test-taker is a `UserSession` driven with the
+    same events as the chat routes. The adaptive rule only looks at
+    questions answered, correct answers and current difficulty, so
+    "vectorized" mode keeps those as arrays instead: the rule runs once per
+    distinct state and one question is generated per level served. Both
+    modes give the same outcomes for the same seed.
+    """
+
+    def __init__(self, config: SimulationConfig):
+        self.config = config
+        self.session_service = SessionService()
+        self.question_service = QuestionService(provider=StubProvider())
+        self._ids = 0
+
+    def _id(self) -> str:
+        self._ids += 1
+        return f"sim-{self._ids}"
+
+    async def _question(self, difficulty: int) -> Question:
+        if self.config.generation == "stub":
+            return await self.question_service.generate_question(self.config.field, difficulty)
+        return self.question_service._fallback_question(self.config.field, difficulty)
+
+    def _grade(self, question: Question, correct: bool) -> tuple[bool, str]:
+        return self.question_service.evaluate_answer(question, question.correct_answer if correct else WRONG_ANSWER)
+
+    async def _serve(self, sessions: List[UserSession]):
+        questions = await asyncio.gather(*(self._question(int(session.difficulty)) for session in sessions))
+        for session, question in zip(sessions, questions, strict=True):
+            self.session_service.record(
+                session,
+                SessionEventType.QUESTION_SERVED,
+                question=question.model_dump(mode="json", exclude_none=True),
+                message_id=self._id()
+            )
+
+    def _answer(self, session: UserSession, correct: bool):
+        question = session.current_question
+        is_correct, explanation = self._grade(question, correct)
+        projected = session.model_copy(update={
+            "total_questions": session.total_questions + 1,
+            "correct_answers": session.correct_answers + int(is_correct)
+        })
+        self.session_service.record(
+            session,
+            SessionEventType.ANSWER_EVALUATED,
+            answer=question.correct_answer if correct else WRONG_ANSWER,
+            is_correct=is_correct,
+            explanation=explanation,
+            difficulty=self.session_service.calculate_adaptive_difficulty(projected),
+            answer_message_id=self._id(),
+            feedback_message_id=self._id()
+        )
+        if session.total_questions >= settings.QUESTIONS_PER_SESSION:
+            self.session_service.record(
+                session, SessionEventType.SESSION_COMPLETED, message={"id": self._id(), "content": "Session complete!"}
+            )
+
+    async def _run_sessions(self, ability: np.ndarray, draws: np.ndarray, trajectory: np.ndarray):
+        config = self.config
+        users = ability.size
+        sessions = [UserSession(id=self._id()) for _ in range(users)]
+        for session in sessions:
+            self.session_service.record(
+                session,
+                SessionEventType.FIELD_SELECTED,
+                field=config.field.value,
+                difficulty=float(config.starting_difficulty)
+            )
+        await self._serve(sessions)
+
+        for step in range(config.questions_per_session):
+            served = np.fromiter((session.current_question.difficulty for session in sessions), float, users)
+            correct = draws[:, step] < response_probability(ability, served, config.discrimination, config.guessing)
+            for session, answered in zip(sessions, correct.tolist(), strict=True):
+                self._answer(session, answered)
+                session._pending_events.clear()
+            trajectory[:, step + 1] = [session.difficulty for session in sessions]
+            if step + 1 < config.questions_per_session:
+                await self._serve(sessions)
+
+        correct_answers = np.fromiter((session.correct_answers for session in sessions), float, users)
+        return correct_answers, np.fromiter((session.score for session in sessions), float, users)
+
+    async def _run_vectorized(self, ability: np.ndarray, draws: np.ndarray, trajectory: np.ndarray):
+        config = self.config
+        users = ability.size
+        correct_answers = np.zeros(users)
+        score = np.zeros(users)
+        for step in range(config.questions_per_session):
+            levels = trajectory[:, step].astype(int)
+            # One question per level served; its difficulty and points stand for the level
+            level_difficulty = np.zeros(settings.MAX_DIFFICULTY + 1)
+            level_points = np.zeros(settings.MAX_DIFFICULTY + 1)
+            level_grades = np.zeros((settings.MAX_DIFFICULTY + 1, 2), dtype=bool)
+            for level in np.unique(levels).tolist():
+                question = await self._question(level)
+                level_difficulty[level] = question.difficulty
+                level_points[level] = question.points
+                level_grades[level] = [self._grade(question, False)[0], self._grade(question, True)[0]]
+
+            served = level_difficulty[levels]
+            sampled = draws[:, step] < response_probability(ability, served, config.discrimination, config.guessing)
+            correct = level_grades[levels, sampled.astype(int)]
+            correct_answers += correct
+            score += np.where(correct, level_points[levels], 0)
+
+            # The real rule, once per distinct (correct answers, difficulty) state
+            states, inverse = np.unique(
+                np.column_stack([correct_answers, trajectory[:, step]]), axis=0, return_inverse=True
+            )
+            outcomes = np.array([
+                self.session_service.calculate_adaptive_difficulty(UserSession(
+                    id="simulated", total_questions=step + 1, correct_answers=int(state_correct), difficulty=difficulty
+                ))
+                for state_correct, difficulty in states.tolist()
+            ])
+            trajectory[:, step + 1] = outcomes[inverse.reshape(-1)]
+        return correct_answers, score
+
+    async def run(self, users: int, seed, mode: str = "vectorized") -> Dict[str, np.ndarray]:
+        """Simulate `users` sessions; returns per-user outcome arrays"""
+        config = self.config
+        rng = np.random.default_rng(seed)
+        ability = rng.normal(config.ability_mean, config.ability_sd, users)
+        draws = rng.random((users, config.questions_per_session))
+        trajectory = np.empty((users, config.questions_per_session + 1))
+        trajectory[:, 0] = float(config.starting_difficulty)
+        if mode == "sessions":
+            correct_answers, score = await self._run_sessions(ability, draws, trajectory)
+        else:
+            correct_answers, score = await self._run_vectorized(ability, draws, trajectory)
+
+        # Question count after which difficulty stays within tolerance of the balance point
+        last = trajectory.shape[1] - 1
+        off_target = np.abs(trajectory - balance_difficulty(ability, config)[:, None]) > config.tolerance
+        last_off = np.where(off_target.any(axis=1), last - np.argmax(off_target[:, ::-1], axis=1), -1)
+        converged_at = np.where(last_off < last, last_off + 1, np.nan)
+
+        # Direction changes of the difficulty path (up then down, or down then up)
+        moves = np.sign(np.diff(trajectory, axis=1))
+        previous = np.zeros(users)
+        reversals = np.zeros(users)
+        for step in range(moves.shape[1]):
+            move = moves[:, step]
+            reversals += (move != 0) & (previous != 0) & (move != previous)
+            previous = np.where(move != 0, move, previous)
+
+        return {
+            "ability": ability,
+            "final_difficulty": trajectory[:, -1],
+            "accuracy": correct_answers / config.questions_per_session,
+            "score": score,
+            "converged_at": converged_at,
+            "reversals": reversals,
+        }
+
+def run_shard(config: SimulationConfig, users: int, seed, mode: str = "vectorized") -> Dict[str, np.ndarray]:
+    """Simulate one shard; the entry point for pool workers"""
+    if database._database is None:
+        # Session and question services look the database up; simulation never writes to it
+        database._database = database.InMemoryDatabase()
+    with _tuned(config):
+        return asyncio.run(ShardSimulator(config).run(users, seed, mode))
+
+def summarize(config: SimulationConfig, outcomes: Dict[str, np.ndarray]) -> Dict:
+    """Convergence, oscillation and calibration of one configuration"""
+    ability = outcomes["ability"]
+    final = outcomes["final_difficulty"]
+    converged = ~np.isnan(outcomes["converged_at"])
+    error = final - balance_difficulty(ability, config)
+    return {
+        "users": int(ability.size),
+        "accuracy": float(outcomes["accuracy"].mean()),
+        "converged_share": float(converged.mean()),
+        "questions_to_converge": float(outcomes["converged_at"][converged].mean()) if converged.any() else None,
+        "reversals_per_session": float(outcomes["reversals"].mean()),
+        "final_difficulty_rmse": float(np.sqrt(np.mean(error ** 2))),
+        "ability_difficulty_corr": float(np.corrcoef(ability, final)[0, 1]) if final.std() else 0.0,
+        "ability_score_corr": float(np.corrcoef(ability, outcomes["score"])[0, 1]) if outcomes["score"].std() else 0.0,
+    }
+
+def simulate(
+    config: SimulationConfig,
+    users: int,
+    workers: int = 1,
+    shard_size: int = 50_000,
+    seed: int = 0,
+    mode: str = "vectorized"
+) -> Dict:
+    """Simulate `users` test-takers under `config`, sharded across `workers` processes.
+
+    Shards get independent seeds derived from `seed`, so results depend on
+    the seed and shard size but not on the number of workers or the mode.
+    """
+    sizes = [min(shard_size, users - offset) for offset in range(0, users, shard_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    started = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            shards = list(pool.map(run_shard, [config] * len(sizes), sizes, seeds, [mode] * len(sizes)))
+    else:
+        shards = [run_shard(config, size, shard_seed, mode) for size, shard_seed in zip(sizes, seeds, strict=True)]
+    elapsed = time.perf_counter() - started
+
+    outcomes = {key: np.concatenate([shard[key] for shard in shards]) for key in shards[0]}
+    report = summarize(config, outcomes)
+    report["users_per_second"] = users / elapsed if elapsed else 0.0
+    logger.info("Simulation finished", users=users, mode=mode, shards=len(sizes), workers=workers, seconds=round(elapsed, 2))
+    return report
@@ -0,0 +1,243 @@
+"""Speculative next-question generation"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+import structlog
+from app.core.config import settings
+from app.core.metrics import get_metrics
+from app.core.rate_limit import AdmissionRejected, get_admission_controller
+from app.models.schemas import FieldType, Question, UserSession
+from app.services.question_service import QuestionService, get_question_service
+from app.services.session_service import SessionService
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+# Upper bound on sessions whose speculative spend is tracked
+MAX_TRACKED_SESSIONS = 100_000
+
+class SessionBranches:
+    """In-flight speculative generations for one session, keyed by difficulty"""
+
+    def __init__(self, field: FieldType):
+        self.field = field
+        self.created_at = time.monotonic()
+        self.tasks: Dict[int, asyncio.Task] = {}
+
+class SpeculativeGenerator:
+    """Pre-generate the next question for every difficulty the session can reach.
+
+    After a question is served, the next difficulty can only be the result of
+    `calculate_adaptive_difficulty` for a correct or an incorrect answer, so a
+    generation is started for each distinct outcome. `next_question` takes the
+    branch matching the real outcome; finished losing branches are recycled
+    into a shared pool keyed by (field, difficulty) and unfinished ones are
+    cancelled. Branches live in process memory and expire after a TTL.
+    """
+
+    def __init__(
+        self,
+        question_service: QuestionService,
+        enabled: bool = True,
+        ttl_seconds: float = 300.0,
+        max_per_session: int = 20,
+        pool_size: int = 50
+    ):
+        self.question_service = question_service
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_per_session = max_per_session
+        self.pool_size = pool_size
+        self._branches: "OrderedDict[str, SessionBranches]" = OrderedDict()
+        self._spent: Dict[str, int] = {}
+        self._pool: Dict[Tuple[FieldType, int], Deque[Question]] = {}
+
+    def reachable_difficulties(self, session: UserSession, session_service: SessionService) -> Set[int]:
+        """Integer difficulties the next question can be served at"""
+        total = session.total_questions + 1
+        if total >= settings.QUESTIONS_PER_SESSION:
+            return set()
+        outcomes = set()
+        for correct in (session.correct_answers + 1, session.correct_answers):
+            projected = session.model_copy(update={"total_questions": total, "correct_answers": correct})
+            outcomes.add(int(session_service.calculate_adaptive_difficulty(projected)))
+        return outcomes
+
+    def speculate(self, session: UserSession, session_service: SessionService, user_history: Optional[List[str]] = None):
+        """Start background generation for each reachable next difficulty"""
+        if not self.enabled or not session.selected_field or session.is_complete:
+            return
+        self._expire()
+
+        self.discard(session.id)
+        branches = SessionBranches(session.selected_field)
+        for difficulty in self.reachable_difficulties(session, session_service):
+            if self._spent.get(session.id, 0) >= self.max_per_session:
+                metrics.incr("speculation.capped")
+                break
+            self._charge(session.id)
+            branches.tasks[difficulty] = asyncio.create_task(
+                self._generate_in_background(session.selected_field, difficulty, user_history)
+            )
+            metrics.incr("speculation.launched")
+
+        if branches.tasks:
+            self._branches[session.id] = branches
+
+    async def next_question(self, session: UserSession, difficulty: int, user_history: Optional[List[str]] = None) -> Question:
+        """Serve the next question, from a speculative branch when one matches"""
+        field = session.selected_field
+        branches = self._branches.pop(session.id, None)
+        question: Optional[Question] = None
+
+        if branches is not None and branches.field == field:
+            task = branches.tasks.pop(difficulty, None)
+            if task is not None:
+                metrics.incr("speculation.hits")
+                question = await task
+            else:
+                metrics.incr("speculation.misses")
+        if branches is not None:
+            self._recycle(branches)
+
+        if question is None:
+            question = self._take_pooled(field, difficulty, user_history)
+
+        if question is None:
+            question = await self.question_service.generate_question(field, difficulty, user_history)
+
+        if session.total_questions + 1 >= settings.QUESTIONS_PER_SESSION:
+            self._spent.pop(session.id, None)
+        return question
+
+    async def _generate_in_background(
+        self,
+        field: FieldType,
+        difficulty: int,
+        user_history: Optional[List[str]] = None,
+        wait: bool = False
+    ) -> Optional[Question]:
+        """Generate under the LLM concurrency cap; skipped when it is full, unless `wait` queues for a slot"""
+        if not settings.RATE_LIMIT_ENABLED:
+            return await self.question_service.generate_question(field, difficulty, user_history)
+        try:
+            async with get_admission_controller().llm_limiter.slot(wait=wait):
+                return await self.question_service.generate_question(field, difficulty, user_history)
+        except AdmissionRejected:
+            metrics.incr("speculation.shed")
+            return None
+
+    async def first_question(self, field: FieldType, difficulty: int) -> Question:
+        """A session's first question, from the pool when warm-up or recycling left one there"""
+        question = self._take_pooled(field, difficulty)
+        if question is None:
+            question = await self.question_service.generate_question(field, difficulty)
+        return question
+
+    def _take_pooled(self, field: FieldType, difficulty: int, user_history: Optional[List[str]] = None) -> Optional[Question]:
+        pooled = self._pool.get((field, difficulty))
+        if not pooled:
+            return None
+        metrics.incr("speculation.pool_hits")
+        diversity = self.question_service.diversity
+        if diversity is None or not user_history:
+            return pooled.popleft()
+        position = diversity.pick([question.question for question in pooled], user_history)
+        question = pooled[position]
+        del pooled[position]
+        return question
+
+    async def prefill(self, field: FieldType, difficulty: int, count: int) -> int:
+        """Generate questions into the shared pool ahead of demand; returns how many were added"""
+        pool = self._pool.setdefault((field, difficulty), deque(maxlen=self.pool_size))
+        wanted = min(count, self.pool_size) - len(pool)
+        if wanted <= 0:
+            return 0
+        results = await asyncio.gather(
+            *(self._generate_in_background(field, difficulty, wait=True) for _ in range(wanted)),
+            return_exceptions=True
+        )
+        # A field the templates do not cover can still fail while the AI path is skipped
+        questions = [result for result in results if isinstance(result, Question)]
+        pool.extend(questions)
+        metrics.incr("speculation.prefilled", len(questions))
+        return len(questions)
+
+    def _charge(self, session_id: str):
+        """Count one speculative generation against the session's budget"""
+        self._spent[session_id] = self._spent.pop(session_id, 0) + 1
+        if len(self._spent) > MAX_TRACKED_SESSIONS:
+            # Forget the least recently charged session
+            del self._spent[next(iter(self._spent))]
+
+    def discard(self, session_id: str):
+        """Drop any speculative branches held for a session"""
+        branches = self._branches.pop(session_id, None)
+        if branches is not None:
+            self._recycle(branches)
+
+    def _recycle(self, branches: SessionBranches):
+        """Move finished losing branches into the pool and cancel the rest"""
+        for difficulty, task in branches.tasks.items():
+            if task.done() and not task.cancelled() and task.exception() is None and task.result() is not None:
+                pool = self._pool.setdefault((branches.field, difficulty), deque(maxlen=self.pool_size))
+                pool.append(task.result())
+                metrics.incr("speculation.recycled")
+            else:
+                task.cancel()
+                metrics.incr("speculation.wasted")
+
+    def _expire(self):
+        """Drop branches older than the TTL (oldest first)"""
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._branches:
+            session_id, branches = next(iter(self._branches.items()))
+            if branches.created_at >= cutoff:
+                break
+            del self._branches[session_id]
+            self._spent.pop(session_id, None)
+            for task in branches.tasks.values():
+                task.cancel()
+                metrics.incr("speculation.wasted")
+
+    def shutdown(self):
+        """Cancel all in-flight speculative work"""
+        for branches in self._branches.values():
+            for task in branches.tasks.values():
+                task.cancel()
+        self._branches.clear()
+
+def speculation_summary() -> Dict:
+    """Branch hit rate and wasted generations for the metrics endpoint"""
+    hits = metrics.counter("speculation.hits")
+    misses = metrics.counter("speculation.misses")
+    launched = metrics.counter("speculation.launched")
+    return {
+        "enabled": _speculator.enabled if _speculator else settings.SPECULATION_ENABLED,
+        "launched": launched,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "wasted": metrics.counter("speculation.wasted"),
+        "recycled": metrics.counter("speculation.recycled"),
+        "pool_hits": metrics.counter("speculation.pool_hits"),
+        "waste_ratio": metrics.counter("speculation.wasted") / launched if launched else 0.0,
+    }
+
+metrics.register_collector("speculation", speculation_summary)
+
+# Shared speculative generator instance
+_speculator: Optional[SpeculativeGenerator] = None
+
+def get_speculative_generator() -> SpeculativeGenerator:
+    """Get the process-wide speculative generator"""
+    global _speculator
+    if _speculator is None:
+        _speculator = SpeculativeGenerator(
+            get_question_service(),
+            enabled=settings.SPECULATION_ENABLED,
+            ttl_seconds=settings.SPECULATION_TTL_SECONDS,
+            max_per_session=settings.SPECULATION_MAX_PER_SESSION,
+            pool_size=settings.SPECULATION_POOL_SIZE
+        )
+    return _speculator
@@ -0,0 +1,234 @@
+"""Structured LLM output: response schema, tolerant JSON extraction and answer checks"""
+
+import ast
+import json
+import math
+import operator
+import re
+from functools import cache
+from typing import Any, Dict, List, Optional
+from app.models.schemas import Question
+
+# Question fields the model is asked to produce; the rest are filled in locally
+GENERATED_FIELDS = ("question", "type", "options", "correct_answer", "explanation", "points")
+
+# Fields requested when explanations are generated lazily, after the question is served
+LAZY_GENERATED_FIELDS = ("question", "type", "options", "correct_answer", "points")
+
+# JSON-schema keywords rejected by strict structured-output mode; ranges are
+# enforced locally when the Question model is built instead
+_UNSUPPORTED_KEYWORDS = {"title", "default", "minimum", "maximum", "description"}
+
+def _clean_schema(node: Any, defs: Dict[str, Any]) -> Any:
+    """Inline $refs and strip keywords strict mode does not accept"""
+    if isinstance(node, dict):
+        if "$ref" in node:
+            return _clean_schema(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+        return {
+            key: _clean_schema(value, defs)
+            for key, value in node.items()
+            if key not in _UNSUPPORTED_KEYWORDS
+        }
+    if isinstance(node, list):
+        return [_clean_schema(item, defs) for item in node]
+    return node
+
+@cache
+def question_json_schema(fields: tuple = GENERATED_FIELDS) -> Dict[str, Any]:
+    """JSON schema for generated questions, derived from the Question model (cached; do not mutate)"""
+    full_schema = Question.model_json_schema()
+    defs = full_schema.get("$defs", {})
+    properties = {
+        name: _clean_schema(full_schema["properties"][name], defs)
+        for name in fields
+    }
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(fields),
+        "additionalProperties": False,
+    }
+
+@cache
+def question_response_format(fields: tuple = GENERATED_FIELDS) -> Dict[str, Any]:
+    """`response_format` payload for OpenAI-compatible chat completion APIs"""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "question",
+            "strict": True,
+            "schema": question_json_schema(fields),
+        },
+    }
+
+@cache
+def explanation_response_format() -> Dict[str, Any]:
+    """`response_format` payload for a standalone explanation"""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "explanation",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {"explanation": {"type": "string"}},
+                "required": ["explanation"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+class JSONObjectExtractor:
+    """Incrementally pull top-level JSON objects out of free-form model output.
+
+    Text outside braces (preambles, code fences, trailing remarks) is ignored,
+    so it can be fed streamed chunks or a complete response alike.
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk and return any objects completed by it"""
+        completed = []
+        for char in chunk:
+            if self._depth == 0:
+                if char == "{":
+                    self._buffer = [char]
+                    self._depth = 1
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    parsed = _loads_lenient("".join(self._buffer))
+                    if isinstance(parsed, dict):
+                        completed.append(parsed)
+                    self._buffer = []
+        return completed
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+def _loads_lenient(text: str) -> Any:
+    """json.loads with a single repair pass for trailing commas"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        try:
+            return json.loads(_TRAILING_COMMA.sub(r"\1", text))
+        except json.JSONDecodeError:
+            return None
+
+def extract_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """Return the first JSON object found in `text`, or None"""
+    objects = JSONObjectExtractor().feed(text)
+    return objects[0] if objects else None
+
+# Arithmetic self-consistency checks
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.Mod: operator.mod,
+}
+
+def _evaluate(node: ast.AST) -> float:
+    """Evaluate a purely numeric expression tree"""
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return float(node.value)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _evaluate(node.operand)
+        return -value if isinstance(node.op, ast.USub) else value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        if isinstance(node.op, ast.Pow) and abs(right) > 10:
+            raise ValueError("Exponent too large")
+        return _BINARY_OPERATORS[type(node.op)](left, right)
+    raise ValueError("Unsupported expression")
+
+_EXPRESSION = re.compile(r"(?:what is|calculate|compute|evaluate)\s+([0-9+\-*/×÷^().\s]+?)\s*\??$", re.IGNORECASE)
+_PERCENT_OF = re.compile(r"what is\s+(-?\d+(?:\.\d+)?)\s*%\s*of\s+(-?\d+(?:\.\d+)?)", re.IGNORECASE)
+_SQUARE_ROOT = re.compile(r"square root of\s+(\d+(?:\.\d+)?)", re.IGNORECASE)
+# The whole equation must be `ax ± b = c`, starting the text or after a colon,
+# so a linear tail inside a longer equation never matches
+_LINEAR = re.compile(r"(?:^|:)\s*(-?\d*)\s*x\s*([+-])\s*(\d+)\s*=\s*(-?\d+)\s*[.?]?\s*$", re.IGNORECASE)
+_POLYNOMIAL_AT = re.compile(
+    r"f\(x\)\s*=\s*(-?\d*)\s*x²\s*([+-])\s*(\d*)\s*x\s*([+-])\s*(\d+)\s*,\s*what is f\((-?\d+)\)\s*\??\s*$",
+    re.IGNORECASE
+)
+_HIGHER_POWER = re.compile(r"x\s*(?:[²³⁴]|\^|\*\*)", re.IGNORECASE)
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_ANSWER = re.compile(r"(-?\d+(?:\.\d+)?)(?:\s*/\s*(\d+(?:\.\d+)?))?")
+
+def solve_math_question(question_text: str) -> Optional[float]:
+    """Solve simple arithmetic question forms locally; None when not recognised"""
+    text = question_text.strip()
+    match = _POLYNOMIAL_AT.search(text)
+    if match:
+        a, b_sign, b, c_sign, c, x = match.groups()
+        a = float({"": "1", "-": "-1"}.get(a, a))
+        b = float(b or 1) * (1 if b_sign == "+" else -1)
+        c = float(c) * (1 if c_sign == "+" else -1)
+        return a * float(x) ** 2 + b * float(x) + c
+    if _HIGHER_POWER.search(text):
+        return None
+    try:
+        match = _PERCENT_OF.search(text)
+        if match:
+            return float(match.group(1)) * float(match.group(2)) / 100.0
+        match = _SQUARE_ROOT.search(text)
+        if match:
+            return math.sqrt(float(match.group(1)))
+        match = _LINEAR.search(text)
+        if match:
+            coefficient, sign, constant, total = match.groups()
+            coefficient = {"": "1", "-": "-1"}.get(coefficient, coefficient)
+            offset = float(constant) if sign == "+" else -float(constant)
+            return (float(total) - offset) / float(coefficient)
+        match = _EXPRESSION.search(text)
+        if match:
+            expression = match.group(1).replace("×", "*").replace("÷", "/").replace("^", "**")
+            if not _NUMBER.search(expression):
+                return None
+            return _evaluate(ast.parse(expression.strip(), mode="eval"))
+    except (ValueError, SyntaxError, ZeroDivisionError, OverflowError):
+        return None
+    return None
+
+def check_math_answer(question_text: str, answer: str) -> Optional[bool]:
+    """Re-solve a math question locally and compare it with the model's answer.
+
+    Returns None when the question is not in a form we can solve, so callers
+    only reject answers that are provably wrong.
+    """
+    expected = solve_math_question(question_text)
+    if expected is None:
+        return None
+    match = _ANSWER.search(answer.replace(",", ""))
+    if not match:
+        return False
+    numerator, denominator = match.groups()
+    if denominator is not None and float(denominator) == 0:
+        return False
+    value = float(numerator) / float(denominator) if denominator is not None else float(numerator)
+    return math.isclose(value, expected, rel_tol=1e-6, abs_tol=1e-3)
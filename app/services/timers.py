@@ -0,0 +1,239 @@
+"""Question expiry timers: a hierarchical timer wheel, or a Redis sorted set shared by workers"""
+
+import asyncio
+import math
+import time
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set
+import structlog
+from app.core.config import settings
+from app.core.metrics import get_metrics
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+# Called with the session ID once its question's deadline has passed
+ExpiryHandler = Callable[[str], Awaitable[None]]
+
+class _Timer:
+    __slots__ = ("key", "tick", "cancelled")
+
+    def __init__(self, key: Hashable, tick: int):
+        self.key = key
+        self.tick = tick
+        self.cancelled = False
+
+class TimerWheel:
+    """Hierarchical timing wheel.
+
+    Level 0 has one slot per tick; each slot of level L spans slots**L ticks.
+    A timer goes into the coarsest level whose range it fits and moves down a
+    level whenever the wheel reaches its slot, so scheduling and cancelling
+    are O(1) and a tick only touches the timers that are due (plus the rare
+    cascade), however many are pending.
+    """
+
+    def __init__(self, tick_seconds: float = 0.1, slots: int = 256, levels: int = 4, now: Optional[float] = None):
+        self.tick_seconds = tick_seconds
+        self.slots = slots
+        self.levels = levels
+        self.current_tick = int((time.time() if now is None else now) / tick_seconds)
+        self._wheels: List[List[List[_Timer]]] = [[[] for _ in range(slots)] for _ in range(levels)]
+        self._timers: Dict[Hashable, _Timer] = {}
+        self._due: List[Hashable] = []
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def _place(self, timer: _Timer):
+        delta = timer.tick - self.current_tick
+        if delta <= 0:
+            self._due.append(timer.key)
+            del self._timers[timer.key]
+            return
+        span = 1
+        for level in range(self.levels):
+            if delta < span * self.slots:
+                self._wheels[level][(timer.tick // span) % self.slots].append(timer)
+                return
+            span *= self.slots
+        # Beyond the wheel's range: park it in the top slot reached last and re-place it from there
+        span //= self.slots
+        self._wheels[-1][(self.current_tick // span) % self.slots].append(timer)
+
+    def schedule(self, key: Hashable, deadline: float):
+        """Fire `key` once `deadline` (epoch seconds) has passed; replaces any timer for the key"""
+        self.cancel(key)
+        timer = self._timers[key] = _Timer(key, math.ceil(deadline / self.tick_seconds))
+        self._place(timer)
+
+    def cancel(self, key: Hashable) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        # Left in its slot and skipped when the slot comes round
+        timer.cancelled = True
+        return True
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Move the wheel up to `now` and return the keys that expired"""
+        target = int(now / self.tick_seconds)
+        while self.current_tick < target:
+            self.current_tick += 1
+            tick = self.current_tick
+            for level in reversed(range(1, self.levels)):
+                span = self.slots ** level
+                if tick % span == 0:
+                    slot = self._wheels[level][(tick // span) % self.slots]
+                    self._wheels[level][(tick // span) % self.slots] = []
+                    for timer in slot:
+                        if not timer.cancelled:
+                            self._place(timer)
+            slot = self._wheels[0][tick % self.slots]
+            self._wheels[0][tick % self.slots] = []
+            for timer in slot:
+                if not timer.cancelled:
+                    del self._timers[timer.key]
+                    self._due.append(timer.key)
+        expired, self._due = self._due, []
+        return expired
+
+class QuestionTimers(ABC):
+    """Schedules the expiry of each session's current question"""
+
+    def __init__(self):
+        self._handler: Optional[ExpiryHandler] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._handling: Set[asyncio.Task] = set()
+
+    @abstractmethod
+    async def schedule(self, session_id: str, deadline: float):
+        """Expire the session's question at `deadline` (epoch seconds), replacing any earlier timer"""
+        pass
+
+    @abstractmethod
+    async def cancel(self, session_id: str):
+        pass
+
+    @abstractmethod
+    async def _expired(self) -> List[str]:
+        """Session IDs whose deadline has passed, each returned once"""
+        pass
+
+    @property
+    @abstractmethod
+    def interval(self) -> float:
+        pass
+
+    def _dispatch(self, session_ids: List[str]):
+        for session_id in session_ids:
+            metrics.incr("timers.expired")
+            task = asyncio.create_task(self._handler(session_id))
+            self._handling.add(task)
+            task.add_done_callback(self._handling.discard)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self._dispatch(await self._expired())
+            except Exception as e:
+                logger.error("Question timer error", error=str(e))
+
+    def start(self, handler: ExpiryHandler):
+        """Start firing expired timers into `handler` on the running event loop"""
+        self._handler = handler
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            self._runner = None
+
+class InMemoryQuestionTimers(QuestionTimers):
+    """Timer wheel ticking in this process's event loop"""
+
+    def __init__(self, tick_seconds: float = 0.1):
+        super().__init__()
+        self.wheel = TimerWheel(tick_seconds)
+
+    @property
+    def interval(self) -> float:
+        return self.wheel.tick_seconds
+
+    async def schedule(self, session_id: str, deadline: float):
+        self.wheel.schedule(session_id, deadline)
+
+    async def cancel(self, session_id: str):
+        self.wheel.cancel(session_id)
+
+    async def _expired(self) -> List[str]:
+        return self.wheel.advance(time.time())
+
+    def status(self) -> Dict:
+        return {"backend": "memory", "pending": len(self.wheel)}
+
+class RedisQuestionTimers(QuestionTimers):
+    """Deadlines in a sorted set polled by every worker.
+
+    A due member is claimed with ZREM, which succeeds for exactly one worker,
+    so each expiry is handled once however many workers poll.
+    """
+
+    KEY = "question_timers"
+
+    def __init__(self, poll_seconds: float = 0.5, batch_size: int = 500, redis_url: Optional[str] = None):
+        super().__init__()
+        import redis.asyncio as redis
+        self.redis = redis.from_url(redis_url or settings.REDIS_URL)
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+
+    @property
+    def interval(self) -> float:
+        return self.poll_seconds
+
+    async def schedule(self, session_id: str, deadline: float):
+        try:
+            await self.redis.zadd(self.KEY, {session_id: deadline})
+        except Exception as e:
+            logger.error("Redis timer schedule error", error=str(e), session_id=session_id)
+
+    async def cancel(self, session_id: str):
+        try:
+            await self.redis.zrem(self.KEY, session_id)
+        except Exception as e:
+            logger.error("Redis timer cancel error", error=str(e), session_id=session_id)
+
+    async def _expired(self) -> List[str]:
+        due = await self.redis.zrangebyscore(self.KEY, "-inf", time.time(), start=0, num=self.batch_size)
+        if not due:
+            return []
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for member in due:
+                pipe.zrem(self.KEY, member)
+            claimed = await pipe.execute()
+        return [member.decode() for member, won in zip(due, claimed, strict=True) if won]
+
+    def status(self) -> Dict:
+        return {"backend": "redis"}
+
+# Question timers instance
+_timers: Optional[QuestionTimers] = None
+
+def get_question_timers() -> QuestionTimers:
+    """Get the question timers described by settings"""
+    global _timers
+    if _timers is None:
+        if settings.TIMER_BACKEND == "redis":
+            _timers = RedisQuestionTimers(settings.TIMER_POLL_SECONDS)
+        else:
+            _timers = InMemoryQuestionTimers(settings.TIMER_TICK_SECONDS)
+    return _timers
+
+def timer_status() -> Dict:
+    """Pending timers for the metrics endpoint"""
+    return _timers.status() if _timers else {}
+
+metrics.register_collector("timers", timer_status)
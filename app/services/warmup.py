@@ -0,0 +1,109 @@
+"""Startup warm-up: open connections and fill caches before readiness reports ready"""
+
+import asyncio
+import time
+from typing import Awaitable, Dict, List, Optional
+import structlog
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.metrics import get_metrics
+from app.models.schemas import FieldType
+from app.services.question_service import get_question_service
+from app.services.speculation import get_speculative_generator
+
+logger = structlog.get_logger()
+metrics = get_metrics()
+
+class Warmup:
+    """Warm-up steps run once per worker at startup.
+
+    Without it the first requests pay for TLS handshakes to the database
+    and the LLM, page faults in the question bank and a cold question pool.
+    The steps run concurrently where they are independent; a failed step is
+    logged and skipped, since every step only saves latency the first
+    request would otherwise pay. Readiness reports "warming" until done.
+    """
+
+    def __init__(self, timeout_seconds: float = 15.0, pool_per_field: int = 2):
+        self.timeout_seconds = timeout_seconds
+        self.pool_per_field = pool_per_field
+        self.state = "idle"  # idle | warming | ready
+        self.steps_ms: Dict[str, float] = {}
+        self.failed: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def warming(self) -> bool:
+        return self.state == "warming"
+
+    async def _step(self, name: str, work: Awaitable):
+        started = time.perf_counter()
+        try:
+            if await work is False:
+                self.failed.append(name)
+        except Exception as e:
+            logger.error("Warm-up step failed", step=name, error=str(e))
+            self.failed.append(name)
+        finally:
+            self.steps_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    async def _steps(self):
+        question_service = get_question_service()
+        steps = [
+            self._step("database", get_database().warm_up()),
+            self._step("llm", question_service.llm.warm_up()),
+        ]
+        if question_service.bank is not None:
+            steps.append(self._step("question_bank", asyncio.to_thread(question_service.bank.warm_up)))
+        if self.pool_per_field > 0:
+            speculator = get_speculative_generator()
+            difficulty = int(settings.DEFAULT_DIFFICULTY)
+            steps.append(self._step("question_pool", asyncio.gather(
+                *(speculator.prefill(field, difficulty, self.pool_per_field) for field in FieldType)
+            )))
+        await asyncio.gather(*steps)
+
+    async def run(self):
+        self.state = "warming"
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._steps(), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            # Serve anyway: a slow dependency should not keep the worker out of rotation
+            logger.warning("Warm-up timed out", timeout=self.timeout_seconds, steps=self.steps_ms)
+            self.failed.append("timeout")
+        finally:
+            self.state = "ready"
+        metrics.observe("warmup.seconds", time.perf_counter() - started)
+        logger.info("Warm-up finished", steps=self.steps_ms, failed=self.failed)
+
+    def start(self) -> asyncio.Task:
+        """Run warm-up in the background; readiness reports warming until it is done"""
+        if self._task is None:
+            self.state = "warming"
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+    def status(self) -> Dict:
+        return {"state": self.state, "steps_ms": self.steps_ms, "failed": self.failed}
+
+# Warm-up instance
+_warmup: Optional[Warmup] = None
+
+def get_warmup() -> Warmup:
+    """Get the process-wide warm-up"""
+    global _warmup
+    if _warmup is None:
+        _warmup = Warmup(settings.WARMUP_TIMEOUT_SECONDS, settings.WARMUP_POOL_PER_FIELD)
+    return _warmup
+
+def warmup_status() -> Dict:
+    """Warm-up progress for the metrics endpoint"""
+    return _warmup.status() if _warmup else {}
+
+metrics.register_collector("warmup", warmup_status)
@@ -0,0 +1,34 @@
+"""Report per-field accuracy from the session archive.
+
+    python -m app.tools.archive_report --path archive
+    python -m app.tools.archive_report --path archive --since 2026-01-01
+"""
+
+import argparse
+import os
+
+# The report never serves requests, but Settings insists on these and reads
+# them at import time, so they are set before the app imports below
+os.environ.setdefault("API_SECRET", "offline-report")
+os.environ.setdefault("OPENAI_API_KEY", "offline-report")
+
+from app.core.config import settings  # noqa: E402
+from app.services.archive import field_accuracy  # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default=settings.ARCHIVE_PATH, help="archive root (ARCHIVE_PATH)")
+    parser.add_argument("--since", help="first date to include, YYYY-MM-DD")
+    args = parser.parse_args()
+
+    report = field_accuracy(args.path, args.since)
+    if not report:
+        print("No archived answers")
+        return
+    print(f"{'field':>16} {'answers':>10} {'accuracy':>9} {'avg_response_s':>15}")
+    for field, stats in sorted(report.items()):
+        average = stats["average_response_seconds"]
+        print(f"{field:>16} {stats['answers']:>10} {stats['accuracy']:>9.3f} {average if average is not None else '-':>15}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""Build a question bank file offline.
+
+Candidates come from the procedural templates and, optionally, an LLM
+backend. A process pool validates them, duplicates are dropped by content
+hash, and accepted questions are appended to per-cell checkpoint shards in
+`<out>.parts/`. Re-running the same command resumes from those shards; the
+bank file is written once every cell is done, followed by the embedding
+index the diversity selector reads (`<out>.vec.npy`).
+
+    python -m app.tools.build_bank --out bank.iqb --per-cell 100000 --workers 8
+    python -m app.tools.build_bank --out bank.iqb --llm stub --llm-share 0.5
+    python -m app.tools.build_bank --out bank.iqb --index-only
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# The builder never serves requests, but Settings insists on these and reads
+# them at import time, so they are set before the app imports below
+os.environ.setdefault("API_SECRET", "offline-build")
+os.environ.setdefault("OPENAI_API_KEY", "offline-build")
+
+import orjson  # noqa: E402
+import structlog  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.models.schemas import FieldType, Question, QuestionType  # noqa: E402
+from app.services.dedup import question_fingerprint  # noqa: E402
+from app.services.diversity import build_vector_index, index_path  # noqa: E402
+from app.services.llm_provider import StubProvider, build_llm_provider  # noqa: E402
+from app.services.question_bank import Cell, QuestionBank, write_bank  # noqa: E402
+from app.services.question_service import QuestionService  # noqa: E402
+from app.services.structured_output import check_math_answer, solve_math_question  # noqa: E402
+
+logger = structlog.get_logger()
+
+def _clean_number(value: float) -> Optional[str]:
+    """Answer text for values a person can type exactly (integers, two decimals)"""
+    if math.isclose(value, round(value), abs_tol=1e-9):
+        return str(int(round(value)))
+    if math.isclose(value, round(value, 2), abs_tol=1e-9):
+        return f"{value:.2f}".rstrip("0")
+    return None
+
+def validate_candidates(candidates: List[Dict]) -> List[Tuple[int, bytes]]:
+    """Validate candidate questions and return the accepted ones as (content hash, encoded).
+
+    Runs in worker processes. Math answers are re-solved locally: template
+    questions get the solved answer (the templates only approximate it) and
+    LLM questions must agree with it. Math template questions the solver
+    cannot answer exactly (quadratics, derivatives) are dropped; questions in
+    other fields keep their own answers.
+    """
+    accepted = []
+    for candidate in candidates:
+        source = candidate.pop("source", "template")
+        try:
+            question = Question.model_validate(candidate)
+        except ValueError:
+            continue
+        if question.type == QuestionType.MULTIPLE_CHOICE and (
+            not question.options or question.correct_answer not in question.options
+        ):
+            continue
+
+        if question.field == FieldType.MATH:
+            if source == "template":
+                solved = solve_math_question(question.question)
+                answer = _clean_number(solved) if solved is not None else None
+                if answer is None:
+                    continue
+                question.correct_answer = answer
+                question.type = QuestionType.NUMBER
+            elif check_math_answer(question.question, question.correct_answer) is False:
+                continue
+
+        fingerprint = question_fingerprint(question.question)
+        question.id = f"bank_{fingerprint:016x}"
+        accepted.append((fingerprint, orjson.dumps(question.model_dump(mode="json"))))
+    return accepted
+
+# Per-process question service used to render templates inside workers
+_worker_service: Optional[QuestionService] = None
+
+def produce_template_batch(cell: Cell, count: int, seed: int) -> List[Tuple[int, bytes]]:
+    """Render and validate `count` template questions in a worker process"""
+    global _worker_service
+    if _worker_service is None:
+        _worker_service = QuestionService(provider=StubProvider())
+    # Forked workers inherit the parent's random state; seed every batch explicitly
+    random.seed(seed)
+    field, difficulty = cell
+    candidates = [
+        {**_worker_service._generate_template_question(field, difficulty).model_dump(mode="json"), "source": "template"}
+        for _ in range(count)
+    ]
+    return validate_candidates(candidates)
+
+def _shard_name(cell: Cell) -> str:
+    field, difficulty = cell
+    return f"{field.value}-{difficulty}.jsonl"
+
+class BankBuilder:
+    """Fill every (field, difficulty) cell up to a target, checkpointing as it goes"""
+
+    def __init__(
+        self,
+        out: str,
+        cells: List[Cell],
+        per_cell: int,
+        workers: int,
+        batch_size: int = 512,
+        max_stale_batches: int = 20,
+        question_service: Optional[QuestionService] = None,
+        llm_share: float = 0.0,
+        llm_concurrency: int = 16,
+        diversity_dim: int = 0
+    ):
+        self.out = out
+        self.parts_dir = f"{out}.parts"
+        self.cells = cells
+        self.per_cell = per_cell
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_stale_batches = max_stale_batches
+        self.question_service = question_service or QuestionService(provider=StubProvider())
+        self.llm_share = llm_share
+        self.llm_concurrency = llm_concurrency
+        self.diversity_dim = diversity_dim
+        self.seen: Set[int] = set()
+        self.counts: Dict[Cell, int] = {}
+        self.recent: Dict[Cell, List[str]] = {}
+        self.stats = {"candidates": 0, "accepted": 0, "duplicates": 0, "rejected": 0, "resumed": 0}
+
+    def resume(self):
+        """Reload checkpoint shards: counts per cell and the content hashes seen so far"""
+        os.makedirs(self.parts_dir, exist_ok=True)
+        for cell in self.cells:
+            path = os.path.join(self.parts_dir, _shard_name(cell))
+            count = 0
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    data = f.read()
+                # Drop a partially written last line left by an interrupted run
+                complete = data[:data.rfind(b"\n") + 1]
+                if len(complete) != len(data):
+                    with open(path, "wb") as f:
+                        f.write(complete)
+                for line in complete.splitlines():
+                    self.seen.add(int(orjson.loads(line)["id"][len("bank_"):], 16))
+                    count += 1
+            self.counts[cell] = count
+            self.stats["resumed"] += count
+
+    def has_templates(self, cell: Cell) -> bool:
+        return cell[0] in self.question_service.question_templates
+
+    async def _llm_candidates(self, cell: Cell, count: int) -> List[Dict]:
+        field, difficulty = cell
+        semaphore = asyncio.Semaphore(self.llm_concurrency)
+
+        async def generate():
+            async with semaphore:
+                return await self.question_service._generate_ai_question(field, difficulty, self.recent.get(cell))
+
+        candidates = []
+        for question in await asyncio.gather(*(generate() for _ in range(count))):
+            if question is not None:
+                candidates.append({**question.model_dump(mode="json"), "source": "llm"})
+                # Vary the prompt so the backend does not repeat itself
+                self.recent[cell] = (self.recent.get(cell, []) + [question.question])[-3:]
+        return candidates
+
+    async def _submit(self, cell: Cell, pool: ProcessPoolExecutor) -> List[Tuple[asyncio.Future, int]]:
+        """Queue one batch of candidates for the cell; returns futures with their candidate counts"""
+        loop = asyncio.get_running_loop()
+        llm_count = sum(random.random() < self.llm_share for _ in range(self.batch_size))
+        if not self.has_templates(cell):
+            llm_count = self.batch_size if self.llm_share else 0
+        submitted = []
+        if llm_count:
+            candidates = await self._llm_candidates(cell, llm_count)
+            submitted.append((loop.run_in_executor(pool, validate_candidates, candidates), len(candidates)))
+        template_count = self.batch_size - llm_count
+        if template_count:
+            future = loop.run_in_executor(pool, produce_template_batch, cell, template_count, random.getrandbits(64))
+            submitted.append((future, template_count))
+        for _, count in submitted:
+            self.stats["candidates"] += count
+        return submitted
+
+    def _accept(self, cell: Cell, shard, accepted: List[Tuple[int, bytes]], submitted: int) -> int:
+        """Append new, unseen questions to the cell's shard; returns how many were new"""
+        lines = []
+        for fingerprint, record in accepted:
+            if self.counts[cell] + len(lines) >= self.per_cell:
+                break
+            if fingerprint in self.seen:
+                self.stats["duplicates"] += 1
+                continue
+            self.seen.add(fingerprint)
+            lines.append(record + b"\n")
+        self.stats["rejected"] += submitted - len(accepted)
+        if lines:
+            shard.write(b"".join(lines))
+            shard.flush()
+            self.counts[cell] += len(lines)
+            self.stats["accepted"] += len(lines)
+        return len(lines)
+
+    async def fill_cell(self, cell: Cell, pool: ProcessPoolExecutor):
+        if not self.has_templates(cell) and not self.llm_share:
+            logger.info("Cell skipped: no templates and no LLM backend", field=cell[0].value, difficulty=cell[1])
+            return
+        pending: Dict[asyncio.Future, int] = {}
+        stale = 0
+        started = time.perf_counter()
+        before = self.counts[cell]
+        with open(os.path.join(self.parts_dir, _shard_name(cell)), "ab") as shard:
+            while True:
+                exhausted = self.counts[cell] >= self.per_cell or stale >= self.max_stale_batches
+                while not exhausted and len(pending) < self.workers * 2:
+                    pending.update(await self._submit(cell, pool))
+                if not pending:
+                    break
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    submitted = pending.pop(future)
+                    stale = 0 if self._accept(cell, shard, future.result(), submitted) else stale + 1
+            os.fsync(shard.fileno())
+
+        added = self.counts[cell] - before
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "Cell built",
+            field=cell[0].value,
+            difficulty=cell[1],
+            questions=self.counts[cell],
+            added=added,
+            exhausted=self.counts[cell] < self.per_cell,
+            questions_per_second_per_core=round(added / elapsed / self.workers, 1) if elapsed else 0.0
+        )
+
+    def _records(self, cell: Cell) -> Iterator[bytes]:
+        with open(os.path.join(self.parts_dir, _shard_name(cell)), "rb") as f:
+            for line in f:
+                yield line.rstrip(b"\n")
+
+    async def build(self) -> Dict:
+        self.resume()
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for cell in self.cells:
+                await self.fill_cell(cell, pool)
+        elapsed = time.perf_counter() - started
+
+        total = write_bank(self.out, {cell: self._records(cell) for cell in self.cells if self.counts[cell]})
+        if self.diversity_dim:
+            write_diversity_index(self.out, self.diversity_dim)
+        return {
+            **self.stats,
+            "bank_questions": total,
+            "elapsed_seconds": elapsed,
+            "questions_per_second": self.stats["accepted"] / elapsed if elapsed else 0.0,
+            "questions_per_second_per_core": self.stats["accepted"] / elapsed / self.workers if elapsed else 0.0,
+        }
+
+def write_diversity_index(out: str, dim: int) -> int:
+    """Embed the bank at `out` for the diversity selector; returns questions indexed"""
+    bank = QuestionBank(out)
+    try:
+        return build_vector_index(bank, index_path(out), dim)
+    finally:
+        bank.close()
+
+def _question_service(llm: str) -> QuestionService:
+    if llm == "configured":
+        return QuestionService(provider=build_llm_provider())
+    return QuestionService(provider=StubProvider())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", required=True, help="bank file to write")
+    parser.add_argument("--per-cell", type=int, default=10_000, help="target questions per (field, difficulty)")
+    parser.add_argument("--fields", nargs="*", choices=[field.value for field in FieldType], help="default: all")
+    parser.add_argument("--max-difficulty", type=int, default=settings.MAX_DIFFICULTY)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--max-stale-batches", type=int, default=20, help="batches without a new question before a cell counts as exhausted")
+    parser.add_argument("--llm", choices=["none", "stub", "configured"], default="none", help="'configured' uses LLM_PROVIDER / LLM_BASE_URL")
+    parser.add_argument("--llm-share", type=float, default=0.5, help="share of candidates requested from the LLM")
+    parser.add_argument("--llm-concurrency", type=int, default=16)
+    parser.add_argument("--diversity-dim", type=int, default=settings.DIVERSITY_DIM, help="embedding size of the diversity index; 0 skips it")
+    parser.add_argument("--index-only", action="store_true", help="only (re)build the diversity index of an existing bank")
+    args = parser.parse_args()
+
+    if args.index_only:
+        print(f"{'indexed_questions':>30}: {write_diversity_index(args.out, args.diversity_dim)}")
+        return
+
+    fields = [FieldType(value) for value in args.fields] if args.fields else list(FieldType)
+    builder = BankBuilder(
+        args.out,
+        [(field, difficulty) for field in fields for difficulty in range(1, args.max_difficulty + 1)],
+        per_cell=args.per_cell,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        max_stale_batches=args.max_stale_batches,
+        question_service=_question_service(args.llm),
+        llm_share=args.llm_share if args.llm != "none" else 0.0,
+        llm_concurrency=args.llm_concurrency,
+        diversity_dim=args.diversity_dim
+    )
+    result = asyncio.run(builder.build())
+    for key, value in result.items():
+        print(f"{key:>30}: {value:.3f}" if isinstance(value, float) else f"{key:>30}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Sweep adaptive difficulty settings over a synthetic test-taker population.
+
+Every combination of the listed thresholds, adjustments and session lengths
+is simulated for the same population and reported as one row.
+
+    python -m app.tools.simulate --users 1000000 --workers 8
+    python -m app.tools.simulate --threshold 0.6 0.7 0.8 --adjustment 0.25 0.5 1.0
+    python -m app.tools.simulate --users 20000 --mode sessions --generation stub
+"""
+
+import argparse
+import itertools
+import os
+
+# The simulator never serves requests, but Settings insists on these and reads
+# them at import time, so they are set before the app imports below
+os.environ.setdefault("API_SECRET", "offline-simulation")
+os.environ.setdefault("OPENAI_API_KEY", "offline-simulation")
+
+from app.core.config import settings  # noqa: E402
+from app.models.schemas import FieldType  # noqa: E402
+from app.services.simulation import SimulationConfig, simulate  # noqa: E402
+
+COLUMNS = [
+    ("accuracy", "accuracy"),
+    ("converged_share", "converged"),
+    ("questions_to_converge", "q_to_converge"),
+    ("reversals_per_session", "reversals"),
+    ("final_difficulty_rmse", "rmse"),
+    ("ability_difficulty_corr", "corr_difficulty"),
+    ("ability_score_corr", "corr_score"),
+    ("users_per_second", "users_per_s"),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000, help="test-takers per configuration")
+    parser.add_argument("--threshold", type=float, nargs="+", default=[settings.DIFFICULTY_THRESHOLD])
+    parser.add_argument("--adjustment", type=float, nargs="+", default=[settings.DIFFICULTY_ADJUSTMENT])
+    parser.add_argument("--questions", type=int, nargs="+", default=[settings.QUESTIONS_PER_SESSION])
+    parser.add_argument("--starting-difficulty", type=int, default=settings.DEFAULT_DIFFICULTY)
+    parser.add_argument("--field", choices=[field.value for field in FieldType], default=FieldType.MATH.value)
+    parser.add_argument("--ability-mean", type=float, default=3.0, help="population mean on the difficulty scale")
+    parser.add_argument("--ability-sd", type=float, default=1.0)
+    parser.add_argument("--discrimination", type=float, default=1.7, help="slope of the response curve")
+    parser.add_argument("--guessing", type=float, default=0.0, help="chance of a correct answer far above ability")
+    parser.add_argument("--generation", choices=["template", "stub"], default="template")
+    parser.add_argument("--mode", choices=["vectorized", "sessions"], default="vectorized", help="'sessions' drives a full UserSession per test-taker")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-size", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'threshold':>9} {'adjust':>6} {'questions':>9} " + " ".join(f"{title:>15}" for _, title in COLUMNS))
+    for threshold, adjustment, questions in itertools.product(args.threshold, args.adjustment, args.questions):
+        config = SimulationConfig(
+            difficulty_threshold=threshold,
+            difficulty_adjustment=adjustment,
+            questions_per_session=questions,
+            starting_difficulty=args.starting_difficulty,
+            field=FieldType(args.field),
+            ability_mean=args.ability_mean,
+            ability_sd=args.ability_sd,
+            discrimination=args.discrimination,
+            guessing=args.guessing,
+            generation=args.generation
+        )
+        # The same seed for every row: each configuration faces the same population
+        report = simulate(config, args.users, args.workers, args.shard_size, args.seed, args.mode)
+        values = [report[key] for key, _ in COLUMNS]
+        print(f"{threshold:>9.2f} {adjustment:>6.2f} {questions:>9} " + " ".join(
+            f"{value:>15.3f}" if value is not None else f"{'-':>15}" for value in values
+        ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark the POST /api/v1/chat/answer path in-process.
+
+Runs the full ASGI stack (routing, validation, middleware, serialization)
+with the stub LLM provider and the in-memory database, so the numbers
+reflect server-side overhead rather than upstream latency.
+
+    python -m benchmarks.bench_answer_path --requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+# Settings are read at import time, so the environment is set before the app imports
+os.environ.setdefault("API_SECRET", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["REQUIRE_AUTH"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+from app.core.database import init_database  # noqa: E402
+from app.main import app  # noqa: E402
+
+async def _new_session(client: httpx.AsyncClient) -> str:
+    response = await client.post("/api/v1/sessions/create", json={})
+    session_id = response.json()["session"]["id"]
+    await client.post("/api/v1/chat/select-field", json={"session_id": session_id, "field": "math"})
+    return session_id
+
+async def run(requests: int) -> dict:
+    await init_database()
+    latencies = []
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        session_id = await _new_session(client)
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/v1/chat/answer",
+                json={"session_id": session_id, "answer": "42"},
+                headers={"Accept-Encoding": "gzip"}
+            )
+            latencies.append(time.perf_counter() - started)
+            if response.json()["is_complete"]:
+                session_id = await _new_session(client)
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "throughput_rps": requests / sum(latencies),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    result = asyncio.run(run(args.requests))
+    for key, value in result.items():
+        print(f"{key:>16}: {value:.3f}" if isinstance(value, float) else f"{key:>16}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Benchmark the Parquet session archive: batch writes and per-field accuracy queries.
+
+Writes synthetic answer rows in archiver-sized batches spread over --days
+days, then computes per-field accuracy with the vectorized field_accuracy
+helper (before and after compacting closed days) and with a row-by-row
+Python loop over the same files.
+
+    python -m benchmarks.bench_archive --rows 2000000 --batch 5000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Settings are read at import time, so the environment is set before the app imports
+os.environ.setdefault("API_SECRET", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app.models.schemas import FieldType  # noqa: E402
+from app.services.archive import compact_partitions, field_accuracy, write_answer_rows  # noqa: E402
+
+def _rows(count: int, rng: random.Random, start: datetime, window: timedelta):
+    fields = [field.value for field in FieldType]
+    rows = []
+    for i in range(count):
+        difficulty = rng.randint(1, 5)
+        correct = rng.random() < 0.9 - difficulty * 0.1
+        answered_at = start + timedelta(seconds=rng.uniform(0, window.total_seconds()))
+        rows.append({
+            "session_id": f"s{i // 10}",
+            "user_id": f"u{i // 100}",
+            "field": rng.choice(fields),
+            "date": answered_at.date().isoformat(),
+            "question_id": f"q_{rng.getrandbits(48):012x}",
+            "difficulty": difficulty,
+            "correct": correct,
+            "points": difficulty * 2 if correct else 0,
+            "response_seconds": rng.uniform(2, 60),
+            "timed_out": False,
+            "answered_at": answered_at,
+        })
+    return rows
+
+def _python_accuracy(path: str) -> dict:
+    import pyarrow.dataset as ds
+    counts: dict = {}
+    for row in ds.dataset(path, format="parquet", partitioning="hive").to_table(columns=["field", "correct"]).to_pylist():
+        answers, correct = counts.get(row["field"], (0, 0))
+        counts[row["field"]] = (answers + 1, correct + row["correct"])
+    return {field: correct / answers for field, (answers, correct) in counts.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--batch", type=int, default=5_000, help="rows per archiver batch")
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    start = datetime(2026, 1, 1)
+    batches = -(-args.rows // args.batch)
+    # Batches arrive in time order, as the archiver drains sessions as they age
+    window = timedelta(days=args.days) / batches
+    with tempfile.TemporaryDirectory() as path:
+        write_seconds = 0.0
+        for batch, offset in enumerate(range(0, args.rows, args.batch)):
+            rows = _rows(min(args.batch, args.rows - offset), rng, start + window * batch, window)
+            started = time.perf_counter()
+            write_answer_rows(path, rows)
+            write_seconds += time.perf_counter() - started
+        files = sum(len(names) for _, _, names in os.walk(path))
+
+        started = time.perf_counter()
+        report = field_accuracy(path)
+        fragmented_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        compact_partitions(path, before=(start + timedelta(days=args.days + 1)).date().isoformat())
+        compact_seconds = time.perf_counter() - started
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+        started = time.perf_counter()
+        field_accuracy(path)
+        vectorized_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        field_accuracy(path, since=(start + timedelta(days=args.days - 7)).date().isoformat())
+        pruned_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        _python_accuracy(path)
+        python_seconds = time.perf_counter() - started
+
+    answers = sum(stats["answers"] for stats in report.values())
+    print(f"{'rows':>24}: {answers}")
+    print(f"{'files_before_compaction':>24}: {files}")
+    print(f"{'bytes_per_row':>24}: {size / answers:.3f}")
+    print(f"{'write_rows_per_s':>24}: {args.rows / write_seconds:.3f}")
+    print(f"{'fragmented_query_s':>24}: {fragmented_seconds:.3f}")
+    print(f"{'compaction_s':>24}: {compact_seconds:.3f}")
+    print(f"{'vectorized_query_s':>24}: {vectorized_seconds:.3f}")
+    print(f"{'last_week_query_s':>24}: {pruned_seconds:.3f}")
+    print(f"{'python_loop_query_s':>24}: {python_seconds:.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark time to first successful answer from a cold process.
+
+Each run starts a fresh interpreter that imports the app, runs its lifespan
+(with or without a blocking warm-up) and then creates a session, selects a
+field and answers the first question. The stub LLM provider adds
+--llm-latency-ms per generation, standing in for a remote model.
+
+    python -m benchmarks.bench_cold_start --runs 5 --llm-latency-ms 300
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+def _child():
+    spawned_at = float(os.environ["BENCH_SPAWNED_AT"])
+    started = time.perf_counter()
+    import asyncio
+    import httpx
+    from app.main import app
+    imported = time.perf_counter()
+
+    async def first_answer() -> dict:
+        async with app.router.lifespan_context(app):
+            ready = time.perf_counter()
+            async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+                session_id = (await client.post("/api/v1/sessions/create", json={})).json()["session"]["id"]
+                question = (await client.post(
+                    "/api/v1/chat/select-field", json={"session_id": session_id, "field": "math"}
+                )).json()["question"]
+                response = await client.post(
+                    "/api/v1/chat/answer",
+                    json={"session_id": session_id, "answer": question["correct_answer"], "question_id": question["id"]}
+                )
+                response.raise_for_status()
+            answered = time.perf_counter()
+            answered_at = time.time()
+        return {
+            "import_ms": (imported - started) * 1000,
+            "startup_ms": (ready - imported) * 1000,
+            "first_answer_ms": (answered - ready) * 1000,
+            # Includes interpreter start-up: measured from when the parent spawned the process
+            "ttfa_ms": (answered_at - spawned_at) * 1000,
+        }
+
+    print(json.dumps(asyncio.run(first_answer())))
+
+def run(warmup: bool, llm_latency_ms: int) -> dict:
+    env = {
+        **os.environ,
+        "API_SECRET": "bench",
+        "OPENAI_API_KEY": "bench",
+        "LLM_PROVIDER": "stub",
+        "STUB_LLM_LATENCY_MS": str(llm_latency_ms),
+        "REQUIRE_AUTH": "false",
+        "RATE_LIMIT_ENABLED": "false",
+        "WARMUP_ENABLED": str(warmup).lower(),
+        "WARMUP_BLOCKING": "true",
+        "BENCH_SPAWNED_AT": repr(time.time()),
+    }
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_cold_start", "--child"],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--llm-latency-ms", type=int, default=300)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child()
+        return
+
+    keys = ("import_ms", "startup_ms", "first_answer_ms", "ttfa_ms")
+    print(f"{'warm-up':>8} " + " ".join(f"{key:>16}" for key in keys) + "  (median)")
+    for warmup in (False, True):
+        results = [run(warmup, args.llm_latency_ms) for _ in range(args.runs)]
+        medians = [statistics.median(result[key] for result in results) for key in keys]
+        print(f"{'on' if warmup else 'off':>8} " + " ".join(f"{value:>16.1f}" for value in medians))
+
+if __name__ == "__main__":
+    main()
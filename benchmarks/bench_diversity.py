@@ -0,0 +1,93 @@
+"""Benchmark diversity-aware question selection over a large bank.
+
+Writes a one-cell bank of --questions synthetic questions drawn from a dozen
+topics and embeds it. Then plays sessions that pick each question against
+the last five served, timing selection and comparing how close the chosen
+question is to that history with the selector and with a random pick.
+
+    python -m benchmarks.bench_diversity --questions 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+# Settings are read at import time, so the environment is set before the app imports
+os.environ.setdefault("API_SECRET", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import numpy as np  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.metrics import percentile  # noqa: E402
+from app.models.schemas import FieldType, Question, QuestionType  # noqa: E402
+from app.services.diversity import DiversitySelector, build_vector_index, index_path  # noqa: E402
+from app.services.question_bank import QuestionBank, write_bank  # noqa: E402
+
+TOPICS = [
+    "What is {a} + {b}?",
+    "What is {a} × {b}?",
+    "Solve for x: {a}x + {b} = {c}",
+    "What is the square root of {a}?",
+    "What is {a}% of {b}?",
+    "If f(x) = {a}x² + {b}x + {c}, what is f({d})?",
+    "What is the derivative of {a}x³ + {b}x²?",
+    "Solve the quadratic equation: x² + {a}x + {b} = 0",
+    "A train travels {a} km in {b} hours. What is its average speed?",
+    "What is the next number in the sequence {a}, {b}, {c}, ___?",
+    "A shirt costs ${a} after a {b}% discount. What was the original price?",
+    "How many ways can {a} people sit in a row of {b} chairs?",
+]
+
+def _records(questions: int, rng: random.Random):
+    for i in range(questions):
+        values = {key: rng.randint(1, 99) for key in "abcd"}
+        yield Question(
+            id=f"bench_{i}", field=FieldType.MATH, difficulty=3, question=TOPICS[i % len(TOPICS)].format(**values),
+            type=QuestionType.TEXT, correct_answer="0", points=6
+        ).model_dump_json().encode()
+
+def run(args) -> None:
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bank.iqb")
+        write_bank(path, {(FieldType.MATH, 3): _records(args.questions, rng)})
+        bank = QuestionBank(path)
+        started = time.perf_counter()
+        build_vector_index(bank, index_path(path), args.dim)
+        index_seconds = time.perf_counter() - started
+        selector = DiversitySelector(np.load(index_path(path), mmap_mode="r"), args.dim, args.candidates, seed=7)
+
+        timings, served_similarity, random_similarity = [], [], []
+        for _ in range(args.sessions):
+            history = [bank.sample(FieldType.MATH, 3, rng).question]
+            for _ in range(settings.QUESTIONS_PER_SESSION - 1):
+                started = time.perf_counter()
+                index = selector.pick_bank(bank, FieldType.MATH, 3, history)
+                timings.append(time.perf_counter() - started)
+                served = bank.get(index).question
+                served_similarity.append(selector.similarity(served, history))
+                random_similarity.append(selector.similarity(bank.sample(FieldType.MATH, 3, rng).question, history))
+                history = (history + [served])[-settings.RECENT_QUESTION_HISTORY:]
+        bank.close()
+
+    print(f"{'questions':>28}: {args.questions}")
+    print(f"{'index_mb':>28}: {args.questions * args.dim / 1e6:.3f}")
+    print(f"{'index_build_us_per_question':>28}: {index_seconds / args.questions * 1e6:.3f}")
+    print(f"{'select_p50_us':>28}: {percentile(timings, 50) * 1e6:.3f}")
+    print(f"{'select_p99_us':>28}: {percentile(timings, 99) * 1e6:.3f}")
+    print(f"{'random_max_similarity':>28}: {np.mean(random_similarity):.3f}")
+    print(f"{'selected_max_similarity':>28}: {np.mean(served_similarity):.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--candidates", type=int, default=512)
+    parser.add_argument("--sessions", type=int, default=500)
+    args = parser.parse_args()
+    run(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare question generation with eager and lazy explanations.
+
+Uses the stub provider with a per-token decode delay, so latency scales with
+the number of output tokens as it does for a hosted model. Lazy mode also
+reports the cost of explaining the share of questions whose explanation is
+actually requested.
+
+    python -m benchmarks.bench_explanations --questions 200 --explained-share 0.3
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+# Settings are read at import time, so the environment is set before the app imports
+os.environ.setdefault("API_SECRET", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app.core.metrics import get_metrics  # noqa: E402
+from app.models.schemas import FieldType  # noqa: E402
+from app.services.explanations import ExplanationService  # noqa: E402
+from app.services.llm_provider import StubProvider  # noqa: E402
+from app.services.question_service import QuestionService  # noqa: E402
+
+async def run(questions: int, explained_share: float, token_latency_ms: float) -> dict:
+    metrics = get_metrics()
+    result = {}
+    for lazy in (False, True):
+        metrics.reset()
+        service = QuestionService(provider=StubProvider(token_latency_seconds=token_latency_ms / 1000))
+        service.lazy_explanations = lazy
+        explanations = ExplanationService(service)
+        rng = random.Random(1)
+
+        started = time.perf_counter()
+        generated = [await service._generate_ai_question(FieldType.MATH, rng.randint(1, 5)) for _ in range(questions)]
+        generation_seconds = time.perf_counter() - started
+        for question in generated:
+            if rng.random() < explained_share:
+                await explanations.explain(question)
+
+        mode = "lazy" if lazy else "eager"
+        result[f"{mode}_generation_ms"] = generation_seconds / questions * 1000
+        result[f"{mode}_question_tokens"] = metrics.counter("question_generation.tokens") / questions
+        result[f"{mode}_explanation_tokens"] = metrics.counter("explanation_generation.tokens") / questions
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--explained-share", type=float, default=0.3, help="share of questions whose explanation is read")
+    parser.add_argument("--token-latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    result = asyncio.run(run(args.questions, args.explained_share, args.token_latency_ms))
+    for key, value in result.items():
+        print(f"{key:>26}: {value:.3f}")
+
+if __name__ == "__main__":
+    main()
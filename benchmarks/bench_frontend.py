@@ -0,0 +1,79 @@
+"""Benchmark serving the built frontend from the precompressed asset cache.
+
+Compares the in-memory cache (variants computed once at startup) with
+Starlette's StaticFiles behind the compression middleware (a file read per
+request, streamed uncompressed), over the JS bundle, the app shell and
+revalidations. Bodies are read raw, so client-side decoding is not counted.
+
+    python -m benchmarks.bench_frontend --requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+# Settings are read at import time, so the environment is set before the app imports
+os.environ.setdefault("API_SECRET", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import httpx  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.routing import Mount  # noqa: E402
+from starlette.staticfiles import StaticFiles  # noqa: E402
+from app.api.frontend import FrontendApp, FrontendAssets  # noqa: E402
+from app.api.middleware import CompressionMiddleware  # noqa: E402
+from app.core.config import settings  # noqa: E402
+
+def _extract(source: str, target: str) -> str:
+    import zipfile
+    with zipfile.ZipFile(source) as archive:
+        archive.extractall(target)
+    return os.path.join(target, "dist")
+
+async def _time(app, path: str, requests: int, headers: dict) -> tuple:
+    """(requests per second, bytes per response)"""
+    sent = 0
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        started = time.perf_counter()
+        for _ in range(requests):
+            async with client.stream("GET", path, headers=headers) as response:
+                assert response.status_code in (200, 304)
+                async for chunk in response.aiter_raw():
+                    sent += len(chunk)
+        return requests / (time.perf_counter() - started), sent // requests
+
+async def run(args) -> None:
+    import tempfile
+    with tempfile.TemporaryDirectory() as target:
+        directory = _extract(args.dist, target)
+        assets = FrontendAssets(args.dist, settings.FRONTEND_PRECOMPRESS_MAX_BYTES, settings.FRONTEND_MMAP_MIN_BYTES)
+        started = time.perf_counter()
+        assets.load()
+        print(f"{'load_ms':>22}: {(time.perf_counter() - started) * 1000:.3f}")
+        print(f"{'bytes':>22}: {assets.status()['bytes']}")
+        print(f"{'compressed_bytes':>22}: {assets.status()['compressed_bytes']}")
+
+        cached = CompressionMiddleware(FrontendApp(assets))
+        static = CompressionMiddleware(Starlette(routes=[Mount("/", StaticFiles(directory=directory, html=True))]))
+        bundle = next(path for path in assets.assets if path.endswith(".js"))
+        gzip_only = {"Accept-Encoding": "gzip"}
+        revalidate = {**gzip_only, "If-None-Match": assets.get(bundle).representation("gzip")[1]}
+        cases = [("bundle", bundle, gzip_only), ("index", "/", gzip_only), ("bundle_304", bundle, revalidate)]
+
+        print(f"{'case':>12} {'cache_rps':>10} {'cache_bytes':>12} {'static_rps':>11} {'static_bytes':>13}")
+        for name, path, headers in cases:
+            cache_rps, cache_bytes = await _time(cached, path, args.requests, headers)
+            # StaticFiles' weak ETag differs from the cache's, so it is sent in full
+            static_rps, static_bytes = await _time(static, path, args.requests, gzip_only)
+            print(f"{name:>12} {cache_rps:>10.1f} {cache_bytes:>12} {static_rps:>11.1f} {static_bytes:>13}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dist", default="frontend-dist.zip")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
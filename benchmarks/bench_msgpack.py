@@ -0,0 +1,82 @@
+"""Compare JSON and MessagePack for the large session and analytics payloads.
+
+Plays a full session through the API with the stub LLM provider, then
+reports for each payload and format: response size, server-side encoding
+time, client-side decoding time, and CPU time per in-process request.
+
+    python -m benchmarks.bench_msgpack --requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import timeit
+
+# Settings are read at import time, so the environment is set before the app imports
+os.environ.setdefault("API_SECRET", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["REQUIRE_AUTH"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+import msgpack  # noqa: E402
+import orjson  # noqa: E402
+from app.api.responses import JSON, MSGPACK, ModelResponse, to_msgpack  # noqa: E402
+from app.core.database import init_database  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.schemas import PerformanceAnalytics, UserSession  # noqa: E402
+
+async def _played_session(client: httpx.AsyncClient) -> str:
+    response = await client.post("/api/v1/sessions/create", json={"user_id": "bench"})
+    session_id = response.json()["session"]["id"]
+    question = (await client.post(
+        "/api/v1/chat/select-field", json={"session_id": session_id, "field": "math"}
+    )).json()["question"]
+    while question:
+        answer = await client.post("/api/v1/chat/answer", json={"session_id": session_id, "answer": question["correct_answer"]})
+        question = answer.json().get("next_question")
+    return session_id
+
+def _micros(fn, number: int) -> float:
+    return timeit.timeit(fn, number=number) / number * 1e6
+
+async def _cpu_per_request(client: httpx.AsyncClient, url: str, accept: str, requests: int) -> float:
+    decode = msgpack.unpackb if accept == MSGPACK else orjson.loads
+    started = time.process_time()
+    for _ in range(requests):
+        response = await client.get(url, headers={"Accept": accept})
+        decode(response.content)
+    return (time.process_time() - started) / requests * 1000
+
+async def run(requests: int) -> None:
+    await init_database()
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        session_id = await _played_session(client)
+        payloads = [
+            ("session", f"/api/v1/sessions/{session_id}", UserSession),
+            ("analytics", f"/api/v1/sessions/{session_id}/analytics", PerformanceAnalytics),
+        ]
+        print(f"{'payload':>10} {'format':>8} {'bytes':>7} {'encode_us':>10} {'decode_us':>10} {'cpu_ms_per_req':>15}")
+        for name, url, model in payloads:
+            instance = model.model_validate(orjson.loads((await client.get(url)).content))
+            for media_type, encode, decode in (
+                (JSON, lambda instance=instance: ModelResponse(instance).body, orjson.loads),
+                (MSGPACK, lambda instance=instance: to_msgpack(instance), msgpack.unpackb),
+            ):
+                body = encode()
+                encode_us = _micros(encode, 2000)
+                decode_us = _micros(lambda decode=decode, body=body: decode(body), 2000)
+                cpu_ms = await _cpu_per_request(client, url, media_type, requests)
+                label = media_type.split("/")[1]
+                print(f"{name:>10} {label:>8} {len(body):>7} {encode_us:>10.2f} {decode_us:>10.2f} {cpu_ms:>15.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Measure what profiling costs on the answer path.
+
+Runs the in-process answer-path benchmark with profiling off, with phase
+spans traced, and with spans plus the sampling profiler, then the cost of
+one span() call when tracing is off and on.
+
+    python -m benchmarks.bench_profiling --requests 2000
+"""
+
+import argparse
+import asyncio
+import timeit
+
+from benchmarks.bench_answer_path import run
+from app.core.profiling import get_profiler, span
+
+def _span_ns(number: int) -> float:
+    def enter():
+        with span("bench"):
+            pass
+    return timeit.timeit(enter, number=number) / number * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sample-interval-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    profiler = get_profiler()
+    profiler.sampler.interval_seconds = args.sample_interval_ms / 1000
+    modes = [("off", False, False), ("spans", True, False), ("spans+sampler", True, True)]
+    print(f"{'mode':>14} {'mean_ms':>9} {'p50_ms':>9} {'p99_ms':>9} {'rps':>9}")
+    baseline = None
+    for name, spans, sampler in modes:
+        profiler.spans_enabled = spans
+        if sampler:
+            profiler.sampler.start()
+        result = asyncio.run(run(args.requests))
+        profiler.sampler.stop()
+        baseline = baseline or result["mean_ms"]
+        print(
+            f"{name:>14} {result['mean_ms']:>9.3f} {result['p50_ms']:>9.3f} {result['p99_ms']:>9.3f} "
+            f"{result['throughput_rps']:>9.1f}  ({result['mean_ms'] / baseline - 1:+.1%})"
+        )
+
+    profiler.spans_enabled = False
+    print(f"{'span_off_ns':>16}: {_span_ns(1_000_000):.3f}")
+    profiler.spans_enabled = True
+    trace = profiler.begin()
+    on = _span_ns(100_000)
+    profiler.end(trace)
+    print(f"{'span_on_ns':>16}: {on:.3f}")
+    print(f"{'sampled_stacks':>16}: {len(profiler.sampler.stacks)}")
+
+if __name__ == "__main__":
+    main()
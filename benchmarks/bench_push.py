@@ -0,0 +1,86 @@
+"""Fan session updates out to many subscribers on one worker.
+
+Each subscriber is a task draining its queue the way a WebSocket sender
+does (the socket write itself is not included). Subscribers watch one
+group (exam room); a share of them never read, to show slow-consumer
+dropping.
+
+    python -m benchmarks.bench_push --subscribers 10000 --groups 100 --updates 10000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+# Settings are read at import time, so the environment is set before the app imports
+os.environ.setdefault("API_SECRET", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import orjson  # noqa: E402
+from app.models.schemas import SessionUpdate  # noqa: E402
+from app.services.push_hub import PushHub, group_topic  # noqa: E402
+
+async def run(subscribers: int, groups: int, updates: int, slow_share: float, queue_size: int) -> dict:
+    hub = PushHub(queue_size=queue_size)
+    rng = random.Random(1)
+    sent = {}
+    latencies = []
+
+    async def consume(subscriber):
+        while True:
+            message = await subscriber.next()
+            if message is None:
+                return
+            latencies.append(time.perf_counter() - sent[orjson.loads(message)["session_id"]])
+
+    readers, consumers = [], []
+    for _ in range(subscribers):
+        subscriber = hub.subscribe([group_topic(f"room-{rng.randrange(groups)}")])
+        if rng.random() >= slow_share:
+            readers.append(subscriber)
+            consumers.append(asyncio.create_task(consume(subscriber)))
+
+    publish_seconds = 0.0
+    started = time.perf_counter()
+    for i in range(updates):
+        update = SessionUpdate(
+            event="answer", session_id=f"s{i}", group=f"room-{rng.randrange(groups)}",
+            score=i, difficulty=1.0, answered=1, correct=1, total=10, is_complete=False
+        )
+        before = sent[update.session_id] = time.perf_counter()
+        await hub.publish(update)
+        publish_seconds += time.perf_counter() - before
+        await asyncio.sleep(0)
+    while any(subscriber.queue.qsize() for subscriber in readers if not subscriber.dropped):
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    for task in consumers:
+        task.cancel()
+
+    latencies.sort()
+    return {
+        "subscribers": subscribers,
+        "publish_us": publish_seconds / updates * 1e6,
+        "deliveries": len(latencies),
+        "deliveries_per_second": len(latencies) / elapsed,
+        "latency_p50_ms": latencies[len(latencies) // 2] * 1000,
+        "latency_p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "slow_dropped": subscribers - hub.status()["subscribers"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--groups", type=int, default=100)
+    parser.add_argument("--updates", type=int, default=10_000)
+    parser.add_argument("--slow-share", type=float, default=0.01, help="share of subscribers that never read")
+    parser.add_argument("--queue-size", type=int, default=64)
+    args = parser.parse_args()
+    result = asyncio.run(run(args.subscribers, args.groups, args.updates, args.slow_share, args.queue_size))
+    for key, value in result.items():
+        print(f"{key:>22}: {value:.3f}" if isinstance(value, float) else f"{key:>22}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark normalized question storage against questions embedded in sessions.
+
+Plays sessions through SessionService, each served questions drawn from a
+shared pool (as the question bank serves them), and records every write the
+database receives. Reports stored bytes and DynamoDB write units per session
+(one WCU per started KB of each item written), for snapshot and event-sourced
+storage with NORMALIZE_QUESTIONS on and off.
+
+    python -m benchmarks.bench_question_store --sessions 500 --pool 300
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import time
+import uuid
+from typing import Dict, List
+
+# Settings are read at import time, so the environment is set before the app imports
+os.environ.setdefault("API_SECRET", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app.core import database  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.models.schemas import FieldType, SessionEventType  # noqa: E402
+from app.services.question_service import QuestionService  # noqa: E402
+from app.services.question_store import content_id  # noqa: E402
+from app.services.session_service import SessionService  # noqa: E402
+
+class RecordingDatabase(database.InMemoryDatabase):
+    """In-memory database that sizes every item written"""
+
+    def __init__(self):
+        super().__init__()
+        self.write_bytes = 0
+        self.write_units = 0
+
+    def _written(self, item):
+        size = len(database._dumps(item))
+        self.write_bytes += size
+        self.write_units += math.ceil(size / 1024)
+
+    async def save_session(self, session_id: str, session_data: Dict) -> bool:
+        self._written(session_data)
+        return await super().save_session(session_id, session_data)
+
+    async def append_session_events(self, session_id: str, events: List[Dict]) -> bool:
+        for event in events:
+            self._written(event)
+        return await super().append_session_events(session_id, events)
+
+    async def put_questions(self, questions: Dict[str, Dict]) -> bool:
+        for question in questions.values():
+            self._written(question)
+        return await super().put_questions(questions)
+
+    def stored_bytes(self) -> int:
+        items = list(self.sessions.values()) + list(self.questions.values())
+        items += [event for events in self.session_events.values() for event in events]
+        return sum(len(database._dumps(item)) for item in items)
+
+async def _play(service: SessionService, pool, turns: int) -> str:
+    session = await service.create_session("bench-user")
+    service.record(session, SessionEventType.FIELD_SELECTED, field="math", difficulty=1.0, reset_score=True)
+    for question in random.sample(pool, turns):
+        service.record(
+            session,
+            SessionEventType.QUESTION_SERVED,
+            question=question.model_dump(mode="json", exclude_none=True),
+            message_id=str(uuid.uuid4())
+        )
+        await service.update_session(session)
+        service.record(
+            session,
+            SessionEventType.ANSWER_EVALUATED,
+            answer="42",
+            is_correct=False,
+            explanation=question.explanation,
+            difficulty=session.difficulty,
+            answer_message_id=str(uuid.uuid4()),
+            feedback_message_id=str(uuid.uuid4())
+        )
+        await service.update_session(session)
+    return session.id
+
+async def run(mode: str, normalized: bool, pool, sessions: int, turns: int) -> dict:
+    settings.SESSION_STORE_MODE = mode
+    settings.NORMALIZE_QUESTIONS = normalized
+    db = database._database = RecordingDatabase()
+    service = SessionService()
+    random.seed(7)
+    session_ids = [await _play(service, pool, turns) for _ in range(sessions)]
+
+    # Cold reads: every question reference resolved from the database
+    service.questions._cache.clear()
+    started = time.perf_counter()
+    for session_id in session_ids:
+        await service.get_session(session_id)
+    read_seconds = time.perf_counter() - started
+    return {
+        "layout": f"{mode}/{'normalized' if normalized else 'embedded'}",
+        "stored_kb": db.stored_bytes() / sessions / 1024,
+        "written_kb": db.write_bytes / sessions / 1024,
+        "wcu": db.write_units / sessions,
+        "read_us": read_seconds / sessions * 1e6,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--pool", type=int, default=300, help="distinct questions the sessions draw from")
+    args = parser.parse_args()
+
+    question_service = QuestionService()
+    pool = []
+    for i in range(args.pool):
+        question = question_service._generate_template_question(FieldType.MATH, i % 5 + 1)
+        question.explanation = f"{question.explanation or ''} Worked solution {i}: " + "step " * 40
+        question.id = content_id(question)
+        pool.append(question)
+
+    print(f"{'layout':>20} {'stored_kb':>10} {'written_kb':>11} {'wcu':>8} {'read_us':>9}  (per session)")
+    for mode in ("snapshot", "events"):
+        for normalized in (False, True):
+            r = asyncio.run(run(mode, normalized, pool, args.sessions, args.turns))
+            print(f"{r['layout']:>20} {r['stored_kb']:>10.2f} {r['written_kb']:>11.2f} {r['wcu']:>8.1f} {r['read_us']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
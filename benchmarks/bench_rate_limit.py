@@ -0,0 +1,41 @@
+"""Measure the cost of one in-memory rate limit check across many caller keys.
+
+    python -m benchmarks.bench_rate_limit --calls 500000 --keys 1000
+"""
+
+import argparse
+import os
+import time
+
+# Settings are read at import time, so the environment is set before the app imports
+os.environ.setdefault("API_SECRET", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app.core.rate_limit import InMemoryRateLimiter  # noqa: E402
+
+def bench_try_acquire(calls: int, keys: int, max_keys: int) -> dict:
+    limiter = InMemoryRateLimiter(rate=1e9, burst=10, max_keys=max_keys)
+    names = [f"key-{i}" for i in range(keys)]
+    started = time.perf_counter()
+    for i in range(calls):
+        limiter.try_acquire(names[i % keys])
+    elapsed = time.perf_counter() - started
+    return {
+        "calls": calls,
+        "keys": keys,
+        "per_call_us": elapsed / calls * 1e6,
+        "calls_per_second": calls / elapsed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500_000)
+    parser.add_argument("--keys", type=int, default=1000)
+    parser.add_argument("--max-keys", type=int, default=100_000, help="bucket count before full buckets are evicted")
+    args = parser.parse_args()
+    result = bench_try_acquire(args.calls, args.keys, args.max_keys)
+    for key, value in result.items():
+        print(f"{key:>20}: {value:.3f}" if isinstance(value, float) else f"{key:>20}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark event-sourced session reads against the snapshot interval.
+
+Plays sessions turn by turn through SessionService on an in-memory SQLite
+store, then measures get_session (latest snapshot + event tail replay) and
+the bytes written per turn, for a range of snapshot intervals.
+
+    python -m benchmarks.bench_session_replay --turns 30 --intervals 1 5 10 20 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+# Settings are read at import time, so the environment is set before the app imports
+os.environ.setdefault("API_SECRET", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app.core import database  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.models.schemas import FieldType, SessionEventType  # noqa: E402
+from app.services.llm_provider import StubProvider  # noqa: E402
+from app.services.question_service import QuestionService  # noqa: E402
+from app.services.session_service import SessionService  # noqa: E402
+
+def _stored_bytes(db: database.SQLiteDatabase) -> int:
+    sessions = db.conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM sessions").fetchone()[0]
+    events = db.conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM session_events").fetchone()[0]
+    return sessions + events
+
+async def _play(service: SessionService, question_service: QuestionService, turns: int) -> str:
+    session = await service.create_session("bench-user")
+    service.record(session, SessionEventType.FIELD_SELECTED, field="math", difficulty=1.0, reset_score=True)
+    for _ in range(turns):
+        question = question_service._generate_template_question(FieldType.MATH, int(session.difficulty))
+        service.record(
+            session,
+            SessionEventType.QUESTION_SERVED,
+            question=question.model_dump(mode="json", exclude_none=True),
+            message_id=str(uuid.uuid4())
+        )
+        await service.update_session(session)
+        service.record(
+            session,
+            SessionEventType.ANSWER_EVALUATED,
+            answer="42",
+            is_correct=False,
+            explanation=question.explanation,
+            difficulty=session.difficulty,
+            answer_message_id=str(uuid.uuid4()),
+            feedback_message_id=str(uuid.uuid4())
+        )
+        await service.update_session(session)
+    return session.id
+
+async def run(mode: str, interval: int, turns: int, reads: int) -> dict:
+    settings.SESSION_STORE_MODE = mode
+    settings.SESSION_SNAPSHOT_INTERVAL = interval
+    db = database._database = database.SQLiteDatabase(":memory:")
+    service = SessionService()
+    question_service = QuestionService(provider=StubProvider())
+
+    started = time.perf_counter()
+    session_id = await _play(service, question_service, turns)
+    write_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(reads):
+        await service.get_session(session_id)
+    read_seconds = time.perf_counter() - started
+
+    tail = db.conn.execute(
+        "SELECT COUNT(*) FROM session_events WHERE session_id = ? AND seq > ?",
+        (session_id, json.loads(db.conn.execute("SELECT data FROM sessions").fetchone()[0])["version"])
+    ).fetchone()[0]
+    return {
+        "mode": mode if mode == "snapshot" else f"events/{interval}",
+        "read_us": read_seconds / reads * 1e6,
+        "write_us_per_turn": write_seconds / turns * 1e6,
+        "stored_kb": _stored_bytes(db) / 1024,
+        "tail_events": tail,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--intervals", type=int, nargs="*", default=[1, 5, 10, 20, 50, 100])
+    args = parser.parse_args()
+
+    results = [asyncio.run(run("snapshot", 1, args.turns, args.reads))]
+    results += [asyncio.run(run("events", interval, args.turns, args.reads)) for interval in args.intervals]
+    print(f"{'mode':>12} {'read_us':>10} {'write_us/turn':>14} {'stored_kb':>10} {'tail':>6}")
+    for r in results:
+        print(f"{r['mode']:>12} {r['read_us']:>10.1f} {r['write_us_per_turn']:>14.1f} {r['stored_kb']:>10.1f} {r['tail_events']:>6}")
+
+if __name__ == "__main__":
+    main()
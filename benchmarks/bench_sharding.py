@@ -0,0 +1,130 @@
+"""Benchmark session-store throughput as shards are added, and an online rebalance.
+
+Each simulated request is one answer turn against the store: read the
+session, append its events and save the snapshot. Nodes are in-process
+stand-ins for single-threaded servers: every operation costs --service-us
+of node time (queued behind the node's other work) plus --rtt-us of network
+time, so one node saturates the way one Redis does. Pass --urls to run
+against real nodes instead.
+
+    python -m benchmarks.bench_sharding --shards 1 2 4 8 --clients 256
+    python -m benchmarks.bench_sharding --urls redis://localhost:6379/0 redis://localhost:6380/0
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+# Settings are read at import time, so the environment is set before the app imports
+os.environ.setdefault("API_SECRET", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app.core import database  # noqa: E402
+from app.core.sharding import ShardedDatabase, backend_for_url  # noqa: E402
+
+class StandInNode(database.InMemoryDatabase):
+    """In-memory node with the throughput of a single-threaded server"""
+
+    def __init__(self, service_seconds: float, rtt_seconds: float):
+        super().__init__()
+        self.service_seconds = service_seconds
+        self.rtt_seconds = rtt_seconds
+        self.busy_until = 0.0
+
+    async def _round_trip(self):
+        now = time.perf_counter()
+        self.busy_until = max(now, self.busy_until) + self.service_seconds
+        await asyncio.sleep(self.busy_until - now + self.rtt_seconds)
+
+    async def get_session(self, session_id):
+        await self._round_trip()
+        return await super().get_session(session_id)
+
+    async def save_session(self, session_id, session_data):
+        await self._round_trip()
+        return await super().save_session(session_id, session_data)
+
+    async def append_session_events(self, session_id, events):
+        await self._round_trip()
+        return await super().append_session_events(session_id, events)
+
+    async def get_session_events(self, session_id, after_seq=0):
+        await self._round_trip()
+        return await super().get_session_events(session_id, after_seq)
+
+def _session(session_id: str, start: datetime) -> dict:
+    return {"id": session_id, "user_id": f"u{session_id}", "start_time": start.isoformat(), "messages": [], "version": 1}
+
+async def _turns(db: ShardedDatabase, sessions: int, clients: int, seconds: float) -> float:
+    """Answer turns per second from `clients` concurrent callers"""
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client(offset: int):
+        nonlocal done
+        turn = 0
+        while time.perf_counter() < deadline:
+            session_id = f"s{(offset + turn * clients) % sessions}"
+            session = await db.get_session(session_id)
+            await db.append_session_events(session_id, [{"seq": session["version"] + 1, "type": "message_received", "data": {}}])
+            session["version"] += 1
+            await db.save_session(session_id, session)
+            done += 1
+            turn += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    return done / (time.perf_counter() - started)
+
+async def _seed(db: ShardedDatabase, sessions: int):
+    start = datetime.now() - timedelta(days=1)
+    await asyncio.gather(*(db.save_session(f"s{i}", _session(f"s{i}", start)) for i in range(sessions)))
+
+async def run(args) -> None:
+    service, rtt = args.service_us / 1e6, args.rtt_us / 1e6
+    print(f"{'shards':>6} {'turns_per_s':>12} {'per_shard':>10}")
+    counts = [len(args.urls)] if args.urls else args.shards
+    for count in counts:
+        nodes = {url: backend_for_url(url) for url in args.urls} if args.urls else {
+            f"node{i}": StandInNode(service, rtt) for i in range(count)
+        }
+        db = ShardedDatabase(nodes)
+        await _seed(db, args.sessions)
+        throughput = await _turns(db, args.sessions, args.clients, args.seconds)
+        print(f"{count:>6} {throughput:>12.1f} {throughput / count:>10.1f}")
+    if args.urls:
+        return
+
+    # Add a node to a loaded ring: requests keep running while keys move
+    db = ShardedDatabase({f"node{i}": StandInNode(service, rtt) for i in range(args.rebalance_from)}, idle_seconds=0)
+    await _seed(db, args.sessions)
+    db.add_node(f"node{args.rebalance_from}", StandInNode(service, rtt))
+    started = time.perf_counter()
+    traffic = asyncio.create_task(_turns(db, args.sessions, args.clients, args.seconds))
+    while db.rebalancing:
+        await db.rebalance_once(batch_size=500)
+    rebalance_seconds = time.perf_counter() - started
+    during = await traffic
+    moved = len(db.shards[f"node{args.rebalance_from}"].sessions)
+    print(f"{'rebalance':>24}: {args.rebalance_from} -> {args.rebalance_from + 1} shards")
+    print(f"{'moved_share':>24}: {moved / args.sessions:.3f}")
+    print(f"{'rebalance_s':>24}: {rebalance_seconds:.3f}")
+    print(f"{'turns_per_s_during':>24}: {during:.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--urls", nargs="*", default=[], help="real store nodes (one run over all of them)")
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=256)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--service-us", type=float, default=50.0, help="node time per operation")
+    parser.add_argument("--rtt-us", type=float, default=200.0, help="network round trip per operation")
+    parser.add_argument("--rebalance-from", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
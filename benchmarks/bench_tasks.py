@@ -0,0 +1,90 @@
+"""Benchmark the background task runtime.
+
+Simulated requests do --request-ms of work for their response and
+--post-ms of work that does not affect it (a store write, say), either inline
+or deferred to the "post_response" queue. Reports response latency for both
+and how many deferred jobs found the queue full, then the runtime's own
+cost per job.
+
+    python -m benchmarks.bench_tasks --requests 5000 --clients 64 --post-ms 5
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+# Settings are read at import time, so the environment is set before the app imports
+os.environ.setdefault("API_SECRET", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app.core.metrics import get_metrics, percentile  # noqa: E402
+from app.core.tasks import TaskQueue, TaskRuntime  # noqa: E402
+
+async def _post_response_work(seconds: float):
+    await asyncio.sleep(seconds)
+
+async def _requests(runtime: TaskRuntime, deferred: bool, args) -> list:
+    latencies = []
+    per_client = args.requests // args.clients
+
+    async def client():
+        for _ in range(per_client):
+            started = time.perf_counter()
+            await asyncio.sleep(args.request_ms / 1000)
+            if deferred:
+                await runtime.defer("post_response", _post_response_work, args.post_ms / 1000)
+            else:
+                await _post_response_work(args.post_ms / 1000)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(client() for _ in range(args.clients)))
+    return latencies
+
+async def _job_overhead(jobs: int) -> float:
+    """Microseconds from submit to completion per no-op job"""
+    runtime = TaskRuntime()
+    runtime.define(TaskQueue("post_response", workers=4, max_size=jobs))
+    runtime.start()
+
+    async def noop():
+        pass
+
+    started = time.perf_counter()
+    for _ in range(jobs):
+        runtime.submit("post_response", noop)
+    await runtime.drain()
+    return (time.perf_counter() - started) / jobs * 1e6
+
+async def run(args) -> None:
+    print(f"{'mode':>8} {'p50_ms':>8} {'p99_ms':>8} {'drain_ms':>9} {'ran_inline':>11}")
+    for deferred in (False, True):
+        runtime = TaskRuntime()
+        runtime.define(TaskQueue("post_response", workers=args.workers, max_size=args.queue_size))
+        runtime.start()
+        inline_before = get_metrics().counter("tasks.post_response.inline")
+        latencies = await _requests(runtime, deferred, args)
+        # Jobs that found the queue full ran in the request instead
+        ran_inline = get_metrics().counter("tasks.post_response.inline") - inline_before
+        started = time.perf_counter()
+        await runtime.drain()
+        drain_ms = (time.perf_counter() - started) * 1000
+        print(
+            f"{'deferred' if deferred else 'inline':>8} {percentile(latencies, 50) * 1000:>8.3f} "
+            f"{percentile(latencies, 99) * 1000:>8.3f} {drain_ms:>9.3f} {int(ran_inline):>11}"
+        )
+    print(f"{'job_overhead_us':>16}: {await _job_overhead(args.requests):.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--request-ms", type=float, default=2.0)
+    parser.add_argument("--post-ms", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=256)
+    parser.add_argument("--queue-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
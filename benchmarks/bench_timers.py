@@ -0,0 +1,83 @@
+"""Compare question expiry through the timer wheel with one sleeping task per question.
+
+    python -m benchmarks.bench_timers --timers 100000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+import tracemalloc
+
+# Settings are read at import time, so the environment is set before the app imports
+os.environ.setdefault("API_SECRET", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from app.services.timers import TimerWheel  # noqa: E402
+
+def bench_wheel(timers: int, horizon: float, tick: float) -> dict:
+    rng = random.Random(1)
+    now = time.time()
+    tracemalloc.start()
+    wheel = TimerWheel(tick, now=now)
+    started = time.perf_counter()
+    for key in range(timers):
+        wheel.schedule(key, now + rng.uniform(1, horizon))
+    schedule_seconds = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    ticks = int(horizon / tick) + 1
+    tick_times = []
+    fired = 0
+    for i in range(1, ticks + 1):
+        started = time.perf_counter()
+        fired += len(wheel.advance(now + i * tick))
+        tick_times.append(time.perf_counter() - started)
+    tick_times.sort()
+    return {
+        "wheel_schedule_us": schedule_seconds / timers * 1e6,
+        "wheel_tick_p50_us": tick_times[len(tick_times) // 2] * 1e6,
+        "wheel_tick_max_us": tick_times[-1] * 1e6,
+        "wheel_memory_mb": memory / 1e6,
+        "wheel_fired": fired,
+    }
+
+async def bench_tasks(timers: int, horizon: float) -> dict:
+    rng = random.Random(1)
+    fired = 0
+
+    async def expire(delay: float):
+        nonlocal fired
+        await asyncio.sleep(delay)
+        fired += 1
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(expire(rng.uniform(1, horizon))) for _ in range(timers)]
+    schedule_seconds = time.perf_counter() - started
+    await asyncio.sleep(0)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return {
+        "tasks_schedule_us": schedule_seconds / timers * 1e6,
+        "tasks_memory_mb": memory / 1e6,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--timers", type=int, default=100_000)
+    parser.add_argument("--horizon", type=float, default=120.0, help="deadlines are spread over this many seconds")
+    parser.add_argument("--tick", type=float, default=0.1)
+    args = parser.parse_args()
+    result = bench_wheel(args.timers, args.horizon, args.tick)
+    result.update(asyncio.run(bench_tasks(args.timers, args.horizon)))
+    for key, value in result.items():
+        print(f"{key:>20}: {value:.3f}" if isinstance(value, float) else f"{key:>20}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 // API Configuration
-const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
+// Same origin by default: the API serves the built app (and proxies it in dev)
+const API_BASE_URL = import.meta.env.VITE_API_URL || '';
 const API_SECRET = import.meta.env.VITE_API_SECRET;
 
 export const apiConfig = {
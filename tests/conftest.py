@@ -0,0 +1,23 @@
+"""Shared test configuration"""
+
+import os
+
+import pytest
+
+
+def pytest_configure(config):
+    """Settings are read at import time; provide the required secrets before any test imports the app"""
+    os.environ.setdefault("API_SECRET", "test-secret")
+    os.environ.setdefault("OPENAI_API_KEY", "test-key")
+    # Tests that start the app opt in to warm-up explicitly
+    os.environ.setdefault("WARMUP_ENABLED", "false")
+
+
+@pytest.fixture(autouse=True)
+def in_memory_database():
+    """Give every test a fresh in-memory database"""
+    from app.core import database
+
+    database._database = database.InMemoryDatabase()
+    yield database._database
+    database._database = None
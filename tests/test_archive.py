@@ -0,0 +1,122 @@
+"""Tests for completed-session archival"""
+
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from app.core import database
+from app.core.config import settings
+from app.services import archive
+from app.services.archive import SessionArchiver, answer_rows, compact_partitions, field_accuracy, write_answer_rows
+from app.services.llm_provider import StubProvider
+from app.services.question_service import QuestionService, get_question_service
+from app.services.session_service import SessionService
+
+pytest.importorskip("pyarrow")
+
+def _play_session(answers: int, wrong_every: int = 2) -> str:
+    from app.main import app
+    app.dependency_overrides[get_question_service] = lambda: QuestionService(provider=StubProvider())
+    try:
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {settings.API_SECRET}"}
+        session_id = client.post("/api/v1/sessions/create", json={"user_id": "u1"}, headers=headers).json()["session"]["id"]
+        question = client.post(
+            "/api/v1/chat/select-field", json={"session_id": session_id, "field": "math"}, headers=headers
+        ).json()["question"]
+        for i in range(answers):
+            answer = "wrong" if i % wrong_every else question["correct_answer"]
+            response = client.post("/api/v1/chat/answer", json={"session_id": session_id, "answer": answer}, headers=headers)
+            assert response.status_code == 200
+            question = response.json().get("next_question")
+        return session_id
+    finally:
+        app.dependency_overrides.clear()
+
+@pytest.fixture
+def short_sessions(monkeypatch):
+    monkeypatch.setattr(settings, "QUESTIONS_PER_SESSION", 4)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+
+async def test_archiver_moves_completed_sessions_to_parquet(short_sessions, in_memory_database, tmp_path):
+    completed = _play_session(answers=4)
+    in_progress = _play_session(answers=2)
+    session = await SessionService().get_session(completed)
+    expected = answer_rows(session)
+
+    archiver = SessionArchiver(in_memory_database, str(tmp_path), batch_size=10, min_age_seconds=0)
+    assert await archiver.run_once() == 1
+
+    assert completed not in in_memory_database.sessions
+    assert in_progress in in_memory_database.sessions
+    assert [row["correct"] for row in expected] == [True, False, True, False]
+    assert list(tmp_path.glob("date=*/part-*.parquet"))
+    report = field_accuracy(str(tmp_path))
+    assert report["math"]["answers"] == 4
+    assert report["math"]["accuracy"] == 0.5
+
+    # Nothing left to archive, and an already-archived session is not written twice
+    assert await archiver.run_once() == 0
+
+async def test_only_the_lease_holder_archives(short_sessions, in_memory_database, tmp_path, monkeypatch):
+    compactions = []
+    monkeypatch.setattr(archive, "compact_partitions", lambda path, before: compactions.append(path) or 0)
+    _play_session(answers=4)
+    _play_session(answers=4)
+
+    # Two workers share the database and the archive directory
+    first = SessionArchiver(in_memory_database, str(tmp_path), batch_size=10, min_age_seconds=0)
+    second = SessionArchiver(in_memory_database, str(tmp_path), batch_size=10, min_age_seconds=0)
+    assert await first.run_once() == 2
+    _play_session(answers=4)
+    assert await second.run_once() == 0
+    assert field_accuracy(str(tmp_path))["math"]["answers"] == 8
+    assert len(compactions) == 1
+
+    # Once the holder's lease lapses, another worker takes over
+    in_memory_database.leases["archiver"] = (first.owner, 0.0)
+    assert await second.run_once() == 1
+    assert field_accuracy(str(tmp_path))["math"]["answers"] == 12
+    assert len(compactions) == 2
+
+async def test_recently_completed_sessions_stay_hot(short_sessions, in_memory_database, tmp_path):
+    completed = _play_session(answers=4)
+
+    archiver = SessionArchiver(in_memory_database, str(tmp_path), min_age_seconds=3600)
+    assert await archiver.run_once() == 0
+    assert completed in in_memory_database.sessions
+    assert field_accuracy(str(tmp_path)) == {}
+
+def test_closed_days_are_compacted_into_one_file(tmp_path):
+    day = datetime(2026, 3, 1, 12)
+    for batch in range(3):
+        write_answer_rows(str(tmp_path), [{
+            "session_id": f"s{batch}", "user_id": "u1", "field": "logic", "date": day.date().isoformat(),
+            "question_id": f"q_{batch}", "difficulty": 2, "correct": batch > 0, "points": 4 if batch else 0,
+            "response_seconds": 10.0, "timed_out": False, "answered_at": day,
+        }])
+    before = field_accuracy(str(tmp_path))
+
+    assert compact_partitions(str(tmp_path), before="2026-03-01") == 0
+    assert compact_partitions(str(tmp_path), before="2026-03-02") == 1
+    assert len(list(tmp_path.glob("date=2026-03-01/*.parquet"))) == 1
+    assert not list(tmp_path.glob("date=2026-03-01/.compacting*"))
+    assert field_accuracy(str(tmp_path)) == before
+    assert before["logic"]["answers"] == 3
+
+async def test_sqlite_lists_completed_sessions_oldest_first_and_deletes_their_events():
+    db = database.SQLiteDatabase(":memory:")
+    now = datetime.now()
+    for i, complete in enumerate([True, False, True]):
+        await db.save_session(f"s{i}", {
+            "id": f"s{i}", "start_time": now.isoformat(), "is_complete": complete,
+            "end_time": (now - timedelta(minutes=10 - i)).isoformat() if complete else None
+        })
+    await db.append_session_events("s0", [{"seq": 1, "type": "session_created", "data": {}}])
+
+    listed = await db.list_completed_sessions(now.isoformat(), limit=10)
+    assert [record["id"] for record in listed] == ["s0", "s2"]
+    assert await db.list_completed_sessions((now - timedelta(minutes=9, seconds=30)).isoformat(), limit=10) == [listed[0]]
+
+    await db.delete_session("s0")
+    assert await db.get_session_events("s0") == []
+    assert [record["id"] for record in await db.list_completed_sessions(now.isoformat(), limit=10)] == ["s2"]
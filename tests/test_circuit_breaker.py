@@ -0,0 +1,76 @@
+"""Tests for the AI path circuit breaker and latency budget"""
+
+import asyncio
+import time
+import pytest
+from app.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.core.metrics import get_metrics
+from app.models.schemas import FieldType
+from app.services.llm_provider import LLMProvider, StubProvider
+from app.services.question_service import QuestionService
+
+class HangingProvider(LLMProvider):
+    """Provider that never answers in time"""
+
+    name = "hanging"
+
+    async def complete(self, model, messages, max_tokens, temperature, response_format=None):
+        await asyncio.sleep(10)
+
+def test_breaker_opens_on_failure_rate():
+    breaker = CircuitBreaker("test", minimum_calls=4, failure_rate_threshold=0.5)
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.allow_request() is False
+
+def test_breaker_opens_on_slow_calls():
+    breaker = CircuitBreaker("test", minimum_calls=3, slow_call_seconds=1.0, slow_call_rate_threshold=0.6)
+    for _ in range(3):
+        breaker.record_success(2.0)
+    assert breaker.state == OPEN
+
+def test_half_open_probe_closes_breaker():
+    breaker = CircuitBreaker("test", minimum_calls=1, cooldown_seconds=0.0)
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    assert breaker.allow_request() is True
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request() is False  # only one probe at a time
+
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+
+@pytest.mark.asyncio
+async def test_latency_budget_falls_back_to_template():
+    get_metrics().reset()
+    service = QuestionService(provider=HangingProvider())
+    service.base_ai_ratio = 1.0
+    service.latency_budget = 0.05
+
+    started = time.monotonic()
+    question = await service.generate_question(FieldType.MATH, 1)
+
+    assert time.monotonic() - started < 1.0
+    assert question.field == FieldType.MATH
+    assert service.breaker.failure_rate() == 1.0
+    # The cut-off call counts as a budget-long sample in the latency window
+    assert get_metrics().window_percentile("question_generation.latency", 95) == pytest.approx(0.05)
+
+def test_ai_ratio_backs_off_with_errors():
+    service = QuestionService(provider=StubProvider())
+    assert service.current_ai_ratio() == pytest.approx(service.base_ai_ratio)
+
+    for _ in range(2):
+        service.breaker.record_failure()
+    for _ in range(8):
+        service.breaker.record_success(0.01)
+    service._ai_ratio_updated_at = 0.0
+
+    assert service.current_ai_ratio() < service.base_ai_ratio
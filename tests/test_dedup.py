@@ -0,0 +1,127 @@
+"""Tests for seen-question tracking and near-duplicate suppression"""
+
+import asyncio
+import random
+import time
+import pytest
+from app.models.schemas import FieldType, Question, QuestionType, UserSession
+from app.services.dedup import (
+    BloomFilter, QuestionDeduplicator, SeenFilter, SeenSet, SimHashIndex,
+    mark_seen, new_user_filter, question_fingerprint, simhash
+)
+from app.services.session_service import SessionService
+
+def _question(text):
+    return Question(
+        id="q", field=FieldType.LOGIC, difficulty=2, question=text,
+        type=QuestionType.TEXT, correct_answer="x", points=4
+    )
+
+def test_seen_set_is_fixed_size():
+    session = UserSession(id="s1")
+    seen = SeenSet.for_session(session)
+    for i in range(10):
+        seen.add(question_fingerprint(f"Question {i}"))
+
+    assert question_fingerprint("question   3") in seen
+    assert question_fingerprint("Question 11") not in seen
+    assert len(session.seen_fingerprints) == SeenSet.capacity()
+
+def test_bloom_filter_round_trip():
+    bloom = BloomFilter(4096, 5)
+    bloom.add(question_fingerprint("What is 2 + 2?"))
+
+    restored = BloomFilter.from_string(bloom.to_string(), 4096, 5)
+
+    assert question_fingerprint("What is 2 + 2?") in restored
+    assert question_fingerprint("What is 3 + 3?") not in restored
+
+def test_seen_filter_retires_full_generations():
+    seen = SeenFilter(BloomFilter(2048, 5), None, max_false_positive=0.01)
+    fingerprints = [question_fingerprint(f"Question {i}") for i in range(2000)]
+    for fingerprint in fingerprints:
+        seen.add(fingerprint)
+
+    assert seen.false_positive_rate() <= 0.011
+    assert all(fingerprint in seen for fingerprint in fingerprints[-100:])
+    assert sum(fingerprint in seen for fingerprint in fingerprints[:100]) < 5
+
+def test_simhash_index_finds_near_duplicates_for_owner_only():
+    index = SimHashIndex(max_distance=6)
+    original = "In a group of 100 people, 60 like coffee, 40 like tea, and 20 like both. How many like neither?"
+    index.add(simhash(original), "user:a")
+
+    reworded = "In a group of 100 people, 60 like coffee, 40 like tea and 20 like both. How many like neither one?"
+    assert index.has_near_duplicate(simhash(reworded), {"user:a"})
+    assert not index.has_near_duplicate(simhash(reworded), {"user:b"})
+    assert not index.has_near_duplicate(simhash("What is the square root of 81?"), {"user:a"})
+
+def test_near_duplicate_lookup_is_sub_millisecond():
+    index = SimHashIndex(max_distance=6)
+    rng = random.Random(1)
+    for i in range(100_000):
+        index.add(rng.getrandbits(64), "user:1" if i % 2 else f"user:{i}")
+
+    probe = simhash("What is the missing number: 1, 1, 2, 3, 5, 8, ___?")
+    started = time.perf_counter()
+    for _ in range(100):
+        index.has_near_duplicate(probe, {"user:1", "session:x"})
+    assert (time.perf_counter() - started) / 100 < 1e-3
+
+@pytest.mark.asyncio
+async def test_repeated_question_is_regenerated():
+    deduplicator = QuestionDeduplicator(SimHashIndex())
+    session = UserSession(id="s1", user_id="u1")
+    user_filter = BloomFilter(4096, 5)
+    repeated = _question("If A > B and B > C, then A ___ C?")
+    deduplicator.record(session, repeated, user_filter)
+
+    async def regenerate():
+        return _question("What comes next in the sequence: 2, 4, 8, 16, ___?")
+
+    served = await deduplicator.fresh_question(UserSession(id="s2", user_id="u1"), repeated, regenerate, user_filter)
+
+    assert served.question.startswith("What comes next")
+
+async def test_used_up_pool_costs_one_regeneration():
+    deduplicator = QuestionDeduplicator(SimHashIndex(), max_attempts=3)
+    user_filter = BloomFilter(4096, 5)
+    pool = [_question(f"Which letter comes after {letter}?") for letter in "ABCD"]
+    for question in pool:
+        deduplicator.record(UserSession(id="old", user_id="u1"), question, user_filter)
+    regenerations = []
+
+    async def regenerate():
+        regenerations.append(1)
+        return pool[len(regenerations)]
+
+    served = await deduplicator.fresh_question(UserSession(id="new", user_id="u1"), pool[0], regenerate, user_filter)
+
+    assert served is pool[1] and len(regenerations) == 1
+    # A saturated filter is not consulted at all
+    saturated = BloomFilter(64, 5)
+    for i in range(200):
+        saturated.add(question_fingerprint(f"Filler {i}"))
+    served = await deduplicator.fresh_question(UserSession(id="newer", user_id="u2"), pool[0], regenerate, saturated)
+    assert served is pool[0] and len(regenerations) == 1
+
+async def test_concurrent_profile_updates_are_all_kept():
+    service = SessionService()
+    texts = [f"Which letter comes after {letter}?" for letter in "ABCDEFGH"]
+    session = UserSession(id="s1", user_id="u1", selected_field=FieldType.LOGIC, difficulty=4.0)
+
+    await asyncio.gather(service.record_completion(session), *(service.record_seen("u1", text) for text in texts))
+
+    profile = await service.get_user_profile("u1")
+    user_filter = new_user_filter(profile.seen_filter, profile.seen_filter_previous)
+    assert all(question_fingerprint(text) in user_filter for text in texts)
+    assert profile.abilities["logic"].sessions == 1
+
+def test_mark_seen_updates_session_state():
+    session = UserSession(id="s1")
+    question = _question("If A > B and B > C, then A ___ C?")
+
+    mark_seen(session, question)
+
+    assert question_fingerprint(question.question) in SeenSet.for_session(session)
+    assert session.recent_questions == [question.question]
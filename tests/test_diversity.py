@@ -0,0 +1,76 @@
+"""Tests for topic-diversity selection"""
+
+import numpy as np
+from app.core.config import settings
+from app.models.schemas import FieldType, Question, QuestionType
+from app.services.diversity import DiversitySelector, embed, load_diversity_selector
+from app.services.llm_provider import StubProvider
+from app.services.question_bank import QuestionBank, write_bank
+from app.services.question_service import QuestionService
+from app.tools.build_bank import write_diversity_index
+
+ADDITION = [f"What is {a} + {b}?" for a, b in [(3, 4), (12, 9), (7, 7), (25, 31)]]
+EQUATIONS = [f"Solve for x: {a}x + {b} = {c}" for a, b, c in [(2, 3, 9), (5, 1, 11), (3, 6, 12)]]
+PERCENTAGES = ["What is 20% of 50?", "What is 15% of 80?"]
+
+def _question(text: str) -> Question:
+    return Question(
+        id=text, field=FieldType.MATH, difficulty=2, question=text,
+        type=QuestionType.TEXT, correct_answer="0", points=4
+    )
+
+def _bank(tmp_path, texts) -> QuestionBank:
+    path = str(tmp_path / "bank.iqb")
+    write_bank(path, {(FieldType.MATH, 2): [_question(text).model_dump_json().encode() for text in texts]})
+    write_diversity_index(path, 64)
+    return QuestionBank(path)
+
+def test_embeddings_group_questions_by_topic_not_numbers():
+    same_topic = embed(ADDITION[0], 128) @ embed(ADDITION[3], 128)
+    other_topic = embed(ADDITION[0], 128) @ embed(EQUATIONS[0], 128)
+
+    assert np.isclose(np.linalg.norm(embed(EQUATIONS[1], 128)), 1.0)
+    assert same_topic > 0.99
+    assert other_topic < 0.6
+
+def test_bank_selection_moves_away_from_recent_topics(tmp_path, monkeypatch):
+    bank = _bank(tmp_path, ADDITION + EQUATIONS + PERCENTAGES)
+    monkeypatch.setattr(settings, "DIVERSITY_DIM", 64)
+    selector = load_diversity_selector(bank)
+
+    picked = bank.get(selector.pick_bank(bank, FieldType.MATH, 2, ADDITION[:2] + EQUATIONS[:1])).question
+
+    assert selector.status()["indexed_questions"] == bank.size
+    assert picked in PERCENTAGES
+    assert selector.pick_bank(bank, FieldType.MATH, 2, []) is None
+    assert selector.pick_bank(bank, FieldType.LOGIC, 2, ADDITION) is None
+    # Pools are scored the same way without an index
+    assert DiversitySelector(None, 64).pick(ADDITION[2:] + PERCENTAGES[:1], ADDITION[:1]) == 2
+
+async def test_enabled_selector_keeps_history_out_of_the_prompt(tmp_path, monkeypatch):
+    prompts = []
+
+    class RecordingProvider(StubProvider):
+        async def complete(self, model, messages, *args, **kwargs):
+            prompts.append(messages[-1]["content"])
+            return await super().complete(model, messages, *args, **kwargs)
+
+    service = QuestionService(provider=RecordingProvider())
+    history = ["Solve for x: 2x + 3 = 9"]
+    await service._generate_ai_question(FieldType.MATH, 2, history)
+    monkeypatch.setattr(settings, "DIVERSITY_ENABLED", True)
+    service = QuestionService(provider=RecordingProvider())
+    # Without an index nothing screens the AI's questions, so the prompt keeps the history
+    await service._generate_ai_question(FieldType.MATH, 2, history)
+    service.bank = _bank(tmp_path, ADDITION + EQUATIONS)
+    service.diversity = DiversitySelector(np.load(f"{service.bank.path}.vec.npy", mmap_mode="r"), 64)
+    await service._generate_ai_question(FieldType.MATH, 2, history)
+
+    assert history[0] in prompts[0] and history[0] in prompts[1]
+    assert history[0] not in prompts[2]
+    assert len(prompts[2]) < len(prompts[0])
+
+    # A generated question too close to the history yields to a diverse bank question
+    service.base_ai_ratio = 1.0
+    question = await service.generate_question(FieldType.MATH, 2, ["What is 1 + 1?"])
+    assert question.question in EQUATIONS
@@ -0,0 +1,92 @@
+"""Tests for lazy explanation generation"""
+
+import asyncio
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.metrics import get_metrics
+from app.models.schemas import FieldType, Question, QuestionType
+from app.services.explanations import ExplanationService, get_explanation_service
+from app.services.llm_provider import StubProvider
+from app.services.question_service import QuestionService, get_question_service
+
+def _question(question_id: str) -> Question:
+    return Question(
+        id=question_id, field=FieldType.MATH, difficulty=1, question="What is 12 + 7?",
+        type=QuestionType.NUMBER, correct_answer="19", points=2
+    )
+
+class CountingService(QuestionService):
+    def __init__(self, result="12 + 7 = 19."):
+        super().__init__(provider=StubProvider())
+        self.calls = 0
+        self.result = result
+
+    async def generate_explanation(self, question):
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        return self.result
+
+async def test_lazy_generation_spends_fewer_tokens():
+    metrics = get_metrics()
+    service = QuestionService(provider=StubProvider())
+    tokens = {}
+    for lazy in (False, True):
+        metrics.reset()
+        service.lazy_explanations = lazy
+        question = await service._generate_ai_question(FieldType.MATH, 2)
+        tokens[lazy] = metrics.counter("question_generation.tokens")
+
+    assert question.explanation is None
+    assert tokens[True] < tokens[False]
+
+async def test_explanations_are_shared_by_content():
+    question_service = CountingService()
+    explanations = ExplanationService(question_service)
+
+    # Two sessions got copies of the same question under different IDs
+    first, second = await asyncio.gather(
+        explanations.explain(_question("a")),
+        explanations.explain(_question("b"))
+    )
+    third = await explanations.explain(_question("c"))
+
+    assert first == second == third == "12 + 7 = 19."
+    assert question_service.calls == 1
+    assert explanations.peek(_question("d")) == "12 + 7 = 19."
+
+async def test_failed_generation_falls_back_without_caching():
+    question_service = CountingService(result=None)
+    explanations = ExplanationService(question_service)
+
+    assert await explanations.explain(_question("a")) == "The correct answer is 19."
+    assert explanations.peek(_question("a")) is None
+    await explanations.explain(_question("a"))
+    assert question_service.calls == 2
+
+def test_explanation_endpoint_waits_for_the_answer(monkeypatch):
+    from app.main import app
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    question_service = QuestionService(provider=StubProvider())
+    app.dependency_overrides[get_question_service] = lambda: question_service
+    app.dependency_overrides[get_explanation_service] = lambda: ExplanationService(question_service)
+    try:
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {settings.API_SECRET}"}
+        session_id = client.post("/api/v1/sessions/create", json={}, headers=headers).json()["session"]["id"]
+        question = client.post(
+            "/api/v1/chat/select-field", json={"session_id": session_id, "field": "math"}, headers=headers
+        ).json()["question"]
+        url = f"/api/v1/questions/{question['id']}/explanation"
+
+        early = client.get(url, params={"session_id": session_id}, headers=headers)
+        client.post("/api/v1/chat/answer", json={"session_id": session_id, "answer": "7"}, headers=headers)
+        answered = client.get(url, params={"session_id": session_id}, headers=headers)
+        unknown = client.get("/api/v1/questions/nope/explanation", params={"session_id": session_id}, headers=headers)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert early.status_code == 409
+    assert answered.status_code == 200
+    assert answered.json()["explanation"]
+    assert unknown.status_code == 404
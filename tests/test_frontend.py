@@ -0,0 +1,84 @@
+"""Tests for serving the built frontend"""
+
+import zipfile
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.frontend import IMMUTABLE, REVALIDATE, FrontendApp, FrontendAssets
+from app.api.middleware import CompressionMiddleware, TimingMiddleware
+
+SCRIPT = b"console.log('iqfieldbot');" * 400
+INDEX = b"<!doctype html><script type=module src=/assets/index-Bq7d0wAn.js></script>"
+
+def _build_app(assets: FrontendAssets) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=512)
+    app.add_middleware(TimingMiddleware)
+
+    @app.get("/api/v1/ping")
+    async def ping():
+        return {"ok": True}
+
+    app.mount("/", FrontendApp(assets))
+    return app
+
+@pytest.fixture
+def client(tmp_path):
+    dist = tmp_path / "frontend-dist.zip"
+    with zipfile.ZipFile(dist, "w") as archive:
+        archive.writestr("dist/index.html", INDEX)
+        archive.writestr("dist/assets/index-Bq7d0wAn.js", SCRIPT)
+        archive.writestr("dist/vite.svg", b"<svg/>")
+        archive.writestr("dist/apple-touch-icon.png", b"\x89PNG")
+        archive.writestr("dist/site-manifest.json", b"{}")
+    return TestClient(_build_app(FrontendAssets(str(dist), 1 << 20, 1 << 20)))
+
+def test_hashed_assets_are_precompressed_immutable_and_revalidated(client):
+    compressed = client.get("/assets/index-Bq7d0wAn.js", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/assets/index-Bq7d0wAn.js", headers={"Accept-Encoding": "identity"})
+    cached = client.get(
+        "/assets/index-Bq7d0wAn.js", headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["etag"]}
+    )
+
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["cache-control"] == IMMUTABLE
+    assert compressed.headers["content-type"].startswith(("application/javascript", "text/javascript"))
+    assert compressed.content == SCRIPT
+    assert int(compressed.headers["content-length"]) < len(SCRIPT) // 10
+    # Each encoding is a distinct representation with its own strong validator
+    assert "content-encoding" not in plain.headers and plain.content == SCRIPT
+    assert plain.headers["etag"] != compressed.headers["etag"]
+    assert cached.status_code == 304 and cached.content == b""
+    # Unhashed public files with hyphenated names must be revalidated
+    assert client.get("/apple-touch-icon.png").headers["cache-control"] == REVALIDATE
+    assert client.get("/site-manifest.json").headers["cache-control"] == REVALIDATE
+
+def test_client_routes_get_the_app_shell_and_api_paths_do_not(client):
+    shell = client.get("/sessions/abc")
+    root = client.get("/")
+
+    assert shell.status_code == 200 and shell.content == INDEX
+    assert shell.headers["cache-control"] == REVALIDATE
+    assert root.content == INDEX
+    assert client.get("/api/v1/ping").json() == {"ok": True}
+    assert client.get("/api/v1/missing").status_code == 404
+    assert client.get("/assets/missing-Abcdefgh.js").status_code == 404
+    assert client.post("/sessions/abc").status_code == 405
+
+def test_large_directory_files_are_memory_mapped_and_streamed(tmp_path):
+    (tmp_path / "assets").mkdir()
+    bundle = SCRIPT * 100
+    (tmp_path / "assets" / "vendor-Zx81aB2c.js").write_bytes(bundle)
+    (tmp_path / "index.html").write_bytes(INDEX)
+    assets = FrontendAssets(str(tmp_path), precompress_max_bytes=512 * 1024, mmap_min_bytes=64 * 1024)
+    client = TestClient(_build_app(assets))
+
+    response = client.get("/assets/vendor-Zx81aB2c.js", headers={"Accept-Encoding": "gzip"})
+    head = client.head("/assets/vendor-Zx81aB2c.js")
+
+    # Above the precompression limit: sent as-is, and not compressed on the fly either
+    assert response.content == bundle
+    assert "content-encoding" not in response.headers
+    assert head.content == b"" and head.headers["content-length"] == str(len(bundle))
+    assert not isinstance(assets.get("/assets/vendor-Zx81aB2c.js").body, bytes)
+    assets.close()
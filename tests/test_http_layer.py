@@ -0,0 +1,46 @@
+"""Tests for the HTTP fast path: response rendering, compression and timing"""
+
+import orjson
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.middleware import CompressionMiddleware, TimingMiddleware
+from app.api.responses import ModelResponse
+from app.models.schemas import UserSession
+
+def _build_app(minimum_size: int) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
+    app.add_middleware(TimingMiddleware)
+
+    @app.get("/session", response_model=UserSession)
+    async def session():
+        return ModelResponse(UserSession(id="s1", user_id="u" * 2000))
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    return app
+
+def test_model_response_renders_model_json():
+    session = UserSession(id="s1")
+    body = ModelResponse(session).body
+    assert orjson.loads(body)["id"] == "s1"
+    assert orjson.loads(body)["start_time"] == session.start_time.isoformat()
+
+def test_large_responses_are_compressed():
+    client = TestClient(_build_app(minimum_size=512))
+
+    response = client.get("/session", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["id"] == "s1"
+    assert "Accept-Encoding" in response.headers["vary"]
+
+def test_small_responses_are_not_compressed():
+    client = TestClient(_build_app(minimum_size=512))
+
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["server-timing"].startswith("app;dur=")
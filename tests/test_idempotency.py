@@ -0,0 +1,98 @@
+"""Tests for Idempotency-Key handling"""
+
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.models.schemas import AnswerRequest
+from app.services.idempotency import IdempotencyCache
+
+REQUEST = AnswerRequest(session_id="s1", answer="4")
+
+async def test_concurrent_duplicates_share_one_computation():
+    cache = IdempotencyCache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"score": 2}
+
+    first, second = await asyncio.gather(
+        cache.run("answer", "s1", "k1", REQUEST, compute),
+        cache.run("answer", "s1", "k1", REQUEST, compute),
+    )
+
+    assert calls == 1
+    assert first.body == second.body
+    assert second.headers["Idempotent-Replayed"] == "true"
+
+async def test_key_reused_with_different_request_is_rejected():
+    cache = IdempotencyCache()
+
+    async def compute():
+        return {"ok": True}
+
+    await cache.run("answer", "s1", "k1", REQUEST, compute)
+    with pytest.raises(HTTPException) as error:
+        await cache.run("answer", "s1", "k1", AnswerRequest(session_id="s1", answer="5"), compute)
+
+    assert error.value.status_code == 422
+
+async def test_failures_are_not_cached():
+    cache = IdempotencyCache()
+    attempts = []
+
+    async def compute():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise HTTPException(status_code=500, detail="boom")
+        return {"ok": True}
+
+    with pytest.raises(HTTPException):
+        await cache.run("answer", "s1", "k1", REQUEST, compute)
+    response = await cache.run("answer", "s1", "k1", REQUEST, compute)
+
+    assert len(attempts) == 2
+    assert "Idempotent-Replayed" not in response.headers
+
+async def test_entries_are_bounded_and_expire():
+    cache = IdempotencyCache(max_entries=2, ttl_seconds=60)
+
+    async def compute():
+        return {"ok": True}
+
+    for key in ("a", "b", "c"):
+        await cache.run("answer", "s1", key, REQUEST, compute)
+    assert cache.status()["entries"] == 2
+
+    cache.ttl_seconds = -1
+    await cache.run("answer", "s1", "d", REQUEST, compute)
+    assert cache._get_local("answer:s1:d") is None
+
+def test_retried_answer_is_scored_once(monkeypatch):
+    from app.main import app
+    from app.services.llm_provider import StubProvider
+    from app.services.question_service import QuestionService, get_question_service
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    app.dependency_overrides[get_question_service] = lambda: QuestionService(provider=StubProvider())
+    try:
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {settings.API_SECRET}"}
+        session_id = client.post("/api/v1/sessions/create", json={}, headers=headers).json()["session"]["id"]
+        client.post("/api/v1/chat/select-field", json={"session_id": session_id, "field": "math"}, headers=headers)
+
+        retry_headers = {**headers, "Idempotency-Key": "answer-1"}
+        body = {"session_id": session_id, "answer": "7"}
+        first = client.post("/api/v1/chat/answer", json=body, headers=retry_headers)
+        retry = client.post("/api/v1/chat/answer", json=body, headers=retry_headers)
+        session = client.get(f"/api/v1/sessions/{session_id}", headers=headers).json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert session["total_questions"] == 1
@@ -0,0 +1,97 @@
+"""Tests for leaderboards, the indexable skip list and the t-digest"""
+
+import bisect
+import random
+import pytest
+from app.models.schemas import FieldType, UserSession
+from app.services.leaderboard import (
+    GLOBAL_BOARD, IndexableSkipList, InMemoryLeaderboardStore, TDigest, record_session
+)
+
+def test_skip_list_matches_sorted_list():
+    rng = random.Random(7)
+    skip_list = IndexableSkipList(seed=1)
+    reference = []
+    for _ in range(2000):
+        key = rng.randrange(500)
+        if key in reference and rng.random() < 0.5:
+            assert skip_list.remove(key)
+            reference.remove(key)
+        elif key not in reference:
+            skip_list.insert(key)
+            bisect.insort(reference, key)
+
+    assert len(skip_list) == len(reference)
+    assert skip_list.first(len(reference)) == reference
+    for index in range(0, len(reference), 17):
+        assert skip_list.at(index) == reference[index]
+        assert skip_list.rank(reference[index]) == index
+    assert skip_list.rank(-1) is None
+
+def test_tdigest_percentiles_are_close():
+    rng = random.Random(3)
+    values = [rng.gauss(50, 15) for _ in range(50_000)]
+    digest = TDigest(compression=100)
+    for value in values:
+        digest.add(value)
+    values.sort()
+
+    for q in (0.01, 0.25, 0.5, 0.9, 0.99):
+        exact = values[int(q * len(values))]
+        assert digest.cdf(exact) == pytest.approx(q, abs=0.01)
+        assert digest.quantile(q) == pytest.approx(exact, abs=1.0)
+
+async def test_in_memory_store_keeps_exact_top_k():
+    store = InMemoryLeaderboardStore(capacity=3)
+    for i, score in enumerate([10, 40, 20, 30, 5]):
+        await store.add("math", f"s{i}", score)
+
+    assert await store.top("math", 10) == [("s1", 40), ("s3", 30), ("s2", 20)]
+    assert await store.rank("math", "s3") == 1
+    assert await store.rank("math", "s4") is None  # below the ranked range
+    assert await store.size("math") == 5
+    assert await store.percentile("math", 40) > await store.percentile("math", 10)
+    assert await store.percentile("logic", 10) is None
+
+    # Re-scoring a ranked member moves it without counting it twice
+    await store.add("math", "s1", 35)
+    assert await store.top("math", 1) == [("s1", 35)]
+    assert await store.size("math") == 5
+    assert store._boards["math"].digest.total == 5
+
+async def test_completed_session_is_recorded_on_both_boards():
+    store = InMemoryLeaderboardStore()
+    session = UserSession(id="s1", selected_field=FieldType.LOGIC, score=12, is_complete=True)
+
+    await record_session(store, session)
+
+    assert await store.rank(GLOBAL_BOARD, "s1") == 0
+    assert await store.top("logic", 1) == [("s1", 12)]
+
+async def test_analytics_include_field_percentile(in_memory_database):
+    from fastapi.testclient import TestClient
+    from app.core.config import settings
+    from app.main import app
+    from app.models.schemas import FieldScore
+    from app.services.leaderboard import get_leaderboard_store
+    from app.services.session_service import SessionService
+
+    store = InMemoryLeaderboardStore()
+    for i in range(10):
+        await store.add("math", f"other{i}", i * 10)
+    session = UserSession(
+        id="s1", selected_field=FieldType.MATH, score=75, total_questions=10, correct_answers=8,
+        field_scores={"math": FieldScore(correct=8, total=10, accuracy=0.8)}
+    )
+    await SessionService().update_session(session)
+
+    app.dependency_overrides[get_leaderboard_store] = lambda: store
+    try:
+        response = TestClient(app).get(
+            "/api/v1/sessions/s1/analytics", headers={"Authorization": f"Bearer {settings.API_SECRET}"}
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert 70 <= response.json()["field_performance"]["math"]["percentile"] <= 85
@@ -0,0 +1,77 @@
+"""Tests for the LLM provider layer"""
+
+import asyncio
+import pytest
+from app.core.circuit_breaker import OPEN
+from app.models.schemas import FieldType
+from app.services.llm_provider import HedgedProvider, LLMCompletion, LLMProvider, OpenAICompatibleProvider, StubProvider
+from app.services.question_service import QuestionService
+
+class SlowProvider(LLMProvider):
+    """Provider that answers after a fixed delay"""
+
+    def __init__(self, name, delay, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def complete(self, model, messages, max_tokens, temperature, response_format=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream error")
+        return LLMCompletion(content="{}", model=model, provider=self.name)
+
+@pytest.mark.asyncio
+async def test_stub_provider_is_deterministic():
+    provider = StubProvider()
+    messages = [{"role": "user", "content": "Generate a math question with difficulty level 2"}]
+
+    first = await provider.complete("any", messages, 100, 0.8)
+    second = await provider.complete("any", messages, 100, 0.8)
+
+    assert first.content == second.content
+    assert first.provider == "stub"
+
+@pytest.mark.asyncio
+async def test_hedged_provider_takes_first_result():
+    primary = SlowProvider("primary", delay=1.0)
+    secondary = SlowProvider("secondary", delay=0.01)
+    provider = HedgedProvider([primary, secondary], initial_delay_seconds=0.05)
+
+    result = await provider.complete("m", [], 10, 0.0)
+
+    assert result.provider == "secondary"
+    assert primary.calls == 1 and secondary.calls == 1
+
+@pytest.mark.asyncio
+async def test_hedged_provider_fails_over_on_error():
+    provider = HedgedProvider([SlowProvider("primary", 0.0, fail=True), SlowProvider("secondary", 0.0)])
+
+    result = await provider.complete("m", [], 10, 0.0)
+
+    assert result.provider == "secondary"
+
+@pytest.mark.asyncio
+async def test_open_breaker_skips_llm(monkeypatch):
+    failing = SlowProvider("primary", 0.0, fail=True)
+    service = QuestionService(provider=failing)
+    service.breaker.minimum_calls = 2
+    monkeypatch.setattr("app.services.question_service.random.random", lambda: 0.0)
+
+    for _ in range(4):
+        question = await service.generate_question(FieldType.MATH, 1)
+        assert question.field == FieldType.MATH
+
+    assert service.breaker.state == OPEN
+    assert failing.calls == 2
+
+def test_strict_schema_only_goes_to_models_that_support_it():
+    openai_api = OpenAICompatibleProvider(api_key="test")
+    local_server = OpenAICompatibleProvider(base_url="http://127.0.0.1:8080/v1", api_key="test")
+
+    assert openai_api.supports_json_schema("gpt-4o-mini")
+    assert not openai_api.supports_json_schema("gpt-4")
+    assert local_server.supports_json_schema("llama-3-8b")
+    assert not OpenAICompatibleProvider(api_key="test", structured_output=False).supports_json_schema("gpt-4o")
@@ -0,0 +1,21 @@
+"""Tests for queue-based logging setup and shutdown"""
+
+import logging
+import logging.handlers
+
+from app.core import logging as app_logging
+
+
+def test_records_after_shutdown_are_written_directly(capsys):
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    try:
+        app_logging.shutdown_logging()
+        app_logging.configure_logging()
+        app_logging.shutdown_logging()
+
+        assert not any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers)
+        logging.getLogger("late").warning("after shutdown")
+        assert "after shutdown" in capsys.readouterr().out
+    finally:
+        root.handlers, root.level = handlers, level
@@ -0,0 +1,74 @@
+"""Tests for MessagePack content negotiation on the chat and session routes"""
+
+import pytest
+from fastapi.testclient import TestClient
+from app.api.responses import JSON, MSGPACK, preferred_format
+from app.core.config import settings
+from app.services.llm_provider import StubProvider
+from app.services.question_service import QuestionService, get_question_service
+
+msgpack = pytest.importorskip("msgpack")
+
+@pytest.fixture
+def client(monkeypatch):
+    from app.main import app
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    app.dependency_overrides[get_question_service] = lambda: QuestionService(provider=StubProvider())
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def _post_msgpack(client: TestClient, url: str, body: dict, headers: dict):
+    return client.post(url, content=msgpack.packb(body), headers={
+        **headers, "Content-Type": MSGPACK, "Accept": MSGPACK
+    })
+
+def test_accept_header_ranks_formats():
+    assert preferred_format("") == JSON
+    assert preferred_format("*/*") == JSON
+    assert preferred_format("application/msgpack") == MSGPACK
+    assert preferred_format("application/x-msgpack, application/json") == MSGPACK
+    assert preferred_format("application/json, application/msgpack") == JSON
+    assert preferred_format("application/json;q=0.5, application/msgpack;q=0.9") == MSGPACK
+    assert preferred_format("application/msgpack;q=0") == JSON
+
+def test_msgpack_clients_get_the_same_data_as_json_clients(client):
+    headers = {"Authorization": f"Bearer {settings.API_SECRET}"}
+    created = _post_msgpack(client, "/api/v1/sessions/create", {"user_id": "kiosk-1"}, headers)
+    session_id = msgpack.unpackb(created.content)["session"]["id"]
+    selected = _post_msgpack(client, "/api/v1/chat/select-field", {"session_id": session_id, "field": "math"}, headers)
+    answered = _post_msgpack(client, "/api/v1/chat/answer", {"session_id": session_id, "answer": "7"}, headers)
+
+    as_msgpack = client.get(f"/api/v1/sessions/{session_id}", headers={**headers, "Accept": MSGPACK})
+    as_json = client.get(f"/api/v1/sessions/{session_id}", headers=headers)
+
+    assert created.headers["content-type"] == MSGPACK
+    assert msgpack.unpackb(created.content)["session"]["user_id"] == "kiosk-1"
+    assert msgpack.unpackb(selected.content)["question"]["field"] == "math"
+    assert msgpack.unpackb(answered.content)["session_id"] == session_id
+    assert msgpack.unpackb(as_msgpack.content) == as_json.json()
+    assert as_json.headers["content-type"] == JSON
+    assert "Accept" in as_msgpack.headers["vary"] and "Accept" in as_json.headers["vary"]
+    assert len(as_msgpack.content) < len(as_json.content)
+
+def test_retry_in_another_format_replays_the_same_answer(client):
+    headers = {"Authorization": f"Bearer {settings.API_SECRET}"}
+    session_id = client.post("/api/v1/sessions/create", json={}, headers=headers).json()["session"]["id"]
+    client.post("/api/v1/chat/select-field", json={"session_id": session_id, "field": "math"}, headers=headers)
+
+    body = {"session_id": session_id, "answer": "7"}
+    retry_headers = {**headers, "Idempotency-Key": "answer-1"}
+    first = _post_msgpack(client, "/api/v1/chat/answer", body, retry_headers)
+    retry = client.post("/api/v1/chat/answer", json=body, headers=retry_headers)
+
+    assert first.headers["content-type"] == MSGPACK
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.headers["content-type"] == JSON
+    assert retry.json() == msgpack.unpackb(first.content)
+    keyed = _post_msgpack(client, "/api/v1/chat/select-field", {"session_id": session_id, "field": "logic"}, {
+        **headers, "Idempotency-Key": "select-1"
+    })
+    assert keyed.headers["content-type"] == MSGPACK
+    assert msgpack.unpackb(keyed.content)["question"]["field"] == "logic"
+    assert client.post("/api/v1/chat/answer", content=b"\xc1", headers={
+        **headers, "Content-Type": MSGPACK
+    }).status_code == 400
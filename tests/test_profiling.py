@@ -0,0 +1,104 @@
+"""Tests for request phase spans, slow-request capture and the sampling profiler"""
+
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.core import profiling
+from app.core.config import settings
+from app.core.profiling import SamplingProfiler, span
+from app.services.llm_provider import StubProvider
+from app.services.question_service import QuestionService, get_question_service
+
+@pytest.fixture(autouse=True)
+def fresh_profiler(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    profiling._profiler = None
+    yield
+    profiling.get_profiler().sampler.stop()
+    profiling._profiler = None
+
+def _answer(client: TestClient, headers: dict):
+    session_id = client.post("/api/v1/sessions/create", json={}, headers=headers).json()["session"]["id"]
+    client.post("/api/v1/chat/select-field", json={"session_id": session_id, "field": "math"}, headers=headers)
+    return client.post("/api/v1/chat/answer", json={"session_id": session_id, "answer": "7"}, headers=headers)
+
+def test_slow_requests_keep_their_phase_breakdown():
+    from app.main import app
+    app.dependency_overrides[get_question_service] = lambda: QuestionService(provider=StubProvider())
+    try:
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {settings.API_SECRET}"}
+        untraced = _answer(client, headers)
+        client.put("/api/v1/admin/profiling", json={"spans_enabled": True, "slow_request_ms": 0}, headers=headers)
+        traced = _answer(client, headers)
+        slow = client.get("/api/v1/admin/profiling/slow", params={"limit": 50}, headers=headers).json()
+        status = client.get("/api/v1/admin/profiling", headers=headers).json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert untraced.headers["server-timing"].startswith("app;dur=")
+    assert "load;dur=" not in untraced.headers["server-timing"]
+    for phase in ("load", "evaluate", "generate", "save"):
+        assert f"{phase};dur=" in traced.headers["server-timing"]
+
+    answer = next(record for record in slow["requests"] if record["route"] == "/api/v1/chat/answer")
+    names = [record["name"] for record in answer["spans"]]
+    assert {"load", "db.read", "validate", "evaluate", "generate", "save", "serialize", "db.write"} <= set(names)
+    assert answer["status"] == 200 and slow["threshold_ms"] == 0
+    assert status["spans_enabled"] and status["phases"]["save"]["count"] >= 1
+
+def test_spans_are_free_outside_a_traced_request():
+    with span("load") as outer:
+        pass
+    assert outer is profiling._NO_SPAN
+
+    profiler = profiling.get_profiler()
+    profiler.spans_enabled = True
+    trace = profiler.begin()
+    with span("load"):
+        pass
+    profiler.end(trace)
+    # Background work that outlives its request records nothing
+    with span("late"):
+        pass
+
+    assert [name for name, _, _ in trace.spans] == ["load"]
+    assert span("next") is profiling._NO_SPAN
+
+def test_sampler_collects_collapsed_stacks_of_busy_threads():
+    stop = threading.Event()
+
+    def spin_in_hot_loop():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=spin_in_hot_loop, name="busy")
+    worker.start()
+    sampler = SamplingProfiler(interval_seconds=0.001)
+    try:
+        assert sampler.start() and not sampler.start()
+        time.sleep(0.1)
+        assert sampler.stop()
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = sampler.collapsed().splitlines()
+    busy = [line for line in lines if line.startswith("busy;") and "spin_in_hot_loop" in line]
+    assert sampler.samples > 10 and busy
+    stack, count = busy[0].rsplit(" ", 1)
+    assert int(count) > 0 and stack.split(";")[-1].startswith("spin_in_hot_loop (tests/test_profiling.py:")
+
+def test_admin_routes_need_the_api_secret(monkeypatch):
+    from app.main import app
+    monkeypatch.setattr(settings, "API_KEYS", ["client-key"])
+    client = TestClient(app)
+
+    assert client.get("/api/v1/admin/profiling").status_code == 401
+    assert client.get("/api/v1/admin/profiling", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/api/v1/admin/profiling", headers={"Authorization": "Bearer client-key"}).status_code == 403
+    assert client.put(
+        "/api/v1/admin/profiling", json={"sampler_running": True}, headers={"Authorization": "Bearer client-key"}
+    ).status_code == 403
+    assert client.get("/api/v1/admin/profiling", headers={"Authorization": f"Bearer {settings.API_SECRET}"}).status_code == 200
@@ -0,0 +1,72 @@
+"""Tests for live session updates"""
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from app.core.config import settings
+from app.models.schemas import SessionUpdate
+from app.services.llm_provider import StubProvider
+from app.services.push_hub import PushHub, group_topic, session_topic
+from app.services.question_service import QuestionService, get_question_service
+
+def _update(**overrides) -> SessionUpdate:
+    data = {
+        "event": "answer", "session_id": "s1", "group": "room-1", "score": 2, "difficulty": 1.0,
+        "answered": 1, "correct": 1, "total": 10, "is_complete": False,
+    }
+    return SessionUpdate(**{**data, **overrides})
+
+async def test_update_reaches_each_subscriber_once():
+    hub = PushHub()
+    watcher = hub.subscribe([session_topic("s1"), group_topic("room-1")])
+    proctor = hub.subscribe([group_topic("room-1")])
+    other = hub.subscribe([session_topic("s2")])
+
+    await hub.publish(_update())
+
+    assert watcher.queue.qsize() == proctor.queue.qsize() == 1
+    assert other.queue.empty()
+    assert SessionUpdate.model_validate_json(await proctor.next()).answered == 1
+
+async def test_slow_consumer_is_dropped():
+    hub = PushHub(queue_size=2)
+    slow = hub.subscribe([session_topic("s1")])
+    fast = hub.subscribe([session_topic("s1")])
+
+    for answered in range(3):
+        await hub.publish(_update(answered=answered))
+        await fast.next()
+
+    assert slow.dropped
+    assert await slow.next() is None
+    assert slow not in hub._topics[session_topic("s1")]
+    assert not fast.dropped
+
+@pytest.fixture
+def client(monkeypatch):
+    from app.main import app
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    app.dependency_overrides[get_question_service] = lambda: QuestionService(provider=StubProvider())
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.clear()
+
+def test_proctor_receives_answers_for_the_group(client):
+    headers = {"Authorization": f"Bearer {settings.API_SECRET}"}
+    session_id = client.post("/api/v1/sessions/create", json={"group": "room-7"}, headers=headers).json()["session"]["id"]
+    client.post("/api/v1/chat/select-field", json={"session_id": session_id, "field": "math"}, headers=headers)
+
+    with client.websocket_connect(f"/api/v1/push/sessions?group=room-7&token={settings.API_SECRET}") as websocket:
+        client.post("/api/v1/chat/answer", json={"session_id": session_id, "answer": "1"}, headers=headers)
+        update = websocket.receive_json()
+
+    assert update["event"] == "answer"
+    assert update["session_id"] == session_id
+    assert update["answered"] == 1
+    assert update["total"] == settings.QUESTIONS_PER_SESSION
+
+def test_push_requires_an_api_key(client):
+    with pytest.raises(WebSocketDisconnect) as error:
+        with client.websocket_connect("/api/v1/push/sessions?group=room-7&token=wrong") as websocket:
+            websocket.receive_json()
+    assert error.value.code == 1008
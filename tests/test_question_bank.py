@@ -0,0 +1,92 @@
+"""Tests for the question bank file and the offline builder"""
+
+import random
+from app.models.schemas import FieldType, Question, QuestionType
+from app.services.question_bank import QuestionBank, load_question_bank, write_bank
+from app.services.question_service import FIXED_TEMPLATE_ANSWERS, QuestionService
+from app.services.structured_output import check_math_answer
+from app.services.llm_provider import StubProvider
+from app.tools.build_bank import BankBuilder, validate_candidates
+
+def _question(text: str, difficulty: int = 1) -> Question:
+    return Question(
+        id=text, field=FieldType.MATH, difficulty=difficulty, question=text,
+        type=QuestionType.TEXT, correct_answer="0", points=2
+    )
+
+def test_bank_round_trip(tmp_path):
+    path = str(tmp_path / "bank.iqb")
+    cells = {
+        (FieldType.MATH, 1): [_question(f"q{i}").model_dump_json().encode() for i in range(3)],
+        (FieldType.MATH, 2): [_question("hard", 2).model_dump_json().encode()],
+    }
+
+    assert write_bank(path, cells) == 4
+    bank = QuestionBank(path)
+
+    assert bank.cells() == {(FieldType.MATH, 1): 3, (FieldType.MATH, 2): 1}
+    assert bank.sample(FieldType.MATH, 2).question == "hard"
+    assert bank.sample(FieldType.MATH, 1, random.Random(1)).question in {"q0", "q1", "q2"}
+    assert bank.sample(FieldType.LOGIC, 1) is None
+
+def test_unreadable_bank_is_ignored(tmp_path):
+    path = tmp_path / "junk.iqb"
+    path.write_bytes(b"not a bank at all, definitely not")
+    assert load_question_bank(str(path)) is None
+
+def test_template_answers_are_solved_or_rejected():
+    candidates = [
+        {**_question("What is 3 × 4?").model_dump(mode="json"), "source": "template"},
+        {**_question("What is the square root of 7?").model_dump(mode="json"), "source": "template"},
+        {**_question("What is the derivative of 2x³ + 1x²?").model_dump(mode="json"), "source": "template"},
+    ]
+
+    accepted = validate_candidates(candidates)
+
+    assert len(accepted) == 1
+    fingerprint, record = accepted[0]
+    question = Question.model_validate_json(record)
+    assert question.correct_answer == "12"
+    assert question.type == QuestionType.NUMBER
+    assert question.id == f"bank_{fingerprint:016x}"
+
+async def test_builder_resumes_from_checkpoint(tmp_path):
+    out = str(tmp_path / "bank.iqb")
+    cells = [(FieldType.MATH, 2)]
+
+    first = BankBuilder(out, cells, per_cell=50, workers=1, batch_size=64)
+    await first.build()
+    second = BankBuilder(out, cells, per_cell=120, workers=1, batch_size=64)
+    result = await second.build()
+
+    bank = QuestionBank(out)
+    assert result["resumed"] == 50
+    assert bank.count(FieldType.MATH, 2) == 120
+    texts = {bank.get(i).question for i in range(bank.size)}
+    assert len(texts) == 120
+
+async def test_built_cells_only_hold_verified_answers(tmp_path):
+    out = str(tmp_path / "bank.iqb")
+    builder = BankBuilder(out, [(FieldType.MATH, 3), (FieldType.LOGIC, 1)], per_cell=200, workers=1, batch_size=64, max_stale_batches=3)
+    await builder.build()
+    bank = QuestionBank(out)
+    first, count = bank.cell_range(FieldType.MATH, 3)
+    math = [bank.get(i) for i in range(first, first + count)]
+    first, count = bank.cell_range(FieldType.LOGIC, 1)
+    logic = [bank.get(i) for i in range(first, first + count)]
+
+    # Quadratics and derivatives have no exact local answer, so none are stored
+    assert math and not any("quadratic" in q.question or "derivative" in q.question for q in math)
+    assert all(check_math_answer(q.question, q.correct_answer) for q in math)
+    # Logic templates are kept with their own answers
+    assert len(logic) == 3
+    assert all(q.correct_answer == FIXED_TEMPLATE_ANSWERS[q.question] for q in logic)
+
+def test_question_service_serves_fallbacks_from_bank(tmp_path):
+    path = str(tmp_path / "bank.iqb")
+    write_bank(path, {(FieldType.MATH, 3): [_question("from the bank", 3).model_dump_json().encode()]})
+    service = QuestionService(provider=StubProvider())
+    service.bank = QuestionBank(path)
+
+    assert service._fallback_question(FieldType.MATH, 3).question == "from the bank"
+    assert service._fallback_question(FieldType.MATH, 1).question != "from the bank"
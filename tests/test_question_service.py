@@ -8,7 +8,8 @@ from app.models.schemas import FieldType, Question, QuestionType
 @pytest.fixture
 def question_service():
     service = QuestionService()
-    service.client = AsyncMock()
+    service.llm.client = AsyncMock()
+    service.base_ai_ratio = 1.0
     return service
 
 @pytest.mark.asyncio
@@ -26,7 +27,7 @@ async def test_generate_question_success(question_service):
         "points": 2
     }
     """
-    question_service.client.chat.completions.create.return_value = mock_response
+    question_service.llm.client.chat.completions.create.return_value = mock_response
     
     question = await question_service.generate_question(FieldType.MATH, 1)
     
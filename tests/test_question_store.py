@@ -0,0 +1,110 @@
+"""Tests for normalized, content-addressed question storage"""
+
+import uuid
+from app.core import database
+from app.core.config import settings
+from app.models.schemas import FieldType, SessionEventType
+from app.services.question_service import QuestionService
+from app.services.question_store import content_id, get_question_store
+from app.services.session_service import SessionService
+
+def _question(difficulty: int = 1):
+    question = QuestionService()._generate_template_question(FieldType.MATH, difficulty)
+    question.id = content_id(question)
+    return question
+
+async def _serve(service: SessionService, session, question):
+    service.record(
+        session,
+        SessionEventType.QUESTION_SERVED,
+        question=question.model_dump(mode="json", exclude_none=True),
+        message_id=str(uuid.uuid4())
+    )
+    await service.update_session(session)
+
+async def test_sessions_store_question_ids_and_share_one_copy(in_memory_database):
+    service = SessionService()
+    question = _question()
+    first, second = await service.create_session("u1"), await service.create_session("u2")
+    await _serve(service, first, question)
+    await _serve(service, second, question)
+
+    stored = in_memory_database.sessions[first.id]
+    assert "current_question" not in stored
+    assert stored["current_question_id"] == question.id
+    assert "question" not in stored["messages"][-1]
+    assert list(in_memory_database.questions) == [question.id]
+
+    # A fresh store has nothing cached, so the read goes to the database
+    database._database = database.InMemoryDatabase()
+    database._database.sessions = in_memory_database.sessions
+    database._database.questions = in_memory_database.questions
+    loaded = await SessionService().get_session(second.id)
+    assert loaded.current_question == question
+    assert loaded.messages[-1].question is loaded.current_question
+
+async def test_event_log_references_questions_and_resolves_in_one_batch(in_memory_database, monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_STORE_MODE", "events")
+    monkeypatch.setattr(settings, "SESSION_SNAPSHOT_INTERVAL", 100)
+    service = SessionService()
+    session = await service.create_session("u1")
+    questions = [_question(difficulty) for difficulty in (1, 2, 3)]
+    for question in questions:
+        await _serve(service, session, question)
+
+    served = [event for event in in_memory_database.session_events[session.id] if event["type"] == "question_served"]
+    assert [event["data"]["question_id"] for event in served] == [question.id for question in questions]
+    assert all("question" not in event["data"] for event in served)
+
+    get_question_store()._cache.clear()
+    batches = []
+    get_questions = in_memory_database.get_questions
+    async def counting_get_questions(question_ids):
+        batches.append(sorted(question_ids))
+        return await get_questions(question_ids)
+    monkeypatch.setattr(in_memory_database, "get_questions", counting_get_questions)
+
+    loaded = await SessionService().get_session(session.id)
+    assert batches == [sorted(question.id for question in questions)]
+    assert [msg.question for msg in loaded.messages if msg.type == "question"] == questions
+    assert loaded.current_question == questions[-1]
+
+async def test_saving_a_session_extends_the_expiry_of_its_questions(in_memory_database, monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_STORE_MODE", "events")
+    touched = []
+    touch_questions = in_memory_database.touch_questions
+    async def recording_touch_questions(question_ids):
+        touched.append(sorted(question_ids))
+        return await touch_questions(question_ids)
+    monkeypatch.setattr(in_memory_database, "touch_questions", recording_touch_questions)
+    service = SessionService()
+    session = await service.create_session("u1")
+    questions = [_question(difficulty) for difficulty in (1, 2, 3)]
+    for question in questions:
+        await _serve(service, session, question)
+
+    # Each save refreshes every question served earlier, not only the new one
+    assert touched[-1] == sorted(question.id for question in questions[:2])
+    assert sorted(in_memory_database.questions) == sorted(question.id for question in questions)
+
+async def test_questions_without_content_ids_stay_embedded(in_memory_database, monkeypatch):
+    service = SessionService()
+    session = await service.create_session("u1")
+    legacy = QuestionService()._generate_template_question(FieldType.MATH, 1)
+    await _serve(service, session, legacy)
+    assert in_memory_database.sessions[session.id]["current_question"]["id"] == legacy.id
+
+    monkeypatch.setattr(settings, "NORMALIZE_QUESTIONS", False)
+    await _serve(service, session, _question(2))
+    assert in_memory_database.sessions[session.id]["messages"][-1]["question"] is not None
+    assert in_memory_database.questions == {}
+
+async def test_sqlite_question_table_batches_and_ignores_rewrites():
+    db = database.SQLiteDatabase(":memory:")
+    questions = {f"q_{i}": {"id": f"q_{i}", "question": f"What is {i} + 1?"} for i in range(1200)}
+
+    assert await db.put_questions(questions)
+    assert await db.put_questions({"q_0": questions["q_0"]})
+    found = await db.get_questions(list(questions) + ["q_unknown"])
+
+    assert found == questions
@@ -0,0 +1,82 @@
+"""Tests for admission control"""
+
+import asyncio
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.core import rate_limit
+from app.core.rate_limit import (
+    AdmissionController, AdmissionRejected, ConcurrencyLimiter, InMemoryRateLimiter, TokenBucket
+)
+from app.main import app
+
+@pytest.fixture
+def admission():
+    controller = AdmissionController(
+        InMemoryRateLimiter(rate=1.0, burst=3),
+        InMemoryRateLimiter(rate=1.0, burst=2),
+        ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+    )
+    rate_limit._admission = controller
+    yield controller
+    rate_limit._admission = None
+
+def test_token_bucket_refills():
+    limiter = InMemoryRateLimiter(rate=100.0, burst=2)
+    assert limiter.try_acquire("k") == 0
+    assert limiter.try_acquire("k") == 0
+    assert limiter.try_acquire("k") > 0
+    time.sleep(0.02)
+    assert limiter.try_acquire("k") == 0
+
+def test_token_bucket_rejects_with_retry_delay_until_refilled():
+    bucket = TokenBucket(rate=2.0, burst=2, now=0.0)
+    assert bucket.take(0.0) == 0 and bucket.take(0.0) == 0
+    assert bucket.take(0.0) == pytest.approx(0.5)
+    assert bucket.take(0.25) == pytest.approx(0.25)
+    assert bucket.take(0.5) == 0
+    assert bucket.take(10.0) == 0 and bucket.tokens == pytest.approx(1.0)
+
+def test_full_buckets_are_evicted_at_the_key_limit():
+    limiter = InMemoryRateLimiter(rate=1e9, burst=10, max_keys=100)
+    for i in range(1000):
+        assert limiter.try_acquire(f"key-{i}") == 0
+    assert len(limiter._buckets) <= 100
+
+@pytest.mark.asyncio
+async def test_concurrency_limiter_sheds_when_queue_full():
+    limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=1.0)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        async with limiter.slot():
+            pass
+    assert rejected.value.status_code == 503
+
+    release.set()
+    await asyncio.gather(holder, waiter)
+    assert limiter.active == 0 and limiter.queued == 0
+
+def test_session_limit_returns_429_with_retry_after(admission):
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer test-secret"}
+
+    statuses = [client.get("/api/v1/sessions/abc", headers=headers).status_code for _ in range(3)]
+
+    assert statuses == [404, 404, 429]
+    response = client.get("/api/v1/sessions/abc", headers=headers)
+    assert response.headers["Retry-After"] == "1"
+
+def test_invalid_api_key_is_rejected(admission):
+    client = TestClient(app)
+    response = client.get("/api/v1/sessions/abc", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401
@@ -0,0 +1,81 @@
+"""Tests for the event-sourced session store"""
+
+import pytest
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.models.schemas import SessionEvent
+from app.services.llm_provider import StubProvider
+from app.services.question_service import QuestionService, get_question_service
+from app.services.session_events import replay
+from app.services.session_service import SessionService
+
+@pytest.fixture
+def event_mode(monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_STORE_MODE", "events")
+    monkeypatch.setattr(settings, "SESSION_SNAPSHOT_INTERVAL", 4)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+
+def _play_session(answers: int) -> str:
+    from app.main import app
+    app.dependency_overrides[get_question_service] = lambda: QuestionService(provider=StubProvider())
+    try:
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {settings.API_SECRET}"}
+        session_id = client.post("/api/v1/sessions/create", json={"user_id": "u1"}, headers=headers).json()["session"]["id"]
+        client.post("/api/v1/chat/select-field", json={"session_id": session_id, "field": "math"}, headers=headers)
+        for i in range(answers):
+            response = client.post("/api/v1/chat/answer", json={"session_id": session_id, "answer": str(i)}, headers=headers)
+            assert response.status_code == 200
+        return session_id
+    finally:
+        app.dependency_overrides.clear()
+
+async def test_snapshot_plus_tail_matches_full_replay(event_mode, in_memory_database):
+    session_id = _play_session(answers=4)
+
+    events = in_memory_database.session_events[session_id]
+    session = await SessionService().get_session(session_id)
+    # Served questions are stored once and referenced from their events by ID
+    resolved = [
+        {**event, "data": {**event["data"], "question": in_memory_database.questions[event["data"]["question_id"]]}}
+        if "question_id" in event["data"] else event
+        for event in events
+    ]
+    rebuilt = replay(session_id, None, (SessionEvent(**event) for event in resolved))
+
+    assert [event["seq"] for event in events] == list(range(1, len(events) + 1))
+    assert session.version == len(events)
+    assert in_memory_database.sessions[session_id]["version"] % 4 in (0, 1)  # creation or interval snapshot
+    assert session.total_questions == 4
+    assert rebuilt.model_dump() == session.model_dump()
+
+async def test_completed_session_replays_completion(event_mode, in_memory_database, monkeypatch):
+    monkeypatch.setattr(settings, "QUESTIONS_PER_SESSION", 3)
+    session_id = _play_session(answers=3)
+
+    session = await SessionService().get_session(session_id)
+
+    assert session.is_complete
+    assert session.end_time is not None
+    assert session.messages[-1].content.startswith("Session complete!")
+
+async def test_snapshot_mode_does_not_write_events(in_memory_database):
+    service = SessionService()
+    session = await service.create_session("u1")
+
+    assert in_memory_database.session_events == {}
+    assert (await service.get_session(session.id)).version == 1
+
+async def test_event_appends_never_duplicate_a_seq(in_memory_database):
+    first = [{"seq": 1, "type": "session_created", "data": {}}]
+    racing = [{"seq": 2, "type": "message_received", "data": {"writer": "a"}}]
+    losing = [{"seq": 2, "type": "message_received", "data": {"writer": "b"}}]
+
+    assert await in_memory_database.append_session_events("s1", first)
+    assert await in_memory_database.append_session_events("s1", racing)
+    assert not await in_memory_database.append_session_events("s1", losing)
+    assert not await in_memory_database.append_session_events("s1", [{"seq": 5, "type": "message_received", "data": {}}])
+
+    events = await in_memory_database.get_session_events("s1")
+    assert [event["seq"] for event in events] == [1, 2]
+    assert events[1]["data"]["writer"] == "a"
@@ -0,0 +1,125 @@
+"""Tests for the consistent-hash sharded store"""
+
+from datetime import datetime, timedelta
+from app.core import database
+from app.core.sharding import HashRing, ShardedDatabase
+
+def _session(session_id: str, user_id: str = "u1", start: datetime = datetime(2026, 3, 1), **extra) -> dict:
+    return {"id": session_id, "user_id": user_id, "start_time": start.isoformat(), "messages": [], **extra}
+
+def _sharded(count: int, **kwargs) -> ShardedDatabase:
+    return ShardedDatabase({f"node{i}": database.InMemoryDatabase() for i in range(count)}, **kwargs)
+
+def test_adding_a_node_moves_only_its_share_of_keys():
+    keys = [f"session-{i}" for i in range(20000)]
+    before = HashRing(["a", "b", "c", "d"])
+    after = HashRing(["a", "b", "c", "d", "e"])
+
+    moved = [key for key in keys if before.node_for(key) != after.node_for(key)]
+    counts = {node: sum(before.node_for(key) == node for key in keys) for node in before.nodes}
+
+    # Every moved key goes to the new node, and it takes about a fifth of them
+    assert {after.node_for(key) for key in moved} == {"e"}
+    assert 0.15 < len(moved) / len(keys) < 0.25
+    assert max(counts.values()) / min(counts.values()) < 1.3
+
+async def test_keys_are_routed_by_id_and_batches_grouped_by_node():
+    db = _sharded(3)
+    for i in range(30):
+        await db.save_session(f"s{i}", _session(f"s{i}"))
+        await db.append_session_events(f"s{i}", [{"seq": 1, "type": "session_created", "data": {}}])
+    questions = {f"q_{i}": {"question": f"Q{i}"} for i in range(50)}
+    assert await db.put_questions(questions)
+
+    for i in range(30):
+        owner = db.shards[db.ring.node_for(f"s{i}")]
+        assert f"s{i}" in owner.sessions and f"s{i}" in owner.session_events
+    assert all(shard.sessions for shard in db.shards.values())
+    assert await db.get_questions(list(questions) + ["q_missing"]) == questions
+    assert sum(len(shard.questions) for shard in db.shards.values()) == 50
+
+async def test_user_sessions_page_across_nodes_newest_first():
+    db = _sharded(3)
+    start = datetime(2026, 3, 1)
+    for i in range(25):
+        await db.save_session(f"s{i:02d}", _session(f"s{i:02d}", start=start + timedelta(minutes=i)))
+    await db.save_session("other", _session("other", user_id="u2"))
+
+    listed, cursor = [], None
+    while True:
+        page, cursor = await db.list_user_sessions("u1", 7, cursor)
+        listed += [record["id"] for record in page]
+        if cursor is None:
+            break
+    assert listed == [f"s{i:02d}" for i in reversed(range(25))]
+
+async def test_online_rebalance_dual_reads_then_moves_everything():
+    db = _sharded(2, idle_seconds=3600)
+    old = datetime.now() - timedelta(days=1)
+    for i in range(200):
+        await db.save_session(f"s{i}", _session(f"s{i}", start=old))
+        await db.append_session_events(f"s{i}", [{"seq": 1, "type": "session_created", "at": old.isoformat(), "data": {}}])
+        await db.save_user_profile(f"u{i}", {"user_id": f"u{i}"})
+    await db.put_questions({f"q_{i}": {"question": f"Q{i}"} for i in range(100)})
+
+    db.add_node("node2", database.InMemoryDatabase())
+    moving = [f"s{i}" for i in range(200) if db.ring.node_for(f"s{i}") == "node2"]
+    assert moving and not db.shards["node2"].sessions
+
+    # Still readable from the previous owner before anything has moved
+    assert await db.get_session(moving[0]) == _session(moving[0], start=old)
+    assert len(await db.get_session_events(moving[1])) == 1
+    # A write moves the session (with its log) before it lands on the new owner
+    await db.append_session_events(moving[1], [{"seq": 2, "type": "message_received", "data": {}}])
+    assert [event["seq"] for event in db.shards["node2"].session_events[moving[1]]] == [1, 2]
+    assert not any(moving[1] in db.shards[node].sessions for node in ("node0", "node1"))
+
+    # A recently active session waits for its own next write
+    active = moving[2]
+    session = await db.get_session(active)
+    session["messages"] = [{"timestamp": datetime.now().isoformat()}]
+    await db.shards[db.previous.node_for(active)].save_session(active, session)
+    first = await db.rebalance_once()
+    assert first["active"] == 1 and first["session"] > 0 and first["user"] > 0 and first["question"] > 0
+    assert db.rebalancing
+
+    await db.save_session(active, session)
+    assert await db.rebalance_once() == {"session": 0, "user": 0, "question": 0, "active": 0}
+    assert not db.rebalancing
+
+    for node, shard in db.shards.items():
+        assert all(db.ring.node_for(key) == node for key in shard.sessions)
+        assert all(db.ring.node_for(key) == node for key in shard.user_profiles)
+        assert all(db.ring.node_for(key) == node for key in shard.questions)
+    assert sum(len(shard.sessions) for shard in db.shards.values()) == 200
+    assert len(await db.get_questions([f"q_{i}" for i in range(100)])) == 100
+
+async def test_a_move_resumes_partial_copies_and_never_deletes_newer_writes():
+    db = _sharded(1)
+    source, target = database.InMemoryDatabase(), database.InMemoryDatabase()
+    events = [{"seq": seq, "type": "message_received", "data": {}} for seq in (1, 2)]
+    for session_id in ("resumed", "diverged"):
+        await source.save_session(session_id, _session(session_id))
+        await source.append_session_events(session_id, events)
+    # An interrupted move copied one event; another worker moved the other and wrote past it
+    await target.append_session_events("resumed", events[:1])
+    newer = [*events, {"seq": 3, "type": "answer_submitted", "data": {}}]
+    await target.append_session_events("diverged", newer)
+
+    assert await db._move_session("resumed", source, target)
+    assert not await db._move_session("diverged", source, target)
+
+    assert await target.get_session_events("resumed") == events
+    assert await target.get_session_events("diverged") == newer
+    assert not source.sessions and not source.session_events
+
+async def test_sqlite_nodes_scan_and_delete_records(tmp_path):
+    db = database.SQLiteDatabase(str(tmp_path / "node.db"))
+    for i in range(5):
+        await db.save_user_profile(f"u{i}", {"user_id": f"u{i}"})
+    keys, cursor = await db.scan_keys("user", None, 3)
+    rest, end = await db.scan_keys("user", cursor, 3)
+
+    assert keys + rest == [f"u{i}" for i in range(5)] and end is None
+    await db.delete_user_profile("u0")
+    assert await db.get_user_profile("u0") is None
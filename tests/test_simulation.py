@@ -0,0 +1,46 @@
+"""Tests for the adaptive difficulty simulation harness"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+# The simulation imports numpy at module level, so it is imported after the skip
+from app.core.config import settings  # noqa: E402
+from app.services.simulation import SimulationConfig, response_probability, simulate  # noqa: E402
+
+def _outcomes(report: dict) -> dict:
+    return {key: value for key, value in report.items() if key != "users_per_second"}
+
+def test_vectorized_mode_matches_full_sessions():
+    config = SimulationConfig(difficulty_adjustment=0.3, guessing=0.25, ability_sd=1.5)
+    sessions = simulate(config, 400, shard_size=150, seed=3, mode="sessions")
+    vectorized = simulate(config, 400, shard_size=150, seed=3)
+
+    assert _outcomes(sessions) == _outcomes(vectorized)
+    assert sessions["users"] == 400
+    # The settings under test are restored afterwards
+    assert settings.DIFFICULTY_ADJUSTMENT != 0.3
+
+def test_results_do_not_depend_on_the_number_of_workers():
+    config = SimulationConfig(questions_per_session=6)
+    single = simulate(config, 3000, workers=1, shard_size=1000, seed=5)
+    pooled = simulate(config, 3000, workers=2, shard_size=1000, seed=5)
+
+    assert _outcomes(single) == _outcomes(pooled)
+
+def test_difficulty_tracks_ability_and_larger_steps_oscillate_more():
+    weak = simulate(SimulationConfig(ability_mean=2.0), 20000, seed=1)
+    strong = simulate(SimulationConfig(ability_mean=4.0), 20000, seed=1)
+    coarse = simulate(SimulationConfig(ability_mean=4.0, difficulty_adjustment=1.0), 20000, seed=1)
+
+    assert strong["ability_difficulty_corr"] > 0.5
+    assert strong["accuracy"] > weak["accuracy"]
+    assert coarse["reversals_per_session"] > strong["reversals_per_session"]
+
+def test_response_probability_follows_the_logistic_model():
+    ability = np.array([1.0, 3.0, 5.0])
+    p = response_probability(ability, 3.0, discrimination=1.7, guessing=0.25)
+
+    assert p[1] == pytest.approx(0.625)
+    assert p[0] < p[1] < p[2]
+    assert p[0] > 0.25
@@ -0,0 +1,85 @@
+"""Tests for speculative next-question generation"""
+
+import asyncio
+import pytest
+from app.core import rate_limit
+from app.core.metrics import get_metrics
+from app.core.rate_limit import AdmissionController, ConcurrencyLimiter, InMemoryRateLimiter
+from app.models.schemas import FieldType, UserSession
+from app.services.llm_provider import StubProvider
+from app.services.question_service import QuestionService
+from app.services.session_service import SessionService
+from app.services.speculation import SpeculativeGenerator
+
+@pytest.fixture
+def speculator():
+    question_service = QuestionService(provider=StubProvider())
+    question_service.base_ai_ratio = 1.0
+    get_metrics().reset()
+    return SpeculativeGenerator(question_service, max_per_session=5)
+
+def _session(session_id="s1"):
+    # One correct answer at difficulty 1.5: a correct answer moves to 2, a wrong one stays at 1
+    return UserSession(
+        id=session_id,
+        selected_field=FieldType.MATH,
+        total_questions=1,
+        correct_answers=1,
+        difficulty=1.5
+    )
+
+def test_reachable_difficulties(speculator):
+    assert speculator.reachable_difficulties(_session(), SessionService()) == {1, 2}
+
+@pytest.mark.asyncio
+async def test_matching_branch_is_served_and_loser_recycled(speculator):
+    session = _session()
+    speculator.speculate(session, SessionService())
+    await asyncio.sleep(0.01)
+
+    question = await speculator.next_question(session, 2)
+
+    assert question.difficulty == 2
+    metrics = get_metrics()
+    assert metrics.counter("speculation.hits") == 1
+    assert metrics.counter("speculation.recycled") == 1
+
+    other = await speculator.next_question(_session("s2"), 1)
+    assert other.difficulty == 1
+    assert metrics.counter("speculation.pool_hits") == 1
+
+@pytest.mark.asyncio
+async def test_speculative_spend_is_capped(speculator):
+    speculator.max_per_session = 1
+    session = _session()
+
+    speculator.speculate(session, SessionService())
+    speculator.speculate(session, SessionService())
+
+    assert get_metrics().counter("speculation.launched") == 1
+    assert get_metrics().counter("speculation.capped") >= 1
+    speculator.shutdown()
+
+async def test_background_generation_counts_against_the_llm_cap(speculator, monkeypatch):
+    limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=10, queue_timeout=1.0)
+    monkeypatch.setattr(rate_limit, "_admission", AdmissionController(
+        InMemoryRateLimiter(rate=1.0, burst=1), InMemoryRateLimiter(rate=1.0, burst=1), limiter
+    ))
+    session = _session()
+
+    # The only slot is held by an admitted request: speculation is skipped, not queued
+    async with limiter.slot():
+        speculator.speculate(session, SessionService())
+        await asyncio.sleep(0.01)
+        assert limiter.queued == 0
+    assert get_metrics().counter("speculation.shed") == 2
+    question = await speculator.next_question(session, 2)
+    assert question.difficulty == 2
+
+    # Pool prefill queues for slots instead, one generation at a time
+    async with limiter.slot():
+        prefill = asyncio.create_task(speculator.prefill(FieldType.LOGIC, 2, 3))
+        await asyncio.sleep(0.01)
+        assert limiter.queued == 3
+    assert await prefill == 3
+    speculator.shutdown()
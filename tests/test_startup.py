@@ -0,0 +1,74 @@
+"""Tests for import cost and startup warm-up"""
+
+import json
+import os
+import subprocess
+import sys
+import pytest
+from httpx import AsyncClient
+from app.core.config import settings
+from app.models.schemas import FieldType
+from app.services import question_service as question_service_module
+from app.services import speculation, warmup as warmup_module
+from app.services.llm_provider import StubProvider
+from app.services.question_service import QuestionService
+from app.services.speculation import SpeculativeGenerator
+from app.services.warmup import Warmup
+
+# Generous for slow CI machines; importing the app takes well under a second locally
+IMPORT_BUDGET_SECONDS = 3.0
+
+def test_importing_the_app_stays_within_budget_and_defers_backend_clients():
+    script = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "import app.main\n"
+        "print(json.dumps({'seconds': time.perf_counter() - started, 'modules': sorted(sys.modules)}))\n"
+    )
+    env = {**os.environ, "API_SECRET": "test-secret", "OPENAI_API_KEY": "test-key"}
+    output = subprocess.run(
+        [sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    loaded = {name.split(".")[0] for name in result["modules"]}
+    assert not loaded & {"boto3", "botocore", "redis", "openai", "numpy"}
+    assert result["seconds"] < IMPORT_BUDGET_SECONDS
+
+@pytest.fixture
+def stub_services(monkeypatch):
+    question_service = QuestionService(provider=StubProvider())
+    speculator = SpeculativeGenerator(question_service, enabled=False)
+    monkeypatch.setattr(question_service_module, "_question_service", question_service)
+    monkeypatch.setattr(speculation, "_speculator", speculator)
+    return speculator
+
+async def test_warm_up_fills_the_question_pool_at_the_starting_difficulty(stub_services):
+    warmup = Warmup(pool_per_field=2)
+    await warmup.run()
+
+    assert warmup.state == "ready"
+    assert warmup.failed == []
+    assert {"database", "llm", "question_pool"} <= set(warmup.steps_ms)
+    difficulty = int(settings.DEFAULT_DIFFICULTY)
+    assert len(stub_services._pool[(FieldType.MATH, difficulty)]) == 2
+    assert len(stub_services._pool[(FieldType.LOGIC, difficulty)]) == 2
+
+    pooled = stub_services._pool[(FieldType.LOGIC, difficulty)][0]
+    assert await stub_services.first_question(FieldType.LOGIC, difficulty) is pooled
+
+async def test_readiness_reports_warming_until_warm_up_finishes(stub_services, monkeypatch):
+    from app.main import app
+    warmup = Warmup()
+    monkeypatch.setattr(warmup_module, "_warmup", warmup)
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        warmup.state = "warming"
+        warming = await client.get("/health/ready")
+        warmup.state = "ready"
+        ready = await client.get("/health/ready")
+
+    assert warming.status_code == 503
+    assert warming.json()["status"] == "warming"
+    assert ready.status_code == 200
@@ -0,0 +1,141 @@
+"""Tests for structured question generation against a local mock LLM server"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.core.config import settings
+from app.core.metrics import get_metrics
+from app.models.schemas import FieldType
+from app.services.llm_provider import OpenAICompatibleProvider
+from app.services.question_service import QuestionService, generation_summary
+from app.services.structured_output import (
+    JSONObjectExtractor, check_math_answer, extract_json_object, question_json_schema
+)
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible /chat/completions endpoint"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        content = self.server.replies.pop(0)
+        payload = {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 80, "completion_tokens": 20, "total_tokens": 100},
+        }
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def mock_llm_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockLLMHandler)
+    server.requests = []
+    server.replies = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def question_service(mock_llm_server):
+    service = QuestionService(provider=OpenAICompatibleProvider(
+        base_url=f"http://127.0.0.1:{mock_llm_server.server_port}/v1",
+        api_key="test"
+    ))
+    get_metrics().reset()
+    return service
+
+def _question_json(**overrides):
+    data = {
+        "question": "What is 12 + 7?",
+        "type": "multiple-choice",
+        "options": ["17", "18", "19", "20"],
+        "correct_answer": "19",
+        "explanation": "12 + 7 = 19",
+        "points": 2,
+    }
+    data.update(overrides)
+    return json.dumps(data)
+
+def test_extractor_ignores_preamble_and_code_fences():
+    text = 'Sure! Here is your question:\n```json\n{"question": "a {b}", "points": 2,}\n```\nEnjoy.'
+    assert extract_json_object(text) == {"question": "a {b}", "points": 2}
+
+def test_extractor_handles_streamed_chunks():
+    extractor = JSONObjectExtractor()
+    chunks = ['noise {"a": "x\\"', '}", "b": [1, ', '2]} tail {"c": 3}']
+    results = [obj for chunk in chunks for obj in extractor.feed(chunk)]
+    assert results == [{"a": 'x"}', "b": [1, 2]}, {"c": 3}]
+
+def test_schema_is_derived_from_question_model():
+    schema = question_json_schema()
+    assert schema["properties"]["type"]["enum"] == ["multiple-choice", "text", "number"]
+    assert set(schema["required"]) == set(schema["properties"])
+    assert "$ref" not in json.dumps(schema)
+
+def test_check_math_answer():
+    assert check_math_answer("What is 12 × 7?", "84") is True
+    assert check_math_answer("Solve for x: 3x + 4 = 19", "x = 5") is True
+    assert check_math_answer("What is 15% of 80?", "10") is False
+    assert check_math_answer("Which shape has the most sides?", "hexagon") is None
+
+def test_check_math_answer_leaves_quadratics_alone_and_reads_fractions():
+    # The `5x + 6 = 0` tail of a quadratic is not a linear equation
+    assert check_math_answer("Solve the quadratic equation: x² + 5x + 6 = 0", "-2") is None
+    assert check_math_answer("If f(x) = 2x^2 + 3x + 1 = 0, what is x?", "-1") is None
+    assert check_math_answer("Solve for x: 2x + 0 = 1", "1/2") is True
+    assert check_math_answer("Solve for x: 2x + 0 = 1", "x = 1") is False
+    assert check_math_answer("Solve for x: -x + 4 = 1", "3") is True
+    assert check_math_answer("What is 3 / 4?", "3/4") is True
+
+@pytest.mark.asyncio
+async def test_fenced_output_is_accepted_on_fast_tier(question_service, mock_llm_server):
+    mock_llm_server.replies.append(f"Here you go:\n```json\n{_question_json()}\n```")
+
+    question = await question_service._generate_ai_question(FieldType.MATH, 1)
+
+    assert question is not None
+    assert question.correct_answer == "19"
+    request = mock_llm_server.requests[0]
+    assert request["model"] == settings.OPENAI_FAST_MODEL
+    assert request["response_format"]["type"] == "json_schema"
+    assert generation_summary()["cost_per_accepted_question"] > 0
+
+@pytest.mark.asyncio
+async def test_wrong_math_answer_is_retried_on_cheap_tier(question_service, mock_llm_server):
+    mock_llm_server.replies.append(_question_json(correct_answer="20"))
+    mock_llm_server.replies.append(_question_json())
+
+    question = await question_service._generate_ai_question(FieldType.MATH, 4)
+
+    assert question is not None and question.correct_answer == "19"
+    assert [r["model"] for r in mock_llm_server.requests] == [
+        settings.OPENAI_MODEL, settings.OPENAI_FAST_MODEL
+    ]
+    assert get_metrics().counter("question_generation.consistency_failures") == 1
+
+@pytest.mark.asyncio
+async def test_parse_failure_rate_is_tracked(question_service, mock_llm_server):
+    mock_llm_server.replies.extend(["I cannot help with that.", "Still no JSON."])
+
+    question = await question_service._generate_ai_question(FieldType.LOGIC, 3)
+
+    assert question is None
+    assert generation_summary()["parse_failure_rate"] == 1.0
@@ -0,0 +1,87 @@
+"""Tests for the background task runtime"""
+
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from app.api.dependencies import backlog_admission
+from app.core import tasks
+from app.core.tasks import HIGH, LOW, NORMAL, TaskQueue, TaskRuntime
+
+async def test_jobs_run_by_priority_and_failures_are_retried():
+    runtime = TaskRuntime()
+    queue = runtime.define(TaskQueue("work", workers=1, max_size=10, retry_base_seconds=0.001))
+    runtime.start()
+    gate = asyncio.Event()
+    order, attempts = [], []
+
+    async def blocker():
+        await gate.wait()
+
+    async def record(name):
+        order.append(name)
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("store unavailable")
+
+    runtime.submit("work", blocker)
+    await asyncio.sleep(0)
+    for name, priority in [("low", LOW), ("normal", NORMAL), ("high", HIGH), ("normal-2", NORMAL)]:
+        runtime.submit("work", record, name, priority=priority)
+    runtime.submit("work", flaky, priority=LOW)
+    gate.set()
+    await runtime.drain()
+
+    assert order == ["high", "normal", "normal-2", "low"]
+    assert len(attempts) == 3
+    assert not queue.running
+
+async def test_full_queues_run_jobs_inline_and_signal_backpressure(monkeypatch):
+    runtime = TaskRuntime(drain_timeout=0.05)
+    queue = runtime.define(TaskQueue("post_response", workers=1, max_size=4, high_water=0.5))
+    runtime.start()
+    gate = asyncio.Event()
+    ran = []
+
+    async def blocked():
+        await gate.wait()
+
+    async def job(name):
+        ran.append(name)
+
+    runtime.submit("post_response", blocked)
+    await asyncio.sleep(0)
+    for _ in range(4):
+        assert runtime.submit("post_response", blocked)
+    queued = await runtime.defer("post_response", job, "inline")
+
+    assert not queued and ran == ["inline"]
+    assert queue.depth == 4 and runtime.retry_after() > 0
+    monkeypatch.setattr(tasks, "_runtime", runtime)
+    with pytest.raises(HTTPException) as rejected:
+        await backlog_admission()
+    assert rejected.value.status_code == 503 and "Retry-After" in rejected.value.headers
+
+    # Jobs still blocked when the drain timeout runs out are dropped, not awaited forever
+    await runtime.drain()
+    assert not queue.running and runtime.retry_after() is None
+    assert not await runtime.defer("post_response", job, "after-drain") and ran[-1] == "after-drain"
+
+async def test_plain_functions_run_in_the_queue_executor():
+    runtime = TaskRuntime()
+    runtime.define(TaskQueue("cpu", workers=2, executor="thread"))
+    runtime.start()
+    threads = []
+
+    def crunch(n):
+        threads.append(threading.current_thread().name)
+        return sum(i * i for i in range(n))
+
+    for _ in range(4):
+        assert runtime.submit("cpu", crunch, 10_000)
+    await runtime.drain()
+
+    assert len(threads) == 4
+    assert all(name.startswith("tasks-cpu") for name in threads)
@@ -0,0 +1,135 @@
+"""Tests for question time limits and the timer wheel"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from app.core.config import settings
+from app.services.llm_provider import StubProvider
+from app.services.question_service import QuestionService, get_question_service
+from app.services.session_service import SessionService
+from app.services.timers import TimerWheel
+
+def test_timer_wheel_fires_each_live_timer_once_on_time():
+    rng = random.Random(5)
+    wheel = TimerWheel(tick_seconds=1, slots=8, levels=3, now=0)
+    deadlines = {}
+    for key in range(3000):
+        # Some deadlines lie beyond the wheel's 512-tick range
+        deadlines[key] = rng.uniform(0, 2000)
+        wheel.schedule(key, deadlines[key])
+    for key in range(0, 3000, 7):
+        wheel.cancel(key)
+        del deadlines[key]
+    for key in range(1, 3000, 11):
+        deadlines[key] = rng.uniform(0, 100)
+        wheel.schedule(key, deadlines[key])
+
+    fired = {}
+    for now in range(2100):
+        for key in wheel.advance(now):
+            assert key not in fired
+            fired[key] = now
+
+    assert fired.keys() == deadlines.keys()
+    assert all(deadlines[key] <= fired[key] < deadlines[key] + 1 for key in fired)
+    assert len(wheel) == 0
+
+@pytest.fixture
+def client(monkeypatch):
+    from app.main import app
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "QUESTIONS_PER_SESSION", 3)
+    app.dependency_overrides[get_question_service] = lambda: QuestionService(provider=StubProvider())
+    yield httpx.AsyncClient(app=app, base_url="http://test", headers={"Authorization": f"Bearer {settings.API_SECRET}"})
+    app.dependency_overrides.clear()
+
+async def _session_with_overdue_question(client) -> str:
+    session_id = (await client.post("/api/v1/sessions/create", json={})).json()["session"]["id"]
+    await client.post("/api/v1/chat/select-field", json={"session_id": session_id, "field": "math"})
+    service = SessionService()
+    session = await service.get_session(session_id)
+    session.question_served_at = datetime.now() - timedelta(seconds=session.current_question.time_limit + 10)
+    await service.update_session(session)
+    return session_id
+
+async def test_late_answer_counts_as_timed_out(client):
+    session_id = await _session_with_overdue_question(client)
+
+    response = (await client.post("/api/v1/chat/answer", json={"session_id": session_id, "answer": "1"})).json()
+    analytics = (await client.get(f"/api/v1/sessions/{session_id}/analytics")).json()
+
+    assert response["timed_out"] is True
+    assert response["is_correct"] is False
+    assert response["next_question"] is not None
+    assert analytics["timed_out_questions"] == 1
+    assert analytics["field_performance"]["math"]["timed_out"] == 1
+
+async def test_expiry_advances_the_session(client):
+    from app.api.routes.chat import expire_question
+    session_id = await _session_with_overdue_question(client)
+    expired_id = (await SessionService().get_session(session_id)).current_question.id
+
+    await expire_question(session_id)
+    await expire_question(session_id)  # a duplicate firing finds nothing overdue
+    session = await SessionService().get_session(session_id)
+    stale = await client.post(
+        "/api/v1/chat/answer", json={"session_id": session_id, "answer": "1", "question_id": expired_id}
+    )
+
+    assert session.total_questions == 1
+    assert session.timed_out_questions == 1
+    assert session.current_question.id != expired_id
+    assert session.question_served_at is not None
+    assert stale.status_code == 409
+
+async def test_answer_records_response_time(client):
+    session_id = (await client.post("/api/v1/sessions/create", json={})).json()["session"]["id"]
+    await client.post("/api/v1/chat/select-field", json={"session_id": session_id, "field": "math"})
+
+    response = (await client.post("/api/v1/chat/answer", json={"session_id": session_id, "answer": "1"})).json()
+    session = await SessionService().get_session(session_id)
+
+    assert response["timed_out"] is False
+    assert 0 <= response["response_seconds"] < 5
+    assert session.response_times == [response["response_seconds"]]
+    assert session.field_scores["math"].average_response_seconds == response["response_seconds"]
+
+async def test_expiry_and_answer_racing_for_the_same_question_apply_once(client, monkeypatch):
+    from app.api.routes import chat
+    session_id = await _session_with_overdue_question(client)
+    expired_id = (await SessionService().get_session(session_id)).current_question.id
+
+    # Hold each load until both paths have loaded, or briefly when one waits on the other
+    loaded, both_loaded = [], asyncio.Event()
+    load = SessionService.get_session
+    async def gated_load(self, session_id):
+        session = await load(self, session_id)
+        loaded.append(session_id)
+        if len(loaded) >= 2:
+            both_loaded.set()
+        try:
+            await asyncio.wait_for(both_loaded.wait(), 0.2)
+        except asyncio.TimeoutError:
+            pass
+        return session
+    monkeypatch.setattr(SessionService, "get_session", gated_load)
+    time_outs = []
+    time_out = chat._time_out
+    monkeypatch.setattr(chat, "_time_out", lambda service, session: time_outs.append(session.id) or time_out(service, session))
+
+    answer, _ = await asyncio.gather(
+        client.post("/api/v1/chat/answer", json={"session_id": session_id, "answer": "1", "question_id": expired_id}),
+        chat.expire_question(session_id)
+    )
+    monkeypatch.setattr(SessionService, "get_session", load)
+    session = await SessionService().get_session(session_id)
+
+    assert len(time_outs) == 1
+    assert session.total_questions == 1 and session.timed_out_questions == 1
+    if answer.status_code == 200:
+        # The client is shown exactly the question that is stored as current
+        assert answer.json()["next_question"]["id"] == session.current_question.id
+    else:
+        assert answer.status_code == 409
@@ -0,0 +1,91 @@
+"""Tests for user profiles, ability tracking and the user_id session index"""
+
+import asyncio
+import threading
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from app.core import database
+from app.core.config import settings
+from app.core.database import InMemoryDatabase, SQLiteDatabase
+from app.models.schemas import FieldType, UserSession
+from app.services.session_service import SessionService
+
+async def _save_sessions(service: SessionService, user_id: str, count: int):
+    base = datetime(2024, 1, 1)
+    for i in range(count):
+        session = UserSession(id=f"s{i}", user_id=user_id, start_time=base + timedelta(minutes=i))
+        await service.update_session(session)
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+async def test_user_sessions_are_paginated_newest_first(backend):
+    database._database = InMemoryDatabase() if backend == "memory" else SQLiteDatabase(":memory:")
+    service = SessionService()
+    await _save_sessions(service, "u1", 5)
+    await service.update_session(UserSession(id="other", user_id="u2"))
+    await service.update_session(UserSession(id="s4", user_id="u1", start_time=datetime(2024, 1, 1, 0, 4), score=7))
+
+    first = await service.list_user_sessions("u1", limit=2)
+    second = await service.list_user_sessions("u1", limit=2, cursor=first.next_cursor)
+    third = await service.list_user_sessions("u1", limit=2, cursor=second.next_cursor)
+
+    assert [s.session_id for s in first.sessions] == ["s4", "s3"]
+    assert first.sessions[0].score == 7
+    assert [s.session_id for s in second.sessions] == ["s2", "s1"]
+    assert [s.session_id for s in third.sessions] == ["s0"]
+    assert third.next_cursor is None
+
+async def test_completed_sessions_update_ability_and_starting_difficulty():
+    service = SessionService()
+    assert await service.starting_difficulty("u1", FieldType.MATH) == settings.DEFAULT_DIFFICULTY
+
+    for difficulty in (3.0, 4.0):
+        session = UserSession(id="s", user_id="u1", selected_field=FieldType.MATH, difficulty=difficulty, total_questions=10)
+        await service.record_completion(session)
+
+    profile = await service.get_user_profile("u1")
+    ability = profile.abilities["math"]
+    assert ability.sessions == 2
+    assert ability.questions == 20
+    assert 3.0 < ability.estimate < 4.0
+    assert await service.starting_difficulty("u1", FieldType.MATH) == round(ability.estimate, 1)
+    assert await service.starting_difficulty("u1", FieldType.LOGIC) == settings.DEFAULT_DIFFICULTY
+
+def test_user_sessions_route():
+    from app.main import app
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {settings.API_SECRET}"}
+
+    created = client.post("/api/v1/sessions/create", json={"user_id": "u9"}, headers=headers)
+    response = client.get("/api/v1/users/u9/sessions?limit=5", headers=headers)
+    invalid = client.get("/api/v1/users/u9/sessions?cursor=nope", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["sessions"][0]["session_id"] == created.json()["session"]["id"]
+    assert invalid.status_code == 400
+
+async def test_a_failed_profile_save_raises_so_the_job_retries_it(in_memory_database, monkeypatch):
+    service = SessionService()
+    session = UserSession(id="s", user_id="u1", selected_field=FieldType.MATH, difficulty=3.0, total_questions=10)
+    save = in_memory_database.save_user_profile
+    async def unavailable(user_id, profile_data):
+        return False
+    monkeypatch.setattr(in_memory_database, "save_user_profile", unavailable)
+
+    with pytest.raises(RuntimeError):
+        await service.record_completion(session)
+
+    monkeypatch.setattr(in_memory_database, "save_user_profile", save)
+    assert await service.record_completion(session)
+    assert (await service.get_user_profile("u1")).abilities["math"].sessions == 1
+
+
+async def test_sqlite_queries_run_off_the_event_loop_thread():
+    db = SQLiteDatabase(":memory:")
+    threads = set()
+    db.conn.set_trace_callback(lambda statement: threads.add(threading.get_ident()))
+
+    await asyncio.gather(*(db.save_user_profile(f"u{i}", {"user_id": f"u{i}"}) for i in range(20)))
+
+    assert await db.get_user_profile("u7") == {"user_id": "u7"}
+    assert threads and threading.get_ident() not in threads